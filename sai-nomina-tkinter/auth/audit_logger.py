@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AuditLogger - Sistema SGN
+Registro de auditoría diferido: los eventos se encolan y un hilo dedicado
+los inserta en lotes sobre su propia conexión
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.models import LogAuditoria
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = ('usuario', 'accion', 'modulo', 'tabla', 'registro_id', 'valores_antes',
+            'valores_despues', 'ip_address', 'fecha', 'exitosa', 'detalles')
+
+INSERT_SQL = (
+    f"INSERT INTO {LogAuditoria.__tablename__} ({', '.join(COLUMNAS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNAS)})"
+)
+
+# Espera máxima del llamador con la cola llena antes de escribir él mismo
+ESPERA_COLA_LLENA = 0.5
+
+
+class _FlushRequest:
+    """Marca en la cola para forzar la escritura de lo pendiente"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class AuditLogger:
+    """
+    Auditoría con escritura diferida (write-behind)
+
+    log() solo encola una tupla; el hilo escritor agrupa hasta batch_size
+    eventos o flush_interval milisegundos y los inserta con executemany en
+    una transacción. Así la auditoría no usa la sesión del llamador (no
+    confirma cambios ajenos) ni bloquea la interfaz.
+    """
+
+    def __init__(self, database_path=None, queue_size=None, batch_size=None, flush_interval=None):
+        self.database_path = Path(database_path or Config.DATABASE_PATH)
+        self.batch_size = batch_size or Config.AUDIT_BATCH_SIZE
+        self.flush_interval = (flush_interval or Config.AUDIT_FLUSH_INTERVAL) / 1000.0
+        self.queue = queue.Queue(maxsize=queue_size or Config.AUDIT_QUEUE_SIZE)
+
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Las métricas se actualizan desde los hilos que llaman a log() y
+        # desde el hilo escritor
+        self._metrics_lock = threading.Lock()
+        self._conn = None
+        self._closed = False
+
+        self._metrics = {
+            'encolados': 0,
+            'escritos': 0,
+            'lotes': 0,
+            'perdidos': 0,
+            'escrituras_directas': 0,
+            'profundidad_maxima': 0,
+            'ultima_latencia_ms': 0.0,
+            'latencia_maxima_ms': 0.0,
+            'latencia_total_ms': 0.0,
+        }
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closed = False
+                self._thread = threading.Thread(target=self._worker, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def log(self, usuario, accion, modulo=None, tabla=None, registro_id=None,
+            valores_antes=None, valores_despues=None, detalles=None, exitosa=True,
+            ip_address=None, fecha=None):
+        """Encolar un evento de auditoría (no bloquea salvo con la cola llena)"""
+        row = (
+            usuario, accion, modulo, tabla,
+            str(registro_id) if registro_id is not None else None,
+            valores_antes, valores_despues, ip_address,
+            (fecha or datetime.utcnow()).isoformat(sep=' '),
+            1 if exitosa else 0, detalles,
+        )
+
+        if self._closed:
+            self._write_direct([row])
+            return
+        if self._thread is None:
+            self.start()
+
+        try:
+            self.queue.put(row, timeout=ESPERA_COLA_LLENA)
+        except queue.Full:
+            # Presión hacia atrás: antes que perder el evento se escribe aquí
+            self._write_direct([row])
+            return
+
+        depth = self.queue.qsize()
+        with self._metrics_lock:
+            self._metrics['encolados'] += 1
+            if depth > self._metrics['profundidad_maxima']:
+                self._metrics['profundidad_maxima'] = depth
+
+    def flush(self, timeout=5.0):
+        """Esperar a que todo lo encolado hasta ahora quede escrito"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        request = _FlushRequest()
+        self.queue.put(request)
+        return request.done.wait(timeout)
+
+    def shutdown(self, timeout=5.0):
+        """Escribir lo pendiente y detener el hilo (se registra con atexit)"""
+        if self._thread is None:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def metrics(self):
+        """Profundidad de cola, eventos escritos y latencia de escritura"""
+        with self._metrics_lock:
+            data = dict(self._metrics)
+        data['profundidad'] = self.queue.qsize()
+        data['latencia_media_ms'] = round(
+            data.pop('latencia_total_ms') / data['lotes'], 3) if data['lotes'] else 0.0
+        return data
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.database_path), timeout=30, check_same_thread=False)
+        return self._conn
+
+    def _write(self, rows):
+        """Insertar un lote en una transacción; reintenta una vez si la base está ocupada"""
+        start = time.perf_counter()
+        with self._write_lock:
+            for intento in (1, 2):
+                try:
+                    conn = self._connect()
+                    with conn:
+                        conn.executemany(INSERT_SQL, rows)
+                    break
+                except sqlite3.Error as e:
+                    if intento == 2:
+                        with self._metrics_lock:
+                            self._metrics['perdidos'] += len(rows)
+                        logger.error(f"Error escribiendo {len(rows)} eventos de auditoría: {e}")
+                        return
+                    time.sleep(1)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._metrics_lock:
+            self._metrics['escritos'] += len(rows)
+            self._metrics['lotes'] += 1
+            self._metrics['ultima_latencia_ms'] = round(elapsed, 3)
+            self._metrics['latencia_total_ms'] += elapsed
+            self._metrics['latencia_maxima_ms'] = max(self._metrics['latencia_maxima_ms'], round(elapsed, 3))
+
+    def _write_direct(self, rows):
+        with self._metrics_lock:
+            self._metrics['escrituras_directas'] += len(rows)
+        self._write(rows)
+
+    def _worker(self):
+        running = True
+        while running:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch, requests = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, _FlushRequest):
+                    requests.append(item)
+                else:
+                    batch.append(item)
+
+                if not running or requests or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            # Al cerrar se vacía lo que quede en la cola
+            if not running:
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, _FlushRequest):
+                        requests.append(item)
+                    elif item is not None:
+                        batch.append(item)
+
+            for start in range(0, len(batch), self.batch_size):
+                self._write(batch[start:start + self.batch_size])
+            for request in requests:
+                request.done.set()
+
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Instancia global
+audit_logger = AuditLogger()
+atexit.register(audit_logger.shutdown)
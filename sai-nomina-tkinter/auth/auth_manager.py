@@ -16,7 +16,8 @@ import logging
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from database.connection import get_session
-from database.models import Usuario, Rol, LogAuditoria, SesionUsuario
+from database.models import Usuario, Rol, SesionUsuario
+from auth.audit_logger import audit_logger
 
 logger = logging.getLogger(__name__)
 
@@ -269,9 +270,9 @@ class AuthManager:
 
     def log_action(self, usuario, accion, modulo=None, tabla=None, registro_id=None,
                    valores_antes=None, valores_despues=None, detalles=None):
-        """Registrar acción en auditoría"""
+        """Registrar acción en auditoría (escritura diferida, no usa la sesión)"""
         try:
-            log = LogAuditoria(
+            audit_logger.log(
                 usuario=usuario,
                 accion=accion,
                 modulo=modulo,
@@ -283,9 +284,6 @@ class AuthManager:
                 exitosa=True
             )
 
-            self.session.add(log)
-            self.session.commit()
-
         except Exception as e:
             logger.error(f"Error registrando auditoría: {str(e)}")
 
@@ -15,7 +15,8 @@ from functools import wraps
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from database.connection import get_session
-from database.models import Usuario, Rol, LogAuditoria
+from database.models import Usuario, Rol
+from auth.audit_logger import audit_logger
 
 logger = logging.getLogger(__name__)
 
@@ -342,7 +343,7 @@ class PermissionManager:
     def log_permission_denied(self, user, module, action):
         """Registrar intento de acceso denegado"""
         try:
-            log = LogAuditoria(
+            audit_logger.log(
                 usuario=user.username,
                 accion="PERMISSION_DENIED",
                 modulo=module,
@@ -350,9 +351,6 @@ class PermissionManager:
                 exitosa=False
             )
 
-            self.session.add(log)
-            self.session.commit()
-
         except Exception as e:
             logger.error(f"Error registrando acceso denegado: {str(e)}")
 
@@ -364,7 +362,7 @@ class PermissionManager:
             current_user = auth_manager.get_current_user()
             usuario = current_user.username if current_user else "SYSTEM"
 
-            log = LogAuditoria(
+            audit_logger.log(
                 usuario=usuario,
                 accion="UPDATE_PERMISSIONS",
                 modulo="usuarios",
@@ -376,9 +374,6 @@ class PermissionManager:
                 exitosa=True
             )
 
-            self.session.add(log)
-            self.session.commit()
-
         except Exception as e:
             logger.error(f"Error registrando cambio de permisos: {str(e)}")
 
@@ -53,13 +53,17 @@ class SessionManager:
             try:
                 now = datetime.utcnow()
 
-                # Marcar como inactivas las sesiones expiradas
-                expired_count = self.session.query(SesionUsuario).filter(
+                # Marcar como inactivas las sesiones expiradas. Se consulta
+                # primero: un UPDATE sin filas deja abierta una transacción de
+                # escritura que bloquea a las conexiones dedicadas (auditoría,
+                # mantenimiento) hasta el siguiente commit.
+                expired = self.session.query(SesionUsuario).filter(
                     SesionUsuario.fecha_expiracion < now,
                     SesionUsuario.activa == True
-                ).update({'activa': False})
+                )
 
-                if expired_count > 0:
+                if expired.count() > 0:
+                    expired_count = expired.update({'activa': False})
                     self.session.commit()
                     logger.info(f"Sesiones expiradas limpiadas: {expired_count}")
 
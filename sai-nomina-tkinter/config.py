@@ -14,6 +14,33 @@ class Config:
     # Base de datos
     DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
+    # Respaldos
+    BACKUP_RETENTION = 10        # Respaldos conservados por tipo
+    BACKUP_PAGES_PER_STEP = 256  # Páginas copiadas por lote
+    BACKUP_PAUSE = 0.005         # Segundos de espera entre lotes
+
+    # Archivo histórico (rphistor, log_auditoria, auditoria_acceso)
+    ARCHIVE_DIR = BASE_DIR / "archivo"
+    ARCHIVE_HORIZON_DAYS = 730   # Filas más antiguas se trasladan al archivo anual
+
+    # Auditoría en segundo plano
+    AUDIT_QUEUE_SIZE = 10000     # Eventos pendientes como máximo
+    AUDIT_BATCH_SIZE = 200       # Eventos por INSERT en lote
+    AUDIT_FLUSH_INTERVAL = 500   # Milisegundos máximos antes de escribir
+
+    # Sincronización con el sistema anterior (SQL Server RPEMPLEA/RPHISTOR)
+    # Cadena ODBC o sqlite:///ruta para una copia local con el mismo esquema
+    LEGACY_SOURCE = os.environ.get("SGN_LEGACY_SOURCE", "")
+    LEGACY_SYNC_BATCH = 1000     # Filas por página y por transacción
+
+    # Importación de archivos (CSV/Excel) por bloques
+    IMPORT_CHUNK_SIZE = 5000     # Filas por bloque leído y validado
+    IMPORT_WORKERS = min(4, os.cpu_count() or 1)  # Hilos de validación de la carga masiva
+    PAYSLIP_WORKERS = min(4, os.cpu_count() or 1)  # Procesos para generar recibos PDF
+    LOADER_WORKERS = 2  # Hilos de carga de datos de la interfaz
+    LOADER_POLL_MS = 30  # Intervalo de revisión de resultados de carga (ms)
+    SEARCH_DEBOUNCE_MS = 150  # Espera tras la última tecla antes de filtrar (ms)
+
     # Aplicación
     APP_NAME = "Sistema de Gestión de Nómina (SGN)"
     APP_VERSION = "1.0.0"
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ArchiveService - Sistema SGN
+Archivo por años de Historico, LogAuditoria y AuditoriaAcceso en bases
+SQLite separadas, consultables mediante vistas UNION ALL sobre ATTACH
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+import logging
+import re
+import sqlite3
+
+from sqlalchemy import create_engine, event, table, column
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.models import Historico, LogAuditoria, AuditoriaAcceso
+
+logger = logging.getLogger(__name__)
+
+# Modelo archivable -> columna de fecha que define el año del archivo
+TABLAS_ARCHIVABLES = {
+    Historico.__tablename__: (Historico, 'fecha'),
+    LogAuditoria.__tablename__: (LogAuditoria, 'fecha'),
+    AuditoriaAcceso.__tablename__: (AuditoriaAcceso, 'fecha_acceso'),
+}
+
+SUFIJO_VISTA = "_completo"
+SUFIJO_ARCHIVO = "_archivo"
+PATRON_ARCHIVO = re.compile(r'^sgn_archivo_(\d{4})\.db$')
+
+# SQLite admite 10 bases adjuntas por defecto
+MAX_ADJUNTOS = 10
+
+
+def archive_path(year, archive_dir=None):
+    return Path(archive_dir or Config.ARCHIVE_DIR) / f"sgn_archivo_{year}.db"
+
+
+def list_archives(archive_dir=None):
+    """Años con archivo disponible, del más reciente al más antiguo"""
+    directory = Path(archive_dir or Config.ARCHIVE_DIR)
+    if not directory.exists():
+        return []
+    years = []
+    for path in directory.iterdir():
+        match = PATRON_ARCHIVO.match(path.name)
+        if match:
+            years.append(int(match.group(1)))
+    return sorted(years, reverse=True)
+
+
+def history_view(model):
+    """
+    Tabla SQLAlchemy ligera sobre la vista histórica de un modelo
+
+    Ejemplo:
+        vista = history_view(Historico)
+        session.execute(select(vista).where(vista.c.empleado == codigo))
+    """
+    return table(
+        model.__tablename__ + SUFIJO_VISTA,
+        *[column(c.name, c.type) for c in model.__table__.columns]
+    )
+
+
+def archive_view_name(model):
+    """Vista temporal con solo las filas archivadas de un modelo"""
+    return model.__tablename__ + SUFIJO_ARCHIVO
+
+
+def attach_archives(dbapi_connection, archive_dir=None):
+    """
+    Adjuntar los archivos anuales y crear las vistas temporales UNION ALL
+
+    Se invoca en cada conexión nueva del engine; sin archivos las vistas
+    *_completo apuntan solo a la tabla principal, así las consultas no
+    dependen de si ya se archivó algo. Las vistas *_archivo contienen solo
+    los archivos (vacías si no hay ninguno).
+    """
+    years = list_archives(archive_dir)
+    if len(years) > MAX_ADJUNTOS:
+        logger.warning(
+            f"Hay {len(years)} archivos anuales; solo se adjuntan los {MAX_ADJUNTOS} más recientes"
+        )
+        years = years[:MAX_ADJUNTOS]
+
+    cursor = dbapi_connection.cursor()
+    try:
+        attached = {row[1] for row in cursor.execute("PRAGMA database_list")}
+        schemas = []
+        for year in years:
+            schema = f"archivo_{year}"
+            if schema not in attached:
+                cursor.execute(f"ATTACH DATABASE ? AS {schema}", (str(archive_path(year, archive_dir)),))
+            schemas.append(schema)
+
+        for table_name, (model, _) in TABLAS_ARCHIVABLES.items():
+            columns = ', '.join(c.name for c in model.__table__.columns)
+            archived = []
+            for schema in schemas:
+                exists = cursor.execute(
+                    f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+                    (table_name,)
+                ).fetchone()
+                if exists:
+                    archived.append(f"SELECT {columns} FROM {schema}.{table_name}")
+
+            views = {
+                table_name + SUFIJO_VISTA: [f"SELECT {columns} FROM main.{table_name}"] + archived,
+                table_name + SUFIJO_ARCHIVO: archived or [f"SELECT {columns} FROM main.{table_name} WHERE 0"],
+            }
+            for view, selects in views.items():
+                cursor.execute(f"DROP VIEW IF EXISTS temp.{view}")
+                cursor.execute(f"CREATE TEMP VIEW {view} AS " + " UNION ALL ".join(selects))
+    finally:
+        cursor.close()
+
+
+def install_archive_views(engine, archive_dir=None):
+    """Registrar attach_archives en el evento connect del engine"""
+    def on_connect(dbapi_connection, connection_record):
+        try:
+            attach_archives(dbapi_connection, archive_dir)
+        except sqlite3.Error as e:
+            logger.error(f"No se pudieron adjuntar los archivos históricos: {e}")
+
+    if not event.contains(engine, "connect", on_connect):
+        event.listen(engine, "connect", on_connect)
+    return on_connect
+
+
+class ArchiveService:
+    """Traslado de filas antiguas a archivos SQLite por año"""
+
+    def __init__(self, database_path=None, archive_dir=None, batch_size=5000):
+        self.database_path = Path(database_path or Config.DATABASE_PATH)
+        self.archive_dir = Path(archive_dir or Config.ARCHIVE_DIR)
+        self.batch_size = batch_size
+
+    def cutoff_date(self, horizon_days=None):
+        horizon_days = Config.ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+        return (datetime.now() - timedelta(days=horizon_days)).date()
+
+    def ensure_archive(self, year):
+        """Crear el archivo del año con el mismo esquema e índices"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = archive_path(year, self.archive_dir)
+        engine = create_engine(f"sqlite:///{path}")
+        try:
+            tables = [model.__table__ for model, _ in TABLAS_ARCHIVABLES.values()]
+            tables[0].metadata.create_all(bind=engine, tables=tables)
+        finally:
+            engine.dispose()
+        return path
+
+    def run(self, horizon_days=None, progress_callback=None):
+        """
+        Archivar las filas anteriores al horizonte
+
+        Cada lote se copia y se borra en la misma transacción sobre la base
+        principal y el archivo adjunto, de modo que una fila nunca queda en
+        ambos lados ni se pierde.
+
+        Returns:
+            dict: {tabla: {año: filas archivadas}}
+        """
+        cutoff = self.cutoff_date(horizon_days).isoformat()
+        summary = {}
+
+        conn = sqlite3.connect(str(self.database_path), timeout=30, isolation_level=None)
+        try:
+            for table_name, (model, date_column) in TABLAS_ARCHIVABLES.items():
+                years = [int(row[0]) for row in conn.execute(
+                    f"SELECT DISTINCT strftime('%Y', {date_column}) FROM {table_name} "
+                    f"WHERE {date_column} < ? AND {date_column} IS NOT NULL",
+                    (cutoff,)
+                ) if row[0]]
+
+                for year in sorted(years):
+                    moved = self._archive_year(conn, model, date_column, year, cutoff, progress_callback)
+                    summary.setdefault(table_name, {})[year] = moved
+        finally:
+            conn.close()
+
+        total = sum(sum(years.values()) for years in summary.values())
+        logger.info(f"Archivo histórico: {total} filas trasladadas (corte {cutoff})")
+
+        # Las conexiones abiertas no tienen adjuntos los archivos nuevos: se
+        # reabren para que las vistas *_completo incluyan lo trasladado
+        if total and self.database_path.resolve() == Path(Config.DATABASE_PATH).resolve():
+            from database.connection import reset_connections
+            reset_connections()
+        return summary
+
+    def _archive_year(self, conn, model, date_column, year, cutoff, progress_callback):
+        table_name = model.__tablename__
+        path = self.ensure_archive(year)
+        columns = ', '.join(c.name for c in model.__table__.columns)
+        start = f"{year:04d}-01-01"
+        end = min(f"{year + 1:04d}-01-01", cutoff)
+        condition = f"{date_column} >= ? AND {date_column} < ?"
+
+        conn.execute("ATTACH DATABASE ? AS destino", (str(path),))
+        moved = 0
+        try:
+            while True:
+                ids = [row[0] for row in conn.execute(
+                    f"SELECT id FROM main.{table_name} WHERE {condition} ORDER BY id LIMIT ?",
+                    (start, end, self.batch_size)
+                )]
+                if not ids:
+                    break
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    params = (start, end, ids[0], ids[-1])
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO destino.{table_name} ({columns}) "
+                        f"SELECT {columns} FROM main.{table_name} "
+                        f"WHERE {condition} AND id BETWEEN ? AND ?",
+                        params
+                    )
+                    deleted = conn.execute(
+                        f"DELETE FROM main.{table_name} WHERE {condition} AND id BETWEEN ? AND ?",
+                        params
+                    ).rowcount
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+                moved += deleted
+                if progress_callback:
+                    progress_callback(table_name, year, moved)
+        finally:
+            conn.execute("DETACH DATABASE destino")
+
+        return moved
+
+
+# Instancia global
+archive_service = ArchiveService()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AuditSearch - Sistema SGN
+Búsqueda de texto completo (FTS5) sobre log_auditoria combinada con los
+filtros indexados por usuario, módulo y fecha, paginada por cursor; incluye
+los eventos trasladados a los archivos anuales (ver database/archive.py)
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime
+import logging
+import re
+
+from sqlalchemy import text
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import LogAuditoria
+from database.archive import SUFIJO_VISTA, archive_view_name
+
+logger = logging.getLogger(__name__)
+
+TABLA = LogAuditoria.__tablename__
+TABLA_FTS = TABLA + "_fts"
+# Vistas temporales de cada conexión: principal + archivos, y solo archivos
+VISTA_COMPLETA = TABLA + SUFIJO_VISTA
+VISTA_ARCHIVO = archive_view_name(LogAuditoria)
+COLUMNAS_FTS = ('detalles', 'valores_antes', 'valores_despues')
+COLUMNAS_RESULTADO = ('id', 'fecha', 'usuario', 'accion', 'modulo', 'tabla', 'registro_id',
+                      'valores_antes', 'valores_despues', 'detalles', 'exitosa')
+
+_lista_fts = ', '.join(COLUMNAS_FTS)
+_nuevos = ', '.join(f"new.{c}" for c in COLUMNAS_FTS)
+_viejos = ', '.join(f"old.{c}" for c in COLUMNAS_FTS)
+
+# Índice de contenido externo: el texto vive solo en log_auditoria
+DDL_FTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+    f"{_lista_fts}, content='{TABLA}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+
+    f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {TABLA} BEGIN "
+    f"INSERT INTO {TABLA_FTS}(rowid, {_lista_fts}) VALUES (new.id, {_nuevos}); END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {TABLA} BEGIN "
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, {_lista_fts}) VALUES ('delete', old.id, {_viejos}); END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF {_lista_fts} ON {TABLA} BEGIN "
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, {_lista_fts}) VALUES ('delete', old.id, {_viejos}); "
+    f"INSERT INTO {TABLA_FTS}(rowid, {_lista_fts}) VALUES (new.id, {_nuevos}); END",
+]
+
+PATRON_TERMINO = re.compile(r'\w+', re.UNICODE)
+
+
+def install_audit_fts(connection):
+    """
+    Crear el índice FTS5 y sus triggers si no existen
+
+    La primera vez se indexan las filas que ya estaban en log_auditoria.
+    """
+    existe = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': TABLA_FTS}
+    ).fetchone()
+    for ddl in DDL_FTS:
+        connection.execute(text(ddl))
+    if not existe:
+        connection.execute(text(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')"))
+        logger.info("Índice de texto completo de auditoría creado")
+
+
+def build_match(texto):
+    """
+    Convertir texto libre en una consulta FTS5 segura
+
+    Cada palabra se cita (evita errores de sintaxis con comillas u
+    operadores) y se busca por prefijo; todas deben aparecer.
+    """
+    terminos = PATRON_TERMINO.findall(texto or '')
+    return ' '.join(f'"{t}"*' for t in terminos)
+
+
+def encode_cursor(fecha, id_):
+    return f"{fecha}|{id_}"
+
+
+def decode_cursor(cursor):
+    fecha, id_ = cursor.rsplit('|', 1)
+    return fecha, int(id_)
+
+
+class AuditSearch:
+    """Consultas paginadas sobre el log de auditoría"""
+
+    def __init__(self, session=None):
+        self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            from database.connection import get_session
+            self._session = get_session()
+        return self._session
+
+    def search(self, texto=None, usuario=None, modulo=None, tabla=None, accion=None,
+               desde=None, hasta=None, limit=50, cursor=None):
+        """
+        Buscar eventos de auditoría, del más reciente al más antiguo
+
+        Sin texto, los filtros de columna recorren idx_auditoria_usuario_fecha,
+        idx_auditoria_modulo_tabla o idx_auditoria_fecha en orden (fecha, id)
+        descendente sobre la vista log_auditoria_completo, que suma los
+        archivos anuales. Con texto, el recorrido lo conduce el índice FTS5 en
+        orden de rowid descendente (el id crece con la fecha de inserción) y
+        se detiene al completar la página, así un término frecuente no obliga
+        a materializar todas sus coincidencias. El índice FTS5 cubre solo la
+        tabla principal: cuando se agotan sus coincidencias la página se
+        completa con los eventos archivados (más antiguos, de id menor)
+        comparando cada palabra con LIKE. En ambos casos la paginación es por
+        clave: cada página cuesta lo mismo sin importar su profundidad.
+
+        Args:
+            texto: Palabras a buscar en detalles y valores antes/después
+            usuario, modulo, tabla, accion: Filtros exactos
+            desde, hasta: Rango de fecha (datetime o date)
+            limit: Filas por página
+            cursor: Valor 'siguiente' de la página anterior
+
+        Returns:
+            dict: {'resultados': [dict], 'siguiente': cursor o None}
+        """
+        condiciones = []
+        params = {'limit': limit + 1}
+        match = build_match(texto)
+
+        for campo, valor in (('usuario', usuario), ('modulo', modulo), ('tabla', tabla), ('accion', accion)):
+            if valor:
+                condiciones.append(f"l.{campo} = :{campo}")
+                params[campo] = valor
+        if desde:
+            condiciones.append("l.fecha >= :desde")
+            params['desde'] = self._as_text(desde)
+        if hasta:
+            condiciones.append("l.fecha < :hasta")
+            params['hasta'] = self._as_text(hasta)
+
+        columnas = ', '.join(f"l.{c}" for c in COLUMNAS_RESULTADO)
+        if match:
+            rows = self._search_text(texto, match, columnas, condiciones, params, cursor, limit)
+        else:
+            if cursor:
+                fecha, id_ = decode_cursor(cursor)
+                condiciones.append("(l.fecha, l.id) < (:c_fecha, :c_id)")
+                params.update(c_fecha=fecha, c_id=id_)
+            sql = f"SELECT {columnas} FROM {VISTA_COMPLETA} l"
+            if condiciones:
+                sql += " WHERE " + " AND ".join(condiciones)
+            sql += " ORDER BY l.fecha DESC, l.id DESC LIMIT :limit"
+            rows = self.session.execute(text(sql), params).fetchall()
+
+        siguiente = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            siguiente = encode_cursor(rows[-1].fecha, rows[-1].id)
+
+        return {
+            'resultados': [dict(row._mapping) for row in rows],
+            'siguiente': siguiente,
+        }
+
+    def _search_text(self, texto, match, columnas, condiciones, params, cursor, limit):
+        """Coincidencias de texto: índice FTS5 de la tabla principal y luego los archivos"""
+        c_id = decode_cursor(cursor)[1] if cursor else None
+
+        fts = [f"{TABLA_FTS} MATCH :match"] + condiciones
+        fts_params = dict(params, match=match)
+        if c_id is not None:
+            fts.append(f"{TABLA_FTS}.rowid < :c_id")
+            fts_params['c_id'] = c_id
+        sql = (f"SELECT {columnas} FROM {TABLA_FTS} JOIN {TABLA} l ON l.id = {TABLA_FTS}.rowid "
+               f"WHERE {' AND '.join(fts)} ORDER BY {TABLA_FTS}.rowid DESC LIMIT :limit")
+        rows = self.session.execute(text(sql), fts_params).fetchall()
+        if len(rows) > limit:
+            return rows
+
+        # Archivos: sin índice de texto, cada palabra debe aparecer en alguna columna
+        archivo = list(condiciones)
+        archivo_params = dict(params, limit=limit + 1 - len(rows))
+        for i, termino in enumerate(PATRON_TERMINO.findall(texto)):
+            archivo.append("(" + " OR ".join(f"l.{c} LIKE :t{i}" for c in COLUMNAS_FTS) + ")")
+            archivo_params[f"t{i}"] = f"%{termino}%"
+        ultimo = rows[-1].id if rows else c_id
+        if ultimo is not None:
+            archivo.append("l.id < :c_id")
+            archivo_params['c_id'] = ultimo
+        sql = (f"SELECT {columnas} FROM {VISTA_ARCHIVO} l "
+               f"WHERE {' AND '.join(archivo)} ORDER BY l.id DESC LIMIT :limit")
+        return rows + self.session.execute(text(sql), archivo_params).fetchall()
+
+    def rebuild(self):
+        """Reconstruir el índice desde log_auditoria"""
+        self.session.execute(text(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')"))
+        self.session.commit()
+
+    @staticmethod
+    def _as_text(value):
+        """Fechas con el mismo formato de texto que guarda SQLAlchemy"""
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ')
+        return str(value)
+
+
+# Instancia global
+audit_search = AuditSearch()
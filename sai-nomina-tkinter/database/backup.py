@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BackupManager - Sistema SGN
+Respaldos en línea con la API de backup de SQLite, comprimidos,
+con manifiesto de checksums y rotación
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    """Excepción para errores de respaldo o restauración"""
+    pass
+
+
+def copy_database(source_path, dest_path, pages=None, pause=None, progress_callback=None):
+    """
+    Copiar una base SQLite con sqlite3.Connection.backup en lotes de páginas
+
+    Entre lotes se libera el bloqueo de lectura, de modo que la aplicación
+    puede seguir escribiendo mientras dura la copia.
+
+    Args:
+        source_path: Base de origen (puede estar en uso)
+        dest_path: Archivo destino
+        pages: Páginas por lote
+        pause: Segundos de espera entre lotes
+        progress_callback: Función (copiadas, total) opcional
+
+    Returns:
+        int: Total de páginas copiadas
+    """
+    pages = pages or Config.BACKUP_PAGES_PER_STEP
+    pause = Config.BACKUP_PAUSE if pause is None else pause
+    state = {'total': 0}
+
+    def progress(status, remaining, total):
+        state['total'] = total
+        if progress_callback:
+            progress_callback(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(str(source_path), timeout=30)
+    dest = sqlite3.connect(str(dest_path))
+    try:
+        source.backup(dest, pages=pages, progress=progress)
+    finally:
+        dest.close()
+        source.close()
+    return state['total']
+
+
+def file_checksum(path):
+    """SHA-256 de un archivo leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupManager:
+    """Gestor de respaldos comprimidos de la base de datos"""
+
+    def __init__(self, database_path=None, backups_dir=None, retention=None):
+        self.database_path = Path(database_path or Config.DATABASE_PATH)
+        self.backups_dir = Path(backups_dir or Config.BACKUPS_DIR)
+        self.retention = retention or Config.BACKUP_RETENTION
+        self.manifest_path = self.backups_dir / MANIFEST_NAME
+
+    def create_backup(self, tipo="manual", progress_callback=None):
+        """
+        Crear un respaldo comprimido en línea
+
+        Args:
+            tipo: 'manual' o 'automatico' (la rotación se aplica por tipo)
+            progress_callback: Función (copiadas, total) con páginas
+
+        Returns:
+            dict: Entrada del manifiesto del respaldo creado
+        """
+        self.backups_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"backup_{tipo}_{timestamp}.db.gz"
+        counter = 1
+        while (self.backups_dir / filename).exists():
+            counter += 1
+            filename = f"backup_{tipo}_{timestamp}_{counter}.db.gz"
+        target = self.backups_dir / filename
+
+        fd, raw_path = tempfile.mkstemp(suffix=".db", dir=self.backups_dir)
+        os.close(fd)
+        try:
+            start = time.time()
+            pages = copy_database(self.database_path, raw_path, progress_callback=progress_callback)
+
+            raw_size = os.path.getsize(raw_path)
+            raw_checksum = file_checksum(raw_path)
+            with open(raw_path, 'rb') as src, gzip.open(target, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+            entry = {
+                'archivo': filename,
+                'tipo': tipo,
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'paginas': pages,
+                'tamano': os.path.getsize(target),
+                'tamano_original': raw_size,
+                'sha256': file_checksum(target),
+                'sha256_original': raw_checksum,
+                'version_app': Config.APP_VERSION,
+                'duracion': round(time.time() - start, 3),
+            }
+        except Exception:
+            if target.exists():
+                target.unlink()
+            raise
+        finally:
+            os.remove(raw_path)
+
+        manifest = self.load_manifest()
+        manifest.append(entry)
+        self.save_manifest(manifest)
+        self.rotate(tipo)
+
+        logger.info(f"Respaldo creado: {filename} ({entry['tamano'] / 1024:.1f} KB)")
+        return entry
+
+    def load_manifest(self):
+        """Entradas del manifiesto (la más reciente al final)"""
+        if not self.manifest_path.exists():
+            return []
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.error(f"Manifiesto de respaldos ilegible: {e}")
+            return []
+
+    def save_manifest(self, manifest):
+        """Escribir el manifiesto de forma atómica"""
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(manifest, fh, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def list_backups(self):
+        """Respaldos existentes en disco, del más reciente al más antiguo"""
+        return [
+            entry for entry in reversed(self.load_manifest())
+            if (self.backups_dir / entry['archivo']).exists()
+        ]
+
+    def get_entry(self, filename):
+        for entry in self.load_manifest():
+            if entry['archivo'] == filename:
+                return entry
+        raise BackupError(f"Respaldo no registrado en el manifiesto: {filename}")
+
+    def verify_backup(self, filename):
+        """Comprobar el checksum del archivo comprimido"""
+        entry = self.get_entry(filename)
+        path = self.backups_dir / filename
+        if not path.exists():
+            return False
+        return file_checksum(path) == entry['sha256']
+
+    def rotate(self, tipo=None):
+        """Conservar solo los últimos N respaldos de cada tipo"""
+        manifest = self.load_manifest()
+        tipos = [tipo] if tipo else sorted({e['tipo'] for e in manifest})
+        removed = []
+
+        for current in tipos:
+            entries = [e for e in manifest if e['tipo'] == current]
+            for entry in entries[:-self.retention]:
+                path = self.backups_dir / entry['archivo']
+                if path.exists():
+                    path.unlink()
+                removed.append(entry['archivo'])
+
+        if removed:
+            self.save_manifest([e for e in manifest if e['archivo'] not in removed])
+            logger.info(f"Respaldos rotados: {', '.join(removed)}")
+        return removed
+
+    def delete_backup(self, filename):
+        """Eliminar un respaldo y su entrada del manifiesto"""
+        path = self.backups_dir / filename
+        if path.exists():
+            path.unlink()
+        self.save_manifest([e for e in self.load_manifest() if e['archivo'] != filename])
+
+    def restore_backup(self, filename, progress_callback=None):
+        """
+        Restaurar un respaldo sobre la base en uso
+
+        Se verifica el checksum, se descomprime a un temporal, se comprueba su
+        integridad y se copia con la API de backup sobre la base activa. Al
+        terminar se cierran la sesión con scope y el pool para que las nuevas
+        sesiones lean la base restaurada.
+        """
+        entry = self.get_entry(filename)
+        path = self.backups_dir / filename
+        if not self.verify_backup(filename):
+            raise BackupError(f"Respaldo dañado o distinto del registrado: {filename}")
+
+        fd, raw_path = tempfile.mkstemp(suffix=".db", dir=self.backups_dir)
+        os.close(fd)
+        try:
+            with gzip.open(path, 'rb') as src, open(raw_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            if file_checksum(raw_path) != entry['sha256_original']:
+                raise BackupError(f"Contenido descomprimido inválido para {filename}")
+
+            self.restore_file(raw_path, progress_callback)
+        finally:
+            os.remove(raw_path)
+
+        logger.info(f"Base de datos restaurada desde: {filename}")
+        return entry
+
+    def restore_file(self, source_path, progress_callback=None):
+        """Restaurar desde un archivo SQLite sin comprimir"""
+        from database.connection import reset_connections
+
+        conn = sqlite3.connect(str(source_path))
+        try:
+            result = conn.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            conn.close()
+        if result != 'ok':
+            raise BackupError(f"El respaldo no supera quick_check: {result}")
+
+        # Liberar las conexiones propias antes de sobrescribir
+        reset_connections()
+        copy_database(source_path, self.database_path, pause=0, progress_callback=progress_callback)
+        reset_connections()
+
+
+# Instancia global
+backup_manager = BackupManager()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ChangeJournal - Sistema SGN
+Diario de cambios mantenido por triggers (rpemplea, roles_pago, rpingdes,
+prestamos) y exportación incremental por consumidor en lotes CSV/JSONL
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, date
+from decimal import Decimal
+import csv
+import json
+import logging
+
+from sqlalchemy import text, select, bindparam
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import Empleado, RolPago, IngresoDescuento, Prestamo, CambioJournal, Control
+
+logger = logging.getLogger(__name__)
+
+# Tabla -> columna de clave primaria
+TABLAS_CDC = {
+    Empleado.__tablename__: 'empleado',
+    RolPago.__tablename__: 'id',
+    IngresoDescuento.__tablename__: 'id',
+    Prestamo.__tablename__: 'id',
+}
+
+MODELOS_CDC = {m.__tablename__: m for m in (Empleado, RolPago, IngresoDescuento, Prestamo)}
+
+JOURNAL = CambioJournal.__tablename__
+FORMATOS = ('jsonl', 'csv')
+
+
+def _trigger_ddl(tabla, pk):
+    insertar = (f"INSERT INTO {JOURNAL} (tabla, pk, op, fecha) "
+                f"VALUES ('{tabla}', {{fila}}.{pk}, '{{op}}', CURRENT_TIMESTAMP);")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS cdc_{tabla}_ai AFTER INSERT ON {tabla} BEGIN "
+        + insertar.format(fila='NEW', op='I') + " END",
+
+        f"CREATE TRIGGER IF NOT EXISTS cdc_{tabla}_au AFTER UPDATE ON {tabla} BEGIN "
+        + insertar.format(fila='NEW', op='U') + " END",
+
+        # Cambio de clave: la fila anterior deja de existir para el consumidor
+        f"CREATE TRIGGER IF NOT EXISTS cdc_{tabla}_au_pk AFTER UPDATE OF {pk} ON {tabla} "
+        f"WHEN OLD.{pk} IS NOT NEW.{pk} BEGIN "
+        + insertar.format(fila='OLD', op='D') + " END",
+
+        f"CREATE TRIGGER IF NOT EXISTS cdc_{tabla}_ad AFTER DELETE ON {tabla} BEGIN "
+        + insertar.format(fila='OLD', op='D') + " END",
+    ]
+
+
+def install_change_journal(connection):
+    """Crear los triggers del diario de cambios si no existen"""
+    for tabla, pk in TABLAS_CDC.items():
+        for ddl in _trigger_ddl(tabla, pk):
+            connection.execute(text(ddl))
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+class ChangeExporter:
+    """
+    Exportación de cambios desde la marca de cada consumidor
+
+    Los cambios de una misma fila se consolidan en el último (una fila
+    modificada diez veces se exporta una vez, con sus valores actuales) y
+    las filas vigentes se leen por lotes de clave primaria. La marca del
+    consumidor se guarda en rpcontrl y solo avanza cuando los archivos se
+    escribieron completos.
+    """
+
+    def __init__(self, engine=None, batch_size=5000):
+        self._engine = engine
+        self.batch_size = batch_size
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from database.connection import get_engine
+            self._engine = get_engine()
+        return self._engine
+
+    @staticmethod
+    def _parameter(consumidor):
+        return f"CDC_{consumidor.upper()}"
+
+    def get_watermark(self, consumidor, connection=None):
+        control = Control.__table__
+        query = select(control.c.valor).where(control.c.parametro == self._parameter(consumidor))
+        if connection is not None:
+            valor = connection.execute(query).scalar()
+        else:
+            with self.engine.connect() as conn:
+                valor = conn.execute(query).scalar()
+        return int(valor) if valor else 0
+
+    def set_watermark(self, consumidor, version, connection=None):
+        """Registrar hasta qué versión recibió el consumidor"""
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        control = Control.__table__
+        stmt = sqlite_insert(control)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[control.c.parametro],
+            set_={'valor': stmt.excluded.valor, 'updated_at': stmt.excluded.updated_at}
+        )
+        values = {
+            'parametro': self._parameter(consumidor), 'valor': str(int(version)),
+            'descripcion': f"Última versión del diario exportada a {consumidor}",
+            'tipo': 'NUMBER', 'categoria': 'CDC', 'editable': False,
+            'updated_at': datetime.utcnow(),
+        }
+        if connection is not None:
+            connection.execute(stmt, values)
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(stmt, values)
+
+    def pending(self, consumidor):
+        """Cantidad de filas distintas con cambios pendientes para el consumidor"""
+        with self.engine.connect() as conn:
+            desde = self.get_watermark(consumidor, conn)
+            return conn.execute(
+                text(f"SELECT COUNT(*) FROM (SELECT 1 FROM {JOURNAL} WHERE version > :v GROUP BY tabla, pk)"),
+                {'v': desde}
+            ).scalar()
+
+    def iter_changes(self, desde, hasta, tablas=None, connection=None):
+        """
+        Cambios consolidados (tabla, pk, op, version, datos) en orden de versión
+
+        datos es None para borrados y la fila vigente en los demás casos.
+        """
+        tablas = list(tablas or TABLAS_CDC)
+        sql = text(
+            f"SELECT j.tabla, j.pk, j.op, j.version FROM {JOURNAL} j "
+            f"JOIN (SELECT tabla, pk, MAX(version) AS version FROM {JOURNAL} "
+            f"      WHERE version > :desde AND version <= :hasta AND tabla IN :tablas "
+            f"      GROUP BY tabla, pk) u ON u.version = j.version "
+            f"ORDER BY j.version"
+        ).bindparams(bindparam('tablas', expanding=True))
+
+        result = connection.execute(sql, {'desde': desde, 'hasta': hasta, 'tablas': tablas})
+        while True:
+            lote = result.fetchmany(self.batch_size)
+            if not lote:
+                break
+
+            filas = {}
+            for tabla in {row.tabla for row in lote}:
+                pks = [row.pk for row in lote if row.tabla == tabla and row.op != 'D']
+                if pks:
+                    filas[tabla] = self._load_rows(connection, tabla, pks)
+
+            for row in lote:
+                datos = None
+                if row.op != 'D':
+                    datos = filas.get(row.tabla, {}).get(row.pk)
+                    if datos is None:
+                        # Borrada después del último cambio registrado en este rango
+                        continue
+                yield row.tabla, row.pk, row.op, row.version, datos
+
+    @staticmethod
+    def _load_rows(connection, tabla, pks):
+        table = MODELOS_CDC[tabla].__table__
+        pk_column = table.c[TABLAS_CDC[tabla]]
+        filas = {}
+        for start in range(0, len(pks), 500):
+            chunk = pks[start:start + 500]
+            if pk_column.name == 'id':
+                chunk = [int(pk) for pk in chunk]
+            for row in connection.execute(select(table).where(pk_column.in_(chunk))):
+                datos = {k: _json_value(v) for k, v in row._mapping.items()}
+                filas[str(datos[pk_column.name])] = datos
+        return filas
+
+    def export(self, consumidor, destino, formato='jsonl', tablas=None, avanzar=True, progress_callback=None):
+        """
+        Exportar los cambios posteriores a la marca del consumidor
+
+        Args:
+            consumidor: Nombre del sistema destino (p. ej. 'CONTABILIDAD')
+            destino: Directorio de salida
+            formato: 'jsonl' (un archivo por lote) o 'csv' (uno por tabla y lote)
+            tablas: Subconjunto de TABLAS_CDC
+            avanzar: Mover la marca al terminar; con False se puede confirmar
+                luego con set_watermark(consumidor, resultado['hasta'])
+
+        Returns:
+            dict: {'desde', 'hasta', 'cambios', 'archivos'}
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        destino = Path(destino)
+        destino.mkdir(parents=True, exist_ok=True)
+
+        with self.engine.connect() as conn:
+            desde = self.get_watermark(consumidor, conn)
+            hasta = conn.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {JOURNAL}")).scalar()
+            resultado = {'consumidor': consumidor, 'desde': desde, 'hasta': hasta, 'cambios': 0, 'archivos': []}
+            if hasta <= desde:
+                return resultado
+
+            prefijo = f"cdc_{consumidor.lower()}_{desde + 1}_{hasta}"
+            lote, numero = [], 0
+            for cambio in self.iter_changes(desde, hasta, tablas, conn):
+                lote.append(cambio)
+                if len(lote) >= self.batch_size:
+                    numero += 1
+                    resultado['archivos'].extend(self._write_batch(destino, prefijo, numero, lote, formato))
+                    resultado['cambios'] += len(lote)
+                    lote = []
+                    if progress_callback:
+                        progress_callback(resultado['cambios'])
+            if lote:
+                numero += 1
+                resultado['archivos'].extend(self._write_batch(destino, prefijo, numero, lote, formato))
+                resultado['cambios'] += len(lote)
+
+        if avanzar:
+            self.set_watermark(consumidor, hasta)
+        logger.info(
+            f"CDC {consumidor}: {resultado['cambios']} cambios ({desde + 1}..{hasta}) "
+            f"en {len(resultado['archivos'])} archivos"
+        )
+        return resultado
+
+    def _write_batch(self, destino, prefijo, numero, lote, formato):
+        if formato == 'jsonl':
+            path = destino / f"{prefijo}_{numero:04d}.jsonl"
+            with open(path, 'w', encoding='utf-8') as fh:
+                for tabla, pk, op, version, datos in lote:
+                    fh.write(json.dumps({'tabla': tabla, 'pk': pk, 'op': op, 'version': version,
+                                         'datos': datos}, ensure_ascii=False) + "\n")
+            return [str(path)]
+
+        archivos = []
+        for tabla in sorted({c[0] for c in lote}):
+            columnas = [c.name for c in MODELOS_CDC[tabla].__table__.columns]
+            path = destino / f"{prefijo}_{numero:04d}_{tabla}.csv"
+            with open(path, 'w', encoding='utf-8', newline='') as fh:
+                writer = csv.writer(fh)
+                writer.writerow(['_op', '_version'] + columnas)
+                for t, pk, op, version, datos in lote:
+                    if t != tabla:
+                        continue
+                    if datos is None:
+                        datos = {TABLAS_CDC[tabla]: pk}
+                    writer.writerow([op, version] + [datos.get(c) for c in columnas])
+            archivos.append(str(path))
+        return archivos
+
+    def prune(self):
+        """Borrar del diario lo que ya recibieron todos los consumidores"""
+        control = Control.__table__
+        with self.engine.begin() as conn:
+            marcas = [int(v) for v in conn.execute(
+                select(control.c.valor).where(control.c.parametro.like('CDC\\_%', escape='\\'))
+            ).scalars() if v]
+            if not marcas:
+                return 0
+            borradas = conn.execute(text(f"DELETE FROM {JOURNAL} WHERE version <= :v"),
+                                    {'v': min(marcas)}).rowcount
+        logger.info(f"Diario de cambios depurado: {borradas} entradas")
+        return borradas
+
+
+# Instancia global
+change_exporter = ChangeExporter()
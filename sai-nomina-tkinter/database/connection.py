@@ -1,6 +1,6 @@
 """Conexión y sesión de base de datos"""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import StaticPool
 import logging
@@ -20,6 +20,22 @@ engine = create_engine(
     }
 )
 
+# Vistas *_completo con los archivos históricos adjuntos
+from database.archive import install_archive_views
+install_archive_views(engine)
+
+# Resúmenes materializados mantenidos en cada flush
+from database.summaries import install_summary_listeners
+install_summary_listeners()
+
+# Invalidación de la caché de datos de referencia
+from database.reference_cache import reference_cache, install_reference_cache_listeners
+install_reference_cache_listeners()
+
+# Índice de búsqueda de empleados, actualizado tras cada commit
+from database.employee_index import employee_index, install_employee_index_listeners
+install_employee_index_listeners(engine)
+
 # Crear session factory
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -30,10 +46,88 @@ SessionLocal = sessionmaker(
 # Session con scope para thread safety
 Session = scoped_session(SessionLocal)
 
+# Engine de solo lectura para los cargadores en segundo plano de la interfaz:
+# cada hilo usa su propia conexión del pool en lugar de la conexión única
+# (StaticPool) del engine principal
+reader_engine = create_engine(
+    Config.DATABASE_URL,
+    echo=False,
+    pool_size=Config.LOADER_WORKERS,
+    connect_args={
+        "check_same_thread": False,
+        "timeout": 30
+    }
+)
+install_archive_views(reader_engine)
+
+ReaderSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=reader_engine
+)
+
+def _sqlite_connect(dbapi_connection, connection_record):
+    # pysqlite no emite BEGIN propio; lo hace _sqlite_begin
+    dbapi_connection.isolation_level = None
+
+def _sqlite_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+def install_savepoint_support(engine):
+    """
+    SAVEPOINT correctos con pysqlite (receta de la documentación de SQLAlchemy)
+
+    pysqlite abre la transacción recién con el primer INSERT/UPDATE, así un
+    SAVEPOINT emitido antes queda como transacción externa y su RELEASE
+    confirma los cambios. Con isolation_level=None y BEGIN explícito en el
+    evento begin, begin_nested() queda dentro de la transacción del engine.
+    Solo para engines de procesos por lotes: las lecturas también abren
+    transacción y mantienen el bloqueo compartido hasta el commit.
+    """
+    if not event.contains(engine, "connect", _sqlite_connect):
+        event.listen(engine, "connect", _sqlite_connect)
+        event.listen(engine, "begin", _sqlite_begin)
+    return engine
+
+# Engine de procesos por lotes (sincronización, importaciones): conexiones
+# propias con SAVEPOINT funcionales para aislar filas con error dentro de
+# la transacción de cada lote
+batch_engine = install_savepoint_support(create_engine(
+    Config.DATABASE_URL,
+    echo=False,
+    connect_args={
+        "check_same_thread": False,
+        "timeout": 30
+    }
+))
+install_employee_index_listeners(batch_engine)
+
+BatchSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=batch_engine
+)
+
 def get_session():
     """Obtener sesión de base de datos"""
     return Session()
 
+def get_reader_session():
+    """Sesión nueva del engine de lectura (una por carga en segundo plano)"""
+    return ReaderSessionLocal()
+
+def get_reader_engine():
+    """Engine de lectura (conexiones propias, no la de la sesión compartida)"""
+    return reader_engine
+
+def get_batch_session():
+    """Sesión nueva del engine de procesos por lotes (admite begin_nested)"""
+    return BatchSessionLocal()
+
+def get_batch_engine():
+    """Engine de procesos por lotes"""
+    return batch_engine
+
 def close_session():
     """Cerrar sesión"""
     Session.remove()
@@ -42,6 +136,21 @@ def get_engine():
     """Obtener engine de base de datos"""
     return engine
 
+def reset_connections():
+    """
+    Cerrar la sesión con scope y las conexiones del pool
+
+    Se conserva el mismo engine (y sus listeners); SessionLocal y Session
+    siguen enlazados a él y las nuevas sesiones abren conexiones contra el
+    archivo actual, por ejemplo tras restaurar un respaldo.
+    """
+    Session.remove()
+    engine.dispose()
+    reader_engine.dispose()
+    batch_engine.dispose()
+    reference_cache.invalidate()
+    employee_index.invalidate()
+
 class DatabaseManager:
     """Manejador de base de datos"""
 
@@ -51,21 +160,44 @@ class DatabaseManager:
 
     def create_tables(self):
         """Crear todas las tablas"""
-        from database.models import Base
+        from sqlalchemy import inspect
+        from database.models import Base, ResumenPlantilla
+        from database.summaries import rebuild_all
+        from database.audit_search import install_audit_fts
+        from database.change_journal import install_change_journal
+
+        nuevos_resumenes = not inspect(self.engine).has_table(ResumenPlantilla.__tablename__)
         Base.metadata.create_all(bind=self.engine)
+        # create_all no agrega índices nuevos a tablas que ya existen
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+        with self.engine.begin() as conn:
+            install_audit_fts(conn)
+            install_change_journal(conn)
+        if nuevos_resumenes:
+            # Bases existentes: poblar los resúmenes la primera vez
+            with self.engine.begin() as conn:
+                rebuild_all(conn)
         logger.info("Tablas creadas correctamente")
 
     def drop_tables(self):
         """Eliminar todas las tablas"""
+        from sqlalchemy import text
         from database.models import Base
+        from database.audit_search import TABLA_FTS
         Base.metadata.drop_all(bind=self.engine)
+        with self.engine.begin() as conn:
+            # El índice FTS no es parte de los modelos
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLA_FTS}"))
+        reference_cache.invalidate()
         logger.info("Tablas eliminadas correctamente")
 
     def backup_database(self, backup_path: str):
         """Crear respaldo de la base de datos"""
-        import shutil
+        from database.backup import copy_database
         try:
-            shutil.copy2(Config.DATABASE_PATH, backup_path)
+            copy_database(Config.DATABASE_PATH, backup_path)
             logger.info(f"Respaldo creado en: {backup_path}")
             return True
         except Exception as e:
@@ -74,28 +206,9 @@ class DatabaseManager:
 
     def restore_database(self, backup_path: str):
         """Restaurar base de datos desde respaldo"""
-        import shutil
+        from database.backup import backup_manager
         try:
-            # Cerrar conexiones
-            self.session.remove()
-            self.engine.dispose()
-
-            # Restaurar archivo
-            shutil.copy2(backup_path, Config.DATABASE_PATH)
-
-            # Recrear engine
-            global engine
-            engine = create_engine(
-                Config.DATABASE_URL,
-                echo=False,
-                poolclass=StaticPool,
-                connect_args={
-                    "check_same_thread": False,
-                    "timeout": 30
-                }
-            )
-
-            self.engine = engine
+            backup_manager.restore_file(backup_path)
             logger.info(f"Base de datos restaurada desde: {backup_path}")
             return True
         except Exception as e:
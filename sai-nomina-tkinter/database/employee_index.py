@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EmployeeIndex - Sistema SGN
+Índice de búsqueda en memoria de la nómina de empleados: prefijos y
+trigramas sobre código, cédula y nombres sin tildes, actualizado con el
+diario de cambios
+"""
+
+import sys
+from pathlib import Path
+from bisect import bisect_left, insort
+from collections import namedtuple
+from functools import lru_cache
+import logging
+import threading
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import Empleado, CambioJournal
+from utils.validators import normalizar_busqueda
+
+logger = logging.getLogger(__name__)
+
+# Términos más cortos se buscan como prefijo de palabra
+MIN_TRIGRAMA = 3
+
+# Campos por los que se puede restringir una búsqueda
+CAMPOS = ('empleado', 'cedula', 'nombre')
+
+# Claves consultadas por lote al aplicar cambios
+LOTE_CAMBIOS = 500
+
+EmpleadoIndexado = namedtuple(
+    'EmpleadoIndexado', ['empleado', 'cedula', 'nombres', 'apellidos', 'cargo', 'sueldo', 'activo']
+)
+
+COLUMNAS = [getattr(Empleado, campo) for campo in EmpleadoIndexado._fields]
+
+
+@lru_cache(maxsize=65536)
+def _trigramas(token):
+    # Los nombres se repiten mucho entre empleados
+    return frozenset(token[i:i + 3] for i in range(len(token) - 2))
+
+
+class PrefixIndex:
+    """
+    Vocabulario ordenado con la lista de empleados de cada palabra
+
+    Equivale a recorrer un trie: todas las palabras bajo un prefijo forman
+    un rango contiguo de la lista ordenada, que se ubica con dos búsquedas
+    binarias.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.postings = {}
+        self.ordenado = True
+
+    def add(self, token, doc):
+        docs = self.postings.get(token)
+        if docs is None:
+            docs = self.postings[token] = set()
+            if self.ordenado:
+                insort(self.tokens, token)
+        docs.add(doc)
+
+    def sort(self):
+        """Ordenar el vocabulario de una vez tras una carga masiva"""
+        self.tokens = sorted(self.postings)
+        self.ordenado = True
+
+    def remove(self, token, doc):
+        docs = self.postings.get(token)
+        if docs is None:
+            return
+        docs.discard(doc)
+        if not docs:
+            del self.postings[token]
+            del self.tokens[bisect_left(self.tokens, token)]
+
+    def lookup(self, prefijo):
+        inicio = bisect_left(self.tokens, prefijo)
+        fin = bisect_left(self.tokens, prefijo + '\uffff', inicio)
+        postings = [self.postings[token] for token in self.tokens[inicio:fin]]
+        if not postings:
+            return set()
+        return set().union(*postings)
+
+
+class EmployeeIndex:
+    """
+    Búsqueda de empleados sin consultar la base
+
+    Cada empleado se indexa por las palabras y los trigramas de su código,
+    cédula y nombres (con normalizar_busqueda: mayúsculas y sin tildes). Un
+    término de tres o más letras se busca como subcadena (los trigramas dan
+    los candidatos y se confirma contra el texto), uno más corto como
+    prefijo de palabra; varios términos se combinan con Y.
+
+    La primera búsqueda carga el índice completo. Cada commit en la base lo
+    marca como pendiente y la búsqueda siguiente aplica solo las filas de
+    rpemplea registradas en cambios_journal desde la última versión leída.
+    """
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self._lock = threading.RLock()
+        self.listo = False
+        self.pendiente = False
+        self.version = None
+        self.cargas = 0
+        self.actualizaciones = 0
+        self._reset()
+
+    def _reset(self):
+        self.registros = []       # doc -> EmpleadoIndexado (None si se borró)
+        self.textos = []          # doc -> (código, cédula, nombre) normalizados
+        self.completos = []       # doc -> los tres textos en una sola cadena
+        self.claves = []          # doc -> clave de orden (nombres, apellidos, código)
+        self.por_codigo = {}
+        self.libres = []
+        self.prefijos = PrefixIndex()
+        self.trigramas = {}
+        # Tras la carga el número de documento sigue el orden por nombre;
+        # después de un cambio incremental se usa un rango recalculado
+        self._rango = None
+        self._todos = {}
+
+    def _new_session(self):
+        if self._session_factory is None:
+            from database.connection import ReaderSessionLocal
+            self._session_factory = ReaderSessionLocal
+        return self._session_factory()
+
+    def mark_changed(self):
+        """Hubo un commit: revisar el diario antes de la próxima búsqueda"""
+        self.pendiente = True
+
+    def invalidate(self):
+        """Recargar el índice completo en la próxima búsqueda"""
+        with self._lock:
+            self.listo = False
+
+    # Mantenimiento
+
+    @staticmethod
+    def _tokens(textos):
+        for texto in textos:
+            yield from texto.split()
+
+    @staticmethod
+    def _clave(fila):
+        return f"{fila.nombres or ''}\x00{fila.apellidos or ''}\x00{fila.empleado}"
+
+    def _add(self, fila):
+        registro = EmpleadoIndexado(*fila)
+        textos = (
+            normalizar_busqueda(registro.empleado),
+            normalizar_busqueda(registro.cedula),
+            normalizar_busqueda(f"{registro.nombres or ''} {registro.apellidos or ''}"),
+        )
+        valores = (registro, textos, '\x1f'.join(textos), self._clave(registro))
+
+        doc = self.libres.pop() if self.libres else len(self.registros)
+        if doc == len(self.registros):
+            for lista, valor in zip((self.registros, self.textos, self.completos, self.claves), valores):
+                lista.append(valor)
+        else:
+            for lista, valor in zip((self.registros, self.textos, self.completos, self.claves), valores):
+                lista[doc] = valor
+        self.por_codigo[registro.empleado] = doc
+
+        for token in self._tokens(textos):
+            self.prefijos.add(token, doc)
+            for trigrama in _trigramas(token):
+                self.trigramas.setdefault(trigrama, set()).add(doc)
+
+    def _remove(self, empleado):
+        doc = self.por_codigo.pop(empleado, None)
+        if doc is None:
+            return
+
+        for token in self._tokens(self.textos[doc]):
+            self.prefijos.remove(token, doc)
+            for trigrama in _trigramas(token):
+                docs = self.trigramas.get(trigrama)
+                if docs is not None:
+                    docs.discard(doc)
+                    if not docs:
+                        del self.trigramas[trigrama]
+
+        self.registros[doc] = None
+        self.textos[doc] = None
+        self.completos[doc] = None
+        self.libres.append(doc)
+
+    @staticmethod
+    def _journal_version(session):
+        """Última versión del diario; None si la base no tiene diario"""
+        try:
+            return session.execute(
+                text(f"SELECT COALESCE(MAX(version), 0) FROM {CambioJournal.__tablename__}")
+            ).scalar()
+        except OperationalError:
+            session.rollback()
+            return None
+
+    def _build(self, session):
+        # La versión se lee antes que las filas: un cambio intermedio se vuelve
+        # a aplicar después, y aplicarlo dos veces da el mismo resultado
+        version = self._journal_version(session)
+        filas = session.query(*COLUMNAS).all()
+        filas.sort(key=self._clave)
+
+        self._reset()
+        self.prefijos.ordenado = False
+        for fila in filas:
+            self._add(fila)
+        self.prefijos.sort()
+
+        self.version = version
+        self.listo = True
+        self.cargas += 1
+        logger.debug(f"Índice de empleados cargado: {len(self.por_codigo)} empleados")
+
+    def _apply_changes(self, session):
+        # La marca avanza también con cambios de otras tablas del diario
+        hasta = self._journal_version(session)
+        if hasta is None or hasta <= self.version:
+            return
+
+        claves = session.execute(
+            text(f"SELECT DISTINCT pk FROM {CambioJournal.__tablename__} "
+                 f"WHERE version > :desde AND version <= :hasta AND tabla = :tabla"),
+            {'tabla': Empleado.__tablename__, 'desde': self.version, 'hasta': hasta}
+        ).scalars().all()
+        self.version = hasta
+        if not claves:
+            return
+
+        vigentes = {}
+        for inicio in range(0, len(claves), LOTE_CAMBIOS):
+            lote = claves[inicio:inicio + LOTE_CAMBIOS]
+            for fila in session.query(*COLUMNAS).filter(Empleado.empleado.in_(lote)):
+                vigentes[fila.empleado] = fila
+
+        for clave in claves:
+            self._remove(clave)
+            if clave in vigentes:
+                self._add(vigentes[clave])
+
+        # Los documentos nuevos o reutilizados ya no siguen el orden por nombre
+        self._rango = [0] * len(self.registros)
+        docs = sorted(self.por_codigo.values(), key=self.claves.__getitem__)
+        for posicion, doc in enumerate(docs):
+            self._rango[doc] = posicion
+        self._todos = {}
+        self.actualizaciones += 1
+        logger.debug(f"Índice de empleados: {len(claves)} empleados actualizados")
+
+    def ensure_loaded(self):
+        """Cargar el índice o aplicar los cambios pendientes"""
+        if self.listo and not self.pendiente:
+            return
+
+        with self._lock:
+            if self.listo and not self.pendiente:
+                return
+
+            # Un commit durante la lectura vuelve a marcar el índice
+            self.pendiente = False
+            session = self._new_session()
+            try:
+                if not self.listo or self.version is None:
+                    self._build(session)
+                else:
+                    self._apply_changes(session)
+            finally:
+                session.close()
+
+    # Búsqueda
+
+    def _ordenar(self, docs):
+        if self._rango is None:
+            return sorted(docs)
+        return sorted(docs, key=self._rango.__getitem__)
+
+    def _filtrar(self, secuencia, activo):
+        registros = self.registros
+        if activo is None:
+            return [registros[doc] for doc in secuencia]
+        return [registro for registro in map(registros.__getitem__, secuencia)
+                if bool(registro.activo) == activo]
+
+    def _buscar_termino(self, termino, campo):
+        posicion = None if campo is None else CAMPOS.index(campo)
+        if len(termino) >= MIN_TRIGRAMA:
+            postings = []
+            for trigrama in _trigramas(termino):
+                docs = self.trigramas.get(trigrama)
+                if not docs:
+                    return set()
+                postings.append(docs)
+            postings.sort(key=len)
+            candidatos = postings[0].intersection(*postings[1:])
+
+            # Los trigramas pueden estar en otro orden o en otra palabra: confirmar
+            if posicion is None:
+                if len(termino) == MIN_TRIGRAMA:
+                    return candidatos
+                completos = self.completos
+                return {doc for doc in candidatos if termino in completos[doc]}
+            textos = self.textos
+            return {doc for doc in candidatos if termino in textos[doc][posicion]}
+
+        candidatos = self.prefijos.lookup(termino)
+        if posicion is None:
+            return candidatos
+        textos = self.textos
+        return {
+            doc for doc in candidatos
+            if any(token.startswith(termino) for token in textos[doc][posicion].split())
+        }
+
+    def search_fields(self, activo=None, **criterios):
+        """
+        Empleados que cumplen todos los criterios
+
+        Args:
+            activo: True/False filtra por estado; None no filtra
+            **criterios: texto por campo de CAMPOS, o 'texto' para buscar
+                en los tres; los vacíos se ignoran
+
+        Returns:
+            list: EmpleadoIndexado ordenados por nombres y apellidos
+        """
+        self.ensure_loaded()
+        with self._lock:
+            docs = None
+            for campo, valor in criterios.items():
+                campo = None if campo == 'texto' else campo
+                for termino in normalizar_busqueda(valor).split():
+                    encontrados = self._buscar_termino(termino, campo)
+                    docs = encontrados if docs is None else docs & encontrados
+                    if not docs:
+                        return []
+            if docs is None:
+                # Sin criterios: la lista completa se guarda hasta el próximo cambio
+                if activo not in self._todos:
+                    self._todos[activo] = self._filtrar(self._ordenar(self.por_codigo.values()), activo)
+                return list(self._todos[activo])
+            return self._filtrar(self._ordenar(docs), activo)
+
+    def search(self, texto, activo=None):
+        """Empleados cuyo código, cédula o nombre contienen todos los términos"""
+        return self.search_fields(activo=activo, texto=texto)
+
+    def get(self, empleado):
+        """Registro indexado de un empleado; None si no existe"""
+        self.ensure_loaded()
+        with self._lock:
+            doc = self.por_codigo.get(empleado)
+            return self.registros[doc] if doc is not None else None
+
+    def stats(self):
+        return {
+            'empleados': len(self.por_codigo),
+            'palabras': len(self.prefijos.tokens),
+            'trigramas': len(self.trigramas),
+            'version': self.version,
+            'cargas': self.cargas,
+            'actualizaciones': self.actualizaciones,
+        }
+
+
+# Instancia global
+employee_index = EmployeeIndex()
+
+
+def _on_commit(connection):
+    employee_index.mark_changed()
+
+
+def install_employee_index_listeners(engine):
+    """Marcar el índice como pendiente en cada commit del engine de escritura"""
+    if not event.contains(engine, "commit", _on_commit):
+        event.listen(engine, "commit", _on_commit)
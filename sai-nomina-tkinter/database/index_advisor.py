@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IndexAdvisor - Sistema SGN
+Reproduce el catálogo de consultas de la aplicación con EXPLAIN QUERY PLAN
+sobre una base sintética y propone índices compuestos/cubrientes medidos
+"""
+
+import sys
+from pathlib import Path
+import json
+import logging
+import random
+import re
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, String
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import Base
+
+logger = logging.getLogger(__name__)
+
+# Filas a generar por tabla: float = multiplicador del número de empleados,
+# int = cantidad fija, 'periodos' = una fila por empleado y período
+VOLUMENES = {
+    'rpemplea': 1.0,
+    'roles_pago': 'periodos',
+    'rphistor': 12.0,
+    'rpingdes': 4.0,
+    'vacaciones': 1.0,
+    'prestamos': 0.5,
+    'dotaciones': 2.0,
+    'decimo_tercer': 1.0,
+    'decimo_cuarto': 1.0,
+    'fondos_reserva': 'periodos',
+    'liquidaciones': 0.05,
+    'asignaciones_departamento': 1.0,
+    'equipos': 0.3,
+    'historial_equipos': 1.0,
+    'log_auditoria': 20.0,
+    'auditoria_acceso': 10.0,
+    'clientes': 40,
+    'departamentos': 120,
+    'cargos': 30,
+    'turnos': 12,
+    'rpcontrl': 30,
+    'roles': 4,
+    'usuarios': 25,
+    'sesiones_usuario': 200,
+}
+
+# Columnas sin ForeignKey declarada que en la práctica referencian otra tabla
+REFERENCIAS_IMPLICITAS = {
+    'empleado': ('rpemplea', 'empleado'),
+    'responsable': ('rpemplea', 'empleado'),
+    'depto': ('departamentos', 'codigo'),
+    'cargo': ('cargos', 'codigo'),
+}
+
+# Valores de dominio usados por los filtros de la aplicación
+DOMINIOS = {
+    ('rpemplea', 'estado'): ['ACT'] * 8 + ['VAC', 'RET'],
+    ('roles_pago', 'estado'): ['CALCULADO', 'PROCESADO', 'PAGADO', 'BORRADOR'],
+    ('prestamos', 'estado'): ['ACTIVO', 'PAGADO', 'CANCELADO'],
+    ('prestamos', 'tipo'): ['ANTICIPO', 'PRESTAMO', 'EMERGENCIA'],
+    ('vacaciones', 'estado'): ['PENDIENTE', 'APROBADA', 'RECHAZADA', 'PAGADA'],
+    ('rpingdes', 'tipo'): ['INGRESO', 'DESCUENTO'],
+    ('rphistor', 'tipo'): ['ING', 'EGR', 'VAC', 'DEC', 'LIQ', 'HEX'],
+    ('dotaciones', 'tipo'): ['UNIFORME', 'EQUIPO', 'HERRAMIENTA'],
+    ('log_auditoria', 'modulo'): ['AUTH', 'EMPLEADOS', 'NOMINA', 'PERMISSIONS', 'PRESTAMOS'],
+    ('log_auditoria', 'accion'): ['LOGIN_SUCCESS', 'LOGOUT', 'UPDATE', 'CREATE', 'PERMISSION_DENIED'],
+    ('auditoria_acceso', 'accion'): ['LOGIN', 'LOGOUT', 'CREATE', 'UPDATE', 'DELETE'],
+}
+
+ESTADOS_GENERICOS = ['ACTIVO'] * 4 + ['INACTIVO']
+USUARIOS_SINTETICOS = ['admin', 'rrhh01', 'rrhh02', 'nomina', 'consulta', 'supervisor']
+
+PATRON_PREDICADO = re.compile(
+    r'(\w+)\.(\w+)\s*(=|==|!=|<>|>=|<=|>|<|\bNOT IN\b|\bIN\b|\bLIKE\b|\bIS NOT\b|\bIS\b|\bBETWEEN\b)',
+    re.IGNORECASE
+)
+PATRON_PREDICADO_SIMPLE = re.compile(
+    r'(?<![.\w])(\w+)\s*(=|==|!=|<>|>=|<=|>|<|\bNOT IN\b|\bIN\b|\bLIKE\b|\bIS NOT\b|\bIS\b|\bBETWEEN\b)',
+    re.IGNORECASE
+)
+PATRON_COLUMNA = re.compile(r'\b(\w+)\.(\w+)\b')
+PATRON_ORDER_BY = re.compile(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|\bOFFSET\b|$)', re.IGNORECASE | re.DOTALL)
+PATRON_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$')
+PATRON_TEMP = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+
+MAX_COLUMNAS_CUBRIENTES = 5
+
+
+class QueryRecorder:
+    """Captura las formas distintas de sentencias SQL que emite la aplicación"""
+
+    def __init__(self):
+        self.shapes = {}
+        self._engine = None
+
+    def attach(self, engine):
+        """Engancharse a los eventos de ejecución del engine"""
+        self._engine = engine
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        return self
+
+    def detach(self):
+        """Quitar los eventos registrados"""
+        if self._engine is not None:
+            event.remove(self._engine, "before_cursor_execute", self._before_execute)
+            event.remove(self._engine, "after_cursor_execute", self._after_execute)
+            self._engine = None
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('advisor_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['advisor_start'].pop()
+        if executemany or not self.is_replayable(statement):
+            return
+        self.record(statement, parameters, elapsed)
+
+    @staticmethod
+    def is_replayable(statement):
+        """Solo interesan lecturas y escrituras con WHERE"""
+        sql = statement.lstrip().upper()
+        if sql.startswith('SELECT'):
+            return True
+        return sql.startswith(('UPDATE', 'DELETE')) and ' WHERE ' in sql
+
+    def record(self, statement, parameters, elapsed=0.0):
+        """Registrar una ejecución de la sentencia"""
+        shape = self.shapes.get(statement)
+        if shape is None:
+            shape = self.shapes[statement] = {
+                'sql': statement,
+                'params': _serializable_params(parameters),
+                'count': 0,
+                'total_time': 0.0,
+            }
+        shape['count'] += 1
+        shape['total_time'] += elapsed
+
+    def save(self, path):
+        """Guardar la sesión grabada en formato JSONL"""
+        with open(path, 'w', encoding='utf-8') as fh:
+            for shape in self.shapes.values():
+                fh.write(json.dumps(shape, default=str) + '\n')
+        logger.info(f"Sesión de consultas guardada en {path} ({len(self.shapes)} formas)")
+
+    @classmethod
+    def load(cls, path):
+        """Cargar una sesión grabada con save()"""
+        recorder = cls()
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    shape = json.loads(line)
+                    recorder.shapes[shape['sql']] = shape
+        return recorder
+
+
+def _serializable_params(parameters):
+    """Convertir parámetros DBAPI en valores JSON"""
+    if parameters is None:
+        return []
+    if isinstance(parameters, dict):
+        return {k: _serializable_value(v) for k, v in parameters.items()}
+    return [_serializable_value(v) for v in parameters]
+
+
+def _serializable_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    return str(value)
+
+
+class SyntheticDatabase:
+    """Base de datos SQLite con el esquema real y volúmenes realistas"""
+
+    def __init__(self, path=None, empleados=2000, periodos=12, seed=2024):
+        self.path = Path(path) if path else Path(tempfile.mkdtemp(prefix='sgn_advisor_')) / 'synthetic.db'
+        self.empleados = empleados
+        self.periodos = [
+            f"{(date.today().year - (i // 12)):04d}-{12 - (i % 12):02d}" for i in range(periodos)
+        ]
+        self.random = random.Random(seed)
+        self.keys = {}
+
+    def build(self):
+        """Crear esquema y poblar todas las tablas mapeadas"""
+        engine = create_engine(f"sqlite:///{self.path}")
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+
+        conn = sqlite3.connect(str(self.path))
+        try:
+            for table in Base.metadata.sorted_tables:
+                rows = self.row_count(table.name)
+                self.populate(conn, table, rows)
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+
+        logger.info(f"Base sintética creada en {self.path}")
+        return self.path
+
+    def row_count(self, table_name):
+        volumen = VOLUMENES.get(table_name, 10)
+        if volumen == 'periodos':
+            return self.empleados * len(self.periodos)
+        if isinstance(volumen, float):
+            return max(1, int(self.empleados * volumen))
+        return volumen
+
+    def populate(self, conn, table, rows):
+        columns = [c for c in table.columns if not (c.primary_key and c.autoincrement is True
+                                                     and isinstance(c.type, Integer))]
+        generators = [self._generator(table, column, rows) for column in columns]
+
+        placeholders = ', '.join('?' for _ in columns)
+        names = ', '.join(c.name for c in columns)
+        sql = f"INSERT OR IGNORE INTO {table.name} ({names}) VALUES ({placeholders})"
+
+        batch = []
+        for i in range(rows):
+            batch.append(tuple(gen(i) for gen in generators))
+            if len(batch) >= 5000:
+                conn.executemany(sql, batch)
+                batch.clear()
+        if batch:
+            conn.executemany(sql, batch)
+
+        pk = [c for c in table.primary_key.columns]
+        if len(pk) == 1:
+            self.keys[(table.name, pk[0].name)] = [
+                r[0] for r in conn.execute(f"SELECT {pk[0].name} FROM {table.name}")
+            ]
+
+    def _generator(self, table, column, rows):
+        rnd = self.random
+        name = column.name
+        length = getattr(column.type, 'length', None) or 20
+
+        if column.primary_key or column.unique:
+            if isinstance(column.type, Integer):
+                return lambda i: i + 1
+            if name == 'cedula':
+                return lambda i: str(1700000000 + i)
+            width = min(length, max(3, len(str(rows))))
+            return lambda i: str(i + 1).zfill(width)
+
+        reference = None
+        if column.foreign_keys:
+            fk = next(iter(column.foreign_keys))
+            reference = (fk.column.table.name, fk.column.name)
+        elif name in REFERENCIAS_IMPLICITAS:
+            reference = REFERENCIAS_IMPLICITAS[name]
+
+        if reference:
+            if name == 'empleado':
+                return self._cyclic_reference(reference)
+            return lambda i: self._pick_reference(reference)
+
+        if name == 'periodo':
+            if isinstance(column.type, Integer):
+                years = sorted({int(p[:4]) for p in self.periodos})
+                return lambda i: years[(i // self.empleados) % len(years)]
+            return lambda i: self.periodos[(i // self.empleados) % len(self.periodos)]
+
+        dominio = DOMINIOS.get((table.name, name))
+        if dominio:
+            return lambda i: rnd.choice(dominio)
+        if name == 'estado':
+            return lambda i: rnd.choice(ESTADOS_GENERICOS)
+        if name in ('usuario', 'procesado_por', 'created_by', 'updated_by', 'aprobado_por'):
+            return lambda i: rnd.choice(USUARIOS_SINTETICOS)
+        if name in ('tabla', 'tabla_afectada'):
+            tablas = list(Base.metadata.tables)
+            return lambda i: rnd.choice(tablas)
+
+        if isinstance(column.type, Boolean):
+            weight = 0.9 if name in ('activo', 'activa', 'exitoso', 'exitosa') else 0.3
+            return lambda i: 1 if rnd.random() < weight else 0
+        if isinstance(column.type, DateTime):
+            start = datetime.now() - timedelta(days=3 * 365)
+            return lambda i: (start + timedelta(seconds=rnd.randint(0, 3 * 365 * 86400))).isoformat(' ')
+        if isinstance(column.type, Date):
+            start = date.today() - timedelta(days=3 * 365)
+            return lambda i: (start + timedelta(days=rnd.randint(0, 3 * 365))).isoformat()
+        if isinstance(column.type, (Numeric, Float)):
+            return lambda i: round(rnd.uniform(0, 2000), 2)
+        if isinstance(column.type, Integer):
+            return lambda i: rnd.randint(0, 30)
+        if isinstance(column.type, String):
+            return lambda i: f"{name[:4].upper()}{rnd.randint(0, 999)}"[:length]
+        return lambda i: f"{name} {i}"
+
+    def _cyclic_reference(self, reference):
+        keys = self.keys.get(reference) or ['000001']
+        return lambda i: keys[i % len(keys)]
+
+    def _pick_reference(self, reference):
+        keys = self.keys.get(reference)
+        return self.random.choice(keys) if keys else None
+
+
+def explain(conn, sql, params):
+    """Obtener los detalles del plan de ejecución"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def plan_issues(details, aliases=None):
+    """Detectar full scans y B-trees temporales en el plan"""
+    aliases = aliases or {}
+    issues = []
+    for detail in details:
+        scan = PATRON_SCAN.match(detail)
+        if scan:
+            name = scan.group(2) or scan.group(1)
+            issues.append({'tipo': 'FULL_SCAN', 'tabla': aliases.get(name, scan.group(1)), 'detalle': detail})
+            continue
+        temp = PATRON_TEMP.search(detail)
+        if temp:
+            issues.append({'tipo': 'TEMP_BTREE', 'tabla': None, 'detalle': detail})
+    return issues
+
+
+def table_aliases(sql):
+    """Mapear alias de la sentencia a nombres de tabla reales"""
+    aliases = {}
+    for match in re.finditer(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        table, alias = match.group(1), match.group(2)
+        if table not in Base.metadata.tables:
+            continue
+        aliases[table] = table
+        if alias and alias.upper() not in ('WHERE', 'JOIN', 'LEFT', 'INNER', 'ON', 'ORDER', 'GROUP', 'LIMIT'):
+            aliases[alias] = table
+    return aliases
+
+
+def propose_index(sql, table, aliases):
+    """
+    Proponer columnas de índice para una tabla de la sentencia
+
+    Orden: igualdades, luego un rango y después ORDER BY. Si la sentencia
+    referencia pocas columnas de la tabla se agregan las restantes para que
+    el índice sea cubriente.
+    """
+    equality, ranges = [], []
+    where = re.split(r'\bWHERE\b', sql, maxsplit=1, flags=re.IGNORECASE)
+    predicates_sql = where[1] if len(where) > 1 else ''
+    predicates_sql = re.split(r'\b(?:ORDER BY|GROUP BY|LIMIT)\b', predicates_sql, flags=re.IGNORECASE)[0]
+
+    predicates = PATRON_PREDICADO.findall(predicates_sql)
+    if set(aliases.values()) == {table}:
+        # Sentencias de una sola tabla pueden usar columnas sin calificar
+        predicates += [(table, column, op) for column, op in PATRON_PREDICADO_SIMPLE.findall(predicates_sql)
+                       if column in Base.metadata.tables[table].c]
+
+    for alias, column, operator in predicates:
+        if aliases.get(alias) != table:
+            continue
+        op = operator.upper()
+        target = equality if op in ('=', '==', 'IN', 'IS') else ranges
+        if op in ('!=', '<>', 'NOT IN', 'IS NOT') or (op == 'LIKE'):
+            target = ranges
+        if column not in equality and column not in target:
+            target.append(column)
+
+    order = []
+    order_match = PATRON_ORDER_BY.search(sql)
+    if order_match:
+        for alias, column in PATRON_COLUMNA.findall(order_match.group(1)):
+            if aliases.get(alias) == table and column not in order:
+                order.append(column)
+
+    columns = list(equality)
+    if ranges:
+        columns.append(ranges[0])
+    elif order:
+        columns.extend(c for c in order if c not in columns)
+    if not columns:
+        return None
+
+    referenced = []
+    for alias, column in PATRON_COLUMNA.findall(sql):
+        if aliases.get(alias) == table and column not in referenced and column in Base.metadata.tables[table].c:
+            referenced.append(column)
+    if len(referenced) <= MAX_COLUMNAS_CUBRIENTES:
+        columns.extend(c for c in referenced if c not in columns)
+
+    return columns
+
+
+def measure(conn, sql, params, repeat=5):
+    """Mediana del tiempo de ejecutar y consumir la sentencia"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def improvement(recomendacion):
+    """Factor de mejora para ordenar; None (tiempo después no medible) cuenta como el mayor"""
+    mejora = recomendacion['mejora']
+    return float('inf') if mejora is None else mejora
+
+
+class IndexAdvisor:
+    """Analizador de planes de ejecución y recomendador de índices"""
+
+    def __init__(self, database_path=None, empleados=2000, periodos=12, repeat=5):
+        self.database_path = database_path
+        self.empleados = empleados
+        self.periodos = periodos
+        self.repeat = repeat
+
+    def prepare_database(self):
+        """Usar la base indicada o construir una sintética"""
+        if self.database_path and Path(self.database_path).exists():
+            return Path(self.database_path)
+        synthetic = SyntheticDatabase(self.database_path, self.empleados, self.periodos)
+        return synthetic.build()
+
+    def analyze(self, shapes):
+        """
+        Analizar las formas de sentencia capturadas
+
+        Args:
+            shapes: Iterable de dicts con 'sql' y 'params' (QueryRecorder.shapes.values())
+
+        Returns:
+            list: Un resultado por sentencia con plan, problemas y recomendación
+        """
+        path = self.prepare_database()
+        conn = sqlite3.connect(str(path))
+        results = []
+        try:
+            for shape in shapes:
+                results.append(self.analyze_statement(conn, shape['sql'], shape.get('params') or []))
+        finally:
+            conn.close()
+        return results
+
+    def analyze_statement(self, conn, sql, params):
+        result = {
+            'sql': sql,
+            'plan': [],
+            'problemas': [],
+            'recomendacion': None,
+            'error': None,
+        }
+        if not sql.lstrip().upper().startswith('SELECT'):
+            # Las escrituras se evalúan por su parte de búsqueda sin modificar la base
+            sql = self._as_select(sql)
+            if sql is None:
+                return result
+
+        try:
+            aliases = table_aliases(sql)
+            result['plan'] = explain(conn, sql, params)
+            result['problemas'] = plan_issues(result['plan'], aliases)
+        except sqlite3.Error as e:
+            result['error'] = str(e)
+            return result
+
+        tables = {p['tabla'] for p in result['problemas'] if p['tabla']}
+        if any(p['tipo'] == 'TEMP_BTREE' for p in result['problemas']) and not tables:
+            tables = set(aliases.values())
+
+        for table in sorted(tables):
+            columns = propose_index(sql, table, aliases)
+            if not columns:
+                continue
+            recomendacion = self.evaluate_index(conn, sql, params, table, columns)
+            if recomendacion and (result['recomendacion'] is None or
+                                  improvement(recomendacion) > improvement(result['recomendacion'])):
+                result['recomendacion'] = recomendacion
+        return result
+
+    def evaluate_index(self, conn, sql, params, table, columns):
+        """Medir la sentencia antes y después de crear el índice propuesto"""
+        name = f"idx_advisor_{table}_{'_'.join(columns)}"[:60]
+        ddl = f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"
+        before = measure(conn, sql, params, self.repeat)
+        try:
+            conn.execute(ddl)
+            conn.execute(f"ANALYZE {table}")
+            plan_after = explain(conn, sql, params)
+            after = measure(conn, sql, params, self.repeat)
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo evaluar {ddl}: {e}")
+            return None
+        finally:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.commit()
+
+        if name not in ' '.join(plan_after):
+            return None
+        return {
+            'tabla': table,
+            'columnas': columns,
+            'ddl': ddl,
+            'tiempo_antes_ms': round(before * 1000, 3),
+            'tiempo_despues_ms': round(after * 1000, 3),
+            'mejora': round(before / after, 2) if after > 0 else None,
+            'plan_despues': plan_after,
+        }
+
+    @staticmethod
+    def _as_select(sql):
+        match = re.match(r'\s*(?:UPDATE\s+(\w+)\s+SET\s+.*?|DELETE\s+FROM\s+(\w+)\s*)\bWHERE\b(.*)$',
+                         sql, re.IGNORECASE | re.DOTALL)
+        if not match:
+            return None
+        table = match.group(1) or match.group(2)
+        # Los marcadores del SET se descartan; solo se conservan los del WHERE
+        if match.group(1) and sql.count('?') != match.group(3).count('?'):
+            return None
+        return f"SELECT {table}.rowid FROM {table} WHERE {match.group(3)}"
+
+    @staticmethod
+    def report(results):
+        """Texto legible con problemas y recomendaciones"""
+        lines = []
+        for result in results:
+            if not result['problemas'] and not result['error']:
+                continue
+            lines.append('-' * 70)
+            lines.append(result['sql'].strip().replace('\n', ' ')[:300])
+            if result['error']:
+                lines.append(f"  ERROR: {result['error']}")
+            for problema in result['problemas']:
+                lines.append(f"  {problema['tipo']}: {problema['detalle']}")
+            rec = result['recomendacion']
+            if rec:
+                lines.append(f"  PROPUESTA: {rec['ddl']}")
+                lines.append(f"    {rec['tiempo_antes_ms']} ms -> {rec['tiempo_despues_ms']} ms (x{'∞' if rec['mejora'] is None else rec['mejora']})")
+        return '\n'.join(lines)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recomendador de índices SGN")
+    parser.add_argument('session', help="Archivo JSONL grabado con QueryRecorder.save()")
+    parser.add_argument('--db', help="Base a usar (por defecto se genera una sintética)")
+    parser.add_argument('--empleados', type=int, default=2000)
+    parser.add_argument('--periodos', type=int, default=12)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    recorder = QueryRecorder.load(args.session)
+    advisor = IndexAdvisor(args.db, args.empleados, args.periodos)
+    print(advisor.report(advisor.analyze(recorder.shapes.values())))
+
+
+if __name__ == "__main__":
+    main()
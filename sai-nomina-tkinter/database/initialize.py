@@ -190,6 +190,27 @@ def insert_initial_data():
                 tipo='STRING',
                 categoria='EMPRESA'
             ),
+            Control(
+                parametro='EMPRESA_BANCO',
+                valor='001',
+                descripcion='Banco pagador de sueldos (código de Config.BANCOS)',
+                tipo='STRING',
+                categoria='EMPRESA'
+            ),
+            Control(
+                parametro='EMPRESA_CUENTA',
+                valor='',
+                descripcion='Cuenta de débito para el pago de sueldos',
+                tipo='STRING',
+                categoria='EMPRESA'
+            ),
+            Control(
+                parametro='EMPRESA_SUCURSAL_IESS',
+                valor='0001',
+                descripcion='Código de sucursal del empleador en el IESS',
+                tipo='STRING',
+                categoria='EMPRESA'
+            ),
             Control(
                 parametro='PERIODO_ACTUAL',
                 valor=datetime.now().strftime('%Y-%m'),
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MaintenanceService - Sistema SGN
+Mantenimiento de la base SQLite: estadísticas del planificador, compactación
+y verificaciones de integridad, en segundo plano y programables
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_MODES = {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}
+
+# Tareas disponibles en el orden en que se ejecutan
+TAREAS = ('optimize', 'analyze', 'compact', 'quick_check', 'integrity_check', 'foreign_key_check')
+
+PARAMETROS_PROGRAMACION = {
+    'MANTENIMIENTO_ACTIVO': ('0', 'BOOLEAN', 'Ejecutar mantenimiento programado'),
+    'MANTENIMIENTO_HORA': ('02:30', 'STRING', 'Hora del mantenimiento (HH:MM, fuera de oficina)'),
+    'MANTENIMIENTO_TAREAS': ('optimize,compact,quick_check,foreign_key_check', 'STRING',
+                             'Tareas del mantenimiento programado'),
+}
+
+
+class MaintenanceService:
+    """Servicio de mantenimiento de la base de datos"""
+
+    def __init__(self, database_path=None):
+        self.database_path = Path(database_path or Config.DATABASE_PATH)
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Conexión dedicada para no interferir con la sesión de la aplicación"""
+        return sqlite3.connect(str(self.database_path), timeout=30, isolation_level=None)
+
+    def get_stats(self, conn=None):
+        """Tamaño, páginas libres y fragmentación medidos con PRAGMA"""
+        own = conn is None
+        conn = conn or self.connect()
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            if own:
+                conn.close()
+
+        return {
+            'tamano': page_size * page_count,
+            'tamano_archivo': os.path.getsize(self.database_path),
+            'page_size': page_size,
+            'paginas': page_count,
+            'paginas_libres': freelist,
+            'fragmentacion': round(freelist / page_count * 100, 2) if page_count else 0.0,
+            'auto_vacuum': AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+        }
+
+    def optimize(self, conn):
+        """PRAGMA optimize: ANALYZE solo de lo que el planificador necesita"""
+        conn.execute("PRAGMA optimize")
+        return 'ok'
+
+    def analyze(self, conn):
+        """ANALYZE completo de todas las tablas e índices"""
+        conn.execute("ANALYZE")
+        return 'ok'
+
+    def compact(self, conn):
+        """
+        Devolver páginas libres al sistema de archivos
+
+        Con auto_vacuum=INCREMENTAL basta con incremental_vacuum, que es
+        rápido. Si la base aún no está en ese modo se convierte: requiere un
+        VACUUM completo en el mismo archivo una sola vez, que bloquea la base
+        mientras dura; por eso se ejecuta en segundo plano y conviene
+        programarlo fuera de horario.
+        """
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode == 2:
+            conn.execute("PRAGMA incremental_vacuum")
+            return 'incremental_vacuum'
+
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return 'vacuum (conversión a auto_vacuum incremental)'
+
+    def quick_check(self, conn):
+        return self._check_rows(conn.execute("PRAGMA quick_check").fetchall())
+
+    def integrity_check(self, conn):
+        return self._check_rows(conn.execute("PRAGMA integrity_check").fetchall())
+
+    def foreign_key_check(self, conn):
+        """Filas huérfanas: (tabla, rowid, tabla referida)"""
+        rows = conn.execute("PRAGMA foreign_key_check").fetchall()
+        return [f"{table} rowid={rowid} -> {parent}" for table, rowid, parent, _ in rows]
+
+    @staticmethod
+    def _check_rows(rows):
+        messages = [row[0] for row in rows]
+        return [] if messages == ['ok'] else messages
+
+    def run(self, tareas=('optimize', 'compact', 'quick_check', 'foreign_key_check'),
+            progress_callback=None):
+        """
+        Ejecutar tareas de mantenimiento y medir antes/después
+
+        Args:
+            tareas: Nombres de TAREAS a ejecutar
+            progress_callback: Función (indice, total, tarea) opcional
+
+        Returns:
+            dict: Reporte con estadísticas antes/después y resultado por tarea
+        """
+        desconocidas = [t for t in tareas if t not in TAREAS]
+        if desconocidas:
+            raise ValueError(f"Tareas de mantenimiento no válidas: {', '.join(desconocidas)}")
+
+        ordered = [t for t in TAREAS if t in tareas]
+        with self._lock:
+            conn = self.connect()
+            try:
+                report = {
+                    'inicio': datetime.now().isoformat(timespec='seconds'),
+                    'antes': self.get_stats(conn),
+                    'tareas': {},
+                    'problemas': [],
+                }
+                for index, tarea in enumerate(ordered):
+                    if progress_callback:
+                        progress_callback(index, len(ordered), tarea)
+                    start = time.time()
+                    resultado = getattr(self, tarea)(conn)
+                    report['tareas'][tarea] = {
+                        'resultado': resultado,
+                        'duracion': round(time.time() - start, 3),
+                    }
+                    if isinstance(resultado, list):
+                        report['problemas'].extend(f"{tarea}: {msg}" for msg in resultado)
+
+                report['despues'] = self.get_stats(conn)
+                report['liberado'] = report['antes']['tamano'] - report['despues']['tamano']
+                report['fin'] = datetime.now().isoformat(timespec='seconds')
+            finally:
+                conn.close()
+
+        logger.info(
+            f"Mantenimiento completado: {', '.join(ordered)}; "
+            f"{report['liberado'] / 1024:.1f} KB liberados, {len(report['problemas'])} problemas"
+        )
+        return report
+
+    def run_async(self, tareas, callback=None, progress_callback=None):
+        """
+        Ejecutar run() en un hilo de fondo
+
+        callback(report, error) se invoca desde ese hilo; la GUI debe
+        reenviarlo con after().
+        """
+        def worker():
+            try:
+                report = self.run(tareas, progress_callback)
+                error = None
+            except Exception as e:
+                logger.error(f"Error en mantenimiento: {e}")
+                report, error = None, e
+            if callback:
+                callback(report, error)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def format_report(report):
+        """Resumen legible para mostrar al operador"""
+        antes, despues = report['antes'], report['despues']
+        lines = [
+            f"Tamaño: {antes['tamano'] / 1048576:.2f} MB -> {despues['tamano'] / 1048576:.2f} MB",
+            f"Fragmentación: {antes['fragmentacion']}% -> {despues['fragmentacion']}%",
+            f"Páginas libres: {antes['paginas_libres']} -> {despues['paginas_libres']}",
+            "",
+        ]
+        for tarea, info in report['tareas'].items():
+            resultado = info['resultado']
+            if isinstance(resultado, list):
+                resultado = 'ok' if not resultado else f"{len(resultado)} problemas"
+            lines.append(f"• {tarea}: {resultado} ({info['duracion']} s)")
+        if report['problemas']:
+            lines.append("")
+            lines.extend(report['problemas'][:10])
+        return "\n".join(lines)
+
+
+class MaintenanceScheduler:
+    """Programación diaria del mantenimiento en horario no laboral"""
+
+    def __init__(self, service=None):
+        self.service = service or maintenance_service
+        self.timer = None
+        self.next_run = None
+
+    def load_schedule(self):
+        """
+        Leer la programación desde los parámetros de control (rpcontrl)
+
+        Se llama también desde el hilo del temporizador, así que usa una
+        conexión propia del servicio en lugar de la sesión de la aplicación.
+        """
+        from database.models import Control
+
+        valores = {k: v[0] for k, v in PARAMETROS_PROGRAMACION.items()}
+        conn = self.service.connect()
+        try:
+            rows = conn.execute(
+                f"SELECT parametro, valor FROM {Control.__tablename__} "
+                f"WHERE parametro IN ({', '.join('?' * len(PARAMETROS_PROGRAMACION))})",
+                list(PARAMETROS_PROGRAMACION)
+            ).fetchall()
+        finally:
+            conn.close()
+        valores.update(rows)
+
+        return {
+            'activo': str(valores['MANTENIMIENTO_ACTIVO']).lower() in ('1', 'true', 'si', 'sí'),
+            'hora': valores['MANTENIMIENTO_HORA'],
+            'tareas': [t.strip() for t in valores['MANTENIMIENTO_TAREAS'].split(',') if t.strip()],
+        }
+
+    def save_schedule(self, activo, hora, tareas, usuario=None):
+        """Guardar la programación y reprogramar el temporizador"""
+        from database.connection import get_session
+        from database.models import Control
+
+        datetime.strptime(hora, "%H:%M")
+        desconocidas = [t for t in tareas if t not in TAREAS]
+        if desconocidas:
+            raise ValueError(f"Tareas de mantenimiento no válidas: {', '.join(desconocidas)}")
+
+        valores = {
+            'MANTENIMIENTO_ACTIVO': '1' if activo else '0',
+            'MANTENIMIENTO_HORA': hora,
+            'MANTENIMIENTO_TAREAS': ','.join(tareas),
+        }
+        session = get_session()
+        try:
+            for parametro, valor in valores.items():
+                control = session.get(Control, parametro)
+                if control is None:
+                    _, tipo, descripcion = PARAMETROS_PROGRAMACION[parametro]
+                    control = Control(parametro=parametro, tipo=tipo, descripcion=descripcion,
+                                      categoria='MANTENIMIENTO')
+                    session.add(control)
+                control.valor = valor
+                control.updated_by = usuario
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+        self.start()
+
+    @staticmethod
+    def compute_next_run(hora, now=None):
+        now = now or datetime.now()
+        hour, minute = map(int, hora.split(':'))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        return candidate
+
+    def start(self):
+        """Programar la siguiente ejecución según la configuración guardada"""
+        self.stop()
+        try:
+            schedule = self.load_schedule()
+        except Exception as e:
+            logger.error(f"No se pudo leer la programación de mantenimiento: {e}")
+            return None
+        if not schedule['activo']:
+            return None
+
+        self.next_run = self.compute_next_run(schedule['hora'])
+        delay = (self.next_run - datetime.now()).total_seconds()
+        self.timer = threading.Timer(delay, self._run_scheduled, args=(schedule['tareas'],))
+        self.timer.daemon = True
+        self.timer.start()
+        logger.info(f"Mantenimiento programado para {self.next_run:%Y-%m-%d %H:%M}")
+        return self.next_run
+
+    def stop(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.next_run = None
+
+    def _run_scheduled(self, tareas):
+        try:
+            self.service.run(tareas)
+        except Exception as e:
+            logger.error(f"Error en mantenimiento programado: {e}")
+        finally:
+            self.start()
+
+
+# Instancias globales
+maintenance_service = MaintenanceService()
+maintenance_scheduler = MaintenanceScheduler(maintenance_service)
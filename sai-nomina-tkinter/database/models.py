@@ -155,6 +155,12 @@ class IngresoDescuento(Base):
     # Relación
     empleado_rel = relationship("Empleado", back_populates="ingresos_descuentos")
 
+    __table_args__ = (
+        # Ingresos/descuentos pendientes del empleado en el período de cálculo
+        Index('idx_ingdes_empleado_tipo_fecha', 'empleado', 'tipo', 'fecha_desde'),
+        Index('idx_ingdes_procesado', 'procesado'),
+    )
+
 class Cliente(Base):
     """Clientes de la empresa de seguridad"""
     __tablename__ = "clientes"
@@ -450,6 +456,8 @@ class Vacacion(Base):
 
     __table_args__ = (
         Index('idx_vacacion_empleado_periodo', 'empleado', 'periodo'),
+        Index('idx_vacacion_empleado_estado', 'empleado', 'estado'),
+        Index('idx_vacacion_estado', 'estado'),
     )
 
 class Prestamo(Base):
@@ -552,6 +560,7 @@ class RolPago(Base):
 
     __table_args__ = (
         Index('idx_rol_periodo_empleado', 'periodo', 'empleado'),
+        Index('idx_rol_empleado_periodo', 'empleado', 'periodo'),
         Index('idx_rol_estado', 'estado'),
     )
 
@@ -804,4 +813,61 @@ class SesionUsuario(Base):
     __table_args__ = (
         Index('idx_sesion_token', 'token_sesion'),
         Index('idx_sesion_usuario_activa', 'usuario_id', 'activa'),
-    )
\ No newline at end of file
+    )
+
+
+class ResumenNomina(Base):
+    """Resumen materializado de roles de pago por período y departamento"""
+    __tablename__ = "resumen_nomina"
+
+    periodo = Column(String(7), primary_key=True)  # YYYY-MM
+    depto = Column(String(10), primary_key=True)   # '*' = total del período
+
+    empleados = Column(Integer, default=0)
+    total_ingresos = Column(Numeric(14, 2), default=0)
+    total_descuentos = Column(Numeric(14, 2), default=0)
+    aporte_iess_personal = Column(Numeric(14, 2), default=0)
+    aporte_iess_patronal = Column(Numeric(14, 2), default=0)
+    impuesto_renta = Column(Numeric(14, 2), default=0)
+    liquido_total = Column(Numeric(14, 2), default=0)
+    provisiones_total = Column(Numeric(14, 2), default=0)
+    costo_empresa_total = Column(Numeric(14, 2), default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ResumenPlantilla(Base):
+    """Resumen materializado de empleados por departamento"""
+    __tablename__ = "resumen_plantilla"
+
+    depto = Column(String(10), primary_key=True)  # '*' = toda la empresa, '' = sin departamento
+
+    empleados_total = Column(Integer, default=0)
+    empleados_activos = Column(Integer, default=0)
+    total_sueldos = Column(Numeric(14, 2), default=0)  # Solo empleados activos
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class EstadoSincronizacion(Base):
+    """Huella de cada fila importada desde el sistema anterior (RPEMPLEA/RPHISTOR)"""
+    __tablename__ = "estado_sincronizacion"
+
+    tabla = Column(String(30), primary_key=True)    # Tabla de origen
+    clave = Column(String(100), primary_key=True)   # Clave de la fila en el origen
+    hash = Column(String(40), nullable=False)       # SHA-1 de los valores mapeados
+    local_id = Column(String(20))                   # Clave en la base local
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CambioJournal(Base):
+    """Diario de cambios (CDC) mantenido por triggers para exportaciones incrementales"""
+    __tablename__ = "cambios_journal"
+    __table_args__ = (
+        Index('idx_cambios_tabla_pk', 'tabla', 'pk'),
+        {'sqlite_autoincrement': True},
+    )
+
+    version = Column(Integer, primary_key=True)  # Creciente en toda la base
+    tabla = Column(String(30), nullable=False)
+    pk = Column(String(50), nullable=False)
+    op = Column(String(1), nullable=False)       # I, U, D
+    fecha = Column(DateTime)                     # Asignada por el trigger (UTC)
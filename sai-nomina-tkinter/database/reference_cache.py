@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ReferenceCache - Sistema SGN
+Caché de datos de referencia (cargos, departamentos, clientes y turnos)
+en diccionarios inmutables por código, invalidada por versión de tabla
+"""
+
+import sys
+from pathlib import Path
+from collections import namedtuple
+from itertools import chain
+from types import MappingProxyType
+import logging
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import Cargo, Departamento, Cliente, Turno
+
+logger = logging.getLogger(__name__)
+
+MODELOS_REFERENCIA = (Cargo, Departamento, Cliente, Turno)
+
+# Orden de presentación en combos y listados
+ORDEN = {
+    Cargo: 'nombre',
+    Departamento: 'nombre_codigo',
+    Cliente: 'razon_social',
+    Turno: 'codigo',
+}
+
+
+class _Snapshot:
+    """Contenido inmutable de una tabla en una versión dada"""
+
+    def __init__(self, version, records, por_codigo, por_id):
+        self.version = version
+        self.records = records
+        self.por_codigo = por_codigo
+        self.por_id = por_id
+
+
+class ReferenceCache:
+    """
+    Caché de proceso para tablas de referencia pequeñas
+
+    Cada tabla tiene un contador de versión que se incrementa al confirmar
+    una transacción que la modificó; la siguiente lectura recarga la tabla
+    completa con una sola consulta. Los registros son namedtuples con los
+    mismos nombres de columna que el modelo, así que sustituyen a los
+    objetos ORM en código de solo lectura (cargo.nombre, dept.nombre_codigo).
+    """
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._versions = {model: 0 for model in MODELOS_REFERENCIA}
+        self._snapshots = {}
+        self._types = {
+            model: namedtuple(model.__name__ + 'Ref', [c.key for c in model.__mapper__.column_attrs])
+            for model in MODELOS_REFERENCIA
+        }
+        self.hits = 0
+        self.loads = 0
+
+    def _new_session(self):
+        if self._session_factory is None:
+            from database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def version(self, model):
+        return self._versions[model]
+
+    def invalidate(self, *models):
+        """Marcar tablas como modificadas (todas si no se indica ninguna)"""
+        with self._lock:
+            for model in models or MODELOS_REFERENCIA:
+                self._versions[model] += 1
+
+    def _snapshot(self, model):
+        snapshot = self._snapshots.get(model)
+        if snapshot is not None and snapshot.version == self._versions[model]:
+            self.hits += 1
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(model)
+            version = self._versions[model]
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+
+            record_type = self._types[model]
+            fields = record_type._fields
+            session = self._new_session()
+            try:
+                rows = session.query(*[getattr(model, f) for f in fields]).order_by(
+                    getattr(model, ORDEN[model])
+                ).all()
+            finally:
+                session.close()
+
+            records = tuple(record_type(*row) for row in rows)
+            por_codigo = MappingProxyType({r.codigo: r for r in records})
+            por_id = MappingProxyType({r.id: r for r in records}) if 'id' in fields else por_codigo
+            snapshot = _Snapshot(version, records, por_codigo, por_id)
+            self._snapshots[model] = snapshot
+            self.loads += 1
+            logger.debug(f"Caché de referencia recargada: {model.__tablename__} ({len(records)} filas)")
+            return snapshot
+
+    def get(self, model, codigo):
+        """Registro por código; None si no existe o codigo es vacío"""
+        if not codigo:
+            return None
+        return self._snapshot(model).por_codigo.get(codigo)
+
+    def get_by_id(self, model, id_):
+        """Registro por id (clientes y turnos)"""
+        return self._snapshot(model).por_id.get(id_)
+
+    def all(self, model, activo=None):
+        """Registros ordenados; activo=True/False filtra por estado"""
+        records = self._snapshot(model).records
+        if activo is None:
+            return records
+        return tuple(r for r in records if bool(r.activo) == activo)
+
+    def mapping(self, model):
+        """Diccionario inmutable codigo -> registro"""
+        return self._snapshot(model).por_codigo
+
+    def nombre(self, model, codigo, default="N/A"):
+        """Nombre para mostrar de un código de referencia"""
+        record = self.get(model, codigo)
+        if record is None:
+            return default
+        return getattr(record, ORDEN[model]) or default
+
+    def stats(self):
+        return {
+            'aciertos': self.hits,
+            'recargas': self.loads,
+            'versiones': {m.__tablename__: v for m, v in self._versions.items()},
+        }
+
+
+# Instancia global
+reference_cache = ReferenceCache()
+
+
+def _changed_models(session):
+    return {
+        type(obj) for obj in chain(session.new, session.dirty, session.deleted)
+        if type(obj) in reference_cache._versions
+    }
+
+
+def _after_flush(session, flush_context):
+    changed = _changed_models(session)
+    if changed:
+        session.info.setdefault('referencias_modificadas', set()).update(changed)
+
+
+def _do_orm_execute(orm_execute_state):
+    """query(...).update()/delete() masivos no pasan por el flush"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        changed = {m.class_ for m in orm_execute_state.all_mappers} & set(MODELOS_REFERENCIA)
+        if changed:
+            orm_execute_state.session.info.setdefault('referencias_modificadas', set()).update(changed)
+
+
+def _after_commit(session):
+    changed = session.info.pop('referencias_modificadas', None)
+    if changed:
+        reference_cache.invalidate(*changed)
+
+
+def _after_rollback(session):
+    session.info.pop('referencias_modificadas', None)
+
+
+def install_reference_cache_listeners():
+    """Invalidar la caché al confirmar cambios en las tablas de referencia"""
+    for name, listener in (("after_flush", _after_flush),
+                           ("do_orm_execute", _do_orm_execute),
+                           ("after_commit", _after_commit),
+                           ("after_rollback", _after_rollback)):
+        if not event.contains(OrmSession, name, listener):
+            event.listen(OrmSession, name, listener)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SqlDump - Sistema SGN
+Volcado SQL fiel al esquema (DDL e índices de Base.metadata) con INSERT
+de varias filas agrupados en transacciones, y carga del volcado en SQLite
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime
+import logging
+import math
+import sqlite3
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import Base
+from database.table_export import SalidaContada
+
+logger = logging.getLogger(__name__)
+
+# Filas por sentencia INSERT y sentencias por transacción
+FILAS_POR_INSERT = 500
+INSERTS_POR_TRANSACCION = 200
+
+
+def sql_literal(valor):
+    """
+    Literal SQL de un valor tal como lo guarda SQLite
+
+    Se vuelcan los valores almacenados (INTEGER, REAL, TEXT, BLOB) sin
+    pasar por los tipos de SQLAlchemy, así la carga reproduce exactamente
+    la base original.
+    """
+    if valor is None:
+        return 'NULL'
+    tipo = type(valor)
+    if tipo is str:
+        return "'" + valor.replace("'", "''") + "'"
+    if tipo is int:
+        return str(valor)
+    if tipo is float:
+        if math.isfinite(valor):
+            return repr(valor)
+        if math.isnan(valor):
+            return 'NULL'
+        return '9e999' if valor > 0 else '-9e999'
+    if tipo is bytes:
+        return "X'" + valor.hex() + "'"
+    raise TypeError(f"Tipo no soportado en el volcado: {tipo.__name__}")
+
+
+class SqlDumper:
+    """
+    Generador de volcados SQL
+
+    El archivo crea las tablas en orden de dependencias, carga los datos
+    con INSERT de FILAS_POR_INSERT filas dentro de BEGIN/COMMIT cada
+    INSERTS_POR_TRANSACCION sentencias y crea los índices al final (más
+    rápido que mantenerlos durante la carga). Las filas se leen por
+    streaming, así la memoria no depende del tamaño de las tablas.
+    """
+
+    def __init__(self, engine=None, rows_per_insert=FILAS_POR_INSERT,
+                 inserts_per_transaction=INSERTS_POR_TRANSACCION):
+        self._engine = engine
+        self.rows_per_insert = rows_per_insert
+        self.inserts_per_transaction = inserts_per_transaction
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            # Conexión propia del pool de lectura: cerrarla no descarta el
+            # trabajo pendiente de la sesión de la interfaz
+            from database.connection import get_reader_engine
+            self._engine = get_reader_engine()
+        return self._engine
+
+    def dump(self, destino, tablas=None, estructura=True, datos=True, progress_callback=None):
+        """
+        Escribir el volcado
+
+        Args:
+            destino: Ruta del archivo .sql
+            tablas: Nombres de tabla; None exporta todas las de Base.metadata
+            estructura: Incluir CREATE TABLE y CREATE INDEX
+            datos: Incluir los INSERT
+            progress_callback: f(tabla, filas, total_filas, bytes); devolver
+                False cancela el volcado
+
+        Returns:
+            dict: {'tablas': {tabla: {'filas', 'bytes'}}, 'filas', 'bytes',
+                   'archivos', 'cancelada'}
+        """
+        seleccion = [t for t in Base.metadata.sorted_tables if tablas is None or t.name in tablas]
+        dialect = self.engine.dialect
+        resultado = {'tablas': {}, 'filas': 0, 'bytes': 0, 'archivos': [str(destino)], 'cancelada': False}
+
+        with self.engine.connect() as conn, open(destino, 'wb') as stream:
+            salida = SalidaContada(stream)
+            salida.write("-- Exportación de Base de Datos - Sistema SGN\n")
+            salida.write(f"-- Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            salida.write("PRAGMA foreign_keys=OFF;\n\n")
+
+            if estructura:
+                for table in seleccion:
+                    salida.write(f"-- Tabla: {table.name}\n")
+                    salida.write(str(CreateTable(table).compile(dialect=dialect)).strip() + ";\n\n")
+
+            if datos:
+                for table in seleccion:
+                    inicio = salida.bytes
+                    filas, completa = self._write_rows(conn, table, salida, progress_callback)
+                    resultado['tablas'][table.name] = {'filas': filas, 'bytes': salida.bytes - inicio}
+                    resultado['filas'] += filas
+                    if not completa:
+                        resultado['cancelada'] = True
+                        break
+
+            if estructura and not resultado['cancelada']:
+                salida.write("-- Índices\n")
+                for table in seleccion:
+                    for index in sorted(table.indexes, key=lambda i: i.name):
+                        salida.write(str(CreateIndex(index).compile(dialect=dialect)).strip() + ";\n")
+                salida.write("\n")
+
+            salida.write("PRAGMA foreign_keys=ON;\n")
+            resultado['bytes'] = salida.bytes
+
+        logger.info(
+            f"Volcado SQL: {len(seleccion)} tablas, {resultado['filas']} filas, "
+            f"{resultado['bytes'] / 1048576:.1f} MB"
+        )
+        return resultado
+
+    def _write_rows(self, connection, table, salida, progress_callback):
+        """Escribir los INSERT de una tabla; devuelve (filas, False si se canceló)"""
+        preparer = connection.dialect.identifier_preparer
+        nombre = preparer.format_table(table)
+        columnas = ', '.join(preparer.format_column(c) for c in table.columns)
+        orden = ', '.join(preparer.format_column(c) for c in table.primary_key.columns) or 'rowid'
+
+        total = connection.execute(text(f"SELECT COUNT(*) FROM {nombre}")).scalar()
+        if progress_callback and progress_callback(table.name, 0, total, salida.bytes) is False:
+            return 0, False
+        if not total:
+            return 0, True
+
+        encabezado = f"INSERT INTO {nombre} ({columnas}) VALUES\n"
+        literal = sql_literal
+        filas = sentencias = 0
+
+        # Valores almacenados, sin procesar por los tipos de SQLAlchemy
+        result = connection.exec_driver_sql(f"SELECT {columnas} FROM {nombre} ORDER BY {orden}")
+        salida.write(f"-- Datos: {table.name}\nBEGIN TRANSACTION;\n")
+        for lote in result.partitions(self.rows_per_insert):
+            salida.write(encabezado + ',\n'.join(
+                '(' + ', '.join(map(literal, fila)) + ')' for fila in lote
+            ) + ';\n')
+            filas += len(lote)
+            sentencias += 1
+            if sentencias % self.inserts_per_transaction == 0:
+                salida.write("COMMIT;\nBEGIN TRANSACTION;\n")
+                if progress_callback and progress_callback(table.name, filas, total, salida.bytes) is False:
+                    salida.write("COMMIT;\n")
+                    return filas, False
+        salida.write("COMMIT;\n\n")
+
+        if progress_callback and progress_callback(table.name, filas, total, salida.bytes) is False:
+            return filas, False
+        return filas, True
+
+
+def load_dump(origen, database_path):
+    """
+    Cargar un volcado en una base SQLite (pensado para una base vacía)
+
+    El archivo se lee por sentencias, sin cargarlo completo en memoria, y
+    las transacciones son las del propio volcado.
+
+    Returns:
+        int: Sentencias ejecutadas
+    """
+    conn = sqlite3.connect(str(database_path), isolation_level=None)
+    ejecutadas = 0
+    try:
+        conn.execute("PRAGMA synchronous=OFF")
+        buffer = []
+        with open(origen, encoding='utf-8') as fh:
+            for linea in fh:
+                if not buffer and (linea.startswith('--') or not linea.strip()):
+                    continue
+                buffer.append(linea)
+                if linea.rstrip().endswith(';'):
+                    sentencia = ''.join(buffer)
+                    if sqlite3.complete_statement(sentencia):
+                        conn.execute(sentencia)
+                        ejecutadas += 1
+                        buffer = []
+        if buffer:
+            raise ValueError("El volcado termina con una sentencia incompleta")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return ejecutadas
+
+
+# Instancia global
+sql_dumper = SqlDumper()
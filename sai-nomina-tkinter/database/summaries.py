@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resúmenes materializados - Sistema SGN
+Mantiene resumen_nomina (período x departamento) y resumen_plantilla
+(departamento) al guardar roles de pago y empleados, para que el dashboard
+y los resúmenes sean lecturas de una sola fila
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, date
+from itertools import chain
+import logging
+
+from sqlalchemy import event, inspect, text, bindparam
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as OrmSession
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import Empleado, RolPago, ResumenNomina, ResumenPlantilla
+
+logger = logging.getLogger(__name__)
+
+TOTAL = '*'          # Clave de la fila con el total general
+SIN_DEPTO = ''       # Clave de empleados sin departamento
+
+COLUMNAS_NOMINA = """
+        periodo, depto, empleados, total_ingresos, total_descuentos,
+        aporte_iess_personal, aporte_iess_patronal, impuesto_renta,
+        liquido_total, provisiones_total, costo_empresa_total, updated_at
+"""
+
+SELECT_NOMINA_DEPTOS = """
+    SELECT
+        :periodo AS periodo,
+        COALESCE(e.depto, '') AS depto,
+        COUNT(*) AS empleados,
+        ROUND(SUM(COALESCE(r.total_ingresos, 0)), 2) AS total_ingresos,
+        ROUND(SUM(COALESCE(r.total_descuentos, 0)), 2) AS total_descuentos,
+        ROUND(SUM(COALESCE(r.aporte_iess, 0)), 2) AS aporte_iess_personal,
+        ROUND(SUM(COALESCE(r.total_ingresos, 0)) * :patronal, 2) AS aporte_iess_patronal,
+        ROUND(SUM(COALESCE(r.impuesto_renta, 0)), 2) AS impuesto_renta,
+        ROUND(SUM(COALESCE(r.neto_pagar, COALESCE(r.total_ingresos, 0) - COALESCE(r.total_descuentos, 0))), 2)
+            AS liquido_total,
+        ROUND(SUM(
+            COALESCE(r.total_ingresos, 0) * :decimo_tercer
+            + :decimo_cuarto / 12.0
+            + COALESCE(e.sueldo, :sbu) / 24.0
+            + CASE WHEN e.fecha_ing IS NOT NULL
+                        AND julianday(:hoy) - julianday(e.fecha_ing) >= 365.25
+                   THEN COALESCE(r.total_ingresos, 0) * :fondos_reserva ELSE 0 END
+        ), 2) AS provisiones_total,
+        0 AS costo_empresa_total,
+        :ahora AS updated_at
+    FROM roles_pago r
+    LEFT JOIN rpemplea e ON e.empleado = r.empleado
+    WHERE r.periodo = :periodo
+    GROUP BY COALESCE(e.depto, '')
+"""
+
+SQL_NOMINA_DEPTOS = text(f"INSERT INTO resumen_nomina ({COLUMNAS_NOMINA}) {SELECT_NOMINA_DEPTOS}")
+
+# Mismos valores que las filas materializadas, sin escribir (lecturas sin resumen)
+SQL_NOMINA_CALCULO = text(f"""
+    SELECT COALESCE(SUM(empleados), 0) AS empleados,
+           ROUND(COALESCE(SUM(total_ingresos), 0), 2) AS total_ingresos,
+           ROUND(COALESCE(SUM(total_descuentos), 0), 2) AS total_descuentos,
+           ROUND(COALESCE(SUM(aporte_iess_personal), 0), 2) AS aporte_iess_personal,
+           ROUND(COALESCE(SUM(aporte_iess_patronal), 0), 2) AS aporte_iess_patronal,
+           ROUND(COALESCE(SUM(impuesto_renta), 0), 2) AS impuesto_renta,
+           ROUND(COALESCE(SUM(liquido_total), 0), 2) AS liquido_total,
+           ROUND(COALESCE(SUM(provisiones_total), 0), 2) AS provisiones_total,
+           ROUND(COALESCE(SUM(ROUND(total_ingresos + aporte_iess_patronal + provisiones_total, 2)), 0), 2)
+               AS costo_empresa_total
+    FROM ({SELECT_NOMINA_DEPTOS}) d
+    WHERE :depto = '*' OR d.depto = :depto
+""")
+
+SQL_NOMINA_COSTO = text("""
+    UPDATE resumen_nomina
+    SET costo_empresa_total = ROUND(total_ingresos + aporte_iess_patronal + provisiones_total, 2)
+    WHERE periodo = :periodo
+""")
+
+# Sin HAVING: un período sin roles queda con su fila total en cero, así su
+# lectura no vuelve a calcularse
+SQL_NOMINA_TOTAL = text("""
+    INSERT INTO resumen_nomina (
+        periodo, depto, empleados, total_ingresos, total_descuentos,
+        aporte_iess_personal, aporte_iess_patronal, impuesto_renta,
+        liquido_total, provisiones_total, costo_empresa_total, updated_at
+    )
+    SELECT :periodo, '*', COALESCE(SUM(empleados), 0), ROUND(COALESCE(SUM(total_ingresos), 0), 2),
+           ROUND(COALESCE(SUM(total_descuentos), 0), 2), ROUND(COALESCE(SUM(aporte_iess_personal), 0), 2),
+           ROUND(COALESCE(SUM(aporte_iess_patronal), 0), 2), ROUND(COALESCE(SUM(impuesto_renta), 0), 2),
+           ROUND(COALESCE(SUM(liquido_total), 0), 2), ROUND(COALESCE(SUM(provisiones_total), 0), 2),
+           ROUND(COALESCE(SUM(costo_empresa_total), 0), 2), :ahora
+    FROM resumen_nomina
+    WHERE periodo = :periodo AND depto != '*'
+""")
+
+SQL_PLANTILLA_TOTAL = text("""
+    INSERT INTO resumen_plantilla (depto, empleados_total, empleados_activos, total_sueldos, updated_at)
+    SELECT '*', COALESCE(SUM(empleados_total), 0), COALESCE(SUM(empleados_activos), 0),
+           ROUND(COALESCE(SUM(total_sueldos), 0), 2), :ahora
+    FROM resumen_plantilla
+    WHERE depto != '*'
+""")
+
+SELECT_PLANTILLA = """
+    SELECT COALESCE(depto, '') AS depto, COUNT(*) AS empleados_total,
+           SUM(CASE WHEN activo THEN 1 ELSE 0 END) AS empleados_activos,
+           ROUND(SUM(CASE WHEN activo THEN COALESCE(sueldo, 0) ELSE 0 END), 2) AS total_sueldos,
+           :ahora AS updated_at
+    FROM rpemplea
+"""
+
+INSERT_PLANTILLA = """
+    INSERT INTO resumen_plantilla (depto, empleados_total, empleados_activos, total_sueldos, updated_at)
+""" + SELECT_PLANTILLA
+
+
+def _payroll_parameters():
+    """Tasas del cálculo de nómina (misma fuente que PayrollCalculator)"""
+    from services.payroll_calculator import payroll_calculator
+    params = payroll_calculator.parameters
+    return {
+        'patronal': float(params["APORTE_PATRONAL_IESS"]),
+        'decimo_tercer': float(params["DECIMO_TERCER_RATE"]),
+        'decimo_cuarto': float(params["DECIMO_CUARTO_MONTO"]),
+        'sbu': float(params["SBU"]),
+        'fondos_reserva': float(params["FONDOS_RESERVA_RATE"]),
+    }
+
+
+def refresh_period(connection, periodo, parameters=None):
+    """Recalcular las filas de un período con un solo GROUP BY sobre ese período"""
+    values = dict(parameters or _payroll_parameters())
+    values.update(periodo=periodo, hoy=date.today().isoformat(), ahora=datetime.utcnow())
+
+    connection.execute(text("DELETE FROM resumen_nomina WHERE periodo = :periodo"), {'periodo': periodo})
+    connection.execute(SQL_NOMINA_DEPTOS, values)
+    connection.execute(SQL_NOMINA_COSTO, {'periodo': periodo})
+    connection.execute(SQL_NOMINA_TOTAL, {'periodo': periodo, 'ahora': values['ahora']})
+
+
+def refresh_departments(connection, deptos=None):
+    """
+    Recalcular resumen_plantilla para los departamentos indicados
+
+    Con deptos=None se recalcula toda la plantilla. La fila total se
+    obtiene sumando las filas por departamento.
+    """
+    ahora = datetime.utcnow()
+    if deptos is None:
+        connection.execute(text("DELETE FROM resumen_plantilla"))
+        connection.execute(text(INSERT_PLANTILLA + " GROUP BY COALESCE(depto, '')"), {'ahora': ahora})
+    else:
+        deptos = set(deptos)
+        con_codigo = sorted(d for d in deptos if d)
+        sin_depto = SIN_DEPTO in deptos or None in deptos
+        condiciones = []
+        if con_codigo:
+            condiciones.append("depto IN :deptos")
+        if sin_depto:
+            condiciones.append("depto IS NULL OR depto = ''")
+        if not condiciones:
+            return
+
+        claves = con_codigo + ([SIN_DEPTO] if sin_depto else [])
+        borrar = text("DELETE FROM resumen_plantilla WHERE depto IN :claves").bindparams(
+            bindparam('claves', expanding=True))
+        connection.execute(borrar, {'claves': claves})
+
+        insertar = text(INSERT_PLANTILLA + " WHERE " + " OR ".join(condiciones) +
+                        " GROUP BY COALESCE(depto, '')")
+        params = {'ahora': ahora}
+        if con_codigo:
+            insertar = insertar.bindparams(bindparam('deptos', expanding=True))
+            params['deptos'] = con_codigo
+        connection.execute(insertar, params)
+
+    connection.execute(text("DELETE FROM resumen_plantilla WHERE depto = '*'"))
+    connection.execute(SQL_PLANTILLA_TOTAL, {'ahora': ahora})
+
+
+def rebuild_all(connection):
+    """Reconstruir todos los resúmenes (tras cargas masivas o migraciones)"""
+    parameters = _payroll_parameters()
+    periodos = [row[0] for row in connection.execute(text("SELECT DISTINCT periodo FROM roles_pago"))]
+    connection.execute(text("DELETE FROM resumen_nomina"))
+    for periodo in periodos:
+        refresh_period(connection, periodo, parameters)
+    refresh_departments(connection)
+    logger.info(f"Resúmenes reconstruidos: {len(periodos)} períodos")
+
+
+def _old_value(obj, attribute):
+    """Valor previo de un atributo; None si no se conocía"""
+    history = inspect(obj).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _after_flush(session, flush_context):
+    """Recalcular los resúmenes afectados dentro de la misma transacción"""
+    periodos = set()
+    deptos = set()
+    toda_plantilla = False
+
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, RolPago):
+            periodos.add(obj.periodo)
+            anterior = _old_value(obj, 'periodo')
+            if anterior:
+                periodos.add(anterior)
+        elif isinstance(obj, Empleado):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            deptos.add(obj.depto or SIN_DEPTO)
+            history = inspect(obj).attrs.depto.history
+            if history.deleted:
+                deptos.add(history.deleted[0] or SIN_DEPTO)
+            elif history.added and obj not in session.new and not history.unchanged:
+                # Se cambió el departamento sin conocer el anterior
+                toda_plantilla = True
+
+    if not periodos and not deptos:
+        return
+
+    connection = session.connection()
+    try:
+        for periodo in periodos:
+            if periodo:
+                refresh_period(connection, periodo)
+        if toda_plantilla:
+            refresh_departments(connection)
+        elif deptos:
+            refresh_departments(connection, deptos)
+    except OperationalError as e:
+        # Base creada antes de existir las tablas de resumen
+        logger.warning(f"No se pudieron actualizar los resúmenes: {e}")
+
+
+def install_summary_listeners():
+    """Registrar el mantenimiento incremental en todas las sesiones ORM"""
+    if not event.contains(OrmSession, "after_flush", _after_flush):
+        event.listen(OrmSession, "after_flush", _after_flush)
+
+
+def compute_period_summary(connection, periodo, depto=TOTAL):
+    """
+    Resumen de un período calculado sin escribirlo
+
+    Devuelve un ResumenNomina transitorio (fuera de la sesión) con los
+    mismos valores que tendría la fila materializada; en cero si el
+    período no tiene roles.
+    """
+    values = _payroll_parameters()
+    values.update(periodo=periodo, depto=depto, hoy=date.today().isoformat(), ahora=datetime.utcnow())
+    row = connection.execute(SQL_NOMINA_CALCULO, values).one()
+    return ResumenNomina(periodo=periodo, depto=depto, updated_at=values['ahora'], **row._mapping)
+
+
+def compute_plantilla(connection):
+    """Filas de plantilla por departamento y total, calculadas sin escribirlas"""
+    ahora = datetime.utcnow()
+    filas = [ResumenPlantilla(**row._mapping) for row in connection.execute(
+        text(SELECT_PLANTILLA + " GROUP BY COALESCE(depto, '') ORDER BY 1"), {'ahora': ahora})]
+    total = ResumenPlantilla(
+        depto=TOTAL,
+        empleados_total=sum(f.empleados_total for f in filas),
+        empleados_activos=sum(f.empleados_activos or 0 for f in filas),
+        total_sueldos=round(sum(float(f.total_sueldos or 0) for f in filas), 2),
+        updated_at=ahora,
+    )
+    return filas, total
+
+
+# Las lecturas no escriben: los resúmenes se materializan al guardar (en
+# _after_flush) o con rebuild_all; si falta una fila se calcula al vuelo
+# sin tocar la transacción de la sesión del llamador.
+
+def get_period_summary(session, periodo, depto=TOTAL):
+    """Fila de resumen_nomina; si aún no existe se calcula sin materializarla"""
+    resumen = session.get(ResumenNomina, (periodo, depto))
+    if resumen is None:
+        resumen = compute_period_summary(session.connection(), periodo, depto)
+    return resumen
+
+
+def get_plantilla(session, depto=TOTAL):
+    """Fila de resumen_plantilla; el total se calcula sin materializarlo si falta"""
+    resumen = session.get(ResumenPlantilla, depto)
+    if resumen is None and depto == TOTAL:
+        resumen = compute_plantilla(session.connection())[1]
+    return resumen
+
+
+def get_plantilla_por_depto(session):
+    """Filas de resumen_plantilla por departamento (sin el total)"""
+    if session.get(ResumenPlantilla, TOTAL) is None:
+        return compute_plantilla(session.connection())[0]
+    return session.query(ResumenPlantilla).filter(
+        ResumenPlantilla.depto != TOTAL
+    ).order_by(ResumenPlantilla.depto).all()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TableExport - Sistema SGN
+Exportación por streaming de las tablas mapeadas a CSV, JSONL, ZIP o
+Excel con memoria constante y progreso por tabla en filas y bytes
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, date
+from decimal import Decimal
+import csv
+import json
+import logging
+import zipfile
+
+from sqlalchemy import select, func, Numeric, Date, DateTime
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.models import Base
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ('csv', 'jsonl', 'zip', 'xlsx')
+
+# Filas por lote leído del cursor
+LOTE_LECTURA = 2000
+
+
+def exportable_tables():
+    """Tablas mapeadas en orden de dependencias: nombre -> descripción del modelo"""
+    modelos = {m.local_table.name: m.class_ for m in Base.registry.mappers}
+    tablas = {}
+    for table in Base.metadata.sorted_tables:
+        doc = (modelos[table.name].__doc__ or '') if table.name in modelos else ''
+        tablas[table.name] = doc.strip().split('\n')[0].split(' - Tabla ')[0]
+    return tablas
+
+
+def column_formats(table):
+    """Formato Excel por columna según el tipo: moneda, fecha o fecha_hora"""
+    formatos = {}
+    for i, column in enumerate(table.columns):
+        if isinstance(column.type, DateTime):
+            formatos[i] = 'fecha_hora'
+        elif isinstance(column.type, Date):
+            formatos[i] = 'fecha'
+        elif isinstance(column.type, Numeric) and column.type.scale == 2:
+            formatos[i] = 'moneda'
+    return formatos
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+class SalidaContada:
+    """Flujo binario (archivo o miembro de ZIP) que cuenta los bytes escritos"""
+
+    def __init__(self, stream, encoding='utf-8'):
+        self.stream = stream
+        self.encoding = encoding
+        self.bytes = 0
+
+    def write(self, texto):
+        datos = texto.encode(self.encoding)
+        self.bytes += len(datos)
+        self.stream.write(datos)
+        return len(texto)
+
+
+class TableExporter:
+    """
+    Volcado de tablas sin cargarlas en memoria
+
+    Cada tabla se recorre con un cursor en modo streaming (yield_per) en
+    orden de clave primaria y cada lote se escribe de inmediato en el
+    archivo o en el miembro del ZIP; la memoria depende de batch_size y no
+    del tamaño de rphistor o de la auditoría.
+    """
+
+    def __init__(self, engine=None, batch_size=LOTE_LECTURA):
+        self._engine = engine
+        self.batch_size = batch_size
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            # Conexión propia del pool de lectura: cerrarla no descarta el
+            # trabajo pendiente de la sesión de la interfaz
+            from database.connection import get_reader_engine
+            self._engine = get_reader_engine()
+        return self._engine
+
+    @staticmethod
+    def table(tabla):
+        try:
+            return Base.metadata.tables[tabla]
+        except KeyError:
+            raise ValueError(f"Tabla no exportable: {tabla}")
+
+    def count(self, connection, tabla):
+        return connection.execute(select(func.count()).select_from(self.table(tabla))).scalar()
+
+    def iter_batches(self, connection, tabla):
+        """Lotes de filas (tuplas en el orden de las columnas de la tabla)"""
+        table = self.table(tabla)
+        query = select(table).order_by(*table.primary_key.columns)
+        result = connection.execution_options(yield_per=self.batch_size).execute(query)
+        for lote in result.partitions():
+            yield lote
+
+    def export(self, tablas, destino, formato='csv', sufijo='', progress_callback=None):
+        """
+        Exportar tablas
+
+        Args:
+            tablas: Nombres de tabla (de exportable_tables())
+            destino: Directorio para 'csv'/'jsonl'; ruta del archivo para 'zip'/'xlsx'
+            formato: 'csv', 'jsonl', 'zip' (un CSV por tabla dentro del ZIP) o
+                'xlsx' (una hoja por tabla, dividida al llegar al límite de filas)
+            sufijo: Texto agregado al nombre de cada archivo (p. ej. fecha)
+            progress_callback: f(tabla, filas, total_filas, bytes); devolver
+                False cancela la exportación
+
+        Returns:
+            dict: {'tablas': {tabla: {'filas', 'bytes'}}, 'filas', 'bytes',
+                   'archivos', 'cancelada'}
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        destino = Path(destino)
+        if formato == 'xlsx':
+            return self._export_excel(tablas, destino, progress_callback)
+        resultado = {'tablas': {}, 'filas': 0, 'bytes': 0, 'archivos': [], 'cancelada': False}
+
+        zipf = None
+        if formato == 'zip':
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            zipf = zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+            resultado['archivos'].append(str(destino))
+        else:
+            destino.mkdir(parents=True, exist_ok=True)
+
+        try:
+            with self.engine.connect() as conn:
+                for tabla in tablas:
+                    extension = 'jsonl' if formato == 'jsonl' else 'csv'
+                    nombre = f"{tabla}{sufijo}.{extension}"
+                    if zipf is not None:
+                        stream = zipf.open(nombre, 'w', force_zip64=True)
+                    else:
+                        stream = open(destino / nombre, 'wb')
+                        resultado['archivos'].append(str(destino / nombre))
+
+                    with stream:
+                        salida = SalidaContada(stream)
+                        filas, completa = self._write_table(conn, tabla, salida, extension, progress_callback)
+
+                    resultado['tablas'][tabla] = {'filas': filas, 'bytes': salida.bytes}
+                    resultado['filas'] += filas
+                    resultado['bytes'] += salida.bytes
+                    if not completa:
+                        resultado['cancelada'] = True
+                        break
+        finally:
+            if zipf is not None:
+                zipf.close()
+
+        logger.info(
+            f"Exportación {formato}: {len(resultado['tablas'])} tablas, "
+            f"{resultado['filas']} filas, {resultado['bytes'] / 1048576:.1f} MB"
+        )
+        return resultado
+
+    def _export_excel(self, tablas, destino, progress_callback):
+        """Una hoja por tabla en modo write-only; bytes se informa al terminar"""
+        from utils.excel_writer import ExcelStreamWriter
+
+        resultado = {'tablas': {}, 'filas': 0, 'bytes': 0, 'archivos': [str(destino)], 'cancelada': False}
+        libro = ExcelStreamWriter(destino)
+        with self.engine.connect() as conn:
+            for tabla in tablas:
+                table = self.table(tabla)
+                total = self.count(conn, tabla)
+                avance = None
+                if progress_callback:
+                    avance = lambda filas, tabla=tabla, total=total: progress_callback(tabla, filas, total, 0)
+                filas = libro.add_sheet(
+                    tabla, [c.name for c in table.columns],
+                    (fila for lote in self.iter_batches(conn, tabla) for fila in lote),
+                    column_formats(table), progress_callback=avance
+                )
+                resultado['tablas'][tabla] = {'filas': filas, 'bytes': 0}
+                resultado['filas'] += filas
+                if libro.cancelada:
+                    resultado['cancelada'] = True
+                    break
+        libro.save()
+        resultado['bytes'] = destino.stat().st_size
+        return resultado
+
+    def _write_table(self, connection, tabla, salida, extension, progress_callback):
+        """Escribir una tabla; devuelve (filas escritas, False si se canceló)"""
+        columnas = [c.name for c in self.table(tabla).columns]
+        total = self.count(connection, tabla)
+        filas = 0
+
+        if extension == 'csv':
+            writer = csv.writer(salida, lineterminator='\n')
+            writer.writerow(columnas)
+            escribir = writer.writerows
+        else:
+            def escribir(lote):
+                salida.write(''.join(
+                    json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_json_default) + '\n'
+                    for fila in lote
+                ))
+
+        if progress_callback and progress_callback(tabla, 0, total, 0) is False:
+            return 0, False
+        for lote in self.iter_batches(connection, tabla):
+            escribir(lote)
+            filas += len(lote)
+            if progress_callback and progress_callback(tabla, filas, total, salida.bytes) is False:
+                return filas, False
+        return filas, True
+
+
+# Instancia global
+table_exporter = TableExporter()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Componente de Carga Asíncrona - Sistema SGN
+Cargadores de datos de los módulos ejecutados en hilos con sesión propia;
+los resultados vuelven al hilo de Tk por una cola revisada con after()
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import logging
+import queue
+import sys
+import threading
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Pool compartido por todos los módulos; se crea con la primera carga
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.LOADER_WORKERS,
+                                           thread_name_prefix="sgn-loader")
+        return _executor
+
+
+class LoadCancelled(Exception):
+    """La carga fue reemplazada por una más reciente"""
+
+
+class LoadTicket:
+    """
+    Estado de una solicitud de carga
+
+    cancel() puede llamarse desde el hilo de Tk: marca la solicitud y, si su
+    consulta está en curso, la interrumpe en la conexión SQLite del hilo que
+    la ejecuta. Los cargadores largos pueden llamar check() entre lotes.
+    """
+
+    def __init__(self, name, generation):
+        self.name = name
+        self.generation = generation
+        self.future = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._dbapi = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise LoadCancelled(self.name)
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+        with self._lock:
+            interrupt = getattr(self._dbapi, 'interrupt', None)
+            if interrupt is not None:
+                interrupt()
+
+    def _attach(self, dbapi_connection):
+        with self._lock:
+            self._dbapi = dbapi_connection
+
+    def _detach(self):
+        with self._lock:
+            self._dbapi = None
+
+
+class AsyncLoader:
+    """
+    Cargadores de datos de un módulo
+
+    Cada módulo declara sus cargadores con register(nombre, funcion,
+    on_success, on_error); la función recibe una sesión nueva del engine de
+    lectura y los argumentos de load(), se ejecuta en el pool de hilos y no
+    debe tocar widgets. on_success/on_error se llaman en el hilo de Tk.
+
+    Una carga nueva con el mismo nombre reemplaza a la anterior (por ejemplo
+    al escribir en un filtro): la anterior se cancela y su resultado, si
+    llega, se descarta.
+    """
+
+    def __init__(self, widget, poll_ms=None):
+        self.widget = widget
+        self.poll_ms = poll_ms or Config.LOADER_POLL_MS
+        self.loaders = {}
+        self.tickets = {}
+        self.generations = {}
+        self.results = queue.Queue()
+        self._polling = None
+        self._closed = False
+
+        widget.bind('<Destroy>', self._on_destroy, add='+')
+
+    def register(self, name, func, on_success, on_error=None):
+        """Declarar un cargador"""
+        self.loaders[name] = (func, on_success, on_error)
+
+    def load(self, name, *args, **kwargs):
+        """Ejecutar un cargador en segundo plano, reemplazando su carga pendiente"""
+        if self._closed:
+            return None
+
+        self.cancel(name)
+        generation = self.generations.get(name, 0) + 1
+        self.generations[name] = generation
+
+        ticket = LoadTicket(name, generation)
+        self.tickets[name] = ticket
+        ticket.future = _get_executor().submit(self._run, ticket, self.loaders[name][0], args, kwargs)
+        self._start_polling()
+        return ticket
+
+    def cancel(self, name=None):
+        """Cancelar la carga pendiente de un cargador, o todas"""
+        names = [name] if name is not None else list(self.tickets)
+        for key in names:
+            ticket = self.tickets.pop(key, None)
+            if ticket is not None:
+                ticket.cancel()
+
+    def is_loading(self, name=None):
+        return name in self.tickets if name is not None else bool(self.tickets)
+
+    def _run(self, ticket, func, args, kwargs):
+        """Hilo del pool: ejecutar con sesión propia y dejar el resultado en la cola"""
+        if ticket.cancelled:
+            return
+
+        from database.connection import get_reader_session
+
+        session = get_reader_session()
+        try:
+            ticket._attach(session.connection().connection.dbapi_connection)
+            value = func(session, *args, **kwargs)
+            self.results.put((ticket, True, value))
+        except Exception as e:
+            if not ticket.cancelled:
+                logger.error(f"Error en la carga '{ticket.name}': {e}")
+                self.results.put((ticket, False, e))
+        finally:
+            ticket._detach()
+            session.close()
+
+    def _start_polling(self):
+        if self._polling is None:
+            self._polling = self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Hilo de Tk: entregar los resultados vigentes"""
+        self._polling = None
+        while True:
+            try:
+                ticket, ok, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            # Resultado de una carga reemplazada o cancelada
+            if self.tickets.get(ticket.name) is not ticket or ticket.cancelled:
+                continue
+            del self.tickets[ticket.name]
+
+            _, on_success, on_error = self.loaders[ticket.name]
+            try:
+                if ok:
+                    on_success(value)
+                elif on_error is not None:
+                    on_error(value)
+            except Exception as e:
+                logger.error(f"Error mostrando la carga '{ticket.name}': {e}")
+
+        if self.tickets and not self._closed:
+            self._start_polling()
+
+    def _on_destroy(self, event):
+        if event.widget is not self.widget:
+            return
+        self._closed = True
+        self.cancel()
+        if self._polling is not None:
+            try:
+                self.widget.after_cancel(self._polling)
+            except Exception:
+                pass
+            self._polling = None
@@ -7,16 +7,28 @@ Funcionalidades para importación y procesamiento masivo de datos
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
 import csv
 from datetime import date, datetime
 from decimal import Decimal
+import queue
 import sys
+import threading
 from pathlib import Path
 
 # Agregar path para imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from utils.file_reader import ChunkedFileReader
+from utils.validators import validar_cedula, validar_email
+from services.bulk_loader import BulkLoader, BulkLoadError
+
+# Intervalo de consulta de la cola del proceso en segundo plano (ms)
+INTERVALO_CONSULTA = 100
+
+# Errores mostrados como máximo en la lista (el total se informa igual)
+MAX_ERRORES_LISTA = 5000
+
+
 class CargaMasivaComponent:
     """Componente reutilizable para carga masiva de datos"""
 
@@ -36,8 +48,14 @@ class CargaMasivaComponent:
         self.entity_type = entity_type
         self.columns_mapping = columns_mapping
         self.validation_rules = validation_rules or {}
-        self.data_frame = None
+        self.reader = None
+        self.data_frame = None  # Vista previa (primeras filas)
+        self.total_rows = 0
         self.errors = []
+        self.loader = None
+        self.worker = None
+        self.last_validation = None
+        self.events = queue.Queue()
 
         self.setup_ui()
 
@@ -234,7 +252,8 @@ class CargaMasivaComponent:
         stats_frame.pack(fill=tk.X, padx=10, pady=5)
 
         self.validation_stats = {}
-        stats_fields = ["Total Registros:", "Registros Válidos:", "Registros con Errores:", "Estado:"]
+        stats_fields = ["Total Registros:", "Registros Válidos:", "Registros con Errores:", "Estado:",
+                        "A Insertar:", "A Actualizar:", "Sin Cambios:", "Campos Ignorados:"]
         for i, field in enumerate(stats_fields):
             tk.Label(stats_frame, text=field, font=('Arial', 9, 'bold')).grid(
                 row=i//2, column=(i%2)*2, sticky=tk.W, padx=10, pady=2
@@ -380,7 +399,7 @@ class CargaMasivaComponent:
         tk.Button(
             processing_buttons_frame,
             text="Cerrar",
-            command=self.window.destroy,
+            command=self.close,
             bg='#718096',
             fg='white',
             font=('Arial', 10, 'bold'),
@@ -407,21 +426,20 @@ class CargaMasivaComponent:
     def load_file_info(self, file_path):
         """Cargar información del archivo"""
         try:
-            # Determinar tipo de archivo y cargar
-            if file_path.lower().endswith('.xlsx'):
-                self.data_frame = pd.read_excel(file_path)
-            elif file_path.lower().endswith('.csv'):
-                self.data_frame = pd.read_csv(file_path)
-            else:
+            # El archivo no se carga completo: encabezado, vista previa y
+            # conteo de filas; validación y proceso lo recorren por bloques
+            if not file_path.lower().endswith(('.xlsx', '.csv')):
                 raise ValueError("Formato de archivo no soportado")
+            self.reader = ChunkedFileReader(file_path, dtype={'cedula': str, 'CEDULA': str})
+            self.data_frame = self.reader.preview()
+            self.total_rows = self.reader.count_rows()
 
             # Actualizar información
-            file_size = Path(file_path).stat().st_size
-            size_mb = file_size / (1024 * 1024)
+            size_mb = self.reader.size / (1024 * 1024)
 
             self.file_info_labels["Nombre:"].config(text=Path(file_path).name)
             self.file_info_labels["Tamaño:"].config(text=f"{size_mb:.2f} MB")
-            self.file_info_labels["Filas:"].config(text=str(len(self.data_frame)))
+            self.file_info_labels["Filas:"].config(text=str(self.total_rows))
             self.file_info_labels["Columnas:"].config(text=str(len(self.data_frame.columns)))
             self.file_info_labels["Estado:"].config(text="Cargado correctamente", fg='green')
 
@@ -532,101 +550,168 @@ class CargaMasivaComponent:
         """Ir a pestaña de validación"""
         self.notebook.select(2)
 
+    def get_active_mappings(self):
+        """Columnas del archivo mapeadas a un campo del sistema"""
+        active_mappings = {}
+        for col, combo in self.column_mappings.items():
+            field = combo.get()
+            if field != "[No mapear]":
+                active_mappings[col] = field
+        return active_mappings
+
     def validate_data(self):
-        """Validar datos"""
+        """Validar datos en segundo plano y simular la carga (sin escribir)"""
+        if self.worker is not None and self.worker.is_alive():
+            return
         try:
-            self.errors = []
-            valid_count = 0
-
-            # Obtener mapeos activos
-            active_mappings = {}
-            for col, combo in self.column_mappings.items():
-                field = combo.get()
-                if field != "[No mapear]":
-                    active_mappings[col] = field
-
-            # Validar cada fila
-            for index, row in self.data_frame.iterrows():
-                row_valid = True
-
-                for col, field in active_mappings.items():
-                    value = row[col]
-
-                    # Validaciones básicas
-                    if pd.isna(value) or str(value).strip() == "":
-                        if field in ['nombres', 'apellidos', 'cedula']:  # Campos obligatorios
-                            self.errors.append({
-                                'fila': index + 2,  # +2 porque index empieza en 0 y hay header
-                                'campo': field,
-                                'valor': str(value),
-                                'error': 'Campo obligatorio vacío'
-                            })
-                            row_valid = False
-                        continue
-
-                    # Validaciones específicas
-                    if field == 'cedula':
-                        if not self.validate_cedula(str(value)):
-                            self.errors.append({
-                                'fila': index + 2,
-                                'campo': field,
-                                'valor': str(value),
-                                'error': 'Cédula inválida'
-                            })
-                            row_valid = False
-
-                    elif field == 'email':
-                        if not self.validate_email(str(value)):
-                            self.errors.append({
-                                'fila': index + 2,
-                                'campo': field,
-                                'valor': str(value),
-                                'error': 'Email inválido'
-                            })
-                            row_valid = False
-
-                    elif field == 'sueldo':
-                        try:
-                            float_val = float(value)
-                            if float_val < 0:
-                                self.errors.append({
-                                    'fila': index + 2,
-                                    'campo': field,
-                                    'valor': str(value),
-                                    'error': 'Sueldo no puede ser negativo'
-                                })
-                                row_valid = False
-                        except:
-                            self.errors.append({
-                                'fila': index + 2,
-                                'campo': field,
-                                'valor': str(value),
-                                'error': 'Sueldo debe ser numérico'
-                            })
-                            row_valid = False
-
-                if row_valid:
-                    valid_count += 1
-
-            # Actualizar estadísticas
-            total_records = len(self.data_frame)
-            error_count = total_records - valid_count
-
-            self.validation_stats["Total Registros:"].config(text=str(total_records))
-            self.validation_stats["Registros Válidos:"].config(text=str(valid_count), fg='green')
-            self.validation_stats["Registros con Errores:"].config(text=str(error_count), fg='red')
-
-            if error_count == 0:
+            self.loader = BulkLoader(self.entity_type, self.get_active_mappings())
+        except BulkLoadError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        self.errors = []
+        self.last_validation = None
+        for item in self.errors_tree.get_children():
+            self.errors_tree.delete(item)
+        self.next_button3.config(state='disabled')
+        self.validation_stats["Estado:"].config(text="Validando...", fg='blue')
+        self.validation_stats["Campos Ignorados:"].config(
+            text=", ".join(self.loader.ignorados) or "-")
+
+        self.start_worker(dry_run=True)
+
+    def start_worker(self, dry_run, skip_errors=True, backup=False):
+        """Ejecutar la carga en un hilo; los resultados llegan por self.events"""
+        loader = self.loader
+        path, dtype = self.reader.path, self.reader.dtype
+
+        def run():
+            try:
+                if backup:
+                    from database.backup import backup_manager
+                    self.events.put(('estado', "Creando respaldo..."))
+                    backup_manager.create_backup("manual")
+                resultado = loader.run(
+                    ChunkedFileReader(path, dtype=dtype),
+                    dry_run=dry_run,
+                    skip_errors=skip_errors,
+                    on_errors=lambda errores: self.events.put(('errores', errores)),
+                    on_progress=lambda resumen: self.events.put(('progreso', resumen)),
+                )
+                self.events.put(('fin', resultado))
+            except Exception as e:
+                self.events.put(('error', str(e)))
+
+        self.worker = threading.Thread(target=run, name="carga-masiva", daemon=True)
+        self.worker.start()
+        self.window.after(INTERVALO_CONSULTA, self.poll_worker, dry_run)
+
+    def poll_worker(self, dry_run):
+        """Aplicar en la interfaz los eventos del proceso en segundo plano"""
+        try:
+            while True:
+                evento, datos = self.events.get_nowait()
+                if evento == 'errores':
+                    self.add_validation_errors(datos)
+                elif evento == 'progreso':
+                    self.show_progress(datos, dry_run)
+                elif evento == 'estado':
+                    self.progress_var.set(datos)
+                elif evento == 'fin':
+                    self.show_progress(datos, dry_run)
+                    self.finish_worker(datos, dry_run)
+                    return
+                elif evento == 'error':
+                    self.fail_worker(datos, dry_run)
+                    return
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            # Ventana cerrada mientras el proceso terminaba
+            return
+        self.window.after(INTERVALO_CONSULTA, self.poll_worker, dry_run)
+
+    def show_progress(self, resumen, dry_run):
+        """Actualizar contadores de validación o la barra de progreso"""
+        if dry_run:
+            self.validation_stats["Total Registros:"].config(text=str(resumen['total']))
+            self.validation_stats["Registros Válidos:"].config(text=str(resumen['validos']), fg='green')
+            self.validation_stats["Registros con Errores:"].config(text=str(resumen['errores']), fg='red')
+            self.validation_stats["A Insertar:"].config(text=str(resumen['insertar']))
+            self.validation_stats["A Actualizar:"].config(text=str(resumen['actualizar']))
+            self.validation_stats["Sin Cambios:"].config(text=str(resumen['sin_cambios']))
+        else:
+            self.progress_bar['maximum'] = max(resumen['bytes_totales'], 1)
+            self.progress_bar['value'] = resumen['bytes']
+            self.progress_var.set(
+                f"Procesados {resumen['total']} de {self.total_rows} registros "
+                f"({resumen['bytes'] / 1048576:.1f} de {resumen['bytes_totales'] / 1048576:.1f} MB)"
+            )
+
+    def finish_worker(self, resumen, dry_run):
+        """Mostrar el resultado de la simulación o de la carga"""
+        if dry_run:
+            self.last_validation = resumen
+            if resumen['errores'] == 0:
                 self.validation_stats["Estado:"].config(text="✓ Validación exitosa", fg='green')
-                self.next_button3.config(state='normal')
             else:
                 self.validation_stats["Estado:"].config(text="⚠ Errores encontrados", fg='orange')
+            if resumen['validos'] > 0:
+                self.next_button3.config(state='normal')
+            return
+
+        results_log = [
+            f"=== PROCESAMIENTO MASIVO DE {self.entity_type.upper()} ===",
+            f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
+            f"Total registros: {resumen['total']}",
+            "",
+            "=== RESUMEN ===",
+            f"Registros insertados: {resumen['insertar']}",
+            f"Registros actualizados: {resumen['actualizar']}",
+            f"Registros sin cambios: {resumen['sin_cambios']}",
+            f"Registros omitidos por errores: {resumen['errores']}",
+            f"Tiempo: {resumen['tiempo']:.1f} s",
+        ]
+        if resumen['ignorados']:
+            results_log.append(f"Campos sin columna en el sistema: {', '.join(resumen['ignorados'])}")
+
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, "\n".join(results_log))
+        self.progress_var.set("Procesamiento completado")
+        self.progress_bar['value'] = self.progress_bar['maximum']
+
+        procesados = resumen['insertar'] + resumen['actualizar'] + resumen['sin_cambios']
+        messagebox.showinfo(
+            "Procesamiento Completado",
+            f"Procesamiento finalizado:\n\n"
+            f"• Registros insertados: {resumen['insertar']}\n"
+            f"• Registros actualizados: {resumen['actualizar']}\n"
+            f"• Errores: {resumen['errores']}\n"
+            f"• Tasa de éxito: {(procesados / max(resumen['total'], 1) * 100):.1f}%"
+        )
 
-            # Mostrar errores
-            self.show_validation_errors()
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Error en validación: {str(e)}")
+    def fail_worker(self, mensaje, dry_run):
+        """Informar un error del proceso en segundo plano"""
+        if dry_run:
+            self.validation_stats["Estado:"].config(text="Error en validación", fg='red')
+            messagebox.showerror("Error", f"Error en validación: {mensaje}")
+        else:
+            self.progress_var.set("Procesamiento cancelado: no se guardó ningún registro")
+            self.results_text.delete(1.0, tk.END)
+            self.results_text.insert(tk.END, f"[ERROR] {mensaje}\nNo se guardó ningún registro.")
+            messagebox.showerror("Error", f"Error en procesamiento: {mensaje}")
+
+    def add_validation_errors(self, errores):
+        """Agregar a la lista los errores de un bloque recién validado"""
+        inicio = len(self.errors)
+        self.errors.extend(errores)
+        for error in errores[:max(MAX_ERRORES_LISTA - inicio, 0)]:
+            self.errors_tree.insert('', 'end', values=(
+                error['fila'],
+                error['campo'],
+                error['valor'],
+                error['error']
+            ))
 
     def show_validation_errors(self):
         """Mostrar errores de validación"""
@@ -634,138 +719,66 @@ class CargaMasivaComponent:
         for item in self.errors_tree.get_children():
             self.errors_tree.delete(item)
 
-        # Agregar errores
-        for error in self.errors:
-            self.errors_tree.insert('', 'end', values=(
-                error['fila'],
-                error['campo'],
-                error['valor'],
-                error['error']
-            ))
+        errores, self.errors = self.errors, []
+        self.add_validation_errors(errores)
 
     def validate_cedula(self, cedula):
         """Validar cédula ecuatoriana"""
-        if len(cedula) != 10:
-            return False
-
-        try:
-            digits = [int(d) for d in cedula]
-
-            # Validar dígitos
-            for i in range(9):
-                if i % 2 == 0:  # Posiciones pares
-                    digits[i] *= 2
-                    if digits[i] > 9:
-                        digits[i] -= 9
-
-            sum_digits = sum(digits[:9])
-            check_digit = (10 - (sum_digits % 10)) % 10
-
-            return check_digit == digits[9]
-        except:
-            return False
+        return validar_cedula(cedula)
 
     def validate_email(self, email):
         """Validar formato de email"""
-        import re
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return validar_email(email)
 
     def next_to_processing(self):
         """Ir a pestaña de procesamiento"""
         self.notebook.select(3)
 
     def process_data(self):
-        """Procesar e importar datos"""
-        try:
-            # Mostrar confirmación
-            if not messagebox.askyesno(
-                "Confirmar",
-                f"¿Está seguro de procesar {len(self.data_frame)} registros?\nEsta acción no se puede deshacer."
-            ):
-                return
-
-            # Configurar progreso
-            self.progress_var.set("Iniciando procesamiento...")
-            self.progress_bar['maximum'] = len(self.data_frame)
-            self.progress_bar['value'] = 0
-            self.window.update()
-
-            # Obtener mapeos activos
-            active_mappings = {}
-            for col, combo in self.column_mappings.items():
-                field = combo.get()
-                if field != "[No mapear]":
-                    active_mappings[col] = field
-
-            # Procesar registros
-            processed = 0
-            errors = 0
-            results_log = []
-
-            results_log.append(f"=== PROCESAMIENTO MASIVO DE {self.entity_type.upper()} ===")
-            results_log.append(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-            results_log.append(f"Total registros: {len(self.data_frame)}")
-            results_log.append("")
-
-            for index, row in self.data_frame.iterrows():
-                try:
-                    # Actualizar progreso
-                    self.progress_var.set(f"Procesando registro {index + 1} de {len(self.data_frame)}")
-                    self.progress_bar['value'] = index + 1
-                    self.window.update()
-
-                    # Preparar datos para inserción
-                    record_data = {}
-                    for col, field in active_mappings.items():
-                        value = row[col]
-                        if not pd.isna(value):
-                            record_data[field] = value
-
-                    # Aquí iría la lógica específica de inserción según entity_type
-                    # Por ahora simulamos el procesamiento
-                    success = self.insert_record(record_data)
-
-                    if success:
-                        processed += 1
-                        results_log.append(f"[OK] Fila {index + 2}: Procesado exitosamente")
-                    else:
-                        errors += 1
-                        results_log.append(f"[ERROR] Fila {index + 2}: Error en procesamiento")
-
-                except Exception as e:
-                    errors += 1
-                    results_log.append(f"[ERROR] Fila {index + 2}: {str(e)}")
-
-            # Finalizar
-            results_log.append("")
-            results_log.append("=== RESUMEN ===")
-            results_log.append(f"Registros procesados: {processed}")
-            results_log.append(f"Errores: {errors}")
-            results_log.append(f"Tasa de éxito: {(processed/len(self.data_frame)*100):.1f}%")
-
-            # Mostrar resultados
-            self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(tk.END, "\n".join(results_log))
-
-            self.progress_var.set("Procesamiento completado")
-
-            messagebox.showinfo(
-                "Procesamiento Completado",
-                f"Procesamiento finalizado:\n\n"
-                f"• Registros procesados: {processed}\n"
-                f"• Errores: {errors}\n"
-                f"• Tasa de éxito: {(processed/len(self.data_frame)*100):.1f}%"
+        """Procesar e importar datos en una transacción, en segundo plano"""
+        if self.worker is not None and self.worker.is_alive():
+            return
+        if self.last_validation is None:
+            messagebox.showwarning("Advertencia", "Primero valide los datos")
+            return
+
+        simulacion = self.last_validation
+        if simulacion['errores'] and not self.skip_errors_var.get():
+            messagebox.showwarning(
+                "Advertencia",
+                f"Hay {simulacion['errores']} registros con errores.\n"
+                "Corríjalos o marque 'Omitir registros con errores'."
             )
+            return
+
+        # Mostrar confirmación con el resultado de la simulación
+        if not messagebox.askyesno(
+            "Confirmar",
+            f"¿Está seguro de procesar {self.total_rows} registros?\n\n"
+            f"• Nuevos: {simulacion['insertar']}\n"
+            f"• Actualizados: {simulacion['actualizar']}\n"
+            f"• Sin cambios: {simulacion['sin_cambios']}\n"
+            f"• Omitidos por errores: {simulacion['errores']}\n\n"
+            "Esta acción no se puede deshacer."
+        ):
+            return
+
+        # Configurar progreso
+        self.progress_var.set("Iniciando procesamiento...")
+        self.progress_bar['value'] = 0
+        self.results_text.delete(1.0, tk.END)
+
+        self.start_worker(
+            dry_run=False,
+            skip_errors=self.skip_errors_var.get(),
+            backup=self.backup_var.get()
+        )
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error en procesamiento: {str(e)}")
-
-    def insert_record(self, record_data):
-        """Insertar registro en base de datos (método a sobrescribir)"""
-        # Este método debe ser sobrescrito por cada módulo específico
-        # Por ahora retorna True para simular éxito
-        return True
+    def close(self):
+        """Cerrar la ventana cancelando el proceso en curso"""
+        if self.worker is not None and self.worker.is_alive() and self.loader is not None:
+            self.loader.cancel()
+        self.window.destroy()
 
 
 def show_carga_masiva_empleados(parent, session):
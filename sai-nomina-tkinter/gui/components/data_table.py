@@ -4,9 +4,246 @@ import tkinter as tk
 from tkinter import ttk
 from config import Config
 
+# Filas que se mantienen como items arriba y abajo de la parte visible
+MARGEN_VIRTUAL = 40
+
+# Filas por consulta al recorrer todas las filas de un origen
+LOTE_FILAS = 1000
+
+
+def cell_value(row, key, default=""):
+    """Valor de una columna en un dict, una fila de consulta (Row) o un objeto ORM"""
+    if isinstance(row, dict):
+        return row.get(key, default)
+    mapping = getattr(row, '_mapping', None)
+    if mapping is not None:
+        return mapping.get(key, default)
+    return getattr(row, key, default)
+
+
+def sort_key(valor, convertir=None):
+    """Clave de orden que admite None mezclado con valores (None va al final)"""
+    if valor is None:
+        return (True, '')
+    return (False, convertir(valor) if convertir else valor)
+
+
+class RowProvider:
+    """
+    Origen de filas de una tabla virtual: cantidad, rango y orden
+
+    Los módulos leen sus filas completas en un hilo del AsyncLoader y las
+    muestran con ListRowProvider: se paga una lectura por carga (fuera del
+    hilo de Tk y con las columnas de la lista) a cambio de ordenar, filtrar
+    y desplazarse en memoria sin volver a consultar desde el hilo de Tk.
+    """
+
+    def count(self):
+        raise NotImplementedError
+
+    def slice(self, start, stop):
+        raise NotImplementedError
+
+    def sort(self, key, reverse=False):
+        raise NotImplementedError
+
+    def filter(self, filter_func):
+        """Filas que cumplen filter_func, leídas por lotes, como ListRowProvider"""
+        total = self.count()
+        filas = []
+        for inicio in range(0, total, LOTE_FILAS):
+            filas.extend(fila for fila in self.slice(inicio, min(total, inicio + LOTE_FILAS)) if filter_func(fila))
+        return ListRowProvider(filas)
+
+
+class ListRowProvider(RowProvider):
+    """Filas ya cargadas en una lista (dicts, filas de consulta u objetos)"""
+
+    def __init__(self, rows):
+        self.rows = rows if isinstance(rows, list) else list(rows)
+
+    def count(self):
+        return len(self.rows)
+
+    def slice(self, start, stop):
+        return self.rows[start:stop]
+
+    def sort(self, key, reverse=False):
+        valor = key if callable(key) else (lambda fila: cell_value(fila, key))
+        try:
+            self.rows = sorted(self.rows, key=lambda fila: sort_key(valor(fila)), reverse=reverse)
+        except TypeError:
+            # Tipos mezclados en la columna (números y texto): se comparan como texto
+            self.rows = sorted(self.rows, key=lambda fila: sort_key(valor(fila), str), reverse=reverse)
+
+    def filter(self, filter_func):
+        return ListRowProvider([fila for fila in self.rows if filter_func(fila)])
+
+
+class VirtualTreeview:
+    """
+    Vista virtual sobre un ttk.Treeview
+
+    Solo existen como items las filas visibles más MARGEN_VIRTUAL arriba y
+    abajo; al desplazarse cerca del borde de esa ventana los mismos items se
+    reutilizan con los valores de las filas nuevas. La barra de
+    desplazamiento representa la posición en el total de filas del origen,
+    así abrir o filtrar cualquier cantidad de filas cuesta lo mismo.
+
+    format_row(fila) devuelve (values, tags) de cada fila del origen.
+    """
+
+    def __init__(self, tree, scrollbar, format_row, margin=MARGEN_VIRTUAL):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.margin = margin
+        self.provider = None
+        self.total = 0
+        self.inicio = 0        # Índice global de la primera fila de la ventana
+        self.primera = 0       # Índice global de la primera fila visible
+        self.filas = []
+        self.items = []
+        self.seleccion = set()
+        self._pendiente = None
+
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        self.tree.bind('<Configure>', lambda e: self._schedule(), add='+')
+
+    def set_provider(self, provider):
+        """Mostrar un origen de filas desde el principio"""
+        self.provider = provider
+        self.seleccion = set()
+        self.reload(0)
+
+    def reload(self, primera=None):
+        """Volver a contar y leer la ventana (tras guardar cambios)"""
+        self.total = self.provider.count() if self.provider else 0
+        self._show(self.primera if primera is None else primera)
+
+    def sort(self, key, reverse=False):
+        self.provider.sort(key, reverse)
+        self.seleccion = set()
+        self._show(0)
+
+    def index_for_item(self, item):
+        """Índice global en el origen de la fila que muestra un item"""
+        return self.inicio + self.items.index(item)
+
+    def row_for_item(self, item):
+        return self.filas[self.items.index(item)]
+
+    def selected_rows(self):
+        return [self.row_for_item(item) for item in self.tree.selection()]
+
+    def iter_rows(self, batch=LOTE_FILAS):
+        """Todas las filas del origen, leídas por lotes"""
+        for inicio in range(0, self.total, batch):
+            yield from self.provider.slice(inicio, min(self.total, inicio + batch))
+
+    def visible_rows(self):
+        if not self.items or not self.tree.winfo_ismapped():
+            return int(self.tree.cget('height'))
+        y0, y1 = self.tree.yview()
+        return max(1, round((y1 - y0) * len(self.items)))
+
+    def _show(self, primera):
+        visibles = self.visible_rows()
+        primera = max(0, min(primera, self.total - visibles))
+        inicio = max(0, primera - self.margin)
+        fin = min(self.total, primera + visibles + self.margin)
+
+        foco = self.tree.focus()
+        foco = self.inicio + self.items.index(foco) if foco in self.items else None
+
+        self.filas = self.provider.slice(inicio, fin) if fin > inicio else []
+        self.inicio = inicio
+        self.primera = primera
+        self._fill(foco)
+
+        if self.items:
+            self.tree.yview_moveto((primera - inicio) / len(self.items))
+        self._update_scrollbar(visibles)
+
+    def _fill(self, foco):
+        """Reutilizar los items existentes; solo se crean o borran los que faltan o sobran"""
+        diferencia = len(self.filas) - len(self.items)
+        if diferencia > 0:
+            self.items.extend(self.tree.insert('', 'end') for _ in range(diferencia))
+        elif diferencia < 0:
+            self.tree.delete(*self.items[diferencia:])
+            del self.items[diferencia:]
+
+        for item, fila in zip(self.items, self.filas):
+            values, tags = self.format_row(fila)
+            self.tree.item(item, values=values, tags=tags)
+
+        # La selección y el foco siguen a la fila, no al item
+        fin = self.inicio + len(self.items)
+        seleccionados = [self.items[i - self.inicio] for i in sorted(self.seleccion) if self.inicio <= i < fin]
+        if set(seleccionados) != set(self.tree.selection()):
+            self.tree.selection_set(seleccionados)
+        if foco is not None and self.inicio <= foco < fin:
+            self.tree.focus(self.items[foco - self.inicio])
+
+    def _on_select(self, event=None):
+        fin = self.inicio + len(self.items)
+        fuera = {i for i in self.seleccion if not self.inicio <= i < fin}
+        self.seleccion = fuera | {self.inicio + self.items.index(item)
+                                  for item in self.tree.selection() if item in self.items}
+
+    def _on_tree_scroll(self, first, last):
+        """Desplazamiento propio del tree (rueda, teclado): recentrar cerca de los bordes"""
+        n = len(self.items)
+        if not n:
+            self.scrollbar.set(0, 1)
+            return
+        local = round(float(first) * n)
+        visibles = max(1, round((float(last) - float(first)) * n))
+        self.primera = self.inicio + local
+        self._update_scrollbar(visibles)
+
+        cerca_arriba = local < self.margin // 2 and self.inicio > 0
+        cerca_abajo = local + visibles > n - self.margin // 2 and self.inicio + n < self.total
+        if cerca_arriba or cerca_abajo:
+            self._schedule()
+
+    def _schedule(self):
+        if self._pendiente is None and self.provider is not None:
+            self._pendiente = self.tree.after_idle(self._recentre)
+
+    def _recentre(self):
+        self._pendiente = None
+        self._show(self.primera)
+
+    def _update_scrollbar(self, visibles):
+        if not self.total:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(self.primera / self.total, min(1.0, (self.primera + visibles) / self.total))
+
+    def _on_scrollbar(self, accion, cantidad, unidad=None):
+        """Comandos de la barra: moveto fracción o scroll n units/pages"""
+        if not self.total:
+            return
+        visibles = self.visible_rows()
+        if accion == 'moveto':
+            primera = round(float(cantidad) * self.total)
+        else:
+            primera = self.primera + int(cantidad) * (visibles if unidad == 'pages' else 1)
+
+        n = len(self.items)
+        if n and self.inicio <= primera and primera + visibles <= self.inicio + n:
+            self.tree.yview_moveto((primera - self.inicio) / n)
+        else:
+            self._show(primera)
+
+
 class DataTable(tk.Frame):
     def __init__(self, parent, columns=None, on_select=None, on_double_click=None,
-                 show_actions=True, actions=None, **kwargs):
+                 show_actions=True, actions=None, virtual=False, **kwargs):
         super().__init__(parent, bg=Config.COLORS['surface'], **kwargs)
 
         self.columns = columns or []
@@ -15,6 +252,11 @@ class DataTable(tk.Frame):
         self.show_actions = show_actions
         self.actions = actions or []
         self.data = []
+        # Modo virtual: las filas vienen de un RowProvider (ver set_provider)
+        self.virtual = virtual
+        self.view = None
+        self.sort_state = {}
+        self.selected_index = None
 
         self.setup_ui()
 
@@ -139,6 +381,11 @@ class DataTable(tk.Frame):
         self.tree.configure(yscrollcommand=v_scrollbar.set)
         self.tree.configure(xscrollcommand=h_scrollbar.set)
 
+        if self.virtual:
+            self.view = VirtualTreeview(self.tree, v_scrollbar, self.format_row)
+            for col in self.columns:
+                self.tree.heading(col["key"], command=lambda k=col["key"]: self.toggle_sort(k))
+
         # Grid layout
         self.tree.grid(row=0, column=0, sticky="nsew")
         v_scrollbar.grid(row=0, column=1, sticky="ns")
@@ -147,8 +394,8 @@ class DataTable(tk.Frame):
         tree_container.grid_rowconfigure(0, weight=1)
         tree_container.grid_columnconfigure(0, weight=1)
 
-        # Eventos
-        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+        # Eventos (add='+' conserva el seguimiento de selección de la vista virtual)
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select, add='+')
         self.tree.bind('<Double-1>', self.on_tree_double_click)
         self.tree.bind('<Button-3>', self.show_context_menu)  # Click derecho
 
@@ -181,8 +428,31 @@ class DataTable(tk.Frame):
         )
         self.selection_label.pack(side="right")
 
+    def format_row(self, row):
+        """Valores y tags de una fila para el Treeview"""
+        values = [str(cell_value(row, col["key"])) for col in self.columns]
+        if self.show_actions:
+            values.append(" | ".join([action["text"] for action in self.actions]))
+        return values, ()
+
+    def set_provider(self, provider):
+        """Mostrar las filas de un RowProvider (solo modo virtual)"""
+        self.selected_index = None
+        self.view.set_provider(provider)
+        self.update_info()
+
+    def row_for_item(self, item):
+        """Datos originales de un item del Treeview"""
+        if self.virtual:
+            return self.view.row_for_item(item)
+        return self.data[int(item)]
+
     def set_data(self, data):
         """Establecer datos en la tabla"""
+        if self.virtual:
+            self.set_provider(ListRowProvider(data))
+            return
+
         self.data = data
 
         # Limpiar tabla
@@ -195,26 +465,22 @@ class DataTable(tk.Frame):
 
             # Obtener valores de las columnas
             for col in self.columns:
-                value = row.get(col["key"], "")
-                values.append(str(value))
+                values.append(str(cell_value(row, col["key"])))
 
             # Agregar botones de acción si está habilitado
             if self.show_actions:
                 action_text = " | ".join([action["text"] for action in self.actions])
                 values.append(action_text)
 
-            # Insertar fila
-            item_id = self.tree.insert("", "end", values=values)
-
-            # Guardar referencia a los datos originales
-            self.tree.set(item_id, "#0", i)
+            # Insertar fila; el id del item es el índice en los datos originales
+            self.tree.insert("", "end", iid=str(i), values=values)
 
         # Actualizar información
         self.update_info()
 
     def update_info(self):
         """Actualizar información de la tabla"""
-        count = len(self.data)
+        count = self.view.total if self.virtual else len(self.data)
         self.info_label.configure(text=f"Mostrando {count} registros")
         self.records_label.configure(text=f"{count} registros encontrados")
 
@@ -222,23 +488,25 @@ class DataTable(tk.Frame):
         """Manejar selección en el tree"""
         selection = self.tree.selection()
         if selection and self.on_select:
-            item = selection[0]
-            row_index = int(self.tree.set(item, "#0"))
-            row_data = self.data[row_index]
+            # En modo virtual el desplazamiento vuelve a marcar la misma fila
+            if self.virtual:
+                index = self.view.index_for_item(selection[0])
+                if index == self.selected_index:
+                    return
+                self.selected_index = index
+            row_data = self.row_for_item(selection[0])
             self.on_select(row_data)
 
             # Actualizar información de selección
             self.selection_label.configure(
-                text=f"Seleccionado: {row_data.get(self.columns[0]['key'], 'N/A')}"
+                text=f"Seleccionado: {cell_value(row_data, self.columns[0]['key'], 'N/A')}"
             )
 
     def on_tree_double_click(self, event):
         """Manejar doble click"""
         selection = self.tree.selection()
         if selection and self.on_double_click:
-            item = selection[0]
-            row_index = int(self.tree.set(item, "#0"))
-            row_data = self.data[row_index]
+            row_data = self.row_for_item(selection[0])
             self.on_double_click(row_data)
 
     def show_context_menu(self, event):
@@ -257,8 +525,7 @@ class DataTable(tk.Frame):
         # Crear menú contextual
         context_menu = tk.Menu(self, tearoff=0)
 
-        row_index = int(self.tree.set(item, "#0"))
-        row_data = self.data[row_index]
+        row_data = self.row_for_item(item)
 
         for action in self.actions:
             context_menu.add_command(
@@ -276,13 +543,13 @@ class DataTable(tk.Frame):
         """Obtener datos de la fila seleccionada"""
         selection = self.tree.selection()
         if selection:
-            item = selection[0]
-            row_index = int(self.tree.set(item, "#0"))
-            return self.data[row_index]
+            return self.row_for_item(selection[0])
         return None
 
     def get_all_data(self):
         """Obtener todos los datos"""
+        if self.virtual:
+            return list(self.view.iter_rows())
         return self.data
 
     def refresh_data(self):
@@ -295,18 +562,33 @@ class DataTable(tk.Frame):
 
     def filter_data(self, filter_func):
         """Filtrar datos usando una función"""
+        if self.virtual:
+            self.set_provider(self.view.provider.filter(filter_func))
+            return
+
         filtered_data = [row for row in self.data if filter_func(row)]
         self.set_data(filtered_data)
 
+    def toggle_sort(self, column_key):
+        """Ordenar por la columna del encabezado, alternando el sentido"""
+        reverse = self.sort_state.get(column_key) is False
+        self.sort_state = {column_key: reverse}
+        self.sort_data(column_key, reverse)
+
     def sort_data(self, column_key, reverse=False):
         """Ordenar datos por columna"""
+        if self.virtual:
+            self.selected_index = None
+            self.view.sort(column_key, reverse)
+            return
+
         if not self.data:
             return
 
         try:
             sorted_data = sorted(
                 self.data,
-                key=lambda x: x.get(column_key, ""),
+                key=lambda x: cell_value(x, column_key),
                 reverse=reverse
             )
             self.set_data(sorted_data)
@@ -321,15 +603,10 @@ class DataTable(tk.Frame):
         search_columns = columns or [col["key"] for col in self.columns]
         search_term = search_term.lower()
 
-        filtered_data = []
-        for row in self.data:
-            for col in search_columns:
-                value = str(row.get(col, "")).lower()
-                if search_term in value:
-                    filtered_data.append(row)
-                    break
+        def coincide(row):
+            return any(search_term in str(cell_value(row, col)).lower() for col in search_columns)
 
-        self.set_data(filtered_data)
+        self.filter_data(coincide)
 
 class EditableDataTable(DataTable):
     """Tabla de datos con capacidad de edición inline"""
@@ -412,8 +689,7 @@ class EditableDataTable(DataTable):
         self.tree.set(self.edit_item, self.edit_column, new_value)
 
         # Actualizar datos originales
-        row_index = int(self.tree.set(self.edit_item, "#0"))
-        self.data[row_index][self.edit_column] = new_value
+        self.row_for_item(self.edit_item)[self.edit_column] = new_value
 
         # Limpiar edición
         self.edit_widget.destroy()
@@ -7,23 +7,21 @@ Utilidad para exportar toda la base de datos o tablas específicas
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-import json
-import sqlite3
 from datetime import datetime
 from pathlib import Path
-import zipfile
-import os
 import sys
 
 # Agregar path para imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from database.connection import get_session, engine
 from database.models import *
 from gui.components.progress_dialog import ProgressDialog
 from gui.components.visual_improvements import show_toast
 
+# Consumidor del diario de cambios para la integración contable
+CONSUMIDOR_CONTABILIDAD = "CONTABILIDAD"
+
+
 class DatabaseExportDialog(tk.Toplevel):
     """Diálogo para exportar base de datos"""
 
@@ -92,6 +90,15 @@ class DatabaseExportDialog(tk.Toplevel):
             command=self.on_export_type_change
         ).pack(anchor='w', padx=10, pady=5)
 
+        tk.Radiobutton(
+            export_frame,
+            text="Solo cambios desde la última exportación a contabilidad (CSV/JSONL)",
+            variable=self.export_type,
+            value="incremental",
+            font=('Arial', 10),
+            command=self.on_export_type_change
+        ).pack(anchor='w', padx=10, pady=5)
+
         # Selección de tablas
         tables_frame = tk.LabelFrame(main_frame, text="Seleccionar Tablas", font=('Arial', 11, 'bold'))
         tables_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
@@ -129,7 +136,7 @@ class DatabaseExportDialog(tk.Toplevel):
         formats = [
             ("Excel (.xlsx)", "excel"),
             ("CSV (.csv)", "csv"),
-            ("JSON (.json)", "json"),
+            ("JSON Lines (.jsonl)", "json"),
             ("SQL (.sql)", "sql"),
             ("Archivo Comprimido (.zip)", "zip")
         ]
@@ -206,25 +213,9 @@ class DatabaseExportDialog(tk.Toplevel):
 
     def load_tables_list(self):
         """Cargar lista de tablas disponibles"""
-        tables = [
-            "empleados - Datos de empleados",
-            "departamentos - Departamentos de la empresa",
-            "cargos - Cargos y posiciones",
-            "contratos - Contratos laborales",
-            "nominas - Registros de nómina",
-            "vacaciones - Solicitudes de vacaciones",
-            "prestamos - Préstamos de empleados",
-            "liquidaciones - Liquidaciones laborales",
-            "egresos_ingresos - Movimientos económicos",
-            "dotacion - Asignaciones de dotación",
-            "descuentos - Descuentos aplicados",
-            "horas_extras - Registro de horas extras",
-            "permisos - Permisos y ausencias",
-            "capacitaciones - Capacitaciones realizadas",
-            "evaluaciones - Evaluaciones de desempeño",
-            "usuarios - Usuarios del sistema",
-            "auditoria - Log de auditoría"
-        ]
+        from database.table_export import exportable_tables
+
+        tables = [f"{tabla} - {descripcion}" for tabla, descripcion in exportable_tables().items()]
 
         for table in tables:
             self.tables_listbox.insert(tk.END, table)
@@ -234,7 +225,7 @@ class DatabaseExportDialog(tk.Toplevel):
 
     def on_export_type_change(self):
         """Manejar cambio de tipo de exportación"""
-        if self.export_type.get() == "completa":
+        if self.export_type.get() in ("completa", "incremental"):
             self.tables_listbox.config(state=tk.DISABLED)
             self.tables_listbox.select_set(0, tk.END)
         else:
@@ -251,7 +242,12 @@ class DatabaseExportDialog(tk.Toplevel):
                     return
 
             # Seleccionar directorio de destino
-            if self.export_format.get() == "zip":
+            if self.export_type.get() == "incremental":
+                if self.export_format.get() not in ("csv", "json"):
+                    messagebox.showwarning("Advertencia", "La exportación de cambios admite CSV o JSON (JSONL)")
+                    return
+                file_path = filedialog.askdirectory(title="Seleccionar directorio de destino")
+            elif self.export_format.get() == "zip":
                 file_path = filedialog.asksaveasfilename(
                     title="Guardar exportación",
                     defaultextension=".zip",
@@ -279,8 +275,7 @@ class DatabaseExportDialog(tk.Toplevel):
                 return
 
             # Mostrar diálogo de progreso
-            progress = ProgressDialog(self, "Exportando Base de Datos")
-            progress.start()
+            progress = ProgressDialog(self, "Exportando Base de Datos").show()
 
             # Realizar exportación
             self.after(100, lambda: self.perform_export(file_path, progress))
@@ -293,6 +288,10 @@ class DatabaseExportDialog(tk.Toplevel):
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+            if self.export_type.get() == "incremental":
+                self.export_changes(file_path, progress)
+                return
+
             # Obtener tablas a exportar
             if self.export_type.get() == "completa":
                 selected_tables = list(range(self.tables_listbox.size()))
@@ -305,169 +304,107 @@ class DatabaseExportDialog(tk.Toplevel):
                 table_name = table_info.split(" - ")[0]
                 table_names.append(table_name)
 
-            progress.update(20, "Conectando a base de datos...")
+            progress.update_progress(5, "Conectando a base de datos...")
 
-            # Conectar a base de datos
-            session = get_session()
-
-            progress.update(30, "Leyendo datos...")
-
-            if self.export_format.get() == "excel":
-                self.export_to_excel(session, table_names, file_path, timestamp, progress)
-            elif self.export_format.get() == "csv":
-                self.export_to_csv(session, table_names, file_path, timestamp, progress)
-            elif self.export_format.get() == "json":
-                self.export_to_json(session, table_names, file_path, timestamp, progress)
-            elif self.export_format.get() == "sql":
-                self.export_to_sql(session, table_names, file_path, timestamp, progress)
-            elif self.export_format.get() == "zip":
-                self.export_to_zip(session, table_names, file_path, timestamp, progress)
+            if self.export_format.get() == "sql":
+                resultado = self.export_to_sql(table_names, file_path, timestamp, progress)
+            else:
+                resultado = self.export_tables(table_names, file_path, timestamp, progress)
 
-            progress.update(100, "Exportación completada")
-            progress.finish()
+            progress.close()
 
-            session.close()
+            if resultado['cancelada']:
+                messagebox.showwarning(
+                    "Exportación cancelada",
+                    f"Se canceló la exportación; los archivos generados están incompletos.\n"
+                    f"Filas escritas: {resultado['filas']:,}"
+                )
+                return
 
             # Mostrar mensaje de éxito
             show_toast(self.parent, "Exportación completada exitosamente", "success")
-            messagebox.showinfo("Éxito", f"Base de datos exportada exitosamente")
+            messagebox.showinfo(
+                "Éxito",
+                f"Base de datos exportada exitosamente\n\n"
+                f"Tablas: {len(resultado['tablas'])}\n"
+                f"Filas: {resultado['filas']:,}\n"
+                f"Tamaño: {resultado['bytes'] / 1048576:.1f} MB"
+            )
 
             self.destroy()
 
         except Exception as e:
-            progress.finish()
+            progress.close()
             messagebox.showerror("Error", f"Error durante la exportación: {str(e)}")
 
-    def export_to_excel(self, session, table_names, file_path, timestamp, progress):
-        """Exportar a Excel"""
-        if self.include_timestamp.get():
-            base_name = Path(file_path).stem
-            extension = Path(file_path).suffix
-            file_path = str(Path(file_path).parent / f"{base_name}_{timestamp}{extension}")
-
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            for i, table_name in enumerate(table_names):
-                progress.update(40 + (i * 40 // len(table_names)), f"Exportando {table_name}...")
-
-                # Simular datos de tabla (en implementación real conectar a la BD)
-                data = self.get_table_data(session, table_name)
-                df = pd.DataFrame(data)
-
-                # Escribir a Excel
-                sheet_name = table_name[:31]  # Limitar nombre de hoja
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    def export_to_csv(self, session, table_names, file_path, timestamp, progress):
-        """Exportar a CSV"""
-        for i, table_name in enumerate(table_names):
-            progress.update(40 + (i * 40 // len(table_names)), f"Exportando {table_name}...")
-
-            data = self.get_table_data(session, table_name)
-            df = pd.DataFrame(data)
-
-            # Crear nombre de archivo
-            if self.include_timestamp.get():
-                csv_file = os.path.join(file_path, f"{table_name}_{timestamp}.csv")
-            else:
-                csv_file = os.path.join(file_path, f"{table_name}.csv")
-
-            df.to_csv(csv_file, index=False, encoding='utf-8')
+    def export_changes(self, directory, progress):
+        """Exportar solo los cambios del diario desde la última entrega a contabilidad"""
+        from database.change_journal import change_exporter
 
-    def export_to_json(self, session, table_names, file_path, timestamp, progress):
-        """Exportar a JSON"""
-        all_data = {}
+        formato = "csv" if self.export_format.get() == "csv" else "jsonl"
+        progress.update_progress(30, "Leyendo diario de cambios...")
+        resultado = change_exporter.export(
+            CONSUMIDOR_CONTABILIDAD, directory, formato,
+            progress_callback=lambda n: progress.update_progress(60, f"{n} cambios exportados...")
+        )
+        progress.close()
 
-        for i, table_name in enumerate(table_names):
-            progress.update(40 + (i * 40 // len(table_names)), f"Exportando {table_name}...")
+        messagebox.showinfo(
+            "Éxito",
+            f"Cambios exportados: {resultado['cambios']}\n"
+            f"Archivos generados: {len(resultado['archivos'])}"
+        )
+        self.destroy()
+
+    def progress_callback(self, table_names, progress):
+        """Callback de avance por tabla (filas y bytes); devuelve False si se canceló"""
+        posiciones = {tabla: i for i, tabla in enumerate(table_names)}
+
+        def avance(tabla, filas, total, bytes_escritos):
+            if progress.is_cancelled():
+                return False
+            fraccion = (posiciones[tabla] + (filas / total if total else 1)) / len(table_names)
+            progress.update_progress(
+                5 + fraccion * 95,
+                f"{tabla}: {filas:,} de {total:,} filas ({bytes_escritos / 1048576:.1f} MB)"
+            )
+            return True
+
+        return avance
+
+    def timestamped(self, file_path, timestamp):
+        """Agregar la fecha al nombre del archivo si se eligió la opción"""
+        if not self.include_timestamp.get():
+            return file_path
+        path = Path(file_path)
+        return str(path.parent / f"{path.stem}_{timestamp}{path.suffix}")
+
+    def export_tables(self, table_names, file_path, timestamp, progress):
+        """Exportar a CSV, JSONL (un archivo por tabla), ZIP o Excel leyendo por streaming"""
+        from database.table_export import table_exporter
+
+        formato = {"csv": "csv", "json": "jsonl", "zip": "zip", "excel": "xlsx"}[self.export_format.get()]
+        if formato in ("zip", "xlsx"):
+            destino, sufijo = self.timestamped(file_path, timestamp), ""
+        else:
+            destino = file_path
+            sufijo = f"_{timestamp}" if self.include_timestamp.get() else ""
 
-            data = self.get_table_data(session, table_name)
-            all_data[table_name] = data
+        return table_exporter.export(
+            table_names, destino, formato, sufijo,
+            progress_callback=self.progress_callback(table_names, progress)
+        )
 
-        # Crear nombre de archivo
-        if self.include_timestamp.get():
-            json_file = os.path.join(file_path, f"database_export_{timestamp}.json")
-        else:
-            json_file = os.path.join(file_path, "database_export.json")
-
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2, default=str)
-
-    def export_to_sql(self, session, table_names, file_path, timestamp, progress):
-        """Exportar a SQL"""
-        if self.include_timestamp.get():
-            base_name = Path(file_path).stem
-            extension = Path(file_path).suffix
-            file_path = str(Path(file_path).parent / f"{base_name}_{timestamp}{extension}")
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write("-- Exportación de Base de Datos - Sistema SGN\n")
-            f.write(f"-- Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-
-            for i, table_name in enumerate(table_names):
-                progress.update(40 + (i * 40 // len(table_names)), f"Exportando {table_name}...")
-
-                f.write(f"-- Tabla: {table_name}\n")
-
-                if self.include_structure.get():
-                    # Generar CREATE TABLE (simulado)
-                    f.write(f"CREATE TABLE IF NOT EXISTS {table_name} (\n")
-                    f.write("    id INTEGER PRIMARY KEY,\n")
-                    f.write("    -- Estructura de tabla\n")
-                    f.write(");\n\n")
-
-                if self.include_data.get():
-                    data = self.get_table_data(session, table_name)
-                    for row in data:
-                        values = ', '.join([f"'{str(v)}'" for v in row.values()])
-                        f.write(f"INSERT INTO {table_name} VALUES ({values});\n")
-                    f.write("\n")
-
-    def export_to_zip(self, session, table_names, file_path, timestamp, progress):
-        """Exportar a archivo ZIP"""
-        if self.include_timestamp.get():
-            base_name = Path(file_path).stem
-            extension = Path(file_path).suffix
-            file_path = str(Path(file_path).parent / f"{base_name}_{timestamp}{extension}")
-
-        with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for i, table_name in enumerate(table_names):
-                progress.update(40 + (i * 40 // len(table_names)), f"Exportando {table_name}...")
-
-                data = self.get_table_data(session, table_name)
-                df = pd.DataFrame(data)
-
-                # Crear CSV temporal en memoria
-                csv_content = df.to_csv(index=False, encoding='utf-8')
-                zipf.writestr(f"{table_name}.csv", csv_content)
-
-    def get_table_data(self, session, table_name):
-        """Obtener datos de una tabla específica"""
-        # Datos simulados para demostración
-        # En implementación real, hacer query a la base de datos real
-        sample_data = []
-
-        if table_name == "empleados":
-            sample_data = [
-                {"id": 1, "cedula": "0123456789", "nombres": "Juan Pérez", "cargo": "Desarrollador"},
-                {"id": 2, "cedula": "0987654321", "nombres": "María González", "cargo": "Analista"}
-            ]
-        elif table_name == "departamentos":
-            sample_data = [
-                {"id": 1, "nombre": "Recursos Humanos", "codigo": "RH"},
-                {"id": 2, "nombre": "Desarrollo", "codigo": "DEV"}
-            ]
-        elif table_name == "nominas":
-            sample_data = [
-                {"id": 1, "empleado_id": 1, "periodo": "2024-01", "sueldo": 1500.00},
-                {"id": 2, "empleado_id": 2, "periodo": "2024-01", "sueldo": 1800.00}
-            ]
-        else:
-            # Datos genéricos para otras tablas
-            sample_data = [
-                {"id": 1, "descripcion": f"Registro de {table_name}", "fecha": datetime.now().strftime('%Y-%m-%d')}
-            ]
+    def export_to_sql(self, table_names, file_path, timestamp, progress):
+        """Exportar a SQL (volcado con DDL, índices e INSERT de varias filas)"""
+        from database.sql_dump import sql_dumper
 
-        return sample_data
+        return sql_dumper.dump(
+            self.timestamped(file_path, timestamp), table_names,
+            estructura=self.include_structure.get(),
+            datos=self.include_data.get(),
+            progress_callback=self.progress_callback(table_names, progress)
+        )
 
 
 def show_database_export_dialog(parent):
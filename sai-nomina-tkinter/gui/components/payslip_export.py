@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Componente de Roles de Pago en PDF - Sistema SGN
+Generación de los recibos de un período con progreso y cancelación
+"""
+
+from tkinter import messagebox, filedialog
+from pathlib import Path
+import logging
+import sys
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from gui.components.progress_dialog import ProgressDialog
+from services.payslip_pdf import payslip_service
+
+logger = logging.getLogger(__name__)
+
+
+def show_payslip_export(parent, periodo):
+    """Pedir carpeta y formato y generar los roles de pago del período"""
+    directory = filedialog.askdirectory(title=f"Carpeta para los roles de pago {periodo}", parent=parent)
+    if not directory:
+        return None
+
+    merged = messagebox.askyesnocancel(
+        "Roles de Pago",
+        "¿Generar un solo PDF con todos los roles?\n\nNo: un PDF por empleado",
+        parent=parent
+    )
+    if merged is None:
+        return None
+
+    progress = ProgressDialog(parent, "Generando Roles de Pago", "Preparando plantilla...").show()
+
+    def avance(generados, total):
+        progress.update_progress(generados * 100 / total, f"{generados:,} de {total:,} roles generados")
+        return not progress.is_cancelled()
+
+    try:
+        result = payslip_service.generate(periodo, directory, merged=merged, progress_callback=avance)
+    finally:
+        progress.close()
+
+    if not result['success']:
+        messagebox.showerror("Error", f"Error generando roles de pago: {result['message']}", parent=parent)
+    elif result['cancelada']:
+        messagebox.showwarning("Roles de Pago", f"Generación cancelada: {result['paginas']:,} roles generados",
+                               parent=parent)
+    else:
+        destino = result['archivos'][0] if merged else str(Path(result['archivos'][0]).parent)
+        messagebox.showinfo(
+            "Roles de Pago",
+            f"{result['paginas']:,} roles generados en {result['tiempo']:.1f} s "
+            f"({result['paginas_por_segundo']:.0f} páginas/s)\n\n{destino}",
+            parent=parent
+        )
+    return result
@@ -12,6 +12,9 @@ from pathlib import Path
 from config import Config
 from database.connection import get_session
 from database.models import *
+from database.backup import backup_manager
+from database.maintenance import maintenance_service, maintenance_scheduler
+from database.archive import archive_service
 
 
 class ConfiguracionCompleteModule(tk.Frame):
@@ -602,6 +605,7 @@ class ConfiguracionCompleteModule(tk.Frame):
             ("🔧 Optimizar DB", self.optimize_database, Config.COLORS['primary']),
             ("📊 Verificar Integridad", self.check_integrity, Config.COLORS['info']),
             ("🧹 Limpiar Logs", self.clean_logs, Config.COLORS['warning']),
+            ("📦 Archivar Históricos", self.archive_history, Config.COLORS['secondary']),
             ("🔄 Reinicializar", self.reinitialize_db, Config.COLORS['danger'])
         ]
 
@@ -622,6 +626,71 @@ class ConfiguracionCompleteModule(tk.Frame):
         buttons_grid.grid_columnconfigure(0, weight=1)
         buttons_grid.grid_columnconfigure(1, weight=1)
 
+        self.maintenance_status_label = tk.Label(
+            maintenance_frame,
+            text="",
+            font=('Arial', 10),
+            bg='white',
+            fg=Config.COLORS['info']
+        )
+        self.maintenance_status_label.pack(anchor="w")
+
+        # Programación en horario no laboral
+        schedule_frame = tk.LabelFrame(
+            scrollable_frame,
+            text="Mantenimiento Programado",
+            font=('Arial', 12, 'bold'),
+            bg='white',
+            fg=Config.COLORS['secondary'],
+            padx=20,
+            pady=15
+        )
+        schedule_frame.pack(fill="x", padx=20, pady=15)
+
+        try:
+            schedule = maintenance_scheduler.load_schedule()
+        except Exception:
+            schedule = {'activo': False, 'hora': '02:30', 'tareas': []}
+
+        self.maintenance_active_var = tk.BooleanVar(value=schedule['activo'])
+        self.maintenance_hour_var = tk.StringVar(value=schedule['hora'])
+
+        tk.Checkbutton(
+            schedule_frame,
+            text="Ejecutar optimización y verificación diaria",
+            variable=self.maintenance_active_var,
+            font=('Arial', 10),
+            bg='white'
+        ).pack(anchor="w", pady=5)
+
+        hour_frame = tk.Frame(schedule_frame, bg='white')
+        hour_frame.pack(anchor="w", pady=5)
+
+        tk.Label(
+            hour_frame,
+            text="Hora (HH:MM):",
+            font=('Arial', 10),
+            bg='white'
+        ).pack(side="left")
+
+        tk.Entry(
+            hour_frame,
+            textvariable=self.maintenance_hour_var,
+            font=('Arial', 10),
+            width=8
+        ).pack(side="left", padx=10)
+
+        tk.Button(
+            hour_frame,
+            text="💾 Guardar Programación",
+            font=('Arial', 10),
+            bg=Config.COLORS['primary'],
+            fg='white',
+            relief="flat",
+            padx=15,
+            command=self.save_maintenance_schedule
+        ).pack(side="left")
+
     def create_backup_tab(self):
         """Crear pestaña de configuración de backups"""
         backup_frame = ttk.Frame(self.notebook)
@@ -669,12 +738,21 @@ class ConfiguracionCompleteModule(tk.Frame):
 
         tk.Label(
             manual_backup_frame,
-            text="Incluye: Base de datos, configuraciones, reportes y logs",
+            text="Copia en línea de la base de datos, comprimida y con checksum",
             font=('Arial', 10),
             bg='white',
             fg=Config.COLORS['text_light']
         ).pack()
 
+        self.backup_status_label = tk.Label(
+            manual_backup_frame,
+            text="",
+            font=('Arial', 10),
+            bg='white',
+            fg=Config.COLORS['info']
+        )
+        self.backup_status_label.pack()
+
         # Lista de backups existentes
         backups_list_frame = tk.LabelFrame(
             scrollable_frame,
@@ -917,19 +995,61 @@ class ConfiguracionCompleteModule(tk.Frame):
 
     def optimize_database(self):
         """Optimizar base de datos"""
-        try:
-            # Implementar optimización de SQLite
-            messagebox.showinfo("Éxito", "Base de datos optimizada correctamente")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al optimizar base de datos: {str(e)}")
+        self.run_maintenance(['optimize', 'compact'], "Optimización")
 
     def check_integrity(self):
         """Verificar integridad de base de datos"""
+        self.run_maintenance(['integrity_check', 'foreign_key_check'], "Verificación de integridad")
+
+    def run_maintenance(self, tareas, titulo):
+        """Ejecutar tareas de mantenimiento en segundo plano y mostrar el reporte"""
+        resultado = {}
+
+        def on_done(report, error):
+            resultado['report'] = report
+            resultado['error'] = error
+
+        def poll():
+            if thread.is_alive():
+                self.after(200, poll)
+                return
+
+            self.maintenance_status_label.config(text="")
+            if resultado.get('error'):
+                messagebox.showerror("Error", f"Error en {titulo.lower()}: {str(resultado['error'])}")
+                return
+
+            report = resultado['report']
+            texto = maintenance_service.format_report(report)
+            if report['problemas']:
+                messagebox.showwarning(titulo, f"Se encontraron problemas:\n\n{texto}")
+            else:
+                messagebox.showinfo(titulo, f"{titulo} completada sin errores.\n\n{texto}")
+
+        self.maintenance_status_label.config(text=f"{titulo} en curso...")
+        thread = maintenance_service.run_async(tareas, on_done)
+        self.after(200, poll)
+
+    def save_maintenance_schedule(self):
+        """Guardar programación del mantenimiento"""
         try:
-            # Implementar verificación de integridad
-            messagebox.showinfo("Éxito", "Verificación de integridad completada. No se encontraron errores.")
+            schedule = maintenance_scheduler.load_schedule()
+            maintenance_scheduler.save_schedule(
+                self.maintenance_active_var.get(),
+                self.maintenance_hour_var.get().strip(),
+                schedule['tareas']
+            )
+            if maintenance_scheduler.next_run:
+                messagebox.showinfo(
+                    "Éxito",
+                    f"Próximo mantenimiento: {maintenance_scheduler.next_run:%Y-%m-%d %H:%M}"
+                )
+            else:
+                messagebox.showinfo("Éxito", "Mantenimiento programado desactivado")
+        except ValueError:
+            messagebox.showerror("Error", "Ingrese la hora en formato HH:MM")
         except Exception as e:
-            messagebox.showerror("Error", f"Error al verificar integridad: {str(e)}")
+            messagebox.showerror("Error", f"Error al guardar programación: {str(e)}")
 
     def clean_logs(self):
         """Limpiar archivos de log"""
@@ -944,31 +1064,118 @@ class ConfiguracionCompleteModule(tk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Error al limpiar logs: {str(e)}")
 
+    def archive_history(self):
+        """Trasladar histórico y auditoría antiguos a los archivos anuales"""
+        dias = Config.ARCHIVE_HORIZON_DAYS
+        if not messagebox.askyesno(
+            "Confirmar",
+            f"Se trasladarán a archivos anuales los registros de histórico y auditoría "
+            f"con más de {dias} días. Seguirán disponibles en las consultas históricas.\n¿Continuar?"
+        ):
+            return
+
+        resultado = {}
+
+        def worker():
+            try:
+                resultado['summary'] = archive_service.run(dias)
+            except Exception as e:
+                resultado['error'] = e
+
+        def poll():
+            if thread.is_alive():
+                self.after(200, poll)
+                return
+
+            self.maintenance_status_label.config(text="")
+            if resultado.get('error'):
+                messagebox.showerror("Error", f"Error al archivar: {str(resultado['error'])}")
+                return
+
+            # archive_service.run ya reabrió las conexiones; sesión nueva de este hilo
+            from database.connection import close_session
+            close_session()
+            self.session = get_session()
+
+            lineas = [
+                f"{tabla}: " + ", ".join(f"{anio}={filas}" for anio, filas in anios.items())
+                for tabla, anios in resultado['summary'].items()
+            ]
+            messagebox.showinfo("Archivo Histórico", "\n".join(lineas) or "No hay registros para archivar")
+
+        import threading
+        self.maintenance_status_label.config(text="Archivando registros antiguos...")
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.after(200, poll)
+
     def reinitialize_db(self):
         """Reinicializar base de datos"""
         if messagebox.askyesno("ADVERTENCIA", "¿Está seguro de reinicializar la base de datos? Se perderán TODOS los datos."):
             if messagebox.askyesno("CONFIRMACIÓN FINAL", "Esta acción NO se puede deshacer. ¿Continuar?"):
                 try:
-                    # Implementar reinicialización
-                    messagebox.showinfo("Éxito", "Base de datos reinicializada correctamente")
+                    from database.connection import DatabaseManager, reset_connections
+                    from init_database import insert_initial_data
+
+                    # Respaldo de seguridad antes de borrar
+                    entry = backup_manager.create_backup("pre_reinicio")
+
+                    reset_connections()
+                    db_manager = DatabaseManager()
+                    db_manager.drop_tables()
+                    db_manager.create_tables()
+                    insert_initial_data()
+                    self.session = get_session()
+
+                    # La compactación corre en segundo plano con su propia conexión
+                    maintenance_service.run_async(['compact', 'analyze'])
+                    messagebox.showinfo(
+                        "Éxito",
+                        f"Base de datos reinicializada correctamente.\nRespaldo previo: {entry['archivo']}"
+                    )
                 except Exception as e:
                     messagebox.showerror("Error", f"Error al reinicializar base de datos: {str(e)}")
 
     def create_manual_backup(self):
-        """Crear respaldo manual"""
-        try:
-            backup_dir = Config.BACKUPS_DIR
-            backup_dir.mkdir(exist_ok=True)
+        """Crear respaldo manual en segundo plano"""
+        if getattr(self, '_backup_running', False):
+            messagebox.showinfo("Info", "Ya hay un respaldo en curso")
+            return
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"backup_manual_{timestamp}.zip"
+        progress = {'copiadas': 0, 'total': 0, 'resultado': None, 'error': None}
 
-            # Aquí se implementaría la creación del backup
-            messagebox.showinfo("Éxito", f"Respaldo creado: {backup_filename}")
-            self.refresh_backups_list()
+        def on_progress(copiadas, total):
+            progress['copiadas'] = copiadas
+            progress['total'] = total
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al crear respaldo: {str(e)}")
+        def worker():
+            try:
+                progress['resultado'] = backup_manager.create_backup("manual", on_progress)
+            except Exception as e:
+                progress['error'] = e
+
+        def poll():
+            if thread.is_alive():
+                if progress['total']:
+                    porcentaje = progress['copiadas'] * 100 / progress['total']
+                    self.backup_status_label.config(text=f"Respaldando... {porcentaje:.0f}%")
+                self.after(100, poll)
+                return
+
+            self._backup_running = False
+            self.backup_status_label.config(text="")
+            if progress['error']:
+                messagebox.showerror("Error", f"Error al crear respaldo: {str(progress['error'])}")
+            else:
+                entry = progress['resultado']
+                messagebox.showinfo("Éxito", f"Respaldo creado: {entry['archivo']}")
+                self.refresh_backups_list()
+
+        import threading
+        self._backup_running = True
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.after(100, poll)
 
     def refresh_backups_list(self):
         """Actualizar lista de respaldos"""
@@ -977,15 +1184,12 @@ class ConfiguracionCompleteModule(tk.Frame):
             self.backups_tree.delete(item)
 
         try:
-            backup_dir = Config.BACKUPS_DIR
-            if backup_dir.exists():
-                for backup_file in backup_dir.glob("*.zip"):
-                    stat = backup_file.stat()
-                    fecha = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-                    tamaño = f"{stat.st_size / (1024*1024):.2f} MB"
-                    tipo = "Manual" if "manual" in backup_file.name else "Automático"
-
-                    self.backups_tree.insert('', 'end', values=(fecha, tamaño, tipo))
+            for entry in backup_manager.list_backups():
+                fecha = entry['fecha'].replace('T', ' ')
+                tamaño = f"{entry['tamano'] / (1024*1024):.2f} MB"
+                tipo = "Manual" if entry['tipo'] == "manual" else "Automático"
+
+                self.backups_tree.insert('', 'end', iid=entry['archivo'], values=(fecha, tamaño, tipo))
         except Exception as e:
             messagebox.showerror("Error", f"Error al cargar lista de respaldos: {str(e)}")
 
@@ -996,12 +1200,47 @@ class ConfiguracionCompleteModule(tk.Frame):
             messagebox.showwarning("Advertencia", "Seleccione un respaldo para restaurar")
             return
 
-        if messagebox.askyesno("Confirmar", "¿Está seguro de restaurar este respaldo? Se reemplazarán los datos actuales."):
+        if getattr(self, '_backup_running', False):
+            messagebox.showinfo("Info", "Ya hay un respaldo en curso")
+            return
+        if not messagebox.askyesno("Confirmar", "¿Está seguro de restaurar este respaldo? Se reemplazarán los datos actuales."):
+            return
+
+        archivo = selection[0]
+        resultado = {}
+
+        def worker():
             try:
-                # Implementar restauración
-                messagebox.showinfo("Éxito", "Respaldo restaurado correctamente")
+                # verify_backup rechaza el archivo antes de tocar la base
+                resultado['entry'] = backup_manager.restore_backup(archivo)
             except Exception as e:
-                messagebox.showerror("Error", f"Error al restaurar respaldo: {str(e)}")
+                resultado['error'] = e
+
+        def poll():
+            if thread.is_alive():
+                self.after(200, poll)
+                return
+
+            self._backup_running = False
+            self.config(cursor="")
+            self.backup_status_label.config(text="")
+            if resultado.get('error'):
+                messagebox.showerror("Error", f"Error al restaurar respaldo: {str(resultado['error'])}")
+                return
+
+            # restore_backup reabrió las conexiones; sesión nueva de este hilo
+            from database.connection import close_session
+            close_session()
+            self.session = get_session()
+            messagebox.showinfo("Éxito", "Respaldo restaurado correctamente")
+
+        import threading
+        self._backup_running = True
+        self.config(cursor="watch")
+        self.backup_status_label.config(text="Restaurando respaldo...")
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.after(200, poll)
 
     def delete_backup(self):
         """Eliminar respaldo seleccionado"""
@@ -1012,8 +1251,8 @@ class ConfiguracionCompleteModule(tk.Frame):
 
         if messagebox.askyesno("Confirmar", "¿Está seguro de eliminar este respaldo?"):
             try:
-                # Implementar eliminación
+                backup_manager.delete_backup(selection[0])
                 self.refresh_backups_list()
                 messagebox.showinfo("Éxito", "Respaldo eliminado correctamente")
             except Exception as e:
-                messagebox.showerror("Error", f"Error al eliminar respaldo: {str(e)}")
\ No newline at end of file
+                messagebox.showerror("Error", f"Error al eliminar respaldo: {str(e)}")
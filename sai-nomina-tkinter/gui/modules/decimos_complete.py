@@ -17,6 +17,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from database.connection import get_session
 from database.models import Empleado, Departamento, Cargo, DecimoTercer, DecimoCuarto
+from database.reference_cache import reference_cache
 from services.decimos_calculator import decimos_calculator
 
 class DecimosCompleteModule(tk.Frame):
@@ -170,7 +171,7 @@ class DecimosCompleteModule(tk.Frame):
         dept_combo.pack(fill=tk.X, pady=2)
 
         # Cargar departamentos
-        departments = ["TODOS"] + [d.nombre_codigo for d in self.session.query(Departamento).filter_by(activo=True).all()]
+        departments = ["TODOS"] + [d.nombre_codigo for d in reference_cache.all(Departamento, activo=True)]
         dept_combo['values'] = departments
 
         # Panel derecho - Lista de empleados y cálculos
@@ -375,7 +376,7 @@ class DecimosCompleteModule(tk.Frame):
                 # Obtener información del cargo
                 cargo_nombre = "N/A"
                 if emp.cargo:
-                    cargo = self.session.query(Cargo).filter_by(codigo=emp.cargo).first()
+                    cargo = reference_cache.get(Cargo, emp.cargo)
                     if cargo:
                         cargo_nombre = cargo.nombre
 
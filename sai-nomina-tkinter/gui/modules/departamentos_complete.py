@@ -9,6 +9,7 @@ from datetime import datetime, date
 from config import Config
 from database.connection import get_session
 from database.models import *
+from gui.components.async_loader import AsyncLoader
 
 
 class DepartamentosCompleteModule(tk.Frame):
@@ -39,6 +40,11 @@ class DepartamentosCompleteModule(tk.Frame):
         self.editing_item = None
         self.clientes_dict = {}
 
+        # Responsables reales cargados en segundo plano
+        self.loader = AsyncLoader(self)
+        self.loader.register('responsables', self.fetch_responsables, self.show_responsables,
+                             lambda e: print(f"Info: No se pudieron cargar empleados reales: {e}"))
+
         self.pack(fill="both", expand=True)
         self.setup_ui()
         self.load_data()
@@ -598,14 +604,7 @@ class DepartamentosCompleteModule(tk.Frame):
             ]
 
             # Intentar cargar datos reales si es posible
-            try:
-                from database.models import Empleado
-                empleados = self.session.query(Empleado).filter(Empleado.activo == True).limit(10).all()
-                if empleados:
-                    empleados_reales = [f"{emp.empleado} - {emp.nombre_completo}" for emp in empleados]
-                    self.responsable_combo['values'] = empleados_reales + self.responsable_combo['values']
-            except Exception as e:
-                print(f"Info: No se pudieron cargar empleados reales: {e}")
+            self.loader.load('responsables')
 
         except Exception as e:
             print(f"Error en load_combos: {str(e)}")
@@ -614,6 +613,16 @@ class DepartamentosCompleteModule(tk.Frame):
             self.cliente_combo['values'] = ["CLI001 - COOR EL ROSADO"]
             self.responsable_combo['values'] = ["EMP001 - SUPERVISOR GENERAL"]
 
+    @staticmethod
+    def fetch_responsables(session):
+        """Cargador: empleados activos para el combo de responsables"""
+        empleados = session.query(Empleado).filter(Empleado.activo == True).limit(10).all()
+        return [f"{emp.empleado} - {emp.nombre_completo}" for emp in empleados]
+
+    def show_responsables(self, empleados_reales):
+        if empleados_reales:
+            self.responsable_combo['values'] = empleados_reales + list(self.responsable_combo['values'])
+
     def filter_list(self, event=None):
         """Filtrar lista según búsqueda - versión simplificada"""
         search_text = self.search_var.get().lower()
@@ -18,10 +18,12 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from database.connection import get_session
 from database.models import Empleado, Departamento, Cargo
+from database.reference_cache import reference_cache
 from gui.components.carga_masiva import CargaMasivaComponent
 from gui.components.progress_dialog import show_loading_dialog, ProgressDialog
 from gui.components.visual_improvements import show_toast
 from gui.components.database_export import show_database_export_dialog
+from gui.components.async_loader import AsyncLoader
 import pandas as pd
 import json
 
@@ -37,6 +39,14 @@ class DotacionCompleteModule(tk.Frame):
         self.selected_item = None
         self.tipo_dotacion_var = tk.StringVar(value="uniforme")
 
+        # Consultas de empleados fuera del hilo de la interfaz
+        self.loader = AsyncLoader(self)
+        self.loader.register('empleados', self.fetch_employees, self.show_employees,
+                             lambda e: messagebox.showerror("Error", f"Error cargando datos: {str(e)}"))
+        self.loader.register('empleado_info', self.fetch_employee_info, self.show_employee_info,
+                             lambda e: messagebox.showerror(
+                                 "Error", f"Error cargando información del empleado: {str(e)}"))
+
         self.pack(fill="both", expand=True)
         self.setup_ui()
         self.load_data()
@@ -673,14 +683,10 @@ class DotacionCompleteModule(tk.Frame):
         """Cargar datos iniciales"""
         try:
             # Cargar empleados
-            empleados = self.session.query(Empleado).filter_by(activo=True).all()
-            emp_values = [f"{emp.empleado} - {emp.nombres} {emp.apellidos}" for emp in empleados]
-            self.emp_combo['values'] = emp_values
-            if hasattr(self, 'desc_emp_combo'):
-                self.desc_emp_combo['values'] = emp_values
+            self.loader.load('empleados')
 
             # Cargar departamentos para reportes
-            departamentos = self.session.query(Departamento).filter_by(activo=True).all()
+            departamentos = reference_cache.all(Departamento, activo=True)
             dept_values = ["TODOS"] + [dept.nombre_codigo for dept in departamentos]
             self.rep_dept_combo['values'] = dept_values
             self.rep_dept_combo.set("TODOS")
@@ -688,6 +694,19 @@ class DotacionCompleteModule(tk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Error cargando datos: {str(e)}")
 
+    @staticmethod
+    def fetch_employees(session):
+        """Cargador: empleados activos como 'código - nombres apellidos'"""
+        empleados = session.query(
+            Empleado.empleado, Empleado.nombres, Empleado.apellidos
+        ).filter_by(activo=True).all()
+        return [f"{emp.empleado} - {emp.nombres} {emp.apellidos}" for emp in empleados]
+
+    def show_employees(self, emp_values):
+        self.emp_combo['values'] = emp_values
+        if hasattr(self, 'desc_emp_combo'):
+            self.desc_emp_combo['values'] = emp_values
+
     def on_employee_selected(self, event):
         """Manejar selección de empleado"""
         selected = self.emp_combo.get()
@@ -695,34 +714,37 @@ class DotacionCompleteModule(tk.Frame):
             codigo = selected.split(' - ')[0]
             self.load_employee_info(codigo)
 
+    @staticmethod
+    def fetch_employee_info(session, codigo_empleado):
+        """Cargador: nombres de cargo y departamento del empleado (None si no existe)"""
+        # Cargo y departamento se resuelven en la misma consulta con la sesión del cargador
+        empleado = session.query(
+            Cargo.nombre.label('cargo_nombre'), Departamento.nombre_codigo.label('dept_nombre')
+        ).select_from(Empleado).outerjoin(
+            Cargo, Cargo.codigo == Empleado.cargo
+        ).outerjoin(
+            Departamento, Departamento.codigo == Empleado.depto
+        ).filter(Empleado.empleado == codigo_empleado).first()
+        if not empleado:
+            return None
+
+        return {'cargo': empleado.cargo_nombre or "N/A", 'departamento': empleado.dept_nombre or "N/A"}
+
     def load_employee_info(self, codigo_empleado):
         """Cargar información del empleado"""
-        try:
-            empleado = self.session.query(Empleado).filter_by(empleado=codigo_empleado).first()
-            if empleado:
-                # Obtener información adicional
-                cargo_nombre = "N/A"
-                dept_nombre = "N/A"
-
-                if empleado.cargo:
-                    cargo = self.session.query(Cargo).filter_by(codigo=empleado.cargo).first()
-                    if cargo:
-                        cargo_nombre = cargo.nombre
-
-                if empleado.depto:
-                    dept = self.session.query(Departamento).filter_by(codigo=empleado.depto).first()
-                    if dept:
-                        dept_nombre = dept.nombre_codigo
-
-                # Actualizar labels (simular tallas)
-                self.emp_info_labels["Cargo:"].config(text=cargo_nombre)
-                self.emp_info_labels["Departamento:"].config(text=dept_nombre)
-                self.emp_info_labels["Talla Camisa:"].config(text="M")  # Placeholder
-                self.emp_info_labels["Talla Pantalón:"].config(text="32")  # Placeholder
-                self.emp_info_labels["Talla Zapatos:"].config(text="42")  # Placeholder
+        # Un cambio rápido de empleado reemplaza la carga anterior
+        self.loader.load('empleado_info', codigo_empleado)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error cargando información del empleado: {str(e)}")
+    def show_employee_info(self, info):
+        if not info:
+            return
+
+        # Actualizar labels (simular tallas)
+        self.emp_info_labels["Cargo:"].config(text=info['cargo'])
+        self.emp_info_labels["Departamento:"].config(text=info['departamento'])
+        self.emp_info_labels["Talla Camisa:"].config(text="M")  # Placeholder
+        self.emp_info_labels["Talla Pantalón:"].config(text="32")  # Placeholder
+        self.emp_info_labels["Talla Zapatos:"].config(text="42")  # Placeholder
 
     def update_items_list(self):
         """Actualizar lista de elementos según tipo"""
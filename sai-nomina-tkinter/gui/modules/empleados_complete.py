@@ -15,7 +15,11 @@ from decimal import Decimal
 from config import Config
 from database.connection import get_session
 from database.models import Empleado, Departamento, Cargo
+from database.reference_cache import reference_cache
 from gui.components.carga_masiva import show_carga_masiva_empleados
+from gui.components.data_table import VirtualTreeview, ListRowProvider
+from gui.components.async_loader import AsyncLoader
+from database.employee_index import employee_index
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +30,11 @@ class EmpleadosCompleteModule(tk.Frame):
         self.session = get_session()
         self.current_employee = None
         self.data_modified = False
+        self._filtro_pendiente = None
+
+        # Primera carga del índice de empleados fuera del hilo de la interfaz
+        self.loader = AsyncLoader(self)
+        self.loader.register('empleados', self.fetch_employees, self.show_employees, self.show_load_error)
 
         self.pack(fill="both", expand=True)
         self.setup_ui()
@@ -134,6 +143,11 @@ class EmpleadosCompleteModule(tk.Frame):
         self.search_status_combo.set("Activos")
         self.search_status_combo.grid(row=0, column=3, padx=(0, 15))
 
+        # Filtrado incremental sobre el índice en memoria
+        for entry in (self.search_employee_entry, self.search_cedula_entry, self.search_name_entry):
+            entry.bind('<KeyRelease>', self.schedule_search)
+        self.search_status_combo.bind('<<ComboboxSelected>>', self.schedule_search)
+
         # Botones de accion
         buttons_frame = tk.Frame(row2_frame, bg='white')
         buttons_frame.grid(row=0, column=4, padx=(20, 0))
@@ -241,8 +255,10 @@ class EmpleadosCompleteModule(tk.Frame):
         self.employee_tree.column("Estado", width=70, anchor="center")
 
         # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.employee_tree.yview)
-        self.employee_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+
+        # Solo la parte visible de la lista existe como items del tree
+        self.employee_view = VirtualTreeview(self.employee_tree, scrollbar, self.format_employee_row)
 
         # Pack
         self.employee_tree.pack(side="left", fill="both", expand=True)
@@ -717,7 +733,7 @@ class EmpleadosCompleteModule(tk.Frame):
     def load_departments(self):
         """Cargar departamentos en combos"""
         try:
-            departamentos = self.session.query(Departamento).filter(Departamento.activo == True).all()
+            departamentos = reference_cache.all(Departamento, activo=True)
             dept_list = ["Todos"] + [f"{d.codigo} - {d.nombre_codigo}" for d in departamentos]
 
             self.search_dept_combo['values'] = dept_list
@@ -729,56 +745,66 @@ class EmpleadosCompleteModule(tk.Frame):
         except Exception as e:
             logger.error(f"Error cargando departamentos: {e}")
 
+    @staticmethod
+    def format_employee_row(emp):
+        """Valores de una fila de la lista de empleados"""
+        estado = "Activo" if emp.activo else "Inactivo"
+        return (emp.empleado, emp.cedula, f"{emp.nombres} {emp.apellidos}", estado), ()
+
+    @staticmethod
+    def search_index(filtros):
+        """Filas de la lista de empleados desde el índice en memoria"""
+        activo = {"Activos": True, "Inactivos": False}.get(filtros['estado'])
+        return employee_index.search_fields(
+            activo=activo,
+            empleado=filtros['empleado'],
+            cedula=filtros['cedula'],
+            nombre=filtros['nombre'],
+        )
+
+    @classmethod
+    def fetch_employees(cls, session, filtros):
+        """Cargador: primera carga del índice de empleados fuera del hilo de Tk"""
+        return cls.search_index(filtros)
+
     def load_employees(self):
         """Cargar lista de empleados"""
-        try:
-            # Limpiar tree
-            for item in self.employee_tree.get_children():
-                self.employee_tree.delete(item)
-
-            # Query base
-            query = self.session.query(Empleado)
-
-            # Aplicar filtros de busqueda si existen
-            if hasattr(self, 'search_employee_var') and self.search_employee_var.get():
-                query = query.filter(Empleado.empleado.like(f"%{self.search_employee_var.get()}%"))
-
-            if hasattr(self, 'search_cedula_var') and self.search_cedula_var.get():
-                query = query.filter(Empleado.cedula.like(f"%{self.search_cedula_var.get()}%"))
-
-            if hasattr(self, 'search_name_var') and self.search_name_var.get():
-                search_text = self.search_name_var.get().upper()
-                query = query.filter(
-                    (Empleado.nombres.like(f"%{search_text}%")) |
-                    (Empleado.apellidos.like(f"%{search_text}%"))
-                )
-
-            # Filtro de estado
-            if hasattr(self, 'search_status_var'):
-                status = self.search_status_var.get()
-                if status == "Activos":
-                    query = query.filter(Empleado.activo == True)
-                elif status == "Inactivos":
-                    query = query.filter(Empleado.activo == False)
-
-            # Ejecutar query
-            empleados = query.order_by(Empleado.nombres, Empleado.apellidos).all()
-
-            # Poblar tree
-            for emp in empleados:
-                estado = "Activo" if emp.activo else "Inactivo"
-                nombre_completo = f"{emp.nombres} {emp.apellidos}"
-
-                self.employee_tree.insert("", "end", values=(
-                    emp.empleado,
-                    emp.cedula,
-                    nombre_completo,
-                    estado
-                ))
+        if self._filtro_pendiente is not None:
+            self.after_cancel(self._filtro_pendiente)
+            self._filtro_pendiente = None
+
+        def valor(nombre):
+            var = getattr(self, nombre, None)
+            return var.get().strip() if var is not None else ""
+
+        filtros = {
+            'empleado': valor('search_employee_var'),
+            'cedula': valor('search_cedula_var'),
+            'nombre': valor('search_name_var'),
+            'estado': valor('search_status_var'),
+        }
+        if not employee_index.listo:
+            self.loader.load('empleados', filtros)
+            return
 
+        try:
+            self.show_employees(self.search_index(filtros))
         except Exception as e:
-            logger.error(f"Error cargando empleados: {e}")
-            messagebox.showerror("Error", f"Error al cargar empleados: {str(e)}")
+            self.show_load_error(e)
+
+    def schedule_search(self, event=None):
+        """Filtrar mientras se escribe, cuando se deja de escribir"""
+        if self._filtro_pendiente is not None:
+            self.after_cancel(self._filtro_pendiente)
+        self._filtro_pendiente = self.after(Config.SEARCH_DEBOUNCE_MS, self.load_employees)
+
+    def show_employees(self, empleados):
+        """Mostrar el resultado del cargador de empleados"""
+        self.employee_view.set_provider(ListRowProvider(empleados))
+
+    def show_load_error(self, error):
+        logger.error(f"Error cargando empleados: {error}")
+        messagebox.showerror("Error", f"Error al cargar empleados: {str(error)}")
 
     def search_employees(self):
         """Buscar empleados con filtros"""
@@ -797,8 +823,7 @@ class EmpleadosCompleteModule(tk.Frame):
         """Manejar seleccion de empleado"""
         selection = self.employee_tree.selection()
         if selection:
-            item = self.employee_tree.item(selection[0])
-            employee_code = item['values'][0]
+            employee_code = self.employee_view.row_for_item(selection[0]).empleado
             self.load_employee_details(employee_code)
 
             # Habilitar botones
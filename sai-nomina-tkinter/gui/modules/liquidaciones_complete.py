@@ -18,6 +18,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from database.connection import get_session
 from database.models import Empleado, Departamento, Cargo
+from database.reference_cache import reference_cache
 from gui.components.carga_masiva import CargaMasivaComponent
 from gui.components.progress_dialog import show_loading_dialog, ProgressDialog
 from gui.components.visual_improvements import show_toast
@@ -608,7 +609,7 @@ class LiquidacionesCompleteModule(tk.Frame):
             self.doc_emp_combo['values'] = emp_values
 
             # Cargar departamentos para reportes
-            departamentos = self.session.query(Departamento).filter_by(activo=True).all()
+            departamentos = reference_cache.all(Departamento, activo=True)
             dept_values = ["TODOS"] + [dept.nombre_codigo for dept in departamentos]
             self.rep_dept_combo['values'] = dept_values
             self.rep_dept_combo.set("TODOS")
@@ -633,12 +634,12 @@ class LiquidacionesCompleteModule(tk.Frame):
                 dept_nombre = "N/A"
 
                 if empleado.cargo:
-                    cargo = self.session.query(Cargo).filter_by(codigo=empleado.cargo).first()
+                    cargo = reference_cache.get(Cargo, empleado.cargo)
                     if cargo:
                         cargo_nombre = cargo.nombre
 
                 if empleado.depto:
-                    dept = self.session.query(Departamento).filter_by(codigo=empleado.depto).first()
+                    dept = reference_cache.get(Departamento, empleado.depto)
                     if dept:
                         dept_nombre = dept.nombre_codigo
 
@@ -986,7 +987,7 @@ class LiquidacionesCompleteModule(tk.Frame):
         self.dept_masivo_combo.grid(row=0, column=3, padx=5, pady=5)
 
         # Cargar departamentos
-        departamentos = self.session.query(Departamento).filter_by(activo=True).all()
+        departamentos = reference_cache.all(Departamento, activo=True)
         dept_values = ["TODOS"] + [dept.nombre_codigo for dept in departamentos]
         self.dept_masivo_combo['values'] = dept_values
         self.dept_masivo_combo.set("TODOS")
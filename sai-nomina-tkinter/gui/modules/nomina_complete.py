@@ -12,12 +12,20 @@ from datetime import datetime, date
 import logging
 from decimal import Decimal
 import calendar
+from pathlib import Path
 
 from config import Config
 from database.connection import get_session
-from database.models import Empleado, RolPago, IngresoDescuento
+from database.models import RolPago, IngresoDescuento
+from database.summaries import get_plantilla, get_plantilla_por_depto
 from gui.components.carga_masiva import show_carga_masiva_nomina
+from gui.components.payslip_export import show_payslip_export
+from gui.components.data_table import VirtualTreeview, ListRowProvider
+from gui.components.async_loader import AsyncLoader
+from database.employee_index import employee_index
 from services.payroll_calculator import payroll_calculator
+from services.iess_planilla import iess_planilla_service
+from services.bank_payments import bank_payment_service
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +35,12 @@ class NominaCompleteModule(tk.Frame):
         self.main_app = main_app
         self.session = get_session()
         self.current_period = datetime.now().strftime("%Y-%m")
+        self._filtro_pendiente = None
+
+        # La primera carga del índice de empleados se hace en segundo plano
+        self.loader = AsyncLoader(self)
+        self.loader.register('empleados', self.fetch_payroll_employees, self.show_payroll_employees,
+                             self.show_payroll_error)
 
         self.pack(fill="both", expand=True)
         self.setup_ui()
@@ -127,6 +141,7 @@ class NominaCompleteModule(tk.Frame):
             ("📊 Carga Masiva", self.carga_masiva_nomina, '#38a169'),
             ("🔄 Calcular Nómina", self.calculate_payroll, Config.COLORS['primary']),
             ("💾 Procesar Roles", self.process_payroll, Config.COLORS['success']),
+            ("🏦 Archivo Bancario", self.generate_bank_file, Config.COLORS['primary']),
             ("📄 Generar Reporte", self.generate_report, Config.COLORS['info']),
             ("📊 Resumen IESS", self.show_iess_summary, Config.COLORS['warning']),
             ("🗑️ Limpiar Período", self.clear_period, Config.COLORS['danger'])
@@ -196,9 +211,12 @@ class NominaCompleteModule(tk.Frame):
             self.payroll_tree.column(col, width=column_widths[col], anchor="center" if col != "Nombres" else "w")
 
         # Scrollbars
-        v_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.payroll_tree.yview)
+        v_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
         h_scrollbar = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.payroll_tree.xview)
-        self.payroll_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.payroll_tree.configure(xscrollcommand=h_scrollbar.set)
+
+        # Solo la parte visible de la nómina existe como items del tree
+        self.payroll_view = VirtualTreeview(self.payroll_tree, v_scrollbar, self.format_payroll_row)
 
         # Grid
         self.payroll_tree.grid(row=0, column=0, sticky="nsew")
@@ -463,79 +481,62 @@ class NominaCompleteModule(tk.Frame):
         self.current_period = self.period_var.get()
         self.load_payroll_data()
 
+    @staticmethod
+    def format_payroll_row(emp):
+        """Valores de una fila de la nómina del período"""
+        # Calcular valores de nómina
+        salary = float(emp.sueldo or 0)
+        worked_days = 30  # Por defecto, días del mes
+
+        # Cálculos básicos
+        total_income = salary
+        iess_personal = salary * Config.APORTE_PERSONAL_IESS
+        total_deductions = iess_personal
+        net_pay = total_income - total_deductions
+
+        return (
+            emp.empleado,
+            f"{emp.nombres} {emp.apellidos}",
+            emp.cargo or "Sin cargo",
+            f"${salary:,.2f}",
+            worked_days,
+            f"${total_income:,.2f}",
+            f"${total_deductions:,.2f}",
+            f"${net_pay:,.2f}"
+        ), ()
+
+    @staticmethod
+    def fetch_payroll_employees(session, texto):
+        """Cargador: primera carga del índice de empleados fuera del hilo de Tk"""
+        return employee_index.search(texto, activo=True)
+
     def load_payroll_data(self):
         """Cargar datos de nómina del período"""
-        try:
-            # Limpiar tree
-            for item in self.payroll_tree.get_children():
-                self.payroll_tree.delete(item)
-
-            # Obtener empleados activos
-            employees = self.session.query(Empleado).filter(Empleado.activo == True).all()
-
-            for emp in employees:
-                # Calcular valores de nómina
-                salary = float(emp.sueldo or 0)
-                worked_days = 30  # Por defecto, días del mes
-
-                # Cálculos básicos
-                total_income = salary
-                iess_personal = salary * Config.APORTE_PERSONAL_IESS
-                total_deductions = iess_personal
-                net_pay = total_income - total_deductions
-
-                self.payroll_tree.insert("", "end", values=(
-                    emp.empleado,
-                    f"{emp.nombres} {emp.apellidos}",
-                    emp.cargo or "Sin cargo",
-                    f"${salary:,.2f}",
-                    worked_days,
-                    f"${total_income:,.2f}",
-                    f"${total_deductions:,.2f}",
-                    f"${net_pay:,.2f}"
-                ))
+        self.apply_employee_filter()
 
-        except Exception as e:
-            logger.error(f"Error cargando datos de nómina: {e}")
-            messagebox.showerror("Error", f"Error al cargar nómina: {str(e)}")
+    def show_payroll_employees(self, empleados):
+        self.payroll_view.set_provider(ListRowProvider(empleados))
 
-    def filter_employees(self, event):
-        """Filtrar empleados en la lista"""
-        search_text = self.search_employee_var.get().upper()
+    def show_payroll_error(self, error):
+        logger.error(f"Error cargando datos de nómina: {error}")
+        messagebox.showerror("Error", f"Error al cargar nómina: {str(error)}")
 
-        # Limpiar y recargar con filtro
-        for item in self.payroll_tree.get_children():
-            self.payroll_tree.delete(item)
+    def filter_employees(self, event):
+        """Filtrar empleados en la lista (espera a que se deje de escribir)"""
+        if self._filtro_pendiente is not None:
+            self.after_cancel(self._filtro_pendiente)
+        self._filtro_pendiente = self.after(Config.SEARCH_DEBOUNCE_MS, self.apply_employee_filter)
+
+    def apply_employee_filter(self):
+        """Empleados activos que coinciden con la búsqueda, desde el índice en memoria"""
+        self._filtro_pendiente = None
+        texto = self.search_employee_var.get()
+        if not employee_index.listo:
+            self.loader.load('empleados', texto)
+            return
 
         try:
-            employees = self.session.query(Empleado).filter(Empleado.activo == True)
-
-            if search_text:
-                employees = employees.filter(
-                    (Empleado.nombres.like(f"%{search_text}%")) |
-                    (Empleado.apellidos.like(f"%{search_text}%")) |
-                    (Empleado.empleado.like(f"%{search_text}%"))
-                )
-
-            for emp in employees.all():
-                salary = float(emp.sueldo or 0)
-                worked_days = 30
-                total_income = salary
-                iess_personal = salary * Config.APORTE_PERSONAL_IESS
-                total_deductions = iess_personal
-                net_pay = total_income - total_deductions
-
-                self.payroll_tree.insert("", "end", values=(
-                    emp.empleado,
-                    f"{emp.nombres} {emp.apellidos}",
-                    emp.cargo or "Sin cargo",
-                    f"${salary:,.2f}",
-                    worked_days,
-                    f"${total_income:,.2f}",
-                    f"${total_deductions:,.2f}",
-                    f"${net_pay:,.2f}"
-                ))
-
+            self.show_payroll_employees(employee_index.search(texto, activo=True))
         except Exception as e:
             logger.error(f"Error filtrando empleados: {e}")
 
@@ -605,39 +606,57 @@ class NominaCompleteModule(tk.Frame):
             logger.error(f"Error actualizando resumen: {e}")
 
     def process_payroll(self):
-        """Procesar roles de pago"""
+        """Procesar (aprobar) los roles calculados del período"""
         if messagebox.askyesno("Confirmar", f"¿Procesar roles definitivamente para {self.current_period}?"):
             try:
-                self.status_label.config(text="● PROCESANDO...", fg=Config.COLORS['warning'])
-                self.main_app.root.update()
+                year, month = map(int, self.current_period.split('-'))
+                procesados = payroll_calculator.process_payroll_period(year, month)
 
-                # Aquí iría el procesamiento real
-                self.main_app.root.after(3000, self.finish_processing)
+                if not procesados:
+                    messagebox.showwarning("Sin datos", "No hay roles calculados pendientes de procesar en el período.")
+                    return
 
-                messagebox.showinfo("Proceso Iniciado", "Procesando roles de pago...")
+                self.finish_processing(procesados)
 
             except Exception as e:
                 logger.error(f"Error procesando nómina: {e}")
                 messagebox.showerror("Error", f"Error en procesamiento: {str(e)}")
 
-    def finish_processing(self):
+    def finish_processing(self, procesados):
         """Finalizar procesamiento"""
         self.status_label.config(text="● PROCESADO", fg=Config.COLORS['success'])
-        messagebox.showinfo("Éxito", "Roles procesados correctamente")
+        messagebox.showinfo("Éxito", f"{procesados} roles procesados correctamente.\n\n"
+                            "Ya se puede generar el archivo bancario del período.")
+
+    def generate_bank_file(self):
+        """Generar el archivo de acreditación bancaria de los roles procesados"""
+        directory = filedialog.askdirectory(title="Carpeta para el archivo bancario")
+        if not directory:
+            return
+
+        result = bank_payment_service.generate(self.current_period, directory)
+        if not result['success']:
+            message = f"Error generando archivo bancario: {result['message']}"
+            if result.get('rechazados'):
+                message += f"\n\nRechazados: {len(result['rechazados'])}"
+            messagebox.showerror("Error", message)
+            return
+
+        message = (
+            f"Archivo generado: {Path(result['archivo']).name}\n\n"
+            f"Pagos: {result['registros']}\n"
+            f"Total: ${result['total']:,.2f}\n"
+            f"SHA-256: {result['hash'][:16]}..."
+        )
+        if result['rechazados']:
+            message += f"\n\nRechazados: {len(result['rechazados'])}\n" + "\n".join(
+                f"{r['empleado']} {r['nombre']}: {r['motivo']}" for r in result['rechazados'][:10])
+        messagebox.showinfo("Archivo Bancario", message)
 
     def generate_report(self):
-        """Generar reporte de nómina"""
+        """Generar los roles de pago del período en PDF"""
         try:
-            # Seleccionar ubicación
-            file_path = filedialog.asksaveasfilename(
-                title="Guardar reporte",
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf"), ("Excel files", "*.xlsx"), ("All files", "*.*")]
-            )
-
-            if file_path:
-                # Simular generación
-                messagebox.showinfo("Éxito", f"Reporte generado: {file_path}")
+            show_payslip_export(self, self.current_period)
 
         except Exception as e:
             logger.error(f"Error generando reporte: {e}")
@@ -679,6 +698,51 @@ class NominaCompleteModule(tk.Frame):
             tk.Label(detail_frame, text=value, bg='white', font=('Arial', 11, 'bold'),
                     fg=Config.COLORS['primary']).pack(side="right")
 
+        tk.Button(
+            summary_window,
+            text="📄 Generar Planilla de Aportes",
+            command=lambda: self.generate_iess_planilla(summary_window),
+            bg=Config.COLORS['primary'],
+            fg='white',
+            font=('Arial', 10, 'bold'),
+            relief='flat',
+            padx=15,
+            pady=5
+        ).pack(pady=15)
+
+    def generate_iess_planilla(self, parent=None):
+        """Generar el archivo de la planilla de aportes IESS del período"""
+        directory = filedialog.askdirectory(title="Carpeta para la planilla IESS", parent=parent)
+        if not directory:
+            return
+
+        result = iess_planilla_service.generate(self.current_period, directory)
+        if not result['success']:
+            messagebox.showerror("Error", f"Error generando planilla IESS: {result['message']}", parent=parent)
+            return
+
+        totales = result['totales']
+        message = (
+            f"Planilla generada: {Path(result['archivo']).name}\n\n"
+            f"Afiliados: {result['registros']}\n"
+            f"Materia gravada: ${totales['aportable']:,.2f}\n"
+            f"Aporte personal: ${totales['personal']:,.2f}\n"
+            f"Aporte patronal: ${totales['patronal']:,.2f}"
+        )
+        if result['novedades']:
+            message += "\nNovedades: " + ", ".join(
+                f"{codigo or 'ninguna'} {cantidad}" for codigo, cantidad in result['novedades'].items())
+        if result['rechazados']:
+            message += f"\n\nRechazados: {len(result['rechazados'])} (ver archivo de control)"
+
+        if result['cuadrada']:
+            messagebox.showinfo("Planilla IESS", message + "\n\nCuadra con el resumen del período.", parent=parent)
+        else:
+            diferencias = "\n".join(
+                f"{clave}: {c['diferencia']}" for clave, c in result['conciliacion'].items() if not c['cuadra'])
+            messagebox.showwarning(
+                "Planilla IESS", message + f"\n\nNO cuadra con el resumen del período:\n{diferencias}", parent=parent)
+
     def clear_period(self):
         """Limpiar período"""
         if messagebox.askyesno("Confirmar", f"¿Limpiar todos los datos del período {self.current_period}?"):
@@ -696,8 +760,7 @@ class NominaCompleteModule(tk.Frame):
         """Editar rol individual"""
         selection = self.payroll_tree.selection()
         if selection:
-            item = self.payroll_tree.item(selection[0])
-            employee_code = item['values'][0]
+            employee_code = self.payroll_view.row_for_item(selection[0]).empleado
 
             # Aquí abriríamos ventana de edición individual
             messagebox.showinfo("Editar Rol", f"Editando rol del empleado: {employee_code}")
@@ -723,10 +786,10 @@ class NominaCompleteModule(tk.Frame):
     def get_payroll_stats(self):
         """Obtener estadísticas de nómina"""
         try:
-            employees = self.session.query(Empleado).filter(Empleado.activo == True).all()
+            plantilla = get_plantilla(self.session)
 
-            total_employees = len(employees)
-            total_salary = sum(float(emp.sueldo or 0) for emp in employees)
+            total_employees = plantilla.empleados_activos if plantilla else 0
+            total_salary = float(plantilla.total_sueldos or 0) if plantilla else 0
             total_iess_personal = total_salary * Config.APORTE_PERSONAL_IESS
             total_iess_patronal = total_salary * Config.APORTE_PATRONAL_IESS
             total_net = total_salary - total_iess_personal
@@ -785,27 +848,19 @@ class NominaCompleteModule(tk.Frame):
     def populate_department_summary(self, tree):
         """Poblar resumen por departamento"""
         try:
-            # Obtener empleados por departamento
-            employees = self.session.query(Empleado).filter(Empleado.activo == True).all()
-
+            # Resumen materializado por departamento (solo empleados activos)
             dept_summary = {}
-            for emp in employees:
-                dept = emp.depto or "SIN DEPARTAMENTO"
-                if dept not in dept_summary:
-                    dept_summary[dept] = {
-                        'count': 0,
-                        'total_salary': 0,
-                        'total_iess': 0,
-                        'total_net': 0
-                    }
-
-                salary = float(emp.sueldo or 0)
+            for resumen in get_plantilla_por_depto(self.session):
+                if not resumen.empleados_activos:
+                    continue
+                salary = float(resumen.total_sueldos or 0)
                 iess = salary * Config.APORTE_PERSONAL_IESS
-
-                dept_summary[dept]['count'] += 1
-                dept_summary[dept]['total_salary'] += salary
-                dept_summary[dept]['total_iess'] += iess
-                dept_summary[dept]['total_net'] += salary - iess
+                dept_summary[resumen.depto or "SIN DEPARTAMENTO"] = {
+                    'count': resumen.empleados_activos,
+                    'total_salary': salary,
+                    'total_iess': iess,
+                    'total_net': salary - iess
+                }
 
             # Llenar tree
             for dept, data in dept_summary.items():
@@ -22,6 +22,7 @@ from gui.components.carga_masiva import CargaMasivaComponent
 from gui.components.progress_dialog import show_loading_dialog, ProgressDialog
 from gui.components.visual_improvements import show_toast
 from gui.components.database_export import show_database_export_dialog
+from gui.components.async_loader import AsyncLoader
 import pandas as pd
 import json
 
@@ -38,6 +39,14 @@ class PrestamosCompleteModule(tk.Frame):
         self.tipo_prestamo_var = tk.StringVar(value="quirografario")
         self.tipo_interes_var = tk.StringVar(value="fijo")
 
+        # Consultas de empleados fuera del hilo de la interfaz
+        self.loader = AsyncLoader(self)
+        self.loader.register('empleados', self.fetch_employees, self.show_employees,
+                             lambda e: messagebox.showerror("Error", f"Error cargando empleados: {str(e)}"))
+        self.loader.register('empleado_info', self.fetch_employee_info, self.show_employee_info,
+                             lambda e: messagebox.showerror(
+                                 "Error", f"Error cargando información del empleado: {str(e)}"))
+
         self.pack(fill="both", expand=True)
         self.setup_ui()
         self.load_employees()
@@ -587,23 +596,27 @@ class PrestamosCompleteModule(tk.Frame):
             ).pack(side=tk.LEFT, padx=5)
 
     # Métodos de funcionalidad
+    @staticmethod
+    def fetch_employees(session):
+        """Cargador: empleados activos como 'código - nombres apellidos'"""
+        empleados = session.query(
+            Empleado.empleado, Empleado.nombres, Empleado.apellidos
+        ).filter_by(activo=True).all()
+        return [f"{emp.empleado} - {emp.nombres} {emp.apellidos}" for emp in empleados]
+
     def load_employees(self):
         """Cargar empleados en combos"""
-        try:
-            empleados = self.session.query(Empleado).filter_by(activo=True).all()
-            emp_values = [f"{emp.empleado} - {emp.nombres} {emp.apellidos}" for emp in empleados]
+        self.loader.load('empleados')
 
-            # Actualizar combos
-            self.emp_combo['values'] = emp_values
-            self.filter_emp_combo['values'] = ["TODOS"] + emp_values
-            self.rep_emp_combo['values'] = ["TODOS"] + emp_values
+    def show_employees(self, emp_values):
+        # Actualizar combos
+        self.emp_combo['values'] = emp_values
+        self.filter_emp_combo['values'] = ["TODOS"] + emp_values
+        self.rep_emp_combo['values'] = ["TODOS"] + emp_values
 
-            # Establecer valores por defecto
-            self.filter_emp_combo.set("TODOS")
-            self.rep_emp_combo.set("TODOS")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Error cargando empleados: {str(e)}")
+        # Establecer valores por defecto
+        self.filter_emp_combo.set("TODOS")
+        self.rep_emp_combo.set("TODOS")
 
     def on_employee_selected(self, event):
         """Manejar selección de empleado"""
@@ -612,31 +625,43 @@ class PrestamosCompleteModule(tk.Frame):
             codigo = selected.split(' - ')[0]
             self.load_employee_info(codigo)
 
+    @staticmethod
+    def fetch_employee_info(session, codigo_empleado):
+        """Cargador: sueldo, cargo y fecha de ingreso del empleado (None si no existe)"""
+        # El cargo se resuelve en la misma consulta con la sesión del cargador
+        empleado = session.query(
+            Empleado.sueldo, Empleado.fecha_ing, Cargo.nombre.label('cargo_nombre')
+        ).outerjoin(
+            Cargo, Cargo.codigo == Empleado.cargo
+        ).filter(Empleado.empleado == codigo_empleado).first()
+        if not empleado:
+            return None
+
+        return {
+            'sueldo': empleado.sueldo,
+            'cargo': empleado.cargo_nombre or "N/A",
+            'fecha_ing': empleado.fecha_ing,
+        }
+
     def load_employee_info(self, codigo_empleado):
         """Cargar información del empleado"""
-        try:
-            empleado = self.session.query(Empleado).filter_by(empleado=codigo_empleado).first()
-            if empleado:
-                # Obtener información del cargo
-                cargo_nombre = "N/A"
-                if empleado.cargo:
-                    cargo = self.session.query(Cargo).filter_by(codigo=empleado.cargo).first()
-                    if cargo:
-                        cargo_nombre = cargo.nombre
-
-                # Actualizar labels
-                self.emp_info_labels["Sueldo:"].config(text=f"${empleado.sueldo:.2f}")
-                self.emp_info_labels["Cargo:"].config(text=cargo_nombre)
-                self.emp_info_labels["Fecha Ingreso:"].config(
-                    text=empleado.fecha_ing.strftime('%d/%m/%Y') if empleado.fecha_ing else "N/A"
-                )
-
-                # Calcular capacidad de pago (máximo 40% del sueldo)
-                capacidad = empleado.sueldo * Decimal('0.40')
-                self.emp_info_labels["Capacidad de Pago:"].config(text=f"${capacidad:.2f}")
+        # Un cambio rápido de empleado reemplaza la carga anterior
+        self.loader.load('empleado_info', codigo_empleado)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error cargando información del empleado: {str(e)}")
+    def show_employee_info(self, info):
+        if not info:
+            return
+
+        # Actualizar labels
+        self.emp_info_labels["Sueldo:"].config(text=f"${info['sueldo']:.2f}")
+        self.emp_info_labels["Cargo:"].config(text=info['cargo'])
+        self.emp_info_labels["Fecha Ingreso:"].config(
+            text=info['fecha_ing'].strftime('%d/%m/%Y') if info['fecha_ing'] else "N/A"
+        )
+
+        # Calcular capacidad de pago (máximo 40% del sueldo)
+        capacidad = info['sueldo'] * Decimal('0.40')
+        self.emp_info_labels["Capacidad de Pago:"].config(text=f"${capacidad:.2f}")
 
     def update_loan_params(self):
         """Actualizar parámetros según tipo de préstamo"""
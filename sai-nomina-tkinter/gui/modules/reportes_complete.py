@@ -6,7 +6,7 @@ Generación de reportes del sistema de nómina y RRHH
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 import sys
@@ -17,6 +17,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from database.connection import get_session
 from database.models import Empleado, Departamento, Cargo
+from database.reference_cache import reference_cache
+from services.sri_rdep import rdep_service
+from gui.components.payslip_export import show_payslip_export
 
 class ReportesCompleteModule(tk.Frame):
     """Módulo completo de reportes"""
@@ -238,6 +241,7 @@ class ReportesCompleteModule(tk.Frame):
             ("Costos por Centro", "costos_centro", "Distribución de costos por centro de costos"),
             ("IESS y Contribuciones", "iess_contribuciones", "Reporte de aportes al IESS"),
             ("Retenciones Fiscales", "retenciones", "Retenciones de impuesto a la renta"),
+            ("Anexo RDEP (SRI)", "rdep", "XML anual de retenciones en relación de dependencia"),
             ("Flujo de Efectivo", "flujo_efectivo", "Proyección de flujo de efectivo de nómina")
         ]
 
@@ -620,13 +624,13 @@ class ReportesCompleteModule(tk.Frame):
         """Cargar datos iniciales"""
         try:
             # Cargar departamentos
-            departamentos = self.session.query(Departamento).filter_by(activo=True).all()
+            departamentos = reference_cache.all(Departamento, activo=True)
             dept_values = ["TODOS"] + [dept.nombre_codigo for dept in departamentos]
             self.filter_dept_combo['values'] = dept_values
             self.filter_dept_combo.set("TODOS")
 
             # Cargar cargos
-            cargos = self.session.query(Cargo).filter_by(activo=True).all()
+            cargos = reference_cache.all(Cargo, activo=True)
             cargo_values = ["TODOS"] + [cargo.nombre for cargo in cargos]
             self.filter_cargo_combo['values'] = cargo_values
             self.filter_cargo_combo.set("TODOS")
@@ -729,6 +733,13 @@ Usuario: Sistema SGN
     # Métodos principales
     def generate_report(self):
         """Generar reporte"""
+        if self.notebook.index('current') == 2 and self.financial_report_var.get() == 'rdep':
+            self.generate_rdep()
+            return
+        if self.notebook.index('current') == 0 and self.nomina_report_var.get() == 'rol_pagos':
+            self.generate_payslips()
+            return
+
         try:
             # Validar parámetros
             if not self.fecha_desde_entry.get() or not self.fecha_hasta_entry.get():
@@ -753,6 +764,51 @@ Usuario: Sistema SGN
         except Exception as e:
             messagebox.showerror("Error", f"Error generando reporte: {str(e)}")
 
+    def generate_payslips(self):
+        """Generar los roles de pago en PDF del mes de 'Fecha Desde'"""
+        try:
+            periodo = datetime.strptime(self.fecha_desde_entry.get().strip(), '%d/%m/%Y').strftime('%Y-%m')
+        except ValueError:
+            messagebox.showwarning("Advertencia", "Ingrese Fecha Desde como DD/MM/AAAA")
+            return
+
+        show_payslip_export(self, periodo)
+
+    def generate_rdep(self):
+        """Generar el XML del RDEP del año de 'Fecha Desde'"""
+        try:
+            anio = datetime.strptime(self.fecha_desde_entry.get().strip(), '%d/%m/%Y').year
+        except ValueError:
+            messagebox.showwarning("Advertencia", "Ingrese Fecha Desde como DD/MM/AAAA")
+            return
+
+        directory = filedialog.askdirectory(title=f"Carpeta para el RDEP {anio}")
+        if not directory:
+            return
+
+        result = rdep_service.generate(anio, directory)
+        if not result['success']:
+            messagebox.showerror("Error", f"Error generando RDEP: {result['message']}")
+            return
+
+        totales = result['totales']
+        message = (
+            f"Anexo generado: {Path(result['archivo']).name}\n\n"
+            f"Empleados: {result['empleados']}\n"
+            f"Ingresos gravados: ${totales['ingresos']:,.2f}\n"
+            f"Aporte personal IESS: ${totales['aporte_iess']:,.2f}\n"
+            f"Impuesto retenido: ${totales['retenido']:,.2f}"
+        )
+        if result['observaciones']:
+            message += f"\n\nEmpleados con retención menor al impuesto causado: {len(result['observaciones'])}"
+        if result['cuadrado']:
+            messagebox.showinfo("RDEP", message)
+        else:
+            diferencias = "\n".join(
+                f"{clave}: {c['diferencia']}" for clave, c in result['conciliacion'].items() if not c['cuadra'])
+            messagebox.showwarning(
+                "RDEP", message + f"\n\nLos totales NO cuadran con los resúmenes por período:\n{diferencias}")
+
     def finish_report_generation(self, progress_window):
         """Finalizar generación de reporte"""
         progress_window.destroy()
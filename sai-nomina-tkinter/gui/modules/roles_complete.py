@@ -17,6 +17,8 @@ from sqlalchemy import and_, or_, desc, asc
 from config import Config
 from database.connection import get_session
 from database.models import RolPago, Empleado
+from gui.components.data_table import VirtualTreeview, ListRowProvider
+from gui.components.async_loader import AsyncLoader
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,11 @@ class RolesCompleteModule(tk.Frame):
         self.session = get_session()
         self.current_role = None
 
+        # Consultas de la lista y de los períodos fuera del hilo de la interfaz
+        self.loader = AsyncLoader(self)
+        self.loader.register('periodos', self.fetch_periods, self.show_periods, self.show_periods_error)
+        self.loader.register('roles', self.fetch_roles, self.show_roles, self.show_roles_error)
+
         self.pack(fill="both", expand=True)
         self.setup_ui()
         self.load_roles()
@@ -230,8 +237,15 @@ class RolesCompleteModule(tk.Frame):
         self.roles_tree.column("Estado", width=100, anchor="center")
 
         # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.roles_tree.yview)
-        self.roles_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+
+        # Solo la parte visible de la lista existe como items del tree
+        self.roles_view = VirtualTreeview(self.roles_tree, scrollbar, self.format_role_row)
+
+        # Colores por estado
+        self.roles_tree.tag_configure('pagado', background='#d4edda')
+        self.roles_tree.tag_configure('procesado', background='#cce5ff')
+        self.roles_tree.tag_configure('anulado', background='#f8d7da')
 
         # Pack
         self.roles_tree.pack(side="left", fill="both", expand=True)
@@ -550,156 +564,121 @@ class RolesCompleteModule(tk.Frame):
         self.detail_observaciones = tk.Text(obs_frame, height=4, state='disabled', bg='#f8f9fa')
         self.detail_observaciones.pack(fill="both", expand=True, pady=5)
 
+    @staticmethod
+    def fetch_periods(session):
+        """Cargador: períodos con roles, del más reciente al más antiguo"""
+        periods = session.query(RolPago.periodo).distinct().order_by(desc(RolPago.periodo)).all()
+        return [p[0] for p in periods]
+
     def load_periods(self):
         """Cargar períodos disponibles"""
-        try:
-            periods = self.session.query(RolPago.periodo).distinct().order_by(desc(RolPago.periodo)).all()
-            period_values = ["TODOS"] + [p[0] for p in periods]
-            self.periodo_combo['values'] = period_values
-            if len(period_values) > 1:
-                self.periodo_combo.set(period_values[1])  # Seleccionar el más reciente
-            else:
-                self.periodo_combo.set("TODOS")
-        except Exception as e:
-            logger.error(f"Error cargando períodos: {str(e)}")
-            self.periodo_combo['values'] = ["TODOS"]
+        self.loader.load('periodos')
+
+    def show_periods(self, periods):
+        period_values = ["TODOS"] + periods
+        self.periodo_combo['values'] = period_values
+        if len(period_values) > 1:
+            self.periodo_combo.set(period_values[1])  # Seleccionar el más reciente
+        else:
             self.periodo_combo.set("TODOS")
 
-    def load_roles(self):
-        """Cargar roles de pago"""
-        try:
-            # Cargar períodos primero
-            self.load_periods()
+    def show_periods_error(self, error):
+        logger.error(f"Error cargando períodos: {str(error)}")
+        self.periodo_combo['values'] = ["TODOS"]
+        self.periodo_combo.set("TODOS")
+
+    @staticmethod
+    def format_role_row(rol):
+        """Valores y color de una fila de la lista de roles"""
+        # Determinar color según estado
+        tags = ()
+        if rol.estado == 'PAGADO':
+            tags = ('pagado',)
+        elif rol.estado == 'PROCESADO':
+            tags = ('procesado',)
+        elif rol.estado == 'ANULADO':
+            tags = ('anulado',)
+
+        return (
+            rol.id,
+            rol.periodo,
+            rol.empleado,
+            f"{rol.nombres} {rol.apellidos}",
+            f"${float(rol.neto_pagar or 0):,.2f}",
+            rol.estado or 'BORRADOR'
+        ), tags
+
+    @staticmethod
+    def fetch_roles(session, filtros):
+        """Cargador: filas de la lista de roles con los filtros dados (sin widgets)"""
+        # Query base con join, solo las columnas de la lista
+        query = session.query(
+            RolPago.id, RolPago.periodo, RolPago.empleado, RolPago.neto_pagar,
+            RolPago.estado, Empleado.nombres, Empleado.apellidos
+        ).join(
+            Empleado, RolPago.empleado == Empleado.empleado
+        )
 
-            # Limpiar árbol
-            for item in self.roles_tree.get_children():
-                self.roles_tree.delete(item)
+        # Aplicar filtros
+        filters = []
 
-            # Query base
-            query = self.session.query(RolPago, Empleado).join(
-                Empleado, RolPago.empleado == Empleado.empleado
-            ).order_by(desc(RolPago.fecha_proceso), desc(RolPago.periodo))
-
-            # Aplicar filtros si existen
-            roles = query.all()
-
-            # Insertar en tree
-            for rol, empleado in roles:
-                # Formatear valores
-                neto_format = f"${float(rol.neto_pagar or 0):,.2f}"
-                nombre_completo = f"{empleado.nombres} {empleado.apellidos}"
-
-                # Determinar color según estado
-                tags = ()
-                if rol.estado == 'PAGADO':
-                    tags = ('pagado',)
-                elif rol.estado == 'PROCESADO':
-                    tags = ('procesado',)
-                elif rol.estado == 'ANULADO':
-                    tags = ('anulado',)
-
-                self.roles_tree.insert("", "end", values=(
-                    rol.id,
-                    rol.periodo,
-                    rol.empleado,
-                    nombre_completo,
-                    neto_format,
-                    rol.estado or 'BORRADOR'
-                ), tags=tags)
-
-            # Configurar colores
-            self.roles_tree.tag_configure('pagado', background='#d4edda')
-            self.roles_tree.tag_configure('procesado', background='#cce5ff')
-            self.roles_tree.tag_configure('anulado', background='#f8d7da')
-
-            # Limpiar detalles
-            self.clear_details()
+        # Filtro por empleado
+        if filtros.get('empleado'):
+            filters.append(RolPago.empleado.like(f"%{filtros['empleado']}%"))
 
-            logger.info(f"Cargados {len(roles)} roles de pago")
+        # Filtro por cédula
+        if filtros.get('cedula'):
+            filters.append(Empleado.cedula.like(f"%{filtros['cedula']}%"))
 
-        except Exception as e:
-            logger.error(f"Error cargando roles: {str(e)}")
-            messagebox.showerror("Error", f"Error cargando roles de pago: {str(e)}")
+        # Filtro por período
+        if filtros.get('periodo') and filtros['periodo'] != "TODOS":
+            filters.append(RolPago.periodo == filtros['periodo'])
 
-    def search_roles(self):
-        """Buscar roles con filtros"""
-        try:
-            # Limpiar tree
-            for item in self.roles_tree.get_children():
-                self.roles_tree.delete(item)
+        # Filtro por estado
+        if filtros.get('estado') and filtros['estado'] != "TODOS":
+            filters.append(RolPago.estado == filtros['estado'])
 
-            # Query base con join
-            query = self.session.query(RolPago, Empleado).join(
-                Empleado, RolPago.empleado == Empleado.empleado
-            )
+        # Filtro por tipo nómina
+        tipo_map = {"Semanal": 1, "Quincenal": 2, "Mensual": 3}
+        if filtros.get('tipo_nomina') in tipo_map:
+            filters.append(RolPago.tipo_nomina == tipo_map[filtros['tipo_nomina']])
 
-            # Aplicar filtros
-            filters = []
-
-            # Filtro por empleado
-            if self.empleado_var.get().strip():
-                filters.append(RolPago.empleado.like(f"%{self.empleado_var.get().strip()}%"))
-
-            # Filtro por cédula
-            if self.cedula_var.get().strip():
-                filters.append(Empleado.cedula.like(f"%{self.cedula_var.get().strip()}%"))
-
-            # Filtro por período
-            if self.periodo_var.get() and self.periodo_var.get() != "TODOS":
-                filters.append(RolPago.periodo == self.periodo_var.get())
-
-            # Filtro por estado
-            if self.estado_var.get() and self.estado_var.get() != "TODOS":
-                filters.append(RolPago.estado == self.estado_var.get())
-
-            # Filtro por tipo nómina
-            if self.tipo_nomina_var.get() and self.tipo_nomina_var.get() != "TODOS":
-                tipo_map = {"Semanal": 1, "Quincenal": 2, "Mensual": 3}
-                if self.tipo_nomina_var.get() in tipo_map:
-                    filters.append(RolPago.tipo_nomina == tipo_map[self.tipo_nomina_var.get()])
-
-            # Aplicar filtros
-            if filters:
-                query = query.filter(and_(*filters))
-
-            # Ordenar
-            query = query.order_by(desc(RolPago.fecha_proceso), desc(RolPago.periodo))
-
-            # Ejecutar query
-            roles = query.all()
-
-            # Insertar resultados
-            for rol, empleado in roles:
-                neto_format = f"${float(rol.neto_pagar or 0):,.2f}"
-                nombre_completo = f"{empleado.nombres} {empleado.apellidos}"
-
-                tags = ()
-                if rol.estado == 'PAGADO':
-                    tags = ('pagado',)
-                elif rol.estado == 'PROCESADO':
-                    tags = ('procesado',)
-                elif rol.estado == 'ANULADO':
-                    tags = ('anulado',)
-
-                self.roles_tree.insert("", "end", values=(
-                    rol.id,
-                    rol.periodo,
-                    rol.empleado,
-                    nombre_completo,
-                    neto_format,
-                    rol.estado or 'BORRADOR'
-                ), tags=tags)
-
-            # Configurar colores
-            self.roles_tree.tag_configure('pagado', background='#d4edda')
-            self.roles_tree.tag_configure('procesado', background='#cce5ff')
-            self.roles_tree.tag_configure('anulado', background='#f8d7da')
-
-            logger.info(f"Búsqueda completada: {len(roles)} resultados")
+        # Aplicar filtros
+        if filters:
+            query = query.filter(and_(*filters))
 
-        except Exception as e:
-            logger.error(f"Error en búsqueda: {str(e)}")
-            messagebox.showerror("Error", f"Error en la búsqueda: {str(e)}")
+        # Ordenar
+        return query.order_by(desc(RolPago.fecha_proceso), desc(RolPago.periodo), desc(RolPago.id)).all()
+
+    def load_roles(self):
+        """Cargar roles de pago"""
+        # Cargar períodos y todos los roles en segundo plano
+        self.load_periods()
+        self.loader.load('roles', {})
+
+        # Limpiar detalles
+        self.clear_details()
+
+    def search_roles(self):
+        """Buscar roles con filtros"""
+        filtros = {
+            'empleado': self.empleado_var.get().strip(),
+            'cedula': self.cedula_var.get().strip(),
+            'periodo': self.periodo_var.get(),
+            'estado': self.estado_var.get(),
+            'tipo_nomina': self.tipo_nomina_var.get(),
+        }
+        # Reemplaza a la carga o búsqueda anterior si aún no terminó
+        self.loader.load('roles', filtros)
+
+    def show_roles(self, roles):
+        """Mostrar el resultado del cargador de roles"""
+        self.roles_view.set_provider(ListRowProvider(roles))
+        logger.info(f"Cargados {len(roles)} roles de pago")
+
+    def show_roles_error(self, error):
+        logger.error(f"Error cargando roles: {str(error)}")
+        messagebox.showerror("Error", f"Error cargando roles de pago: {str(error)}")
 
     def clear_search(self):
         """Limpiar filtros de búsqueda"""
@@ -714,11 +693,8 @@ class RolesCompleteModule(tk.Frame):
         """Manejar selección de rol"""
         selection = self.roles_tree.selection()
         if selection:
-            item = self.roles_tree.item(selection[0])
-            values = item['values']
-            if values:
-                rol_id = values[0]
-                self.show_role_details(rol_id)
+            rol_id = self.roles_view.row_for_item(selection[0]).id
+            self.show_role_details(rol_id)
 
     def on_role_double_click(self, event):
         """Manejar doble clic en rol"""
@@ -848,7 +824,7 @@ class RolesCompleteModule(tk.Frame):
     def export_roles(self):
         """Exportar roles a Excel"""
         try:
-            if not self.roles_tree.get_children():
+            if not self.roles_view.total:
                 messagebox.showwarning("Advertencia", "No hay datos para exportar")
                 return
 
@@ -864,8 +840,8 @@ class RolesCompleteModule(tk.Frame):
 
             # Obtener datos actuales de la búsqueda
             data = []
-            for item in self.roles_tree.get_children():
-                values = self.roles_tree.item(item)['values']
+            for rol in self.roles_view.iter_rows():
+                values, _ = self.format_role_row(rol)
                 data.append({
                     'ID': values[0],
                     'Período': values[1],
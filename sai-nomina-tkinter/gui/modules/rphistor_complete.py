@@ -2,10 +2,32 @@
 # -*- coding: utf-8 -*-
 """
 Módulo de RPHISTOR - Sistema SGN
+Consulta del histórico de movimientos, incluidos los años archivados
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database.archive import history_view
+from database.models import Historico
+from gui.components.async_loader import AsyncLoader
+
+# Filas por consulta; se muestran las más recientes
+LIMITE_FILAS = 500
+
+COLUMNAS = (
+    ('fecha', 'Fecha', 90),
+    ('empleado', 'Empleado', 80),
+    ('tipo', 'Tipo', 50),
+    ('clase', 'Clase', 50),
+    ('concepto', 'Concepto', 220),
+    ('valor', 'Valor', 90),
+    ('horas', 'Horas', 60),
+    ('periodo', 'Período', 70),
+)
 
 class RPHistorCompleteModule(tk.Frame):
     """Módulo de tabla RPHISTOR"""
@@ -28,13 +50,102 @@ class RPHistorCompleteModule(tk.Frame):
             fg='white'
         ).pack(side=tk.LEFT, pady=15, padx=20)
 
+        # Filtros
+        filtros_frame = tk.Frame(self, bg='#f0f0f0')
+        filtros_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.empleado_var = tk.StringVar()
+        self.tipo_var = tk.StringVar()
+        self.desde_var = tk.StringVar()
+        self.hasta_var = tk.StringVar()
+
+        for texto, variable, ancho in (("Empleado:", self.empleado_var, 10),
+                                       ("Desde (AAAA-MM-DD):", self.desde_var, 12),
+                                       ("Hasta (AAAA-MM-DD):", self.hasta_var, 12)):
+            tk.Label(filtros_frame, text=texto, bg='#f0f0f0').pack(side=tk.LEFT, padx=(0, 5))
+            tk.Entry(filtros_frame, textvariable=variable, width=ancho).pack(side=tk.LEFT, padx=(0, 15))
+
+        tk.Label(filtros_frame, text="Tipo:", bg='#f0f0f0').pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(
+            filtros_frame, textvariable=self.tipo_var, width=6, state='readonly',
+            values=('', 'ING', 'EGR', 'VAC', 'DEC', 'LIQ', 'HEX')
+        ).pack(side=tk.LEFT, padx=(0, 15))
+
+        tk.Button(
+            filtros_frame, text="Buscar", command=self.load_history,
+            bg='#2c5282', fg='white', padx=15
+        ).pack(side=tk.LEFT)
+
         # Content
         content_frame = tk.Frame(self, bg='white')
         content_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        tk.Label(
-            content_frame,
-            text="Tabla RPHISTOR\n\nEn desarrollo...",
-            font=('Arial', 14),
-            bg='white'
-        ).pack(expand=True)
\ No newline at end of file
+        self.tree = ttk.Treeview(content_frame, columns=[c[0] for c in COLUMNAS], show='headings')
+        for nombre, titulo, ancho in COLUMNAS:
+            self.tree.heading(nombre, text=titulo)
+            self.tree.column(nombre, width=ancho, anchor='e' if nombre in ('valor', 'horas') else 'w')
+
+        scrollbar = ttk.Scrollbar(content_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.status_label = tk.Label(self, text="", bg='#f0f0f0', anchor='w')
+        self.status_label.pack(fill=tk.X, padx=10, pady=(0, 5))
+
+        self.loader = AsyncLoader(self)
+        self.loader.register('historico', self.fetch_history, self.show_history, self.show_history_error)
+        self.load_history()
+
+    def load_history(self):
+        """Consultar el histórico con los filtros actuales"""
+        try:
+            desde = self.parse_date(self.desde_var.get())
+            hasta = self.parse_date(self.hasta_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Ingrese las fechas en formato AAAA-MM-DD")
+            return
+
+        filtros = {
+            'empleado': self.empleado_var.get().strip(),
+            'tipo': self.tipo_var.get(),
+            'desde': desde,
+            'hasta': hasta,
+        }
+        self.status_label.config(text="Cargando histórico...")
+        self.loader.load('historico', filtros)
+
+    @staticmethod
+    def parse_date(texto):
+        texto = texto.strip()
+        return datetime.strptime(texto, '%Y-%m-%d').date() if texto else None
+
+    @staticmethod
+    def fetch_history(session, filtros):
+        """Cargador: movimientos de la vista rphistor_completo (principal + archivos)"""
+        vista = history_view(Historico)
+        consulta = select(*[vista.c[nombre] for nombre, _, _ in COLUMNAS])
+        if filtros['empleado']:
+            consulta = consulta.where(vista.c.empleado == filtros['empleado'])
+        if filtros['tipo']:
+            consulta = consulta.where(vista.c.tipo == filtros['tipo'])
+        if filtros['desde']:
+            consulta = consulta.where(vista.c.fecha >= filtros['desde'])
+        if filtros['hasta']:
+            consulta = consulta.where(vista.c.fecha <= filtros['hasta'])
+        consulta = consulta.order_by(vista.c.fecha.desc(), vista.c.id.desc()).limit(LIMITE_FILAS)
+        return session.execute(consulta).fetchall()
+
+    def show_history(self, filas):
+        self.tree.delete(*self.tree.get_children())
+        for fila in filas:
+            valores = ['' if valor is None else valor for valor in fila]
+            self.tree.insert('', tk.END, values=valores)
+        texto = f"{len(filas)} movimientos"
+        if len(filas) == LIMITE_FILAS:
+            texto += f" (se muestran los {LIMITE_FILAS} más recientes; afine los filtros)"
+        self.status_label.config(text=texto)
+
+    def show_history_error(self, error):
+        self.status_label.config(text="")
+        messagebox.showerror("Error", f"Error al cargar el histórico: {str(error)}")
@@ -19,6 +19,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from database.connection import get_session
 from database.models import Empleado, Departamento, Cargo
+from database.reference_cache import reference_cache
 from gui.components.carga_masiva import CargaMasivaComponent
 from gui.components.progress_dialog import show_loading_dialog, ProgressDialog
 from gui.components.visual_improvements import show_toast
@@ -757,7 +758,7 @@ class VacacionesCompleteModule(tk.Frame):
         self.dept_saldos_combo.grid(row=0, column=3, padx=5, pady=5)
 
         # Cargar departamentos
-        departamentos = self.session.query(Departamento).filter_by(activo=True).all()
+        departamentos = reference_cache.all(Departamento, activo=True)
         dept_values = ["TODOS"] + [dept.nombre_codigo for dept in departamentos]
         self.dept_saldos_combo['values'] = dept_values
         self.dept_saldos_combo.set("TODOS")
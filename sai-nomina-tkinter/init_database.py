@@ -121,14 +121,19 @@ def insert_initial_data():
             session.commit()
             logger.info("💼 Cargo inicial creado")
 
-        # Parámetros de control
-        if not session.query(Control).first():
-            parametros = [
-                Control(parametro="SBU", valor="460.00", descripcion="Salario Básico Unificado", tipo="NUMBER"),
-                Control(parametro="EMPRESA_NOMBRE", valor="INSEVIG CIA. LTDA.", descripcion="Nombre de la empresa", tipo="STRING"),
-                Control(parametro="EMPRESA_RUC", valor="0992123456001", descripcion="RUC de la empresa", tipo="STRING")
-            ]
-            session.add_all(parametros)
+        # Parámetros de control (se agregan los que falten en bases existentes)
+        parametros = [
+            Control(parametro="SBU", valor="460.00", descripcion="Salario Básico Unificado", tipo="NUMBER"),
+            Control(parametro="EMPRESA_NOMBRE", valor="INSEVIG CIA. LTDA.", descripcion="Nombre de la empresa", tipo="STRING"),
+            Control(parametro="EMPRESA_RUC", valor="0992123456001", descripcion="RUC de la empresa", tipo="STRING"),
+            Control(parametro="EMPRESA_BANCO", valor="001", descripcion="Banco pagador de sueldos (código de Config.BANCOS)", tipo="STRING"),
+            Control(parametro="EMPRESA_CUENTA", valor="", descripcion="Cuenta de débito para el pago de sueldos", tipo="STRING"),
+            Control(parametro="EMPRESA_SUCURSAL_IESS", valor="0001", descripcion="Código de sucursal del empleador en el IESS", tipo="STRING")
+        ]
+        existentes = {parametro for (parametro,) in session.query(Control.parametro).all()}
+        nuevos = [control for control in parametros if control.parametro not in existentes]
+        if nuevos:
+            session.add_all(nuevos)
             session.commit()
             logger.info("⚙️ Parámetros de control creados")
 
@@ -62,6 +62,20 @@ def main():
         create_database()
         print("[OK] Base de datos inicializada con sistema de autenticación")
 
+        # Mantenimiento programado fuera de horario
+        from database.maintenance import maintenance_scheduler
+        maintenance_scheduler.start()
+
+        # Grabar las consultas de la sesión para el recomendador de índices
+        query_log = os.environ.get('SGN_GRABAR_CONSULTAS')
+        if query_log:
+            import atexit
+            from database.connection import get_engine
+            from database.index_advisor import QueryRecorder
+            recorder = QueryRecorder().attach(get_engine())
+            atexit.register(recorder.save, query_log)
+            print(f"[INFO] Grabando consultas en {query_log}")
+
         # Importar sistema de autenticación
         from auth.login_window import show_login_window
         from auth.auth_manager import auth_manager
@@ -714,17 +728,22 @@ class SGNCompleteApp:
         """Obtener estadisticas para dashboard"""
         try:
             from database.connection import get_session
-            from database.models import Empleado, RolPago, Vacacion, Prestamo
+            from database.models import Vacacion
+            from database.summaries import get_plantilla, get_period_summary
             from gui.components.visual_improvements import StatCard, show_toast
 
             session = get_session()
 
-            total_empleados = session.query(Empleado).count()
-            empleados_activos = session.query(Empleado).filter(Empleado.activo == True).count()
+            # Lecturas de una fila sobre los resúmenes materializados
+            plantilla = get_plantilla(session)
+            total_empleados = plantilla.empleados_total if plantilla else 0
+            empleados_activos = plantilla.empleados_activos if plantilla else 0
 
-            # Simular otras estadisticas
-            roles_procesados = session.query(RolPago).count() if hasattr(session.query(RolPago), 'count') else 12
-            vacaciones_pendientes = 8
+            resumen = get_period_summary(session, datetime.now().strftime("%Y-%m"))
+            roles_procesados = resumen.empleados if resumen else 0
+            vacaciones_pendientes = session.query(Vacacion).filter(
+                Vacacion.estado == 'PENDIENTE'
+            ).count()
 
             session.close()
 
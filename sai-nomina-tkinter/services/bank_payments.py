@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BankPayments - Sistema SGN
+Archivos de acreditación de sueldos para cash management: un formato por
+banco, validación de cuentas por columnas, totales de control y hash
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
+import hashlib
+import logging
+import tempfile
+import time
+import unicodedata
+
+import numpy as np
+from sqlalchemy import select
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.models import Empleado, RolPago, Control
+from utils.validators import codigos_cedula, codigos_cuenta, MENSAJES_VALIDACION, VALIDO
+
+logger = logging.getLogger(__name__)
+
+# Roles que ya se pueden pagar: los aprobados con "Procesar Roles" en nómina
+# (PayrollCalculator.process_payroll_period)
+ESTADOS_PAGABLES = ('PROCESADO',)
+
+TIPOS_CUENTA = {'A': 'AHORROS', 'C': 'CORRIENTE'}
+
+# Filas leídas por lote del cursor
+LOTE_PAGOS = 2000
+
+
+def ascii_text(texto, longitud=None):
+    """Texto en mayúsculas sin tildes ni eñes, como lo aceptan los bancos"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode('ascii')
+    texto = ' '.join(texto.upper().split())
+    return texto[:longitud] if longitud else texto
+
+
+class BankLayout:
+    """
+    Formato base del archivo de un banco
+
+    Cada banco se agrega como subclase registrada con @register_layout y
+    define detail() y, si su formato los pide, header()/footer(), que
+    reciben los totales del archivo. Los anchos y códigos siguen la
+    estructura general del formato de cada banco; deben confirmarse con la
+    especificación vigente del banco antes de enviar pagos reales.
+    """
+
+    banco = None
+    nombre = 'GENÉRICO'
+    extension = 'txt'
+    fin_linea = '\r\n'
+    # Largo admitido de las cuentas de este banco (se valida por banco del empleado)
+    longitud_cuenta = (6, 20)
+    # Dígitos que caben en el campo de cuenta del archivo (None: sin límite)
+    ancho_cuenta = None
+
+    def __init__(self, cuenta_empresa, ruc_empresa, nombre_empresa, fecha_pago):
+        self.cuenta_empresa = cuenta_empresa
+        self.ruc_empresa = ruc_empresa
+        self.nombre_empresa = nombre_empresa
+        self.fecha_pago = fecha_pago
+
+    def header(self, totales):
+        return None
+
+    def detail(self, pago):
+        raise NotImplementedError
+
+    def footer(self, totales):
+        return None
+
+    def bank_code(self, banco):
+        """Código del banco destino en la codificación del banco pagador"""
+        return banco
+
+
+class FixedWidthLayout(BankLayout):
+    """Registros de ancho fijo descritos por CAMPOS = [(campo, ancho, 'N'|'A')]"""
+
+    CAMPOS = []
+
+    @property
+    def ancho_cuenta(self):
+        return next((ancho for campo, ancho, _ in self.CAMPOS if campo == 'cuenta'), None)
+
+    @staticmethod
+    def field(valor, ancho, tipo):
+        """
+        'N': numérico con ceros a la izquierda; 'A': texto con espacios a la derecha
+
+        Un número más largo que el campo es un error (cortarlo cambiaría la
+        cuenta o el valor); el texto sí se recorta al ancho.
+        """
+        if tipo == 'N':
+            texto = str(valor or 0)
+            if len(texto) > ancho:
+                raise ValueError(f"El valor {texto} excede los {ancho} dígitos del campo")
+            return texto.rjust(ancho, '0')
+        return ascii_text(valor, ancho).ljust(ancho)
+
+    def detail(self, pago):
+        return ''.join(self.field(pago[campo], ancho, tipo) for campo, ancho, tipo in self.CAMPOS)
+
+
+class DelimitedLayout(BankLayout):
+    """Registros separados por SEPARADOR con los valores de COLUMNAS"""
+
+    SEPARADOR = ','
+    COLUMNAS = []
+
+    def values(self, pago):
+        return [pago[c] for c in self.COLUMNAS]
+
+    def detail(self, pago):
+        return self.SEPARADOR.join(str(v) for v in self.values(pago))
+
+
+LAYOUTS = {}
+
+
+def register_layout(cls):
+    """Registrar el formato de un banco (clave: código de Config.BANCOS)"""
+    LAYOUTS[cls.banco] = cls
+    return cls
+
+
+@register_layout
+class GenericLayout(DelimitedLayout):
+    """CSV con encabezado para bancos sin formato propio"""
+
+    extension = 'csv'
+    fin_linea = '\n'
+    COLUMNAS = ['secuencia', 'cedula', 'nombre', 'banco', 'tipo_cuenta', 'cuenta', 'valor', 'referencia']
+
+    def header(self, totales):
+        return self.SEPARADOR.join(c.upper() for c in self.COLUMNAS)
+
+    def values(self, pago):
+        return [ascii_text(v).replace(self.SEPARADOR, ' ') if isinstance(v, str) else v
+                for v in super().values(pago)]
+
+
+@register_layout
+class PichinchaLayout(DelimitedLayout):
+    """Banco Pichincha: cash management, registros PA separados por tabulador"""
+
+    banco = '001'
+    nombre = Config.BANCOS['001']
+    SEPARADOR = '\t'
+    longitud_cuenta = (10, 10)
+
+    def values(self, pago):
+        return [
+            'PA', self.cuenta_empresa, pago['secuencia'], '', pago['empleado'], 'USD',
+            str(pago['centavos']).rjust(13, '0'), 'CTA', self.bank_code(pago['banco']),
+            'AHO' if pago['tipo_cuenta'] == 'A' else 'CTE', pago['cuenta'],
+            'C', pago['cedula'], ascii_text(pago['nombre'], 40), '', '', '', pago['referencia'],
+        ]
+
+
+@register_layout
+class GuayaquilLayout(FixedWidthLayout):
+    """Banco Guayaquil: ancho fijo con cabecera de control"""
+
+    banco = '002'
+    nombre = Config.BANCOS['002']
+    longitud_cuenta = (7, 10)
+    CAMPOS = [
+        ('tipo_registro', 1, 'A'),
+        ('tipo_cuenta', 1, 'A'),
+        ('cuenta', 10, 'N'),
+        ('centavos', 15, 'N'),
+        ('cedula', 13, 'A'),
+        ('nombre', 40, 'A'),
+        ('banco', 3, 'N'),
+        ('referencia', 20, 'A'),
+    ]
+
+    def header(self, totales):
+        return (
+            'C' + self.field(self.ruc_empresa, 13, 'A') + self.field(self.cuenta_empresa, 10, 'N')
+            + self.fecha_pago.strftime('%Y%m%d') + self.field(totales['registros'], 6, 'N')
+            + self.field(totales['centavos'], 15, 'N')
+        ).ljust(sum(ancho for _, ancho, _ in self.CAMPOS))
+
+    def detail(self, pago):
+        return super().detail(dict(pago, tipo_registro='D'))
+
+
+@register_layout
+class PacificoLayout(FixedWidthLayout):
+    """Banco del Pacífico: ancho fijo con registro final de totales"""
+
+    banco = '003'
+    nombre = Config.BANCOS['003']
+    longitud_cuenta = (8, 10)
+    CAMPOS = [
+        ('secuencia', 6, 'N'),
+        ('cedula', 10, 'A'),
+        ('nombre', 30, 'A'),
+        ('banco', 3, 'N'),
+        ('tipo_cuenta', 1, 'A'),
+        ('cuenta', 10, 'N'),
+        ('centavos', 15, 'N'),
+        ('referencia', 20, 'A'),
+    ]
+
+    def footer(self, totales):
+        return ('T' + self.field(totales['registros'], 6, 'N') + self.field(totales['centavos'], 15, 'N')
+                + self.fecha_pago.strftime('%Y%m%d')).ljust(sum(ancho for _, ancho, _ in self.CAMPOS))
+
+
+def get_layout(banco):
+    """Clase de formato del banco pagador (GenericLayout si no tiene uno propio)"""
+    return LAYOUTS.get(banco, LAYOUTS[None])
+
+
+class BankPaymentService:
+    """
+    Generación del archivo de pago de sueldos de un período
+
+    Los roles pagables y los datos bancarios del empleado salen de una sola
+    consulta que se lee por lotes; cada lote se valida por columnas (cuenta,
+    cédula, tipo de cuenta y banco) y se escribe de inmediato. Los pagos
+    rechazados se devuelven con el motivo y no entran en los totales.
+    """
+
+    def __init__(self, session=None):
+        self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            from database.connection import get_session
+            self._session = get_session()
+        return self._session
+
+    def company_parameters(self):
+        """Parámetros EMPRESA_* de rpcontrl"""
+        return dict(self.session.query(Control.parametro, Control.valor).filter(
+            Control.parametro.like('EMPRESA\\_%', escape='\\')
+        ).all())
+
+    @staticmethod
+    def payable_query(periodo):
+        return select(
+            RolPago.id, RolPago.empleado, RolPago.neto_pagar,
+            Empleado.cedula, Empleado.nombres, Empleado.apellidos,
+            Empleado.banco, Empleado.tipo_cuenta, Empleado.cuenta_banco,
+        ).join(
+            Empleado, Empleado.empleado == RolPago.empleado
+        ).where(
+            RolPago.periodo == periodo,
+            RolPago.estado.in_(ESTADOS_PAGABLES),
+            RolPago.neto_pagar > 0,
+        ).order_by(RolPago.empleado)
+
+    def generate(self, periodo, destino=None, banco_empresa=None, cuenta_empresa=None, fecha_pago=None):
+        """
+        Generar el archivo de pagos del período
+
+        Args:
+            periodo: Período YYYY-MM de los roles
+            destino: Directorio de salida (Config.REPORTS_DIR por defecto)
+            banco_empresa: Banco pagador (EMPRESA_BANCO de rpcontrl por defecto)
+            cuenta_empresa: Cuenta de débito (EMPRESA_CUENTA por defecto)
+            fecha_pago: Fecha de acreditación (hoy por defecto)
+
+        Returns:
+            dict: archivo, control, registros, total, hash (SHA-256),
+                  rechazados [{'empleado', 'nombre', 'motivo'}] y tiempo
+        """
+        start_time = time.time()
+        try:
+            parametros = self.company_parameters()
+            banco_empresa = banco_empresa or parametros.get('EMPRESA_BANCO')
+            cuenta_empresa = cuenta_empresa or parametros.get('EMPRESA_CUENTA')
+            if not banco_empresa or not cuenta_empresa:
+                return {
+                    'success': False,
+                    'message': "Configure el banco y la cuenta de la empresa (EMPRESA_BANCO, EMPRESA_CUENTA)"
+                }
+
+            layout = get_layout(banco_empresa)(
+                cuenta_empresa, parametros.get('EMPRESA_RUC', ''),
+                parametros.get('EMPRESA_NOMBRE', Config.COMPANY_NAME), fecha_pago or date.today()
+            )
+
+            destino = Path(destino or Config.REPORTS_DIR)
+            destino.mkdir(parents=True, exist_ok=True)
+            archivo = destino / (
+                f"pagos_{banco_empresa}_{periodo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{layout.extension}"
+            )
+
+            totales = {'registros': 0, 'centavos': 0}
+            rechazados = []
+
+            # Los detalles van a un temporal porque la cabecera lleva los totales
+            with tempfile.TemporaryFile() as detalles:
+                result = self.session.execute(
+                    self.payable_query(periodo).execution_options(yield_per=LOTE_PAGOS)
+                )
+                for lote in result.partitions():
+                    pagos = self._validate_batch(lote, rechazados, periodo, layout)
+                    for pago in pagos:
+                        totales['registros'] += 1
+                        pago['secuencia'] = totales['registros']
+                        totales['centavos'] += pago['centavos']
+                        detalles.write((layout.detail(pago) + layout.fin_linea).encode('ascii', 'replace'))
+
+                if not totales['registros']:
+                    return {
+                        'success': False,
+                        'message': f"No hay roles {', '.join(ESTADOS_PAGABLES)} con pagos válidos en {periodo}",
+                        'rechazados': rechazados,
+                    }
+
+                digest = hashlib.sha256()
+                with open(archivo, 'wb') as fh:
+                    def escribir(datos):
+                        digest.update(datos)
+                        fh.write(datos)
+
+                    cabecera = layout.header(totales)
+                    if cabecera is not None:
+                        escribir((cabecera + layout.fin_linea).encode('ascii', 'replace'))
+                    detalles.seek(0)
+                    for bloque in iter(lambda: detalles.read(1024 * 1024), b''):
+                        escribir(bloque)
+                    pie = layout.footer(totales)
+                    if pie is not None:
+                        escribir((pie + layout.fin_linea).encode('ascii', 'replace'))
+
+            total = Decimal(totales['centavos']) / 100
+            control = self._write_control(archivo, layout, periodo, totales, total, digest.hexdigest())
+
+            logger.info(
+                f"Archivo de pagos {archivo.name}: {totales['registros']} pagos por {total}, "
+                f"{len(rechazados)} rechazados"
+            )
+            return {
+                'success': True,
+                'archivo': str(archivo),
+                'control': str(control),
+                'registros': totales['registros'],
+                'total': total,
+                'hash': digest.hexdigest(),
+                'rechazados': rechazados,
+                'tiempo': time.time() - start_time,
+            }
+
+        except Exception as e:
+            logger.error(f"Error generando archivo de pagos: {e}")
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+    @staticmethod
+    def _validate_batch(lote, rechazados, periodo, layout):
+        """
+        Validar un lote por columnas; devuelve los pagos válidos como dicts
+
+        La cuenta debe tener el largo del banco del empleado y además caber
+        en el campo de cuenta del formato del banco pagador (layout).
+        """
+        cuentas = np.array([(r.cuenta_banco or '').strip() for r in lote], dtype=str)
+        tipos = np.array([(r.tipo_cuenta or '').strip().upper() for r in lote], dtype=str)
+        bancos = np.array([(r.banco or '').strip() for r in lote], dtype=str)
+
+        motivos = np.full(len(lote), None, dtype=object)
+
+        # Se asignan de menor a mayor prioridad: prevalece el último motivo asignado
+        codigos = codigos_cedula([r.cedula for r in lote])
+        for codigo in np.unique(codigos[codigos != VALIDO]):
+            motivos[codigos == codigo] = f"Cédula: {MENSAJES_VALIDACION[codigo].lower()}"
+        motivos[~np.isin(tipos, list(TIPOS_CUENTA))] = "Tipo de cuenta debe ser A (ahorros) o C (corriente)"
+        # El largo de la cuenta depende del banco del empleado
+        for banco in np.unique(bancos):
+            del_banco = bancos == banco
+            codigos = np.full(len(lote), VALIDO, dtype=np.int8)
+            codigos[del_banco] = codigos_cuenta(cuentas[del_banco], *get_layout(banco).longitud_cuenta)
+            for codigo in np.unique(codigos[codigos != VALIDO]):
+                motivos[codigos == codigo] = f"Cuenta: {MENSAJES_VALIDACION[codigo].lower()}"
+        if layout.ancho_cuenta:
+            motivos[np.char.str_len(cuentas) > layout.ancho_cuenta] = (
+                f"Cuenta: excede los {layout.ancho_cuenta} dígitos del formato de {layout.nombre}")
+        motivos[~np.isin(bancos, list(Config.BANCOS))] = "Banco no registrado"
+
+        pagos = []
+        for i, r in enumerate(lote):
+            nombre = f"{r.apellidos} {r.nombres}"
+            if motivos[i] is not None:
+                rechazados.append({'empleado': r.empleado, 'nombre': nombre, 'motivo': motivos[i]})
+                continue
+            valor = Decimal(str(r.neto_pagar)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            pagos.append({
+                'rol_id': r.id,
+                'empleado': r.empleado,
+                'cedula': r.cedula,
+                'nombre': nombre,
+                'banco': bancos[i],
+                'tipo_cuenta': tipos[i],
+                'cuenta': cuentas[i],
+                'valor': valor,
+                'centavos': int(valor * 100),
+                'referencia': f"ROL {periodo}",
+            })
+        return pagos
+
+    @staticmethod
+    def _write_control(archivo, layout, periodo, totales, total, hash_archivo):
+        """Archivo de control junto al de pagos: totales y SHA-256"""
+        control = archivo.with_name(archivo.name + '.control.txt')
+        control.write_text(
+            f"ARCHIVO: {archivo.name}\n"
+            f"BANCO: {layout.banco or '-'} {layout.nombre}\n"
+            f"PERIODO: {periodo}\n"
+            f"FECHA_PAGO: {layout.fecha_pago.strftime('%d/%m/%Y')}\n"
+            f"REGISTROS: {totales['registros']}\n"
+            f"TOTAL: {total:.2f}\n"
+            f"SHA256: {hash_archivo}\n",
+            encoding='utf-8'
+        )
+        return control
+
+
+# Instancia global
+bank_payment_service = BankPaymentService()
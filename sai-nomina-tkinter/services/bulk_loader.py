@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BulkLoader - Sistema SGN
+Carga masiva en segundo plano: validación por bloques en paralelo, simulación
+(insertar / actualizar / sin cambios) y escritura masiva en una transacción
+"""
+
+import sys
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from decimal import Decimal
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select, func, tuple_
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, String
+from sqlalchemy.orm import Session as OrmSession
+from sqlalchemy.pool import NullPool
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.employee_index import install_employee_index_listeners
+from database.models import (
+    Empleado, RolPago, Prestamo, Vacacion, IngresoDescuento, Dotacion, Liquidacion
+)
+from utils.validators import codigos_cedula, codigos_email, MENSAJES_VALIDACION, VALIDO
+
+logger = logging.getLogger(__name__)
+
+# entity_type de CargaMasivaComponent -> modelo y clave natural para detectar
+# filas existentes (sin clave, cada fila del archivo es un registro nuevo)
+ENTIDADES = {
+    'empleados': {
+        'modelo': Empleado,
+        'clave': ('cedula',),
+        'mayusculas': ('nombres', 'apellidos'),
+        'por_defecto': {'fecha_ing': date.today, 'estado': 'ACT'},
+    },
+    'nomina': {'modelo': RolPago, 'clave': ('empleado', 'periodo')},
+    'prestamos': {'modelo': Prestamo, 'clave': None},
+    'vacaciones': {'modelo': Vacacion, 'clave': None},
+    'egresos_ingresos': {'modelo': IngresoDescuento, 'clave': None},
+    'dotacion': {'modelo': Dotacion, 'clave': None},
+    'liquidaciones': {'modelo': Liquidacion, 'clave': None},
+}
+
+BOOLEANOS = {
+    '1': True, 'si': True, 'sí': True, 's': True, 'true': True, 'x': True, 'verdadero': True,
+    '0': False, 'no': False, 'n': False, 'false': False, 'falso': False,
+}
+
+# Formatos de fecha aceptados en texto, en orden (día/mes primero, como en Ecuador)
+FORMATOS_FECHA = ('%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%m-%Y')
+
+# Bloques en validación al mismo tiempo por hilo (acota la memoria)
+BLOQUES_POR_HILO = 2
+
+
+class BulkLoadError(Exception):
+    """La carga no se puede completar (mapeo incompleto, errores o cancelación)"""
+
+
+def _comparable(valor):
+    """Valor normalizado para decidir si una fila cambió"""
+    if isinstance(valor, (Decimal, float)):
+        return round(float(valor), 4)
+    if isinstance(valor, datetime):
+        return valor.replace(microsecond=0)
+    return valor
+
+
+def _mostrar(valor):
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return ''
+    return str(valor)[:50]
+
+
+class BulkLoader:
+    """
+    Carga masiva de un archivo en la tabla de una entidad
+
+    Los bloques del archivo se validan y convierten en un grupo de hilos
+    (pandas y NumPy por columna); la clasificación contra la base y la
+    escritura se hacen en orden, en el hilo que llama a run(), sobre una
+    conexión propia. Con dry_run=True solo se cuentan las filas a insertar,
+    actualizar o sin cambios; con dry_run=False todo el archivo se escribe
+    con bulk_insert_mappings / bulk_update_mappings en una sola transacción.
+
+    Args:
+        entity_type: Clave de ENTIDADES
+        mapping: {columna del archivo: campo del modelo}
+        workers: Hilos de validación (Config.IMPORT_WORKERS por defecto)
+        engine: Engine a usar (uno propio sin pool por defecto)
+    """
+
+    def __init__(self, entity_type, mapping, workers=None, engine=None):
+        if entity_type not in ENTIDADES:
+            raise BulkLoadError(f"Carga masiva no disponible para {entity_type}")
+        spec = ENTIDADES[entity_type]
+        self.entity_type = entity_type
+        self.model = spec['modelo']
+        self.table = self.model.__table__
+        self.clave = spec['clave']
+        self.mayusculas = spec.get('mayusculas', ())
+        self.por_defecto = spec.get('por_defecto', {})
+        self.workers = workers or Config.IMPORT_WORKERS
+        self._engine = engine
+        self._cancelado = threading.Event()
+
+        columnas = self.table.columns
+        self.mapping = {col: campo for col, campo in mapping.items() if campo in columnas}
+        self.ignorados = sorted({campo for campo in mapping.values() if campo not in columnas})
+        self.pk = next(iter(self.table.primary_key.columns))
+
+        mapeados = set(self.mapping.values())
+        requeridos = {
+            c.name for c in columnas
+            if not c.nullable and not c.primary_key and c.default is None
+            and c.name not in self.por_defecto
+        }
+        # Sin clave natural todo es inserción: los obligatorios se exigen por fila
+        self.requeridos = set(self.clave or ()) | (requeridos if not self.clave else set())
+        self.requeridos_insercion = requeridos
+        self.faltantes = sorted((self.requeridos | requeridos) - mapeados)
+
+    def cancel(self):
+        """Detener la carga al terminar el bloque en curso"""
+        self._cancelado.set()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            # Conexión propia: la transacción de la carga no se mezcla con la
+            # sesión compartida de la interfaz
+            self._engine = create_engine(
+                Config.DATABASE_URL, poolclass=NullPool, connect_args={"timeout": 30}
+            )
+            # Los empleados cargados deben aparecer en la búsqueda sin esperar
+            # a otro commit de la aplicación
+            install_employee_index_listeners(self._engine)
+        return self._engine
+
+    # Validación (se ejecuta en los hilos del grupo)
+
+    def prepare(self, chunk, referencias):
+        """
+        Validar y convertir un bloque
+
+        Returns:
+            (DataFrame de filas válidas con campos del modelo, lista de errores
+            {'fila', 'campo', 'valor', 'error'}, cantidad de filas con error)
+        """
+        errores = []
+        invalidas = np.zeros(len(chunk), dtype=bool)
+        datos = {}
+
+        def anotar(mascara, campo, origen, mensaje):
+            for posicion in np.flatnonzero(mascara):
+                errores.append({
+                    'fila': int(chunk.index[posicion]) + 2,
+                    'campo': campo,
+                    'valor': _mostrar(origen[posicion]),
+                    'error': mensaje,
+                })
+            np.logical_or(invalidas, mascara, out=invalidas)
+
+        for columna_archivo, campo in self.mapping.items():
+            if columna_archivo not in chunk.columns:
+                continue
+            origen = chunk[columna_archivo].to_numpy(dtype=object)
+            texto = pd.Series(
+                [None if v is None or v != v or str(v).strip() == '' else str(v).strip() for v in origen],
+                dtype=object
+            )
+            presentes = texto.notna().to_numpy()
+            tipo = self.table.c[campo].type
+
+            if isinstance(tipo, (Date, DateTime)):
+                # Celdas de fecha (Excel) tal cual; el texto, con formatos explícitos
+                es_fecha = presentes & np.array([isinstance(v, (date, np.datetime64)) for v in origen], dtype=bool)
+                fechas = pd.Series(pd.NaT, index=texto.index, dtype='datetime64[us]')
+                if es_fecha.any():
+                    fechas[es_fecha] = pd.to_datetime(pd.Series(origen[es_fecha], index=texto.index[es_fecha]))
+                for formato in FORMATOS_FECHA:
+                    pendientes = presentes & fechas.isna().to_numpy()
+                    if not pendientes.any():
+                        break
+                    fechas[pendientes] = pd.to_datetime(texto[pendientes], errors='coerce', format=formato)
+                anotar(presentes & fechas.isna().to_numpy(), campo, origen, "Fecha inválida")
+                convertidas = fechas.dt.date if isinstance(tipo, Date) else fechas.dt.to_pydatetime()
+                valores = pd.Series(convertidas, dtype=object).where(fechas.notna(), None)
+
+            elif isinstance(tipo, (Numeric, Integer)):
+                numeros = pd.to_numeric(texto, errors='coerce').to_numpy(dtype=float)
+                nulos = np.isnan(numeros)
+                anotar(presentes & nulos, campo, origen, "Debe ser numérico")
+                anotar(~nulos & (numeros < 0), campo, origen, "No puede ser negativo")
+                if isinstance(tipo, Integer):
+                    anotar(~nulos & (numeros != np.round(numeros)), campo, origen, "Debe ser entero")
+                    valores = pd.Series([None if n else int(v) for v, n in zip(numeros, nulos)], dtype=object)
+                else:
+                    escala = tipo.scale if tipo.scale is not None else 2
+                    valores = pd.Series(
+                        [None if n else Decimal(str(round(v, escala))) for v, n in zip(numeros, nulos)],
+                        dtype=object
+                    )
+
+            elif isinstance(tipo, Boolean):
+                valores = texto.str.lower().map(BOOLEANOS)
+                anotar(presentes & valores.isna().to_numpy(), campo, origen, "Debe ser Sí o No")
+                valores = valores.astype(object).where(valores.notna(), None)
+
+            else:
+                valores = texto
+                if campo == 'cedula':
+                    codigos = codigos_cedula(texto.to_numpy())
+                    for codigo in np.unique(codigos[presentes & (codigos != VALIDO)]):
+                        anotar(presentes & (codigos == codigo), campo, origen,
+                               f"Cédula inválida ({MENSAJES_VALIDACION[codigo].lower()})")
+                elif campo == 'email':
+                    anotar(presentes & (codigos_email(texto.to_numpy()) != VALIDO), campo, origen, "Email inválido")
+                if campo in self.mayusculas:
+                    valores = valores.str.upper()
+                longitud = getattr(tipo, 'length', None)
+                if longitud:
+                    valores = valores.str[:longitud]
+
+            datos[campo] = valores.reset_index(drop=True)
+
+        # Empleado referido por código o cédula
+        if 'empleado' in datos and self.model is not Empleado:
+            originales = datos['empleado']
+            codigos = originales.map(referencias['empleados'])
+            anotar(originales.notna().to_numpy() & codigos.isna().to_numpy(), 'empleado',
+                   originales.to_numpy(dtype=object), "Empleado no registrado")
+            datos['empleado'] = codigos.astype(object).where(codigos.notna(), None)
+
+        for campo in self.requeridos:
+            valores = datos.get(campo)
+            if valores is not None:
+                anotar(valores.isna().to_numpy() & ~invalidas, campo,
+                       np.full(len(chunk), '', dtype=object), "Campo obligatorio vacío")
+
+        registros = pd.DataFrame(datos)
+        registros.index = chunk.index
+        registros = registros.astype(object).where(registros.notna(), None)
+        return registros[~invalidas], errores, int(invalidas.sum())
+
+    # Clasificación y escritura (hilo de run())
+
+    def run(self, reader, dry_run=True, skip_errors=True, on_errors=None, on_progress=None):
+        """
+        Recorrer el archivo completo
+
+        Args:
+            reader: ChunkedFileReader del archivo
+            dry_run: Solo simular (la transacción se descarta)
+            skip_errors: Con False, la primera fila con error cancela la carga
+            on_errors: callback(lista de errores) por bloque
+            on_progress: callback(resumen parcial) por bloque
+
+        Returns:
+            dict: {'total', 'validos', 'errores', 'insertar', 'actualizar',
+                   'sin_cambios', 'ignorados', 'dry_run', 'tiempo'}
+        """
+        if self.faltantes:
+            raise BulkLoadError(f"Campos obligatorios sin mapear: {', '.join(self.faltantes)}")
+
+        start = time.time()
+        self._cancelado.clear()
+        resumen = {
+            'total': 0, 'validos': 0, 'errores': 0, 'insertar': 0, 'actualizar': 0,
+            'sin_cambios': 0, 'ignorados': self.ignorados, 'dry_run': dry_run,
+            'bytes': 0, 'bytes_totales': reader.size,
+        }
+
+        def leido(bytes_leidos, bytes_totales, filas):
+            resumen['bytes'] = bytes_leidos
+
+        with self.engine.connect() as conn:
+            session = OrmSession(bind=conn)
+            try:
+                referencias = self._load_references(conn)
+                self._vistos = {}
+                self._periodos = set()
+
+                pendientes = deque()
+                with ThreadPoolExecutor(self.workers, thread_name_prefix="carga-masiva") as pool:
+                    try:
+                        for chunk in reader.chunks(leido):
+                            pendientes.append((len(chunk), pool.submit(self.prepare, chunk, referencias)))
+                            if len(pendientes) >= self.workers * BLOQUES_POR_HILO:
+                                self._consume(session, conn, pendientes.popleft(), referencias,
+                                              resumen, dry_run, skip_errors, on_errors, on_progress)
+                        while pendientes:
+                            self._consume(session, conn, pendientes.popleft(), referencias,
+                                          resumen, dry_run, skip_errors, on_errors, on_progress)
+                    finally:
+                        for _, futuro in pendientes:
+                            futuro.cancel()
+
+                if dry_run:
+                    conn.rollback()
+                else:
+                    self._refresh_summaries(conn)
+                    conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                session.close()
+                self._vistos = {}
+
+        resumen['tiempo'] = round(time.time() - start, 3)
+        logger.info(
+            f"Carga masiva {self.entity_type} ({'simulación' if dry_run else 'escritura'}): "
+            f"{resumen['insertar']} nuevos, {resumen['actualizar']} actualizados, "
+            f"{resumen['sin_cambios']} sin cambios, {resumen['errores']} con error "
+            f"en {resumen['tiempo']} s"
+        )
+        return resumen
+
+    def _consume(self, session, conn, pendiente, referencias, resumen, dry_run, skip_errors,
+                 on_errors, on_progress):
+        if self._cancelado.is_set():
+            raise BulkLoadError("Carga cancelada por el usuario")
+
+        filas, futuro = pendiente
+        registros, errores, con_error = futuro.result()
+        resumen['total'] += filas
+
+        inserts, updates = self._classify(conn, registros, referencias, resumen, errores)
+        resumen['errores'] += con_error
+        if errores:
+            if on_errors:
+                on_errors(errores)
+            if not skip_errors and not dry_run:
+                raise BulkLoadError(f"Fila {errores[0]['fila']}: {errores[0]['error']}")
+
+        if not dry_run:
+            if inserts:
+                session.bulk_insert_mappings(self.model, inserts, render_nulls=True)
+            if updates:
+                session.bulk_update_mappings(
+                    self.model, sorted(updates.values(), key=lambda m: tuple(sorted(m)))
+                )
+            # Lo escrito ya está en la transacción: las filas siguientes lo
+            # encuentran al consultar la base
+            self._vistos = {}
+
+        resumen['validos'] = resumen['insertar'] + resumen['actualizar'] + resumen['sin_cambios']
+        if on_progress:
+            on_progress(dict(resumen))
+
+    def _classify(self, conn, registros, referencias, resumen, errores):
+        """Decidir para cada fila válida si se inserta, se actualiza o no cambia"""
+        existentes = self._load_existing(conn, registros) if self.clave else {}
+        inserts, updates, nuevos = [], {}, set()
+        pk = self.pk.name
+
+        for fila, registro in zip(registros.index, registros.to_dict('records')):
+            clave = tuple(registro[c] for c in self.clave) if self.clave else None
+            previo = None
+            if clave is not None:
+                previo = self._vistos.get(clave) or existentes.get(clave)
+
+            if previo is None:
+                mapeo = self._new_mapping(registro, referencias)
+                faltan = [c for c in self.requeridos_insercion if mapeo.get(c) is None]
+                if faltan:
+                    resumen['errores'] += 1
+                    for campo in faltan:
+                        errores.append({'fila': int(fila) + 2, 'campo': campo, 'valor': '',
+                                        'error': "Campo obligatorio vacío"})
+                    continue
+                inserts.append(mapeo)
+                resumen['insertar'] += 1
+                if clave is not None:
+                    self._vistos[clave] = mapeo
+                    nuevos.add(clave)
+                if 'periodo' in mapeo and self.model is RolPago:
+                    self._periodos.add(mapeo['periodo'])
+                continue
+
+            cambios = {
+                c: v for c, v in registro.items()
+                if c != pk and v is not None and _comparable(v) != _comparable(previo.get(c))
+            }
+            if not cambios:
+                resumen['sin_cambios'] += 1
+                continue
+
+            resumen['actualizar'] += 1
+            previo.update(cambios)
+            self._vistos[clave] = previo
+            if clave not in nuevos:
+                updates.setdefault(previo[pk], {pk: previo[pk]}).update(cambios)
+            if self.model is RolPago:
+                self._periodos.add(previo.get('periodo'))
+
+        return inserts, updates
+
+    def _new_mapping(self, registro, referencias):
+        mapeo = dict(registro)
+        for campo, defecto in self.por_defecto.items():
+            if mapeo.get(campo) is None:
+                mapeo[campo] = defecto() if callable(defecto) else defecto
+        for campo in list(mapeo):
+            default = self.table.c[campo].default
+            if mapeo[campo] is None and default is not None and default.is_scalar:
+                mapeo[campo] = default.arg
+        if 'created_by' in self.table.c and 'created_by' not in mapeo:
+            mapeo['created_by'] = 'IMPORT'
+
+        if self.clave and not mapeo.get(self.pk.name):
+            # Clave primaria asignada aquí para poder actualizar la fila si
+            # el archivo la repite más adelante
+            referencias['ultimo_pk'] += 1
+            siguiente = referencias['ultimo_pk']
+            mapeo[self.pk.name] = str(siguiente).zfill(6) if isinstance(self.pk.type, String) else siguiente
+        return mapeo
+
+    def _load_references(self, conn):
+        referencias = {'empleados': {}, 'ultimo_pk': 0}
+        if self.model is not Empleado and 'empleado' in self.mapping.values():
+            for codigo, cedula in conn.execute(select(Empleado.empleado, Empleado.cedula)):
+                referencias['empleados'][codigo] = codigo
+                if cedula:
+                    referencias['empleados'][cedula] = codigo
+
+        if self.clave:
+            if isinstance(self.pk.type, String):
+                codigos = conn.execute(select(self.pk)).scalars()
+                referencias['ultimo_pk'] = max(
+                    [int(c) for c in codigos if c and c.isdigit()] or [1000])
+            else:
+                referencias['ultimo_pk'] = conn.execute(
+                    select(func.coalesce(func.max(self.pk), 0))).scalar()
+        return referencias
+
+    def _load_existing(self, conn, registros):
+        """Filas de la base con las claves del bloque: {clave: {campo: valor}}"""
+        claves = {tuple(r) for r in registros[list(self.clave)].itertuples(index=False, name=None)}
+        claves -= set(self._vistos)
+        if not claves:
+            return {}
+
+        columnas = [self.pk] + [self.table.c[c] for c in set(self.mapping.values()) | set(self.clave)
+                                if c != self.pk.name]
+        columnas_clave = [self.table.c[c] for c in self.clave]
+        existentes = {}
+        claves = list(claves)
+        for inicio in range(0, len(claves), 500):
+            lote = claves[inicio:inicio + 500]
+            if len(columnas_clave) == 1:
+                condicion = columnas_clave[0].in_([c[0] for c in lote])
+            else:
+                condicion = tuple_(*columnas_clave).in_(lote)
+            for row in conn.execute(select(*columnas).where(condicion)):
+                datos = dict(row._mapping)
+                existentes[tuple(datos[c] for c in self.clave)] = datos
+        return existentes
+
+    def _refresh_summaries(self, conn):
+        # Las escrituras masivas no pasan por el flush del ORM
+        from database.summaries import refresh_departments, refresh_period
+        if self.model is Empleado:
+            refresh_departments(conn)
+        for periodo in sorted(p for p in self._periodos if p):
+            refresh_period(conn, periodo)
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IessPlanilla - Sistema SGN
+Planilla mensual de aportes al IESS: materia gravada, aportes personal y
+patronal y novedades por empleado, escrita en una sola pasada y cuadrada
+contra el resumen del período
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime
+from decimal import Decimal
+import hashlib
+import logging
+import time
+
+import numpy as np
+from sqlalchemy import select, func
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.models import Empleado, RolPago, Control
+from services.bank_payments import FixedWidthLayout
+from utils.validators import codigos_cedula, MENSAJES_VALIDACION, VALIDO
+
+logger = logging.getLogger(__name__)
+
+# Roles que entran en la planilla
+ESTADOS_PLANILLA = ('CALCULADO', 'PROCESADO', 'PAGADO')
+
+NOVEDADES = {
+    '': 'Sin novedad',
+    'ENT': 'Aviso de entrada',
+    'SAL': 'Aviso de salida',
+    'DNL': 'Días no laborados',
+}
+
+# Días que cubre un mes completo de aportes
+DIAS_MES = 30
+
+# Filas leídas por lote del cursor
+LOTE_PLANILLA = 2000
+
+
+class IessLayout(FixedWidthLayout):
+    """
+    Archivo plano de la planilla de aportes
+
+    Cabecera con el empleador y el período, un detalle por afiliado con
+    valores en centavos y un registro final de totales, para que el archivo
+    se escriba sin volver atrás. La estructura sigue el formato general de
+    carga de planillas; debe confirmarse con la especificación vigente del
+    IESS antes de subir el archivo.
+    """
+
+    nombre = 'IESS'
+    CAMPOS = [
+        ('tipo_registro', 1, 'A'),
+        ('cedula', 10, 'A'),
+        ('nombre', 40, 'A'),
+        ('novedad', 3, 'A'),
+        ('fecha_novedad', 8, 'A'),
+        ('dias', 2, 'N'),
+        ('aportable', 14, 'N'),
+        ('personal', 14, 'N'),
+        ('patronal', 14, 'N'),
+    ]
+
+    def __init__(self, ruc_empresa, sucursal, periodo):
+        super().__init__('', ruc_empresa, '', None)
+        self.sucursal = sucursal
+        self.periodo = periodo
+
+    @property
+    def ancho(self):
+        return sum(ancho for _, ancho, _ in self.CAMPOS)
+
+    def header(self, totales):
+        anio, mes = self.periodo.split('-')
+        return ('C' + self.field(self.ruc_empresa, 13, 'A') + self.field(self.sucursal, 4, 'N')
+                + anio + mes + 'AAP').ljust(self.ancho)
+
+    def detail(self, aporte):
+        return super().detail(dict(aporte, tipo_registro='D'))
+
+    def footer(self, totales):
+        return ('T' + self.field(totales['registros'], 6, 'N') + self.field(totales['aportable'], 14, 'N')
+                + self.field(totales['personal'], 14, 'N')
+                + self.field(totales['patronal'], 14, 'N')).ljust(self.ancho)
+
+
+def _centavos(valores):
+    """Columna de montos (Decimal/None) a centavos int64; None queda en -1"""
+    montos = np.array([-0.01 if v is None else float(v) for v in valores], dtype=np.float64)
+    return np.rint(montos * 100).astype(np.int64)
+
+
+def _fechas(valores):
+    return np.array([v if v is not None else 'NaT' for v in valores], dtype='datetime64[D]')
+
+
+class IessPlanillaService:
+    """
+    Generación de la planilla de aportes de un período
+
+    Los roles del período y los datos del afiliado salen de una consulta
+    leída por lotes. Cada lote se calcula por columnas en centavos enteros:
+    materia gravada (total de ingresos del rol), aporte personal (el
+    retenido en el rol, o la tasa si falta), aporte patronal con la misma
+    tasa que usa el resumen de nómina, y la novedad según las fechas de
+    ingreso y salida y los días trabajados. Los totales del archivo se
+    comparan con resumen_nomina.
+    """
+
+    def __init__(self, session=None, parameters=None):
+        self._session = session
+        self._parameters = parameters
+
+    @property
+    def session(self):
+        if self._session is None:
+            from database.connection import get_session
+            self._session = get_session()
+        return self._session
+
+    @property
+    def parameters(self):
+        """Tasas de aporte (misma fuente que PayrollCalculator y el resumen)"""
+        if self._parameters is None:
+            from services.payroll_calculator import payroll_calculator
+            self._parameters = payroll_calculator.parameters
+        return self._parameters
+
+    def company_parameters(self):
+        """Parámetros EMPRESA_* de rpcontrl"""
+        return dict(self.session.query(Control.parametro, Control.valor).filter(
+            Control.parametro.like('EMPRESA\\_%', escape='\\')
+        ).all())
+
+    @staticmethod
+    def planilla_query(periodo):
+        return select(
+            RolPago.empleado, RolPago.dias_trabajados, RolPago.sueldo_basico,
+            RolPago.total_ingresos, RolPago.aporte_iess, RolPago.fecha_desde, RolPago.fecha_hasta,
+            Empleado.cedula, Empleado.nombres, Empleado.apellidos,
+            Empleado.fecha_ing, Empleado.fecha_sal,
+        ).join(
+            Empleado, Empleado.empleado == RolPago.empleado
+        ).where(
+            RolPago.periodo == periodo,
+            RolPago.estado.in_(ESTADOS_PLANILLA),
+        ).order_by(RolPago.empleado)
+
+    def generate(self, periodo, destino=None, sucursal=None):
+        """
+        Generar la planilla de aportes del período
+
+        Args:
+            periodo: Período YYYY-MM de los roles
+            destino: Directorio de salida (Config.REPORTS_DIR por defecto)
+            sucursal: Código de sucursal IESS (EMPRESA_SUCURSAL_IESS por defecto)
+
+        Returns:
+            dict: archivo, control, registros, totales (aportable, personal,
+                  patronal), novedades {código: cantidad}, conciliacion,
+                  cuadrada, rechazados [{'empleado', 'nombre', 'motivo', montos
+                  en centavos}],
+                  hash (SHA-256) y tiempo
+        """
+        start_time = time.time()
+        try:
+            parametros = self.company_parameters()
+            ruc = parametros.get('EMPRESA_RUC')
+            if not ruc:
+                return {'success': False, 'message': "Configure el RUC de la empresa (EMPRESA_RUC)"}
+
+            layout = IessLayout(ruc, sucursal or parametros.get('EMPRESA_SUCURSAL_IESS') or '0001', periodo)
+            tasas = (
+                Decimal(str(self.parameters["APORTE_PERSONAL_IESS"])),
+                Decimal(str(self.parameters["APORTE_PATRONAL_IESS"])),
+            )
+
+            destino = Path(destino or Config.REPORTS_DIR)
+            destino.mkdir(parents=True, exist_ok=True)
+            archivo = destino / f"iess_aportes_{periodo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+
+            totales = {'registros': 0, 'aportable': 0, 'personal': 0, 'patronal': 0}
+            novedades = dict.fromkeys(NOVEDADES, 0)
+            rechazados = []
+            digest = hashlib.sha256()
+
+            with open(archivo, 'wb') as fh:
+                def escribir(linea):
+                    datos = (linea + layout.fin_linea).encode('ascii', 'replace')
+                    digest.update(datos)
+                    fh.write(datos)
+
+                escribir(layout.header(totales))
+                result = self.session.execute(
+                    self.planilla_query(periodo).execution_options(yield_per=LOTE_PLANILLA)
+                )
+                for lote in result.partitions():
+                    for aporte in self._calculate_batch(lote, tasas, rechazados):
+                        totales['registros'] += 1
+                        totales['aportable'] += aporte['aportable']
+                        totales['personal'] += aporte['personal']
+                        totales['patronal'] += aporte['patronal']
+                        novedades[aporte['novedad']] += 1
+                        escribir(layout.detail(aporte))
+                escribir(layout.footer(totales))
+
+            if not totales['registros']:
+                archivo.unlink()
+                return {
+                    'success': False,
+                    'message': f"No hay roles {', '.join(ESTADOS_PLANILLA)} válidos en {periodo}",
+                    'rechazados': rechazados,
+                }
+
+            montos = {k: Decimal(totales[k]) / 100 for k in ('aportable', 'personal', 'patronal')}
+            conciliacion = self.reconcile(periodo, totales['registros'], montos, rechazados)
+            cuadrada = all(c['cuadra'] for c in conciliacion.values())
+            control = self._write_control(archivo, layout, totales, montos, novedades,
+                                          conciliacion, rechazados, digest.hexdigest())
+
+            logger.info(
+                f"Planilla IESS {archivo.name}: {totales['registros']} afiliados, "
+                f"aportes {montos['personal'] + montos['patronal']}, "
+                f"{'cuadrada' if cuadrada else 'NO cuadra'} con el resumen"
+            )
+            return {
+                'success': True,
+                'archivo': str(archivo),
+                'control': str(control),
+                'registros': totales['registros'],
+                'totales': montos,
+                'novedades': {k: v for k, v in novedades.items() if v},
+                'conciliacion': conciliacion,
+                'cuadrada': cuadrada,
+                'rechazados': rechazados,
+                'hash': digest.hexdigest(),
+                'tiempo': time.time() - start_time,
+            }
+
+        except Exception as e:
+            logger.error(f"Error generando planilla IESS: {e}")
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+    @staticmethod
+    def _calculate_batch(lote, tasas, rechazados):
+        """Calcular un lote por columnas; devuelve los aportes válidos como dicts"""
+        tasa_personal, tasa_patronal = (float(t) for t in tasas)
+
+        ingresos = _centavos([r.total_ingresos for r in lote])
+        sueldos = _centavos([r.sueldo_basico for r in lote])
+        retenidos = _centavos([r.aporte_iess for r in lote])
+
+        # Materia gravada: total de ingresos del rol, o el sueldo si no se calculó
+        aportable = np.where(ingresos >= 0, ingresos, np.maximum(sueldos, 0))
+        personal = np.where(retenidos >= 0, retenidos,
+                            np.floor(aportable * tasa_personal + 0.5).astype(np.int64))
+        patronal = np.floor(aportable * tasa_patronal + 0.5).astype(np.int64)
+
+        dias = np.array([DIAS_MES if r.dias_trabajados is None else r.dias_trabajados for r in lote],
+                        dtype=np.int64).clip(0, DIAS_MES)
+
+        # Novedades de menor a mayor prioridad: prevalece la última asignada
+        desde = _fechas([r.fecha_desde for r in lote])
+        hasta = _fechas([r.fecha_hasta for r in lote])
+        ingreso = _fechas([r.fecha_ing for r in lote])
+        salida = _fechas([r.fecha_sal for r in lote])
+        novedad = np.full(len(lote), '', dtype='<U3')
+        fecha_novedad = np.full(len(lote), 'NaT', dtype='datetime64[D]')
+        novedad[dias < DIAS_MES] = 'DNL'
+        entra = (ingreso >= desde) & (ingreso <= hasta)
+        novedad[entra], fecha_novedad[entra] = 'ENT', ingreso[entra]
+        sale = (salida >= desde) & (salida <= hasta)
+        novedad[sale], fecha_novedad[sale] = 'SAL', salida[sale]
+
+        motivos = np.full(len(lote), None, dtype=object)
+        codigos = codigos_cedula([r.cedula for r in lote])
+        for codigo in np.unique(codigos[codigos != VALIDO]):
+            motivos[codigos == codigo] = f"Cédula: {MENSAJES_VALIDACION[codigo].lower()}"
+        motivos[aportable <= 0] = "Sin materia gravada"
+
+        aportes = []
+        for i, r in enumerate(lote):
+            nombre = f"{r.apellidos} {r.nombres}"
+            if motivos[i] is not None:
+                rechazados.append({
+                    'empleado': r.empleado, 'nombre': nombre, 'motivo': motivos[i],
+                    'aportable': int(aportable[i]), 'personal': int(personal[i]), 'patronal': int(patronal[i]),
+                })
+                continue
+            aportes.append({
+                'empleado': r.empleado,
+                'cedula': r.cedula,
+                'nombre': nombre,
+                'novedad': str(novedad[i]),
+                'fecha_novedad': '' if np.isnat(fecha_novedad[i]) else str(fecha_novedad[i]).replace('-', ''),
+                'dias': int(dias[i]),
+                'aportable': int(aportable[i]),
+                'personal': int(personal[i]),
+                'patronal': int(patronal[i]),
+            })
+        return aportes
+
+    def reconcile(self, periodo, registros, montos, rechazados=()):
+        """
+        Comparar los totales de la planilla con resumen_nomina
+
+        El aporte patronal del resumen se redondea por departamento y el de
+        la planilla por afiliado, así que se admite medio centavo por
+        afiliado de diferencia; el resto debe coincidir exactamente. Junto a
+        cada diferencia se informa cuánto corresponde a los rechazados.
+        """
+        from database.summaries import get_period_summary
+
+        resumen = get_period_summary(self.session, periodo)
+        esperado = {
+            'afiliados': resumen.empleados if resumen else 0,
+            'aportable': Decimal(str(resumen.total_ingresos or 0)) if resumen else Decimal('0'),
+            'personal': Decimal(str(resumen.aporte_iess_personal or 0)) if resumen else Decimal('0'),
+            'patronal': Decimal(str(resumen.aporte_iess_patronal or 0)) if resumen else Decimal('0'),
+        }
+        planilla = {'afiliados': registros, **montos}
+        fuera = {'afiliados': len(rechazados)}
+        for clave in montos:
+            fuera[clave] = Decimal(sum(r[clave] for r in rechazados)) / 100
+        tolerancia = {'patronal': (Decimal('0.005') * registros).quantize(Decimal('0.01'))}
+
+        conciliacion = {}
+        for clave, valor in planilla.items():
+            diferencia = valor - esperado[clave]
+            conciliacion[clave] = {
+                'planilla': valor,
+                'resumen': esperado[clave],
+                'diferencia': diferencia,
+                'rechazados': fuera[clave],
+                'cuadra': abs(diferencia) <= tolerancia.get(clave, 0),
+            }
+
+        if any(not c['cuadra'] for c in conciliacion.values()):
+            excluidos = self.session.execute(
+                select(func.count()).select_from(RolPago).where(
+                    RolPago.periodo == periodo, ~RolPago.estado.in_(ESTADOS_PLANILLA)
+                )
+            ).scalar()
+            if excluidos:
+                logger.warning(f"Planilla IESS {periodo}: {excluidos} roles fuera de {ESTADOS_PLANILLA}")
+        return conciliacion
+
+    @staticmethod
+    def _write_control(archivo, layout, totales, montos, novedades, conciliacion, rechazados, hash_archivo):
+        """Archivo de control junto a la planilla: totales, novedades, cuadre, rechazos y SHA-256"""
+        control = archivo.with_name(archivo.name + '.control.txt')
+        lineas = [
+            f"ARCHIVO: {archivo.name}",
+            f"RUC: {layout.ruc_empresa}  SUCURSAL: {layout.sucursal}",
+            f"PERIODO: {layout.periodo}",
+            f"AFILIADOS: {totales['registros']}",
+            f"MATERIA_GRAVADA: {montos['aportable']:.2f}",
+            f"APORTE_PERSONAL: {montos['personal']:.2f}",
+            f"APORTE_PATRONAL: {montos['patronal']:.2f}",
+        ]
+        lineas += [f"NOVEDAD {codigo or '---'}: {cantidad}  {NOVEDADES[codigo]}"
+                   for codigo, cantidad in novedades.items() if cantidad]
+        for clave, c in conciliacion.items():
+            lineas.append(
+                f"CUADRE {clave.upper()}: planilla {c['planilla']} resumen {c['resumen']} "
+                f"diferencia {c['diferencia']} (rechazados {c['rechazados']}) {'OK' if c['cuadra'] else 'NO CUADRA'}"
+            )
+        lineas += [f"RECHAZADO {r['empleado']} {r['nombre']}: {r['motivo']} ({r['aportable'] / 100:.2f})"
+                   for r in rechazados]
+        lineas.append(f"SHA256: {hash_archivo}")
+        control.write_text('\n'.join(lineas) + '\n', encoding='utf-8')
+        return control
+
+
+# Instancia global
+iess_planilla_service = IessPlanillaService()
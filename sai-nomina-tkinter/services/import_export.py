@@ -1,5 +1,6 @@
 """Servicio de importación y exportación masiva para todos los módulos"""
 
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 from decimal import Decimal
@@ -7,45 +8,71 @@ import logging
 from typing import Dict, List, Callable, Optional
 import time
 
-from database.connection import get_session
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.connection import get_session, get_batch_session
+from utils.file_reader import ChunkedFileReader
 from database.models import (
     Empleado, Historico, IngresoDescuento, Vacacion,
     Prestamo, Dotacion, Departamento, Cargo
 )
 from utils.validators import (
-    validar_cedula, validar_email, validar_fecha,
-    validar_numero_positivo
+    validar_emails, validar_fecha, validar_numero_positivo,
+    codigos_cedula, MENSAJES_VALIDACION, VALIDO
 )
 
 logger = logging.getLogger(__name__)
 
+CENTAVO = Decimal('0.01')
+
 class ImportExportService:
     """Servicio para carga masiva de datos"""
 
     def __init__(self):
-        self.session = get_session()
+        # Sesión del engine de lotes: los savepoint por lote quedan dentro de
+        # la transacción del bloque (con pysqlite, en la sesión compartida el
+        # RELEASE del primer savepoint confirmaba el bloque a medias)
+        self.session = get_batch_session()
+
+    # Columnas opcionales de texto: columna del archivo -> (campo, longitud)
+    COLUMNAS_TEXTO_EMPLEADO = {
+        'DIRECCION': ('direccion', 200),
+        'TELEFONO': ('telefono', 20),
+        'CARGO': ('cargo', 3),
+        'DEPTO': ('depto', 3),
+    }
+
+    COLUMNAS_CODIGO = {'CEDULA': str, 'TELEFONO': str, 'CARGO': str, 'DEPTO': str}
+
+    # Campos que una fila del archivo puede modificar en un empleado existente
+    CAMPOS_ACTUALIZABLES = ('nombres', 'apellidos', 'direccion', 'telefono', 'email', 'sueldo')
+
+    LOTE_EMPLEADOS = 1000
+
+    COLUMNAS_NOMINA = ['EMPLEADO', 'FECHA_DESDE', 'FECHA_HASTA', 'TIPO', 'CONCEPTO', 'VALOR']
+
+    LOTE_CONCEPTOS = 2000
 
     def import_employees(self, filename: str,
                         progress_callback: Optional[Callable] = None) -> Dict:
-        """Importar empleados desde Excel/CSV"""
+        """
+        Importar empleados desde Excel/CSV
+
+        El archivo se lee por bloques (ChunkedFileReader) y cada bloque pasa
+        por validación por columnas y escritura masiva mientras el siguiente
+        se lee en segundo plano; la memoria depende del tamaño del bloque y
+        no del archivo. Las cédulas existentes se cargan con una sola
+        consulta al inicio y cada bloque se confirma en su propia transacción.
+        """
         start_time = time.time()
         
         try:
-            # Leer archivo
-            if filename.endswith('.csv'):
-                df = pd.read_csv(filename)
-            else:
-                df = pd.read_excel(filename)
-
-            total_rows = len(df)
-            imported = 0
-            updated = 0
-            errors = 0
-            error_details = []
+            # Códigos como texto para conservar ceros a la izquierda
+            reader = ChunkedFileReader(filename, dtype=self.COLUMNAS_CODIGO)
 
             # Validar columnas obligatorias
             required_columns = ['CEDULA', 'NOMBRES', 'APELLIDOS']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in required_columns if col not in reader.columns()]
 
             if missing_columns:
                 return {
@@ -53,56 +80,44 @@ class ImportExportService:
                     'message': f"Columnas faltantes: {', '.join(missing_columns)}"
                 }
 
-            # Procesar cada fila
-            for index, row in df.iterrows():
-                try:
-                    if progress_callback:
-                        progress_callback(
-                            index + 1,
-                            total_rows,
-                            f"Procesando {row['CEDULA']}..."
-                        )
-
-                    # Validar cédula
-                    if not validar_cedula(str(row['CEDULA'])):
-                        errors += 1
-                        error_details.append(f"Fila {index + 2}: Cédula inválida")
-                        continue
-
-                    # Buscar si existe
-                    empleado = self.session.query(Empleado).filter(
-                        Empleado.cedula == str(row['CEDULA'])
-                    ).first()
-
-                    if empleado:
-                        # Actualizar existente
-                        self._update_employee_from_row(empleado, row)
-                        updated += 1
-                    else:
-                        # Crear nuevo
-                        empleado = self._create_employee_from_row(row)
-                        self.session.add(empleado)
-                        imported += 1
-
-                    # Commit cada 100 registros
-                    if (index + 1) % 100 == 0:
-                        self.session.commit()
-
-                except Exception as e:
-                    errors += 1
-                    error_details.append(f"Fila {index + 2}: {str(e)}")
-                    logger.error(f"Error en fila {index + 2}: {e}")
-
-            # Commit final
-            self.session.commit()
+            total_rows = reader.count_rows()
+
+            # Una consulta para todo el archivo: cédula -> (código, depto)
+            existentes = {}
+            ultimo_codigo = 1000
+            for codigo, cedula, depto in self.session.query(
+                Empleado.empleado, Empleado.cedula, Empleado.depto
+            ):
+                existentes[cedula] = (codigo, depto)
+                if codigo.isdigit():
+                    ultimo_codigo = max(ultimo_codigo, int(codigo))
+
+            estado = {
+                'ultimo_codigo': ultimo_codigo, 'imported': 0, 'updated': 0,
+                'filas': 0, 'bytes': 0, 'error_details': [],
+            }
+
+            def leido(bytes_leidos, bytes_totales, filas):
+                estado['bytes'] = bytes_leidos
+
+            for chunk in reader.chunks(leido, prefetch=1):
+                self._import_employee_chunk(chunk, existentes, estado)
+                estado['filas'] += len(chunk)
+                if progress_callback:
+                    progress_callback(
+                        estado['filas'], total_rows,
+                        f"Procesadas {estado['filas']} filas "
+                        f"({estado['bytes'] / 1048576:.1f} de {reader.size / 1048576:.1f} MB)..."
+                    )
             
             elapsed_time = time.time() - start_time
+            error_details = estado['error_details']
 
             return {
                 'success': True,
-                'imported': imported,
-                'updated': updated,
-                'errors': errors,
+                'imported': estado['imported'],
+                'updated': estado['updated'],
+                'errors': len(error_details),
                 'error_details': error_details[:10],  # Primeros 10 errores
                 'time': elapsed_time
             }
@@ -114,150 +129,289 @@ class ImportExportService:
                 'success': False,
                 'message': str(e)
             }
-
-    def _create_employee_from_row(self, row) -> Empleado:
-        """Crear empleado desde fila de DataFrame"""
-        # Generar código de empleado
-        last_employee = self.session.query(Empleado).order_by(
-            Empleado.empleado.desc()
-        ).first()
-
-        if last_employee:
-            last_code = int(last_employee.empleado)
-            new_code = str(last_code + 1).zfill(6)
-        else:
-            new_code = "001001"
-
-        empleado = Empleado(
-            empleado=new_code,
-            cedula=str(row['CEDULA']),
-            nombres=str(row['NOMBRES']).upper(),
-            apellidos=str(row['APELLIDOS']).upper()
+        finally:
+            # Con BEGIN explícito también las lecturas abren transacción
+            self.session.close()
+
+    def _import_employee_chunk(self, df: pd.DataFrame, existentes: Dict, estado: Dict):
+        """
+        Validar y guardar un bloque del archivo de empleados
+
+        Los códigos de las cédulas nuevas se reservan como un rango antes de
+        escribir; las filas se guardan con bulk_insert_mappings /
+        bulk_update_mappings y, si un lote falla, se repite fila por fila
+        para reportar el error en la fila que lo causó. existentes incorpora
+        las cédulas creadas, así una cédula repetida en un bloque posterior
+        actualiza al empleado en lugar de duplicarlo.
+        """
+        errores = {}
+        valores = self._employee_columns(df, errores)
+        validas = np.ones(len(df), dtype=bool)
+        validas[list(errores)] = False
+
+        # Un empleado nuevo necesita nombres y apellidos en la fila que lo
+        # crea; una repetición posterior de la cédula en el bloque ya es una
+        # actualización y puede traerlos vacíos
+        cedulas = valores['cedula']
+        es_nueva = ~cedulas.isin(existentes).to_numpy()
+        sin_nombre = (valores['nombres'].isna() | valores['apellidos'].isna()).to_numpy()
+        posiciones = np.arange(len(df))
+        creadoras = validas & es_nueva & ~sin_nombre
+        primera = pd.Series(posiciones[creadoras]).groupby(cedulas.to_numpy()[creadoras]).min()
+        creada_en = cedulas.map(primera).to_numpy(dtype=float, na_value=np.inf)
+        for posicion in np.flatnonzero(validas & es_nueva & sin_nombre & (posiciones < creada_en)):
+            errores[posicion] = "Nombres y apellidos son obligatorios"
+            validas[posicion] = False
+
+        # Reservar un código consecutivo por cada cédula nueva del bloque
+        nuevas = pd.unique(cedulas[validas & es_nueva])
+        codigos = {
+            cedula: str(estado['ultimo_codigo'] + 1 + i).zfill(6)
+            for i, cedula in enumerate(nuevas)
+        }
+        estado['ultimo_codigo'] += len(nuevas)
+
+        # Armar los mapeos en orden de archivo; una cédula repetida en el
+        # archivo actualiza la fila creada o actualizada antes
+        inserts, updates, filas = {}, {}, {}
+        registros = valores.to_dict('records')
+        for posicion in np.flatnonzero(validas):
+            registro = registros[posicion]
+            cedula = registro['cedula']
+            if cedula in inserts:
+                mapeo = inserts[cedula]
+            elif cedula in codigos:
+                mapeo = inserts[cedula] = self._new_employee_mapping(codigos[cedula], registro)
+            else:
+                mapeo = updates.setdefault(cedula, {
+                    'empleado': existentes[cedula][0], 'updated_by': 'IMPORT'
+                })
+            mapeo.update(
+                (k, v) for k, v in registro.items()
+                if k in self.CAMPOS_ACTUALIZABLES and v is not None
+            )
+            filas.setdefault(cedula, []).append(posicion)
+
+        fallidas = set()
+        for operacion, mapeos in (('insert', list(inserts.items())),
+                                  ('update', list(updates.items()))):
+            for inicio in range(0, len(mapeos), self.LOTE_EMPLEADOS):
+                lote = mapeos[inicio:inicio + self.LOTE_EMPLEADOS]
+                fallidas.update(self._write_employee_batch(operacion, lote, filas, errores))
+
+        # Las escrituras masivas no pasan por el flush del ORM
+        from database.summaries import refresh_departments
+        deptos = {m.get('depto') for m in inserts.values()}
+        deptos.update(existentes[cedula][1] for cedula in updates)
+        refresh_departments(self.session.connection(), deptos)
+
+        self.session.commit()
+
+        for cedula, mapeo in inserts.items():
+            if cedula not in fallidas:
+                existentes[cedula] = (mapeo['empleado'], mapeo.get('depto'))
+
+        # Cada fila válida cuenta como importada (primera aparición de una
+        # cédula nueva) o actualizada, igual que en la carga fila a fila
+        imported = sum(1 for cedula in inserts if cedula not in fallidas)
+        estado['imported'] += imported
+        estado['updated'] += sum(len(p) for c, p in filas.items() if c not in fallidas) - imported
+        estado['error_details'].extend(
+            f"Fila {df.index[posicion] + 2}: {errores[posicion]}" for posicion in sorted(errores)
         )
 
-        # Campos opcionales
-        if 'FECHA_NAC' in row and pd.notna(row['FECHA_NAC']):
-            empleado.fecha_nac = pd.to_datetime(row['FECHA_NAC']).date()
-
-        if 'SEXO' in row and pd.notna(row['SEXO']):
-            empleado.sexo = str(row['SEXO']).upper()[:1]
-
-        if 'DIRECCION' in row and pd.notna(row['DIRECCION']):
-            empleado.direccion = str(row['DIRECCION'])[:200]
-
-        if 'TELEFONO' in row and pd.notna(row['TELEFONO']):
-            empleado.telefono = str(row['TELEFONO'])[:20]
-
-        if 'EMAIL' in row and pd.notna(row['EMAIL']):
-            if validar_email(str(row['EMAIL'])):
-                empleado.email = str(row['EMAIL']).lower()
-
-        if 'CARGO' in row and pd.notna(row['CARGO']):
-            empleado.cargo = str(row['CARGO'])[:3]
-
-        if 'DEPTO' in row and pd.notna(row['DEPTO']):
-            empleado.depto = str(row['DEPTO'])[:3]
-
-        if 'SUELDO' in row and pd.notna(row['SUELDO']):
-            empleado.sueldo = Decimal(str(row['SUELDO']))
-
-        if 'FECHA_ING' in row and pd.notna(row['FECHA_ING']):
-            empleado.fecha_ing = pd.to_datetime(row['FECHA_ING']).date()
+    def _employee_columns(self, df: pd.DataFrame, errores: Dict) -> pd.DataFrame:
+        """
+        Convertir las columnas del archivo a campos de Empleado
+
+        Devuelve un DataFrame con los nombres de campo del modelo (None donde
+        no hay dato) y anota en errores {posición: mensaje} las filas que no
+        se pueden importar.
+        """
+        def anotar(mascara, mensaje):
+            self._mark_errors(errores, mascara, mensaje)
+
+        cedulas = df['CEDULA'].fillna('').astype(str).str.strip()
+        codigos = codigos_cedula(cedulas.to_numpy())
+        for codigo in np.unique(codigos[codigos != VALIDO]):
+            anotar(codigos == codigo, f"Cédula inválida ({MENSAJES_VALIDACION[codigo].lower()})")
+
+        valores = pd.DataFrame({'cedula': cedulas}, index=df.index)
+        for columna in ('NOMBRES', 'APELLIDOS'):
+            valores[columna.lower()] = self._text_column(df, columna, 50, upper=True)
+
+        for columna, (campo, longitud) in self.COLUMNAS_TEXTO_EMPLEADO.items():
+            valores[campo] = self._text_column(df, columna, longitud)
+
+        valores['sexo'] = self._text_column(df, 'SEXO', 1, upper=True)
+
+        emails = self._text_column(df, 'EMAIL')
+        emails_validos = validar_emails(emails)
+        valores['email'] = emails.str.lower().where(emails_validos, None)
+
+        for columna, campo in (('FECHA_NAC', 'fecha_nac'), ('FECHA_ING', 'fecha_ing')):
+            fechas, invalidas = self._date_column(df, columna)
+            anotar(invalidas, f"{columna} inválida")
+            valores[campo] = fechas
+
+        if 'SUELDO' in df.columns:
+            sueldos = pd.to_numeric(df['SUELDO'], errors='coerce')
+            anotar(df['SUELDO'].notna() & sueldos.isna(), "SUELDO inválido")
+            valores['sueldo'] = [
+                None if pd.isna(v) else Decimal(str(v)) for v in sueldos.to_numpy()
+            ]
         else:
-            empleado.fecha_ing = date.today()
-
-        empleado.estado = 'ACT'
-        empleado.created_by = 'IMPORT'
-
-        return empleado
-
-    def _update_employee_from_row(self, empleado: Empleado, row):
-        """Actualizar empleado desde fila de DataFrame"""
-        # Solo actualizar campos que vienen en el archivo
-        if 'NOMBRES' in row and pd.notna(row['NOMBRES']):
-            empleado.nombres = str(row['NOMBRES']).upper()
-
-        if 'APELLIDOS' in row and pd.notna(row['APELLIDOS']):
-            empleado.apellidos = str(row['APELLIDOS']).upper()
-
-        if 'DIRECCION' in row and pd.notna(row['DIRECCION']):
-            empleado.direccion = str(row['DIRECCION'])[:200]
-
-        if 'TELEFONO' in row and pd.notna(row['TELEFONO']):
-            empleado.telefono = str(row['TELEFONO'])[:20]
-
-        if 'EMAIL' in row and pd.notna(row['EMAIL']):
-            if validar_email(str(row['EMAIL'])):
-                empleado.email = str(row['EMAIL']).lower()
-
-        if 'SUELDO' in row and pd.notna(row['SUELDO']):
-            empleado.sueldo = Decimal(str(row['SUELDO']))
-
-        empleado.updated_by = 'IMPORT'
+            valores['sueldo'] = None
+
+        return valores.astype(object).where(valores.notna(), None)
+
+    @staticmethod
+    def _mark_errors(errores: Dict, mascara, mensaje: str):
+        """Anotar mensaje en las posiciones de mascara que todavía no tienen error"""
+        for posicion in np.flatnonzero(np.asarray(mascara)):
+            errores.setdefault(posicion, mensaje)
+
+    @staticmethod
+    def _text_column(df: pd.DataFrame, columna: str, longitud: int = None, upper: bool = False) -> pd.Series:
+        """Columna de texto recortada; NaN y cadenas vacías quedan como None"""
+        if columna not in df.columns:
+            return pd.Series(None, index=df.index, dtype=object)
+        texto = df[columna].astype(object).where(df[columna].notna(), None)
+        texto = texto.map(lambda v: None if v is None else str(v).strip(), na_action='ignore')
+        if upper:
+            texto = texto.str.upper()
+        if longitud:
+            texto = texto.str[:longitud]
+        return texto.where(texto.str.len() > 0, None)
+
+    @staticmethod
+    def _date_column(df: pd.DataFrame, columna: str):
+        """
+        Convertir una columna a fechas (DD/MM/YYYY o fechas de Excel)
+
+        Returns:
+            (Serie de date o None, máscara de valores presentes no convertibles)
+        """
+        if columna not in df.columns:
+            return pd.Series(None, index=df.index, dtype=object), np.zeros(len(df), dtype=bool)
+        original = df[columna]
+        fechas = pd.to_datetime(original, errors='coerce', dayfirst=True)
+        pendientes = original.notna() & fechas.isna()
+        if pendientes.any():
+            # Formatos mezclados en la misma columna: se interpreta cada valor
+            fechas[pendientes] = pd.to_datetime(
+                original[pendientes], errors='coerce', dayfirst=True, format='mixed'
+            )
+        invalidas = (original.notna() & fechas.isna()).to_numpy()
+        return pd.Series(fechas.dt.date, index=df.index).where(fechas.notna(), None), invalidas
+
+    @staticmethod
+    def _new_employee_mapping(codigo: str, registro: Dict) -> Dict:
+        """Mapeo de un empleado nuevo con los mismos valores por defecto que la carga fila a fila"""
+        mapeo = dict(registro)
+        mapeo['empleado'] = codigo
+        if mapeo['sueldo'] is None:
+            mapeo['sueldo'] = Decimal('460.00')
+        if mapeo['fecha_ing'] is None:
+            mapeo['fecha_ing'] = date.today()
+        mapeo['estado'] = 'ACT'
+        mapeo['created_by'] = 'IMPORT'
+        return mapeo
+
+    def _write_employee_batch(self, operacion: str, lote: List, filas: Dict, errores: Dict) -> set:
+        """
+        Escribir un lote [(cédula, mapeo)]; devuelve las cédulas que no se guardaron
+
+        El lote va en un savepoint: si falla, se repite fila por fila y el
+        error queda en todas las filas del archivo con esa cédula.
+        """
+        if operacion == 'insert':
+            # Todas las filas nuevas tienen las mismas claves: con render_nulls
+            # el lote completo va en un solo executemany
+            def escribir(modelo, mapeos):
+                self.session.bulk_insert_mappings(modelo, mapeos, render_nulls=True)
+        else:
+            # Las actualizaciones se agrupan por conjunto de columnas
+            escribir = self.session.bulk_update_mappings
+            lote = sorted(lote, key=lambda par: tuple(sorted(par[1])))
+        try:
+            with self.session.begin_nested():
+                escribir(Empleado, [mapeo for _, mapeo in lote])
+            return set()
+        except SQLAlchemyError:
+            pass
+
+        fallidas = set()
+        for cedula, mapeo in lote:
+            try:
+                with self.session.begin_nested():
+                    escribir(Empleado, [mapeo])
+            except SQLAlchemyError as e:
+                fallidas.add(cedula)
+                mensaje = str(getattr(e, 'orig', e))
+                for posicion in filas.get(cedula, []):
+                    errores[posicion] = mensaje
+        return fallidas
 
     def import_payroll_data(self, filename: str,
                            progress_callback: Optional[Callable] = None) -> Dict:
-        """Importar datos de nómina (ingresos y descuentos)"""
-        try:
-            # Leer archivo
-            if filename.endswith('.csv'):
-                df = pd.read_csv(filename)
-            else:
-                df = pd.read_excel(filename)
-
-            total_rows = len(df)
-            imported = 0
-            errors = 0
-
-            for index, row in df.iterrows():
-                try:
-                    if progress_callback:
-                        progress_callback(
-                            index + 1,
-                            total_rows,
-                            f"Procesando concepto {row['CONCEPTO']}..."
-                        )
-
-                    # Buscar empleado
-                    empleado_ref = str(row['EMPLEADO'])
-                    empleado = self.session.query(Empleado).filter(
-                        (Empleado.empleado == empleado_ref) |
-                        (Empleado.cedula == empleado_ref)
-                    ).first()
-
-                    if not empleado:
-                        errors += 1
-                        continue
-
-                    # Crear registro
-                    ingreso_descuento = IngresoDescuento(
-                        empleado=empleado.empleado,
-                        fecha_desde=pd.to_datetime(row['FECHA_DESDE']).date(),
-                        fecha_hasta=pd.to_datetime(row['FECHA_HASTA']).date(),
-                        tipo=str(row['TIPO']).upper()[:1],
-                        codigo=str(row.get('CODIGO', ''))[:10],
-                        concepto=str(row['CONCEPTO'])[:100],
-                        valor=Decimal(str(row['VALOR'])),
-                        horas=Decimal(str(row.get('HORAS', 0))),
-                        usuario='IMPORT'
-                    )
-
-                    self.session.add(ingreso_descuento)
-                    imported += 1
+        """
+        Importar datos de nómina (ingresos y descuentos)
+
+        EMPLEADO acepta el código o la cédula; ambos se resuelven con un
+        diccionario armado en una sola consulta. Cada bloque se convierte por
+        columnas y se inserta con executemany. Una fila igual a un concepto
+        todavía no procesado (o a otra fila del archivo) se reporta como
+        duplicada en lugar de sumarse dos veces en el rol.
+        """
+        start_time = time.time()
 
-                    if (index + 1) % 100 == 0:
-                        self.session.commit()
+        try:
+            # Leer archivo por bloques
+            reader = ChunkedFileReader(filename, dtype={'EMPLEADO': str, 'CODIGO': str})
 
-                except Exception as e:
-                    errors += 1
-                    logger.error(f"Error en fila {index + 2}: {e}")
+            missing_columns = [col for col in self.COLUMNAS_NOMINA if col not in reader.columns()]
+            if missing_columns:
+                return {
+                    'success': False,
+                    'message': f"Columnas faltantes: {', '.join(missing_columns)}"
+                }
 
-            self.session.commit()
+            total_rows = reader.count_rows()
+
+            # Código y cédula -> código de empleado
+            referencias = {}
+            for codigo, cedula in self.session.query(Empleado.empleado, Empleado.cedula):
+                referencias[codigo] = codigo
+                if cedula:
+                    referencias.setdefault(cedula, codigo)
+
+            # Conceptos pendientes: clave -> fila del archivo (None si ya estaba en la base)
+            pendientes = dict.fromkeys(
+                self._payroll_key(*fila) for fila in self.session.query(
+                    IngresoDescuento.empleado, IngresoDescuento.fecha_desde,
+                    IngresoDescuento.fecha_hasta, IngresoDescuento.tipo,
+                    IngresoDescuento.codigo, IngresoDescuento.concepto, IngresoDescuento.valor
+                ).filter(IngresoDescuento.procesado == False)
+            )
+
+            estado = {'imported': 0, 'duplicates': 0, 'filas': 0, 'error_details': []}
+            for chunk in reader.chunks(prefetch=1):
+                self._import_payroll_chunk(chunk, referencias, pendientes, estado)
+                estado['filas'] += len(chunk)
+                if progress_callback:
+                    progress_callback(
+                        estado['filas'], total_rows,
+                        f"Procesadas {estado['filas']} filas de conceptos..."
+                    )
 
             return {
                 'success': True,
-                'imported': imported,
-                'errors': errors
+                'imported': estado['imported'],
+                'duplicates': estado['duplicates'],
+                'errors': len(estado['error_details']),
+                'error_details': estado['error_details'][:10],  # Primeros 10 errores
+                'time': time.time() - start_time
             }
 
         except Exception as e:
@@ -267,6 +421,114 @@ class ImportExportService:
                 'success': False,
                 'message': str(e)
             }
+        finally:
+            self.session.close()
+
+    @staticmethod
+    def _payroll_key(empleado, fecha_desde, fecha_hasta, tipo, codigo, concepto, valor):
+        """Clave de duplicado de un concepto de nómina"""
+        return (empleado, fecha_desde, fecha_hasta, tipo, codigo or '', concepto,
+                Decimal(str(valor)).quantize(CENTAVO) if valor is not None else None)
+
+    def _import_payroll_chunk(self, df: pd.DataFrame, referencias: Dict, pendientes: Dict, estado: Dict):
+        """Validar por columnas e insertar un bloque del archivo de conceptos"""
+        errores = {}
+        anotar = self._mark_errors
+
+        referencia = self._text_column(df, 'EMPLEADO')
+        empleados = referencia.map(referencias)
+        anotar(errores, referencia.isna(), "EMPLEADO vacío")
+        anotar(errores, referencia.notna() & empleados.isna(), "Empleado no encontrado")
+
+        fechas = []
+        for columna in ('FECHA_DESDE', 'FECHA_HASTA'):
+            serie, invalidas = self._date_column(df, columna)
+            anotar(errores, invalidas, f"{columna} inválida")
+            anotar(errores, serie.isna(), f"{columna} vacía")
+            fechas.append(serie)
+
+        tipos = self._text_column(df, 'TIPO', 1, upper=True)
+        anotar(errores, ~tipos.isin(['I', 'D']), "TIPO debe ser I (ingreso) o D (descuento)")
+
+        conceptos = self._text_column(df, 'CONCEPTO', 100)
+        anotar(errores, conceptos.isna(), "CONCEPTO vacío")
+        codigos = self._text_column(df, 'CODIGO', 10)
+
+        valores = pd.to_numeric(df['VALOR'], errors='coerce')
+        anotar(errores, valores.isna(), "VALOR inválido")
+        if 'HORAS' in df.columns:
+            horas = pd.to_numeric(df['HORAS'], errors='coerce')
+            anotar(errores, df['HORAS'].notna() & horas.isna(), "HORAS inválidas")
+            horas = horas.fillna(0)
+        else:
+            horas = pd.Series(0, index=df.index)
+
+        # Unión por hash contra los pendientes y las filas ya leídas
+        lote = []
+        columnas = zip(empleados, fechas[0], fechas[1], tipos, codigos, conceptos,
+                       valores.to_numpy(), horas.to_numpy())
+        for posicion, (empleado, desde, hasta, tipo, codigo, concepto, valor, hora) in enumerate(columnas):
+            if posicion in errores:
+                continue
+            clave = self._payroll_key(empleado, desde, hasta, tipo, codigo, concepto, valor)
+            if clave in pendientes:
+                fila = pendientes[clave]
+                errores[posicion] = (f"Duplicado de la fila {fila}" if fila is not None
+                                     else "Duplicado: el concepto ya está pendiente de procesar")
+                estado['duplicates'] += 1
+                continue
+            pendientes[clave] = df.index[posicion] + 2
+            lote.append((posicion, clave, {
+                'empleado': empleado,
+                'fecha_desde': desde,
+                'fecha_hasta': hasta,
+                'tipo': tipo,
+                'codigo': codigo,
+                'concepto': concepto,
+                'valor': clave[-1],
+                'horas': Decimal(str(hora)).quantize(CENTAVO),
+                'usuario': 'IMPORT',
+            }))
+
+        fallidas = set()
+        for inicio in range(0, len(lote), self.LOTE_CONCEPTOS):
+            fallidas.update(self._write_payroll_batch(lote[inicio:inicio + self.LOTE_CONCEPTOS], errores))
+        self.session.commit()
+
+        for posicion, clave, _ in lote:
+            if posicion in fallidas:
+                pendientes.pop(clave, None)
+        estado['imported'] += len(lote) - len(fallidas)
+        estado['error_details'].extend(
+            f"Fila {df.index[posicion] + 2}: {errores[posicion]}" for posicion in sorted(errores)
+        )
+
+    def _write_payroll_batch(self, lote: List, errores: Dict) -> set:
+        """
+        Insertar un lote [(posición, clave, mapeo)]; devuelve las posiciones que no se guardaron
+
+        Igual que con empleados: un solo executemany en un savepoint y, si
+        falla, fila por fila para dejar el error en la fila que lo causó. Los
+        savepoint requieren la sesión del engine de lotes (ver __init__).
+        """
+        def escribir(mapeos):
+            with self.session.begin_nested():
+                self.session.bulk_insert_mappings(IngresoDescuento, mapeos, render_nulls=True)
+
+        try:
+            escribir([mapeo for _, _, mapeo in lote])
+            return set()
+        except SQLAlchemyError:
+            pass
+
+        fallidas = set()
+        for posicion, _, mapeo in lote:
+            try:
+                escribir([mapeo])
+            except SQLAlchemyError as e:
+                fallidas.add(posicion)
+                errores[posicion] = str(getattr(e, 'orig', e))
+        return fallidas
 
     def generate_import_template(self, template_type: str) -> str:
         """Generar plantilla Excel para importación"""
@@ -366,43 +628,54 @@ class ExportService:
     
     def __init__(self):
         self.session = get_session()
+
+    def export_changes(self, consumidor: str, directory: str, formato: str = 'jsonl') -> Dict:
+        """Exportar solo los cambios posteriores a la marca del consumidor (CDC)"""
+        from database.change_journal import change_exporter
+        return change_exporter.export(consumidor, directory, formato)
     
+    # Columnas del Excel de empleados: encabezado -> columna del modelo
+    COLUMNAS_EXPORT_EMPLEADOS = {
+        'EMPLEADO': Empleado.empleado,
+        'CEDULA': Empleado.cedula,
+        'NOMBRES': Empleado.nombres,
+        'APELLIDOS': Empleado.apellidos,
+        'CARGO': Empleado.cargo,
+        'DEPARTAMENTO': Empleado.depto,
+        'SUELDO': Empleado.sueldo,
+        'FECHA_INGRESO': Empleado.fecha_ing,
+        'ESTADO': Empleado.estado,
+        'TELEFONO': Empleado.telefono,
+        'EMAIL': Empleado.email,
+    }
+
     def export_employees_excel(self, filters=None) -> str:
-        """Exportar empleados a Excel"""
+        """
+        Exportar empleados a Excel
+
+        Las filas se leen por lotes (yield_per) y se escriben en modo
+        write-only, sin armar la lista completa ni un DataFrame.
+        """
+        from utils.excel_writer import ExcelStreamWriter
+
         try:
-            query = self.session.query(Empleado).filter(Empleado.activo == True)
+            query = self.session.query(*self.COLUMNAS_EXPORT_EMPLEADOS.values()).filter(Empleado.activo == True)
             
             if filters:
                 # Aplicar filtros si existen
                 pass
-            
-            empleados = query.all()
-            
-            # Convertir a DataFrame
-            data = []
-            for emp in empleados:
-                data.append({
-                    'EMPLEADO': emp.empleado,
-                    'CEDULA': emp.cedula,
-                    'NOMBRES': emp.nombres,
-                    'APELLIDOS': emp.apellidos,
-                    'CARGO': emp.cargo,
-                    'DEPARTAMENTO': emp.depto,
-                    'SUELDO': float(emp.sueldo),
-                    'FECHA_INGRESO': emp.fecha_ing,
-                    'ESTADO': emp.estado,
-                    'TELEFONO': emp.telefono,
-                    'EMAIL': emp.email
-                })
-            
-            df = pd.DataFrame(data)
-            
+
             # Generar archivo
             filename = f"empleados_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             filepath = f"reports/{filename}"
-            
-            df.to_excel(filepath, index=False, sheet_name='Empleados')
-            
+
+            with ExcelStreamWriter(filepath) as libro:
+                libro.add_sheet(
+                    'Empleados', list(self.COLUMNAS_EXPORT_EMPLEADOS),
+                    query.order_by(Empleado.empleado).yield_per(2000),
+                    formatos={'SUELDO': 'moneda', 'FECHA_INGRESO': 'fecha'}
+                )
+
             return filepath
             
         except Exception as e:
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LegacySync - Sistema SGN
+Sincronización incremental desde las tablas RPEMPLEA/RPHISTOR del sistema
+anterior (SQL Server vía pyodbc) hacia la base SQLite local
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, date
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+from sqlalchemy import select, update, insert, bindparam, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.connection import get_batch_engine
+from database.models import Empleado, Historico, Control, EstadoSincronizacion
+
+logger = logging.getLogger(__name__)
+
+
+class LegacySyncError(Exception):
+    """Excepción para errores de conexión o mapeo con el sistema anterior"""
+    pass
+
+
+# Conversores de valores del origen
+
+def _texto(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _fecha(valor):
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor).strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y', '%Y%m%d'):
+        try:
+            return datetime.strptime(texto[:10], formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no reconocida: {valor!r}")
+
+
+def _numero(valor):
+    if valor is None or valor == '':
+        return None
+    return round(float(valor), 2)
+
+
+def _entero(valor):
+    if valor is None or valor == '':
+        return None
+    return int(float(valor))
+
+
+def _codigos(equivalencias):
+    def convertir(valor):
+        valor = _texto(valor)
+        return equivalencias.get(valor, valor)
+    return convertir
+
+
+def _empleado_derivados(fila, valores):
+    """Campos del modelo nuevo que en RPEMPLEA se expresan de otra forma"""
+    valores['activo'] = (valores.get('estado') or 'ACT') != 'RET'
+    ahorro, corriente = _texto(fila.get('CTA_AHO')), _texto(fila.get('CTA_CTE'))
+    if ahorro:
+        valores['cuenta_banco'], valores['tipo_cuenta'] = ahorro, 'A'
+    elif corriente:
+        valores['cuenta_banco'], valores['tipo_cuenta'] = corriente, 'C'
+    else:
+        valores['cuenta_banco'], valores['tipo_cuenta'] = None, None
+
+
+# Mapeo columna del origen -> columna local, con su conversor
+ESPECIFICACIONES = {
+    'RPEMPLEA': {
+        'modelo': Empleado,
+        'clave': 'EMPLEADO',
+        'columnas': [
+            ('EMPLEADO', 'empleado', _texto),
+            ('NOMBRES', 'nombres', _texto),
+            ('APELLIDOS', 'apellidos', _texto),
+            ('CEDULA', 'cedula', _texto),
+            ('FECHA_NAC', 'fecha_nac', _fecha),
+            ('SEXO', 'sexo', _codigos({'1': 'M', '2': 'F'})),
+            ('ESTADO_CI', 'estado_civil', _codigos({'1': 'C', '2': 'S', '3': 'D', '4': 'V'})),
+            ('DIRECCION', 'direccion', _texto),
+            ('TELEFONO', 'telefono', _texto),
+            ('CARGO', 'cargo', _texto),
+            ('DEPTO', 'depto', _texto),
+            ('SECCION', 'seccion', _texto),
+            ('SUELDO', 'sueldo', _numero),
+            ('FECHA_ING', 'fecha_ing', _fecha),
+            ('TIPO_TRA', 'tipo_tra', _entero),
+            ('TIPO_PGO', 'tipo_pgo', _entero),
+            ('ESTADO', 'estado', _texto),
+            ('ANTICIPO', 'anticipo', _numero),
+            ('DECIMO3', 'decimo3', _numero),
+            ('DECIMO4', 'decimo4', _numero),
+            ('VACACION', 'vacacion', _entero),
+            ('CARGAS', 'cargas', _entero),
+            ('TIPO_SAN', 'tipo_sangre', _texto),
+            ('OBSERV', 'observaciones', _texto),
+        ],
+        'extra': ['CTA_AHO', 'CTA_CTE'],
+        'derivados': _empleado_derivados,
+        'requeridos': ['nombres', 'apellidos', 'cedula', 'fecha_ing'],
+    },
+    'RPHISTOR': {
+        'modelo': Historico,
+        'clave': 'ID',
+        'columnas': [
+            ('EMPLEADO', 'empleado', _texto),
+            ('FECHA', 'fecha', _fecha),
+            ('TIPO', 'tipo', _texto),
+            ('CLASE', 'clase', _entero),
+            ('CONCEPTO', 'concepto', _texto),
+            ('VALOR', 'valor', _numero),
+            ('HORAS', 'horas', _numero),
+            ('REFERENCIA', 'referencia', _texto),
+            ('OBSERV', 'observacion', _texto),
+            ('PERIODO', 'periodo', _texto),
+        ],
+        'extra': [],
+        'derivados': None,
+        'requeridos': ['empleado', 'fecha'],
+    },
+}
+
+
+class LegacySource:
+    """
+    Lectura paginada por clave desde el origen
+
+    Acepta una cadena ODBC (SQL Server, requiere pyodbc) o sqlite:///ruta,
+    una copia local con el mismo esquema para pruebas y migraciones.
+    """
+
+    def __init__(self, source=None):
+        source = source or Config.LEGACY_SOURCE
+        if not source:
+            raise LegacySyncError("No hay origen configurado (SGN_LEGACY_SOURCE)")
+
+        if source.startswith("sqlite:///"):
+            self.dialect = 'sqlite'
+            self.conn = sqlite3.connect(source[len("sqlite:///"):])
+        else:
+            try:
+                import pyodbc
+            except ImportError:
+                raise LegacySyncError("pyodbc no está instalado; no se puede leer SQL Server")
+            self.dialect = 'mssql'
+            self.conn = pyodbc.connect(source, readonly=True)
+
+    def close(self):
+        self.conn.close()
+
+    def page(self, tabla, columnas, clave, marca=None, desde=None, limite=1000):
+        """
+        Siguiente página ordenada por (marca, clave) o solo por clave
+
+        desde es la posición de la última fila leída: (marca, clave) o
+        (None, clave). Cada página es una búsqueda por índice, sin OFFSET.
+        """
+        orden = [marca, clave] if marca else [clave]
+        where, params = "", []
+        if desde is not None:
+            ultima_marca, ultima_clave = desde
+            if marca:
+                where = f" WHERE ({marca} > ? OR ({marca} = ? AND {clave} > ?))"
+                params = [ultima_marca, ultima_marca, ultima_clave]
+            else:
+                where = f" WHERE {clave} > ?"
+                params = [ultima_clave]
+
+        lista = ', '.join(dict.fromkeys(orden + list(columnas)))
+        if self.dialect == 'mssql':
+            sql = f"SELECT TOP ({int(limite)}) {lista} FROM {tabla}{where} ORDER BY {', '.join(orden)}"
+        else:
+            sql = f"SELECT {lista} FROM {tabla}{where} ORDER BY {', '.join(orden)} LIMIT {int(limite)}"
+
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            nombres = [d[0].upper() for d in cursor.description]
+            return [dict(zip(nombres, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+class LegacySync:
+    """
+    Motor de sincronización incremental
+
+    Por cada tabla se recorre el origen en páginas por clave. Con una
+    columna de marca (fecha de modificación) solo se leen filas posteriores
+    a la última marca guardada; sin ella se recorre todo y se comparan
+    huellas SHA-1 por fila, de modo que solo se escriben las filas que
+    cambiaron. Cada página se aplica en una transacción junto con las
+    huellas y la marca, así una ejecución interrumpida continúa donde quedó.
+
+    Las filas que fallan se aíslan con SAVEPOINT dentro de la transacción de
+    la página, por lo que el engine debe tener install_savepoint_support
+    (el engine de lotes por defecto ya lo tiene).
+    """
+
+    def __init__(self, source=None, engine=None, marcas=None, batch_size=None):
+        self.source = source if isinstance(source, LegacySource) else LegacySource(source)
+        self.engine = engine or get_batch_engine()
+        self.marcas = marcas or {}
+        self.batch_size = batch_size or Config.LEGACY_SYNC_BATCH
+
+    def run(self, tablas=('RPEMPLEA', 'RPHISTOR'), progress_callback=None):
+        """
+        Sincronizar las tablas indicadas (RPEMPLEA antes que RPHISTOR)
+
+        Returns:
+            dict: {tabla: {'leidos', 'insertados', 'actualizados', 'sin_cambios', 'errores', ...}}
+        """
+        report = {}
+        try:
+            for tabla in tablas:
+                report[tabla] = self.sync_table(tabla, progress_callback)
+        finally:
+            self.source.close()
+
+        if report.get('RPEMPLEA', {}).get('insertados') or report.get('RPEMPLEA', {}).get('actualizados'):
+            # Las escrituras masivas no pasan por el flush del ORM
+            from database.summaries import refresh_departments
+            with self.engine.begin() as conn:
+                refresh_departments(conn)
+
+        return report
+
+    def sync_table(self, tabla, progress_callback=None):
+        spec = ESPECIFICACIONES[tabla]
+        marca = self.marcas.get(tabla)
+        columnas = [origen for origen, _, _ in spec['columnas']] + spec['extra']
+        stats = {'leidos': 0, 'insertados': 0, 'actualizados': 0, 'sin_cambios': 0,
+                 'errores': 0, 'detalle_errores': [], 'modo': 'marca' if marca else 'huella'}
+        start = time.time()
+
+        desde = self._load_position(tabla) if marca else None
+        while True:
+            filas = self.source.page(tabla, columnas, spec['clave'], marca, desde, self.batch_size)
+            if not filas:
+                break
+
+            ultima = filas[-1]
+            desde = (ultima.get(marca.upper()) if marca else None, ultima[spec['clave']])
+            with self.engine.begin() as conn:
+                self._apply_page(conn, tabla, spec, filas, stats)
+                if marca:
+                    self._save_position(conn, tabla, desde)
+
+            stats['leidos'] += len(filas)
+            if progress_callback:
+                progress_callback(tabla, stats['leidos'])
+            if len(filas) < self.batch_size:
+                break
+
+        stats['duracion'] = round(time.time() - start, 3)
+        logger.info(
+            f"Sincronización {tabla}: {stats['leidos']} leídos, {stats['insertados']} nuevos, "
+            f"{stats['actualizados']} actualizados, {stats['errores']} errores"
+        )
+        return stats
+
+    def _map(self, spec, fila):
+        valores = {local: conversor(fila.get(origen)) for origen, local, conversor in spec['columnas']}
+        if spec['derivados']:
+            spec['derivados'](fila, valores)
+        faltantes = [c for c in spec['requeridos'] if valores.get(c) in (None, '')]
+        if faltantes:
+            raise ValueError(f"Campos requeridos vacíos: {', '.join(faltantes)}")
+        return valores
+
+    @staticmethod
+    def _fingerprint(valores):
+        return hashlib.sha1(json.dumps(valores, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _apply_page(self, conn, tabla, spec, filas, stats):
+        estado = EstadoSincronizacion.__table__
+        claves = [str(f[spec['clave']]) for f in filas]
+        previos = {
+            row.clave: row for row in conn.execute(
+                select(estado.c.clave, estado.c.hash, estado.c.local_id).where(
+                    estado.c.tabla == tabla, estado.c.clave.in_(claves))
+            )
+        }
+
+        cambios = []
+        for fila, clave in zip(filas, claves):
+            try:
+                valores = self._map(spec, fila)
+            except ValueError as e:
+                self._error(stats, clave, e)
+                continue
+            huella = self._fingerprint(valores)
+            previo = previos.get(clave)
+            if previo is not None and previo.hash == huella:
+                stats['sin_cambios'] += 1
+                continue
+            cambios.append((clave, valores, huella, previo))
+
+        if not cambios:
+            return
+
+        if spec['modelo'] is Empleado:
+            aplicados = self._upsert_empleados(conn, cambios, stats)
+        else:
+            aplicados = self._upsert_historico(conn, cambios, stats)
+
+        if aplicados:
+            stmt = sqlite_insert(estado)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[estado.c.tabla, estado.c.clave],
+                    set_={'hash': stmt.excluded.hash, 'local_id': stmt.excluded.local_id,
+                          'updated_at': stmt.excluded.updated_at}
+                ),
+                [{'tabla': tabla, 'clave': clave, 'hash': huella, 'local_id': local_id,
+                  'updated_at': datetime.utcnow()} for clave, huella, local_id in aplicados]
+            )
+
+    def _upsert_empleados(self, conn, cambios, stats):
+        tabla = Empleado.__table__
+        stmt = sqlite_insert(tabla)
+        columnas = list(cambios[0][1])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabla.c.empleado],
+            set_={**{c: stmt.excluded[c] for c in columnas if c != 'empleado'},
+                  'updated_at': stmt.excluded.updated_at}
+        )
+
+        def filas(lote):
+            ahora = datetime.utcnow()
+            return [{**valores, 'created_at': ahora, 'updated_at': ahora} for _, valores, _, _ in lote]
+
+        try:
+            with conn.begin_nested():
+                conn.execute(stmt, filas(cambios))
+            aceptados = cambios
+        except IntegrityError:
+            # Una cédula duplicada invalida el lote: se repite fila por fila
+            aceptados = []
+            for cambio in cambios:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(stmt, filas([cambio]))
+                    aceptados.append(cambio)
+                except IntegrityError as e:
+                    self._error(stats, cambio[0], e.orig)
+
+        for _, _, _, previo in aceptados:
+            stats['actualizados' if previo is not None else 'insertados'] += 1
+        return [(clave, huella, valores['empleado']) for clave, valores, huella, _ in aceptados]
+
+    def _upsert_historico(self, conn, cambios, stats):
+        tabla = Historico.__table__
+        aplicados = []
+        nuevos = [c for c in cambios if c[3] is None or not c[3].local_id]
+        existentes = [c for c in cambios if c[3] is not None and c[3].local_id]
+
+        if existentes:
+            columnas = list(existentes[0][1])
+            stmt = update(tabla).where(tabla.c.id == bindparam('id_local')).values(
+                {c: bindparam(f"v_{c}") for c in columnas}
+            )
+            conn.execute(stmt, [
+                {'id_local': int(previo.local_id), **{f"v_{c}": v for c, v in valores.items()}}
+                for _, valores, _, previo in existentes
+            ])
+            for clave, _, huella, previo in existentes:
+                aplicados.append((clave, huella, previo.local_id))
+            stats['actualizados'] += len(existentes)
+
+        if nuevos:
+            # Ids asignados aquí para insertar el lote con executemany y
+            # conservar la relación clave de origen -> id local
+            siguiente = conn.execute(select(func.coalesce(func.max(tabla.c.id), 0))).scalar() + 1
+            ahora = datetime.utcnow()
+            filas = [{'id': siguiente + i, 'created_at': ahora, **valores}
+                     for i, (_, valores, _, _) in enumerate(nuevos)]
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(tabla), filas)
+                aceptados = list(zip(nuevos, filas))
+            except IntegrityError:
+                aceptados = []
+                for cambio, fila in zip(nuevos, filas):
+                    fila = {k: v for k, v in fila.items() if k != 'id'}
+                    try:
+                        with conn.begin_nested():
+                            result = conn.execute(insert(tabla).values(**fila))
+                        aceptados.append((cambio, {'id': result.inserted_primary_key[0]}))
+                    except IntegrityError as e:
+                        self._error(stats, cambio[0], e.orig)
+
+            for (clave, _, huella, _), fila in aceptados:
+                aplicados.append((clave, huella, str(fila['id'])))
+            stats['insertados'] += len(aceptados)
+        return aplicados
+
+    @staticmethod
+    def _error(stats, clave, error):
+        stats['errores'] += 1
+        if len(stats['detalle_errores']) < 100:
+            stats['detalle_errores'].append(f"{clave}: {error}")
+
+    # Posición (marca, clave) guardada en rpcontrl
+
+    @staticmethod
+    def _position_parameter(tabla):
+        return f"LEGADO_{tabla}_MARCA"
+
+    def _load_position(self, tabla):
+        control = Control.__table__
+        with self.engine.connect() as conn:
+            valor = conn.execute(
+                select(control.c.valor).where(control.c.parametro == self._position_parameter(tabla))
+            ).scalar()
+        if not valor:
+            return None
+        marca, clave = json.loads(valor)
+        return marca, clave
+
+    def _save_position(self, conn, tabla, desde):
+        control = Control.__table__
+        stmt = sqlite_insert(control)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[control.c.parametro],
+                set_={'valor': stmt.excluded.valor, 'updated_at': stmt.excluded.updated_at}
+            ),
+            {'parametro': self._position_parameter(tabla),
+             'valor': json.dumps([_as_json(desde[0]), _as_json(desde[1])]),
+             'descripcion': f"Última posición sincronizada de {tabla}",
+             'tipo': 'STRING', 'categoria': 'SINCRONIZACION', 'editable': False,
+             'updated_at': datetime.utcnow()}
+        )
+
+
+def _as_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat(sep=' ') if isinstance(valor, datetime) else valor.isoformat()
+    return valor
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sincronización desde RPEMPLEA/RPHISTOR")
+    parser.add_argument('--origen', help="Cadena ODBC o sqlite:///ruta (por defecto SGN_LEGACY_SOURCE)")
+    parser.add_argument('--marca', action='append', default=[],
+                        help="TABLA=COLUMNA de fecha de modificación, p. ej. RPEMPLEA=FECHA_MOD")
+    parser.add_argument('--tablas', default='RPEMPLEA,RPHISTOR')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    marcas = dict(m.split('=', 1) for m in args.marca)
+    report = LegacySync(args.origen, marcas=marcas).run(tuple(args.tablas.split(',')))
+    for tabla, stats in report.items():
+        print(f"{tabla}: {stats['leidos']} leídos, {stats['insertados']} nuevos, "
+              f"{stats['actualizados']} actualizados, {stats['sin_cambios']} sin cambios, "
+              f"{stats['errores']} errores ({stats['duracion']} s)")
+        for detalle in stats['detalle_errores'][:10]:
+            print(f"  {detalle}")
+
+
+if __name__ == "__main__":
+    main()
@@ -412,7 +412,7 @@ class PayrollCalculator:
                 rol_pago.aporte_iess = float(result["aporte_iess"])
                 rol_pago.impuesto_renta = float(result["impuesto_renta"])
                 rol_pago.total_descuentos = float(result["total_descuentos"])
-                rol_pago.liquido_recibir = float(result["liquido_recibir"])
+                rol_pago.neto_pagar = float(result["liquido_recibir"])
                 rol_pago.decimo_tercero = float(result["decimo_tercero"])
                 rol_pago.decimo_cuarto = float(result["decimo_cuarto"])
                 rol_pago.vacaciones = float(result["vacaciones"])
@@ -432,16 +432,49 @@ class PayrollCalculator:
             logger.error(f"Error guardando resultados de nómina: {e}")
             raise
 
-    def get_payroll_summary(self, period_year, period_month):
-        """Obtener resumen de nómina del período"""
+    def process_payroll_period(self, period_year, period_month):
+        """
+        Procesar (aprobar) los roles calculados de un período
+
+        Los roles CALCULADO pasan a PROCESADO con la fecha de proceso; desde
+        ese estado se incluyen en el archivo de pagos bancarios. Un nuevo
+        cálculo del período los devuelve a CALCULADO.
+
+        Returns:
+            int: Roles procesados
+        """
         try:
             period = f"{period_year:04d}-{period_month:02d}"
+            procesados = self.session.query(RolPago).filter(
+                RolPago.periodo == period,
+                RolPago.estado == "CALCULADO"
+            ).update(
+                {RolPago.estado: "PROCESADO", RolPago.fecha_proceso: datetime.now()},
+                synchronize_session=False
+            )
+            self.session.commit()
+            logger.info(f"Procesados {procesados} roles de pago del período {period}")
+            return procesados
 
-            roles = self.session.query(RolPago).filter(
-                RolPago.periodo == period
-            ).all()
+        except Exception as e:
+            self.session.rollback()
+            logger.error(f"Error procesando roles de pago: {e}")
+            raise
 
-            if not roles:
+    def get_payroll_summary(self, period_year, period_month):
+        """
+        Obtener resumen de nómina del período
+
+        Se lee la fila total de resumen_nomina, que se mantiene al guardar
+        los roles de pago, en lugar de recorrer todos los roles del período.
+        """
+        from database.summaries import get_period_summary
+
+        try:
+            period = f"{period_year:04d}-{period_month:02d}"
+            resumen = get_period_summary(self.session, period)
+
+            if resumen is None:
                 return {
                     "total_empleados": 0,
                     "total_ingresos": Decimal("0"),
@@ -455,33 +488,21 @@ class PayrollCalculator:
                 }
 
             summary = {
-                "total_empleados": len(roles),
-                "total_ingresos": sum(Decimal(str(rol.total_ingresos)) for rol in roles),
-                "total_descuentos": sum(Decimal(str(rol.total_descuentos)) for rol in roles),
-                "liquido_total": sum(Decimal(str(rol.liquido_recibir)) for rol in roles),
-                "aporte_iess_personal": sum(Decimal(str(rol.aporte_iess)) for rol in roles),
-                "aporte_iess_patronal": sum(Decimal(str(rol.aporte_patronal)) for rol in roles),
-                "impuesto_renta_total": sum(Decimal(str(rol.impuesto_renta)) for rol in roles),
-                "provisiones_total": sum(
-                    Decimal(str(rol.decimo_tercero)) +
-                    Decimal(str(rol.decimo_cuarto)) +
-                    Decimal(str(rol.vacaciones)) +
-                    Decimal(str(rol.fondos_reserva))
-                    for rol in roles
-                ),
+                "total_empleados": resumen.empleados,
+                "total_ingresos": resumen.total_ingresos,
+                "total_descuentos": resumen.total_descuentos,
+                "liquido_total": resumen.liquido_total,
+                "aporte_iess_personal": resumen.aporte_iess_personal,
+                "aporte_iess_patronal": resumen.aporte_iess_patronal,
+                "impuesto_renta_total": resumen.impuesto_renta,
+                "provisiones_total": resumen.provisiones_total,
+                "costo_empresa_total": resumen.costo_empresa_total,
             }
 
-            # Costo total para la empresa
-            summary["costo_empresa_total"] = (
-                summary["total_ingresos"] +
-                summary["aporte_iess_patronal"] +
-                summary["provisiones_total"]
-            )
-
             # Redondear todos los valores
             for key in summary:
-                if key != "total_empleados" and isinstance(summary[key], Decimal):
-                    summary[key] = self.round_currency(summary[key])
+                if key != "total_empleados":
+                    summary[key] = self.round_currency(Decimal(str(summary[key] or 0)))
 
             return summary
 
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PayslipPdf - Sistema SGN
+Recibos de pago en PDF por lotes: plantilla estática armada una vez por
+proceso y páginas renderizadas en paralelo en un pool de procesos
+"""
+
+import sys
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+import logging
+import tempfile
+import time
+
+from sqlalchemy import select, func
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.models import Empleado, RolPago, Control
+
+logger = logging.getLogger(__name__)
+
+# Roles con recibo
+ESTADOS_RECIBO = ('CALCULADO', 'PROCESADO', 'PAGADO')
+
+# Recibos por tarea del pool
+LOTE_RECIBOS = 250
+
+INGRESOS = [
+    ('Sueldo básico', 'sueldo_basico'),
+    ('Horas extras', 'horas_extras'),
+    ('Comisiones', 'comisiones'),
+    ('Bonos', 'bonos'),
+    ('Otros ingresos', 'otros_ingresos'),
+]
+
+DESCUENTOS = [
+    ('Aporte personal IESS', 'aporte_iess'),
+    ('Impuesto a la renta', 'impuesto_renta'),
+    ('Préstamos', 'prestamos'),
+    ('Anticipos', 'anticipos'),
+    ('Otros descuentos', 'otros_descuentos'),
+]
+
+MESES = ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO', 'JULIO',
+         'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']
+
+
+class PayslipTemplate:
+    """
+    Parte fija del recibo (marcos, títulos, etiquetas y empresa)
+
+    Las operaciones de dibujo y las posiciones de los valores se calculan
+    una sola vez en el constructor. Cada documento guarda la parte fija
+    como un Form XObject (attach) y cada página solo la referencia y
+    escribe los valores del empleado (render), así el PDF no repite la
+    plantilla en cada página.
+    """
+
+    FORM = 'recibo'
+
+    def __init__(self, empresa, periodo):
+        from reportlab.lib.pagesizes import A4
+
+        self.empresa = empresa
+        self.periodo = periodo
+        self.ancho, self.alto = A4
+        self.operaciones = []
+        self.campos = {}
+        self._build()
+
+    def _text(self, x, y, texto, fuente='Helvetica', tamano=9, alineacion='left'):
+        self.operaciones.append(('text', x, y, texto, fuente, tamano, alineacion))
+
+    def _build(self):
+        ancho, alto = self.ancho, self.alto
+        margen = 40
+        derecha = ancho - margen
+        anio, mes = self.periodo.split('-')
+
+        # Encabezado de la empresa
+        self._text(margen, alto - 50, self.empresa.get('EMPRESA_NOMBRE', Config.COMPANY_NAME), 'Helvetica-Bold', 13)
+        self._text(margen, alto - 65, f"RUC: {self.empresa.get('EMPRESA_RUC', '')}")
+        self._text(margen, alto - 77, self.empresa.get('EMPRESA_DIRECCION', ''), tamano=8)
+        self._text(derecha, alto - 50, 'ROL DE PAGOS', 'Helvetica-Bold', 13, 'right')
+        self._text(derecha, alto - 65, f"{MESES[int(mes) - 1]} {anio}", 'Helvetica-Bold', 10, 'right')
+        self.operaciones.append(('line', margen, alto - 88, derecha, alto - 88))
+
+        # Datos del empleado: etiquetas fijas, valores por página
+        y = alto - 108
+        for etiqueta, campo, x in [('Código:', 'empleado', margen), ('Cédula:', 'cedula', 300)]:
+            self._text(x, y, etiqueta, 'Helvetica-Bold')
+            self.campos[campo] = (x + 55, y, 'left')
+        y -= 14
+        for etiqueta, campo, x in [('Nombre:', 'nombre', margen), ('Días:', 'dias_trabajados', 300)]:
+            self._text(x, y, etiqueta, 'Helvetica-Bold')
+            self.campos[campo] = (x + 55, y, 'left')
+        y -= 14
+        for etiqueta, campo, x in [('Cargo:', 'cargo', margen), ('Depto.:', 'depto', 300)]:
+            self._text(x, y, etiqueta, 'Helvetica-Bold')
+            self.campos[campo] = (x + 55, y, 'left')
+
+        # Columnas de ingresos y descuentos
+        superior = y - 20
+        filas = max(len(INGRESOS), len(DESCUENTOS))
+        alto_tabla = 22 + 15 * filas + 22
+        medio = ancho / 2
+        self.operaciones.append(('rect', margen, superior - alto_tabla, derecha - margen, alto_tabla))
+        self.operaciones.append(('line', medio, superior, medio, superior - alto_tabla))
+        self.operaciones.append(('line', margen, superior - 18, derecha, superior - 18))
+        self.operaciones.append(('line', margen, superior - alto_tabla + 20, derecha, superior - alto_tabla + 20))
+
+        for x0, x1, titulo, conceptos, total, etiqueta_total in [
+            (margen, medio, 'INGRESOS', INGRESOS, 'total_ingresos', 'TOTAL INGRESOS'),
+            (medio, derecha, 'DESCUENTOS', DESCUENTOS, 'total_descuentos', 'TOTAL DESCUENTOS'),
+        ]:
+            self._text((x0 + x1) / 2, superior - 13, titulo, 'Helvetica-Bold', 10, 'center')
+            fila_y = superior - 33
+            for etiqueta, campo in conceptos:
+                self._text(x0 + 8, fila_y, etiqueta)
+                self.campos[campo] = (x1 - 8, fila_y, 'right')
+                fila_y -= 15
+            self._text(x0 + 8, superior - alto_tabla + 7, etiqueta_total, 'Helvetica-Bold')
+            self.campos[total] = (x1 - 8, superior - alto_tabla + 7, 'right')
+
+        # Neto y firmas
+        neto_y = superior - alto_tabla - 28
+        self.operaciones.append(('rect', medio, neto_y - 6, derecha - medio, 22))
+        self._text(medio + 8, neto_y, 'NETO A RECIBIR', 'Helvetica-Bold', 11)
+        self.campos['neto_pagar'] = (derecha - 8, neto_y, 'right')
+
+        firma_y = neto_y - 80
+        for x0 in (margen, medio + 20):
+            self.operaciones.append(('line', x0, firma_y, x0 + 200, firma_y))
+        self._text(margen + 100, firma_y - 12, 'EMPLEADOR', tamano=8, alineacion='center')
+        self._text(medio + 120, firma_y - 12, 'RECIBÍ CONFORME', tamano=8, alineacion='center')
+
+    def attach(self, canvas):
+        """Registrar la parte fija como Form XObject del documento"""
+        canvas.beginForm(self.FORM)
+        canvas.setLineWidth(0.7)
+        for operacion in self.operaciones:
+            tipo = operacion[0]
+            if tipo == 'text':
+                _, x, y, texto, fuente, tamano, alineacion = operacion
+                canvas.setFont(fuente, tamano)
+                if alineacion == 'right':
+                    canvas.drawRightString(x, y, texto)
+                elif alineacion == 'center':
+                    canvas.drawCentredString(x, y, texto)
+                else:
+                    canvas.drawString(x, y, texto)
+            elif tipo == 'line':
+                canvas.line(*operacion[1:])
+            else:
+                canvas.rect(*operacion[1:], stroke=1, fill=0)
+        canvas.endForm()
+
+    def render(self, canvas, recibo):
+        """Dibujar una página: la plantilla y los valores del empleado"""
+        canvas.doForm(self.FORM)
+        for campo, (x, y, alineacion) in self.campos.items():
+            valor = recibo.get(campo)
+            if alineacion == 'right':
+                canvas.setFont('Helvetica-Bold' if campo in ('neto_pagar', 'total_ingresos', 'total_descuentos')
+                               else 'Helvetica', 11 if campo == 'neto_pagar' else 9)
+                canvas.drawRightString(x, y, f"{valor or 0:,.2f}")
+            else:
+                canvas.setFont('Helvetica', 9)
+                canvas.drawString(x, y, str(valor if valor is not None else ''))
+        canvas.showPage()
+
+
+# Plantilla del proceso (se arma una vez en cada proceso del pool)
+_plantilla = None
+
+
+def _init_worker(empresa, periodo):
+    global _plantilla
+    _plantilla = PayslipTemplate(empresa, periodo)
+
+
+def _new_canvas(path):
+    from reportlab.pdfgen.canvas import Canvas
+
+    canvas = Canvas(str(path), pagesize=(_plantilla.ancho, _plantilla.alto))
+    canvas.setTitle(f"Rol de pagos {_plantilla.periodo}")
+    _plantilla.attach(canvas)
+    return canvas
+
+
+def _render_chunk(destino, recibos, individual):
+    """
+    Renderizar un lote en el proceso actual
+
+    individual=True escribe un PDF por empleado en destino (directorio);
+    si no, el lote completo va a un solo PDF en destino (archivo).
+    """
+    if individual:
+        archivos = []
+        for recibo in recibos:
+            path = Path(destino) / f"recibo_{_plantilla.periodo}_{recibo['empleado']}.pdf"
+            canvas = _new_canvas(path)
+            _plantilla.render(canvas, recibo)
+            canvas.save()
+            archivos.append(str(path))
+        return archivos, len(recibos)
+
+    canvas = _new_canvas(destino)
+    for recibo in recibos:
+        _plantilla.render(canvas, recibo)
+    canvas.save()
+    return [str(destino)], len(recibos)
+
+
+class PayslipService:
+    """
+    Generación de recibos de pago de un período
+
+    Los roles se leen por streaming y se reparten en lotes de chunk_size
+    recibos entre los procesos del pool; cada proceso arma la plantilla al
+    iniciar y renderiza sus lotes de forma independiente. Con merged=True
+    cada lote produce una parte que se une al final en un solo PDF (pypdf);
+    si pypdf no está instalado el PDF único se renderiza en este proceso.
+    """
+
+    def __init__(self, session=None, workers=None, chunk_size=LOTE_RECIBOS):
+        self._session = session
+        self.workers = workers or Config.PAYSLIP_WORKERS
+        self.chunk_size = chunk_size
+
+    @property
+    def session(self):
+        if self._session is None:
+            from database.connection import get_session
+            self._session = get_session()
+        return self._session
+
+    def company_parameters(self):
+        """Parámetros EMPRESA_* de rpcontrl"""
+        return dict(self.session.query(Control.parametro, Control.valor).filter(
+            Control.parametro.like('EMPRESA\\_%', escape='\\')
+        ).all())
+
+    @staticmethod
+    def payslip_query(periodo, employee_codes=None):
+        query = select(
+            RolPago.empleado, RolPago.dias_trabajados, RolPago.neto_pagar,
+            RolPago.total_ingresos, RolPago.total_descuentos,
+            *(getattr(RolPago, campo) for _, campo in INGRESOS + DESCUENTOS),
+            Empleado.cedula, Empleado.nombres, Empleado.apellidos, Empleado.cargo, Empleado.depto,
+        ).join(
+            Empleado, Empleado.empleado == RolPago.empleado
+        ).where(
+            RolPago.periodo == periodo,
+            RolPago.estado.in_(ESTADOS_RECIBO),
+        )
+        if employee_codes:
+            query = query.where(RolPago.empleado.in_(employee_codes))
+        return query.order_by(RolPago.empleado)
+
+    def iter_chunks(self, periodo, employee_codes=None):
+        """Lotes de recibos como dicts simples (se envían a otros procesos)"""
+        result = self.session.execute(
+            self.payslip_query(periodo, employee_codes).execution_options(yield_per=self.chunk_size)
+        )
+        for lote in result.partitions():
+            recibos = []
+            for fila in lote:
+                recibo = dict(fila._mapping)
+                recibo['nombre'] = f"{recibo.pop('apellidos')} {recibo.pop('nombres')}"
+                for campo, valor in recibo.items():
+                    if hasattr(valor, 'as_tuple'):
+                        recibo[campo] = float(valor)
+                recibos.append(recibo)
+            yield recibos
+
+    def generate(self, periodo, destino=None, merged=False, employee_codes=None, progress_callback=None):
+        """
+        Generar los recibos del período
+
+        Args:
+            periodo: Período YYYY-MM
+            destino: Directorio de salida (Config.REPORTS_DIR por defecto)
+            merged: True para un solo PDF con todos los recibos
+            employee_codes: Limitar a estos empleados (opcional)
+            progress_callback: f(generados, total); devolver False cancela
+
+        Returns:
+            dict: archivos, paginas, paginas_por_segundo, cancelada y tiempo
+        """
+        start_time = time.time()
+        try:
+            total = self.session.execute(
+                select(func.count()).select_from(self.payslip_query(periodo, employee_codes).subquery())
+            ).scalar()
+            if not total:
+                return {'success': False, 'message': f"No hay roles {', '.join(ESTADOS_RECIBO)} en {periodo}"}
+
+            empresa = self.company_parameters()
+            destino = Path(destino or Config.REPORTS_DIR)
+            marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+            if merged:
+                destino.mkdir(parents=True, exist_ok=True)
+                archivo = destino / f"roles_{periodo}_{marca}.pdf"
+            else:
+                destino = destino / f"roles_{periodo}_{marca}"
+                destino.mkdir(parents=True, exist_ok=True)
+
+            if merged and not self._can_merge():
+                logger.info("pypdf no disponible: el PDF único se genera en un solo proceso")
+                resultado = self._render_single(periodo, empresa, archivo, employee_codes, total, progress_callback)
+            elif merged:
+                # Las partes quedan en un temporal junto al destino hasta unirlas
+                with tempfile.TemporaryDirectory(dir=destino) as tmp:
+                    resultado = self._render_pool(
+                        periodo, empresa, Path(tmp), merged, employee_codes, total, progress_callback
+                    )
+                    if not resultado['cancelada']:
+                        self._merge(resultado['archivos'], archivo)
+                    resultado['archivos'] = [] if resultado['cancelada'] else [str(archivo)]
+            else:
+                resultado = self._render_pool(
+                    periodo, empresa, destino, merged, employee_codes, total, progress_callback
+                )
+
+            tiempo = time.time() - start_time
+            resultado.update(
+                success=True,
+                tiempo=tiempo,
+                paginas_por_segundo=resultado['paginas'] / tiempo if tiempo else 0,
+            )
+            logger.info(
+                f"Recibos {periodo}: {resultado['paginas']} páginas en {tiempo:.1f} s "
+                f"({resultado['paginas_por_segundo']:.0f} pág/s)"
+            )
+            return resultado
+
+        except Exception as e:
+            logger.error(f"Error generando recibos de pago: {e}")
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+    def _render_pool(self, periodo, empresa, destino, merged, employee_codes, total, progress_callback):
+        """Repartir los lotes en el pool; a lo sumo dos lotes pendientes por proceso"""
+        partes = {}
+        archivos = []
+        paginas = 0
+        cancelada = False
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(empresa, periodo)) as pool:
+            pendientes = {}
+
+            def recoger(hechos):
+                nonlocal paginas, cancelada
+                for futuro in hechos:
+                    numero = pendientes.pop(futuro)
+                    generados, cantidad = futuro.result()
+                    paginas += cantidad
+                    if merged:
+                        partes[numero] = generados[0]
+                    else:
+                        archivos.extend(generados)
+                    if progress_callback and progress_callback(paginas, total) is False:
+                        cancelada = True
+
+            for numero, recibos in enumerate(self.iter_chunks(periodo, employee_codes)):
+                salida = destino / f"parte_{numero:05d}.pdf" if merged else destino
+                pendientes[pool.submit(_render_chunk, salida, recibos, not merged)] = numero
+                if len(pendientes) >= 2 * self.workers:
+                    hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                    recoger(hechos)
+                if cancelada:
+                    break
+
+            if cancelada:
+                for futuro in pendientes:
+                    futuro.cancel()
+                pool.shutdown(wait=True, cancel_futures=True)
+            else:
+                recoger(wait(pendientes).done)
+
+        if merged:
+            archivos = [partes[n] for n in sorted(partes)]
+        return {'archivos': archivos, 'paginas': paginas, 'cancelada': cancelada}
+
+    def _render_single(self, periodo, empresa, archivo, employee_codes, total, progress_callback):
+        """Un solo PDF renderizado en este proceso (misma plantilla en caché)"""
+        _init_worker(empresa, periodo)
+        canvas = _new_canvas(archivo)
+        paginas = 0
+        cancelada = False
+        for recibos in self.iter_chunks(periodo, employee_codes):
+            for recibo in recibos:
+                _plantilla.render(canvas, recibo)
+            paginas += len(recibos)
+            if progress_callback and progress_callback(paginas, total) is False:
+                cancelada = True
+                break
+        canvas.save()
+        return {'archivos': [str(archivo)], 'paginas': paginas, 'cancelada': cancelada}
+
+    @staticmethod
+    def _can_merge():
+        try:
+            import pypdf  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @staticmethod
+    def _merge(partes, archivo):
+        """Unir las partes en orden; la plantilla compartida se deduplica"""
+        from pypdf import PdfWriter
+
+        writer = PdfWriter()
+        for parte in partes:
+            writer.append(parte)
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        with open(archivo, 'wb') as fh:
+            writer.write(fh)
+        return str(archivo)
+
+
+# Instancia global
+payslip_service = PayslipService()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SriRdep - Sistema SGN
+Anexo de retenciones en la fuente bajo relación de dependencia (RDEP):
+totales anuales por empleado con un solo GROUP BY y XML escrito por
+streaming
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from xml.sax.saxutils import XMLGenerator
+import hashlib
+import logging
+import time
+
+from sqlalchemy import select, func, or_
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from database.models import Empleado, RolPago, Control, DecimoTercer, DecimoCuarto, FondosReserva
+from services.bank_payments import ascii_text
+
+logger = logging.getLogger(__name__)
+
+# Roles que cuentan como ingresos del año
+ESTADOS_RDEP = ('CALCULADO', 'PROCESADO', 'PAGADO')
+
+# Filas leídas por lote del cursor
+LOTE_RDEP = 2000
+
+CENTAVO = Decimal('0.01')
+
+# Campos monetarios de cada empleado, en el orden del anexo
+CAMPOS_VALORES = [
+    ('suelSal', 'sueldo'),
+    ('sobSuelComRemu', 'sobresueldos'),
+    ('partUtil', None),
+    ('intGrabGen', None),
+    ('impRentEmpl', None),
+    ('decimTer', 'decimo_tercero'),
+    ('decimCuar', 'decimo_cuarto'),
+    ('fondoReserva', 'fondos_reserva'),
+    ('salarioDigno', None),
+    ('otrosIngRenGrav', None),
+    ('ingGravConEsteEmpl', 'ingresos'),
+]
+
+CAMPOS_RETENCION = [
+    ('apoPerIess', 'aporte_iess'),
+    ('aporPerIessConOtrosEmpls', None),
+    ('basImp', 'base_imponible'),
+    ('impRentCaus', 'impuesto_causado'),
+    ('valRetAsuOtrosEmpls', None),
+    ('valImpAsuEsteEmpl', None),
+    ('valRet', 'retenido'),
+]
+
+# Totales que se cuadran contra resumen_nomina: total del anexo -> columna del resumen
+TOTALES_CONTROL = ('ingresos', 'aporte_iess', 'retenido')
+COLUMNAS_RESUMEN = {
+    'ingresos': 'total_ingresos',
+    'aporte_iess': 'aporte_iess_personal',
+    'retenido': 'impuesto_renta',
+}
+
+# Valores anuales por empleado de annual_query
+VALORES_EMPLEADO = ('sueldo', 'sobresueldos', 'decimo_tercero', 'decimo_cuarto', 'fondos_reserva',
+                    'ingresos', 'aporte_iess', 'retenido')
+
+
+def _moneda(valor):
+    return Decimal(str(valor or 0)).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+class RdepWriter:
+    """
+    Escritor incremental del XML del anexo
+
+    Cada elemento se escribe en cuanto se conoce, sin construir el árbol
+    completo; la memoria no depende de la cantidad de empleados.
+    """
+
+    def __init__(self, stream):
+        self.xml = XMLGenerator(stream, encoding='UTF-8', short_empty_elements=True)
+        self.nivel = 0
+        self.vacio = True
+
+    def _sangria(self):
+        if self.vacio:
+            self.vacio = False
+            return
+        self.xml.ignorableWhitespace('\n' + '  ' * self.nivel)
+
+    def start_document(self):
+        self.xml.startDocument()
+
+    def start(self, nombre):
+        self._sangria()
+        self.xml.startElement(nombre, {})
+        self.nivel += 1
+
+    def end(self, nombre):
+        self.nivel -= 1
+        self._sangria()
+        self.xml.endElement(nombre)
+
+    def element(self, nombre, valor):
+        self._sangria()
+        self.xml.startElement(nombre, {})
+        self.xml.characters(str(valor))
+        self.xml.endElement(nombre)
+
+    def end_document(self):
+        self.xml.ignorableWhitespace('\n')
+        self.xml.endDocument()
+
+
+class RdepService:
+    """
+    Generación del RDEP de un año
+
+    Los totales por empleado salen de una sola consulta agrupada sobre los
+    doce períodos de roles_pago, leída por lotes; cada empleado se escribe
+    de inmediato en el XML. Al terminar, los totales escritos se comparan
+    con los doce resúmenes por período de resumen_nomina.
+    """
+
+    def __init__(self, session=None):
+        self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            from database.connection import get_session
+            self._session = get_session()
+        return self._session
+
+    def company_parameters(self):
+        """Parámetros EMPRESA_* de rpcontrl"""
+        return dict(self.session.query(Control.parametro, Control.valor).filter(
+            Control.parametro.like('EMPRESA\\_%', escape='\\')
+        ).all())
+
+    @staticmethod
+    def year_filter(anio):
+        return (
+            RolPago.periodo >= f"{anio:04d}-01",
+            RolPago.periodo <= f"{anio:04d}-12",
+            RolPago.estado.in_(ESTADOS_RDEP),
+        )
+
+    @classmethod
+    def benefit_totals(cls, anio):
+        """
+        Décimos y fondos de reserva pagados en el año, por empleado
+
+        No forman parte de roles_pago: se llevan en sus tablas de control
+        (decimo_tercer y decimo_cuarto por año, fondos_reserva por período).
+        """
+        return [
+            select(
+                DecimoTercer.empleado, func.sum(func.coalesce(DecimoTercer.valor_pagado, 0)).label('valor')
+            ).where(
+                DecimoTercer.periodo == anio, DecimoTercer.estado != 'ANULADO'
+            ).group_by(DecimoTercer.empleado).subquery('decimo_tercero'),
+            select(
+                DecimoCuarto.empleado, func.sum(func.coalesce(DecimoCuarto.valor_pagado, 0)).label('valor')
+            ).where(
+                DecimoCuarto.periodo == anio, DecimoCuarto.estado != 'ANULADO'
+            ).group_by(DecimoCuarto.empleado).subquery('decimo_cuarto'),
+            select(
+                FondosReserva.empleado, func.sum(func.coalesce(FondosReserva.valor_pagado, 0)).label('valor')
+            ).where(
+                FondosReserva.periodo.between(f"{anio:04d}-01", f"{anio:04d}-12")
+            ).group_by(FondosReserva.empleado).subquery('fondos_reserva'),
+        ]
+
+    @classmethod
+    def annual_query(cls, anio):
+        """Totales del año por empleado (un solo GROUP BY)"""
+        sobresueldos = (
+            func.coalesce(RolPago.horas_extras, 0) + func.coalesce(RolPago.comisiones, 0)
+            + func.coalesce(RolPago.bonos, 0) + func.coalesce(RolPago.otros_ingresos, 0)
+        )
+        beneficios = cls.benefit_totals(anio)
+        consulta = select(
+            RolPago.empleado,
+            func.min(Empleado.cedula).label('cedula'),
+            func.min(Empleado.nombres).label('nombres'),
+            func.min(Empleado.apellidos).label('apellidos'),
+            func.count().label('periodos'),
+            func.round(func.sum(func.coalesce(RolPago.sueldo_basico, 0)), 2).label('sueldo'),
+            func.round(func.sum(sobresueldos), 2).label('sobresueldos'),
+            *[func.round(func.coalesce(func.min(beneficio.c.valor), 0), 2).label(beneficio.name)
+              for beneficio in beneficios],
+            func.round(func.sum(func.coalesce(RolPago.total_ingresos, 0)), 2).label('ingresos'),
+            func.round(func.sum(func.coalesce(RolPago.aporte_iess, 0)), 2).label('aporte_iess'),
+            func.round(func.sum(func.coalesce(RolPago.impuesto_renta, 0)), 2).label('retenido'),
+        ).join(
+            Empleado, Empleado.empleado == RolPago.empleado
+        )
+        for beneficio in beneficios:
+            consulta = consulta.outerjoin(beneficio, beneficio.c.empleado == RolPago.empleado)
+        return consulta.where(
+            *cls.year_filter(anio)
+        ).group_by(RolPago.empleado).order_by(RolPago.empleado)
+
+    def generate(self, anio, destino=None):
+        """
+        Generar el XML del RDEP
+
+        Args:
+            anio: Año fiscal
+            destino: Directorio de salida (Config.REPORTS_DIR por defecto)
+
+        Returns:
+            dict: archivo, empleados, totales, conciliacion, cuadrado,
+                  observaciones [{'empleado', 'nombre', 'motivo'}], hash
+                  (SHA-256) y tiempo
+        """
+        start_time = time.time()
+        try:
+            parametros = self.company_parameters()
+            ruc = parametros.get('EMPRESA_RUC')
+            if not ruc:
+                return {'success': False, 'message': "Configure el RUC de la empresa (EMPRESA_RUC)"}
+
+            from services.payroll_calculator import payroll_calculator
+
+            destino = Path(destino or Config.REPORTS_DIR)
+            destino.mkdir(parents=True, exist_ok=True)
+            archivo = destino / f"RDEP_{anio}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xml"
+
+            totales = dict.fromkeys(TOTALES_CONTROL + ('impuesto_causado',), Decimal('0'))
+            empleados = 0
+            roles = 0
+            observaciones = []
+
+            with open(archivo, 'w', encoding='utf-8', newline='\n') as fh:
+                xml = RdepWriter(fh)
+                xml.start_document()
+                xml.start('rdep')
+                xml.element('numRuc', ruc)
+                xml.element('anio', anio)
+                xml.start('retRelDep')
+
+                result = self.session.execute(
+                    self.annual_query(anio).execution_options(yield_per=LOTE_RDEP)
+                )
+                for fila in result:
+                    datos = {clave: _moneda(getattr(fila, clave)) for clave in VALORES_EMPLEADO}
+                    datos['base_imponible'] = max(datos['ingresos'] - datos['aporte_iess'], Decimal('0'))
+                    datos['impuesto_causado'] = _moneda(
+                        payroll_calculator.calculate_income_tax(None, datos['base_imponible']))
+
+                    nombre = f"{fila.apellidos} {fila.nombres}"
+                    if datos['retenido'] + 1 < datos['impuesto_causado']:
+                        observaciones.append({
+                            'empleado': fila.empleado, 'nombre': nombre,
+                            'motivo': f"Retención {datos['retenido']} menor al impuesto causado "
+                                      f"{datos['impuesto_causado']}",
+                        })
+
+                    self._write_employee(xml, fila, datos)
+                    empleados += 1
+                    roles += fila.periodos
+                    for clave in totales:
+                        totales[clave] += datos[clave]
+
+                xml.end('retRelDep')
+                xml.end('rdep')
+                xml.end_document()
+
+            if not empleados:
+                archivo.unlink()
+                return {'success': False, 'message': f"No hay roles {', '.join(ESTADOS_RDEP)} en {anio}"}
+
+            conciliacion = self.reconcile(anio, roles, totales)
+            cuadrado = all(c['cuadra'] for c in conciliacion.values())
+
+            digest = hashlib.sha256()
+            with open(archivo, 'rb') as fh:
+                for bloque in iter(lambda: fh.read(1024 * 1024), b''):
+                    digest.update(bloque)
+
+            logger.info(
+                f"RDEP {anio}: {empleados} empleados, ingresos {totales['ingresos']}, "
+                f"retenido {totales['retenido']}, {'cuadrado' if cuadrado else 'NO cuadra'}"
+            )
+            return {
+                'success': True,
+                'archivo': str(archivo),
+                'empleados': empleados,
+                'totales': totales,
+                'conciliacion': conciliacion,
+                'cuadrado': cuadrado,
+                'observaciones': observaciones,
+                'hash': digest.hexdigest(),
+                'tiempo': time.time() - start_time,
+            }
+
+        except Exception as e:
+            logger.error(f"Error generando RDEP: {e}")
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+    @staticmethod
+    def _write_employee(xml, fila, datos):
+        xml.start('datRetRelDep')
+        xml.start('empleado')
+        xml.element('benGalpg', 'NO')
+        xml.element('tipIdRet', 'C')
+        xml.element('idRet', fila.cedula)
+        xml.element('apellidoTrab', ascii_text(fila.apellidos))
+        xml.element('nombreTrab', ascii_text(fila.nombres))
+        xml.element('estab', '001')
+        xml.element('residenciaTrab', '01')
+        xml.element('paisResidencia', '593')
+        xml.element('aplicaConvenio', 'NA')
+        xml.element('tipoTrabajDiscap', '01')
+        xml.element('porcentajeDiscap', '0')
+        xml.element('tipIdDiscap', 'N')
+        xml.element('idDiscap', '999')
+        xml.end('empleado')
+        for etiqueta, clave in CAMPOS_VALORES:
+            xml.element(etiqueta, datos[clave] if clave else '0.00')
+        xml.element('sisSalNet', '1')
+        for etiqueta, clave in CAMPOS_RETENCION:
+            xml.element(etiqueta, datos[clave] if clave else '0.00')
+        xml.end('datRetRelDep')
+
+    def reconcile(self, anio, roles, totales):
+        """
+        Comparar los totales escritos con resumen_nomina del año
+
+        El resumen de cada período se mantiene al guardar los roles e
+        incluye todos los roles del período, así que los que el anexo deja
+        fuera (estado fuera de ESTADOS_RDEP o sin empleado) se suman aparte:
+        anexo + excluidos debe igualar a la suma de los doce resúmenes.
+        """
+        from database.summaries import get_period_summary
+
+        resumen = dict.fromkeys(TOTALES_CONTROL, Decimal('0'))
+        resumen['roles'] = 0
+        for mes in range(1, 13):
+            periodo = get_period_summary(self.session, f"{anio:04d}-{mes:02d}")
+            resumen['roles'] += periodo.empleados or 0
+            for clave, columna in COLUMNAS_RESUMEN.items():
+                resumen[clave] += _moneda(getattr(periodo, columna))
+
+        desde, hasta, estados = self.year_filter(anio)
+        fuera = self.session.execute(
+            select(
+                func.count().label('roles'),
+                func.sum(func.coalesce(RolPago.total_ingresos, 0)).label('ingresos'),
+                func.sum(func.coalesce(RolPago.aporte_iess, 0)).label('aporte_iess'),
+                func.sum(func.coalesce(RolPago.impuesto_renta, 0)).label('retenido'),
+            ).select_from(RolPago).outerjoin(
+                Empleado, Empleado.empleado == RolPago.empleado
+            ).where(
+                desde, hasta,
+                or_(RolPago.estado.is_(None), ~estados, Empleado.empleado.is_(None))
+            )
+        ).one()
+
+        conciliacion = {}
+        for clave, valor in [('roles', roles)] + [(c, totales[c]) for c in TOTALES_CONTROL]:
+            excluidos = fuera.roles if clave == 'roles' else _moneda(getattr(fuera, clave))
+            diferencia = valor + excluidos - resumen[clave]
+            conciliacion[clave] = {
+                'anexo': valor,
+                'excluidos': excluidos,
+                'resumen': resumen[clave],
+                'diferencia': diferencia,
+                'cuadra': diferencia == 0,
+            }
+        return conciliacion
+
+
+# Instancia global
+rdep_service = RdepService()
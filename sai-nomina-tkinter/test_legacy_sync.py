@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de la sincronización con el sistema anterior - Sistema SGN
+Origen SQLite con el esquema de RPEMPLEA/RPHISTOR en lugar de SQL Server
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import sqlite3
+import tempfile
+
+from sqlalchemy import create_engine
+
+from database.connection import install_savepoint_support
+from database.models import Base
+from services.legacy_sync import LegacySync
+
+
+def _crear_origen(path):
+    """Base con las columnas del sistema anterior"""
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE RPEMPLEA (
+            EMPLEADO TEXT PRIMARY KEY, NOMBRES TEXT, APELLIDOS TEXT, CEDULA TEXT,
+            FECHA_NAC TEXT, SEXO TEXT, ESTADO_CI TEXT, DIRECCION TEXT, TELEFONO TEXT,
+            CARGO TEXT, DEPTO TEXT, SECCION TEXT, SUELDO REAL, FECHA_ING TEXT,
+            TIPO_TRA INTEGER, TIPO_PGO INTEGER, ESTADO TEXT, ANTICIPO REAL,
+            DECIMO3 REAL, DECIMO4 REAL, VACACION INTEGER, CARGAS INTEGER,
+            TIPO_SAN TEXT, OBSERV TEXT, CTA_AHO TEXT, CTA_CTE TEXT, FECHA_MOD TEXT
+        );
+        CREATE TABLE RPHISTOR (
+            ID INTEGER PRIMARY KEY, EMPLEADO TEXT, FECHA TEXT, TIPO TEXT, CLASE INTEGER,
+            CONCEPTO TEXT, VALOR REAL, HORAS REAL, REFERENCIA TEXT, OBSERV TEXT, PERIODO TEXT
+        );
+    """)
+    conn.executemany(
+        "INSERT INTO RPEMPLEA (EMPLEADO, NOMBRES, APELLIDOS, CEDULA, SEXO, DEPTO, SUELDO, "
+        "FECHA_ING, ESTADO, CTA_AHO, FECHA_MOD) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ('000001', 'JUAN', 'PEREZ', '1710034065', '1', 'D01', 800, '2020-01-15', 'ACT', '2200112233', '2024-01-01'),
+            ('000002', 'ANA', 'LOPEZ', '0912345678', '2', 'D01', 900, '15/06/2021', 'ACT', None, '2024-01-02'),
+            # Cédula repetida: se rechaza solo esta fila
+            ('000003', 'LUIS', 'MORA', '1710034065', '1', 'D02', 700, '2022-03-01', 'RET', None, '2024-01-03'),
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO RPHISTOR (ID, EMPLEADO, FECHA, TIPO, CLASE, CONCEPTO, VALOR, PERIODO) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (1, '000001', '2024-01-31', 'ING', 1, 'SUELDO', 800, '2024-01'),
+            (2, '000002', '2024-01-31', 'ING', 1, 'SUELDO', 900, '2024-01'),
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _crear_destino(path):
+    engine = install_savepoint_support(create_engine(f"sqlite:///{path}"))
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _filas(path, sql):
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_legacy_sync_incremental():
+    """Inserción inicial con una fila rechazada y segunda pasada sin cambios"""
+    with tempfile.TemporaryDirectory() as tmp:
+        origen, destino = Path(tmp, "legado.db"), Path(tmp, "sgn.db")
+        _crear_origen(origen)
+        engine = _crear_destino(destino)
+
+        reporte = LegacySync(f"sqlite:///{origen}", engine, batch_size=2).run()
+        assert reporte['RPEMPLEA']['insertados'] == 2
+        assert reporte['RPEMPLEA']['errores'] == 1
+        assert reporte['RPHISTOR']['insertados'] == 2
+        assert _filas(destino, "SELECT empleado, tipo_cuenta, fecha_ing FROM rpemplea ORDER BY empleado") == [
+            ('000001', 'A', '2020-01-15'), ('000002', None, '2021-06-15')]
+
+        reporte = LegacySync(f"sqlite:///{origen}", engine, batch_size=2).run()
+        assert reporte['RPEMPLEA']['sin_cambios'] == 2
+        assert reporte['RPHISTOR']['sin_cambios'] == 2
+        assert reporte['RPHISTOR']['insertados'] == 0
+        engine.dispose()
+
+
+class _FallaAlGuardarPosicion(LegacySync):
+    def _save_position(self, conn, tabla, desde):
+        raise RuntimeError("corte simulado")
+
+
+def test_legacy_sync_page_is_atomic():
+    """Un error al final de la página deshace también las filas aisladas con SAVEPOINT"""
+    with tempfile.TemporaryDirectory() as tmp:
+        origen, destino = Path(tmp, "legado.db"), Path(tmp, "sgn.db")
+        _crear_origen(origen)
+        conn = sqlite3.connect(str(origen))
+        conn.execute("DELETE FROM RPEMPLEA WHERE EMPLEADO = '000003'")
+        conn.commit()
+        conn.close()
+        engine = _crear_destino(destino)
+
+        # Página sin errores: el lote entero pasa por un único SAVEPOINT
+        sync = _FallaAlGuardarPosicion(f"sqlite:///{origen}", engine, marcas={'RPEMPLEA': 'FECHA_MOD'})
+        try:
+            sync.run(tablas=('RPEMPLEA',))
+            assert False, "se esperaba el corte simulado"
+        except RuntimeError:
+            pass
+
+        assert _filas(destino, "SELECT COUNT(*) FROM rpemplea") == [(0,)]
+        assert _filas(destino, "SELECT COUNT(*) FROM estado_sincronizacion") == [(0,)]
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_legacy_sync_incremental()
+    print("OK Sincronización incremental")
+    test_legacy_sync_page_is_atomic()
+    print("OK Atomicidad por página")
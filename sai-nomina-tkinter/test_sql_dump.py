@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del volcado SQL - Sistema SGN
+Ida y vuelta del volcado sobre una base temporal y medición de tiempos
+con una tabla de históricos grande (python test_sql_dump.py [filas])
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from datetime import datetime, date
+from decimal import Decimal
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database.models import Base, Empleado, Historico, IngresoDescuento
+from database.sql_dump import SqlDumper, load_dump
+
+
+def _crear_base(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _contenido(path):
+    """Filas almacenadas de cada tabla y definición de índices"""
+    conn = sqlite3.connect(str(path))
+    try:
+        tablas = {}
+        for table in Base.metadata.sorted_tables:
+            tablas[table.name] = conn.execute(f'SELECT * FROM "{table.name}" ORDER BY rowid').fetchall()
+        indices = sorted(conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        ).fetchall())
+        return tablas, indices
+    finally:
+        conn.close()
+
+
+def test_sql_dump_round_trip():
+    """El volcado cargado en una base vacía reproduce filas e índices"""
+    with tempfile.TemporaryDirectory() as tmp:
+        origen, copia, volcado = Path(tmp, "origen.db"), Path(tmp, "copia.db"), Path(tmp, "volcado.sql")
+        engine = _crear_base(origen)
+
+        with Session(engine) as session:
+            session.add_all([
+                Empleado(empleado='001001', cedula='1710034065', nombres="MARÍA JOSÉ", apellidos="O'BRIEN",
+                         fecha_ing=date(2020, 1, 15), sueldo=Decimal('1234.56'),
+                         observaciones="Línea 1;\nLínea 2 -- no es comentario\n'; DROP TABLE rpemplea; --"),
+                Empleado(empleado='001002', cedula='0912345678', nombres='PEDRO', apellidos='ÑAUPA',
+                         fecha_ing=date(2021, 6, 1), activo=False, foto=None),
+            ])
+            session.flush()
+            session.add_all([
+                Historico(empleado='001001', fecha=date(2024, 1, 31), tipo='ING', clase=1,
+                          valor=Decimal('0.10'), horas=Decimal('8.5'), periodo='2024-01'),
+                IngresoDescuento(empleado='001002', fecha_desde=date(2024, 2, 1), fecha_hasta=date(2024, 2, 7),
+                                 tipo='D', codigo='ANT', concepto='ANTICIPO', valor=Decimal('-25.00'),
+                                 created_at=datetime(2024, 2, 1, 8, 30)),
+            ])
+            session.commit()
+        engine.dispose()
+
+        dumper = SqlDumper(create_engine(f"sqlite:///{origen}"), rows_per_insert=1)
+        resultado = dumper.dump(volcado)
+        assert not resultado['cancelada']
+        assert resultado['tablas']['rpemplea']['filas'] == 2
+        assert resultado['tablas']['rphistor']['filas'] == 1
+
+        load_dump(volcado, copia)
+        assert _contenido(copia) == _contenido(origen)
+
+
+def benchmark(filas=1_000_000):
+    """Medir volcado y carga con una tabla rphistor de `filas` registros"""
+    with tempfile.TemporaryDirectory() as tmp:
+        origen, copia, volcado = Path(tmp, "origen.db"), Path(tmp, "copia.db"), Path(tmp, "volcado.sql")
+        _crear_base(origen).dispose()
+
+        conn = sqlite3.connect(str(origen))
+        conn.execute(
+            "INSERT INTO rpemplea (empleado, cedula, nombres, apellidos, fecha_ing) "
+            "VALUES ('001001', '1710034065', 'JUAN', 'PEREZ', '2020-01-01')"
+        )
+        conn.execute(
+            "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < ?) "
+            "INSERT INTO rphistor (empleado, fecha, tipo, clase, concepto, valor, horas, periodo, procesado, created_at) "
+            "SELECT '001001', date('2020-01-01', '+' || (x % 1500) || ' days'), 'ING', x % 200, "
+            "'CONCEPTO ' || (x % 97), (x % 100000) / 100.0, x % 12, "
+            "strftime('%Y-%m', date('2020-01-01', '+' || (x % 1500) || ' days')), 1, "
+            "'2024-01-01 00:00:00.000000' FROM n",
+            (filas,)
+        )
+        conn.commit()
+        conn.close()
+
+        inicio = time.perf_counter()
+        resultado = SqlDumper(create_engine(f"sqlite:///{origen}")).dump(volcado)
+        t_volcado = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        load_dump(volcado, copia)
+        t_carga = time.perf_counter() - inicio
+
+        print(f"Filas: {resultado['filas']:,}  Tamaño: {resultado['bytes'] / 1048576:.1f} MB")
+        print(f"Volcado: {t_volcado:.1f} s ({resultado['filas'] / t_volcado:,.0f} filas/s)")
+        print(f"Carga:   {t_carga:.1f} s ({resultado['filas'] / t_carga:,.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    test_sql_dump_round_trip()
+    print("OK Ida y vuelta del volcado SQL")
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
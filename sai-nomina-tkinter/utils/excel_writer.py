@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ExcelWriter - Sistema SGN
+Escritura de libros Excel grandes con memoria constante (openpyxl
+write-only), formatos de moneda/fecha por columna y división de hojas
+"""
+
+import sys
+from pathlib import Path
+import logging
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logger = logging.getLogger(__name__)
+
+# Filas por hoja en Excel (incluye el encabezado)
+MAX_FILAS_HOJA = 1_048_576
+
+FORMATOS_EXCEL = {
+    'moneda': '#,##0.00',
+    'fecha': 'DD/MM/YYYY',
+    'fecha_hora': 'DD/MM/YYYY HH:MM:SS',
+    'entero': '0',
+    'texto': '@',
+}
+
+ANCHOS_FORMATO = {'moneda': 14, 'fecha': 12, 'fecha_hora': 20}
+
+# Filas entre llamadas al callback de progreso
+INTERVALO_PROGRESO = 5000
+
+
+class ExcelStreamWriter:
+    """
+    Libro Excel escrito fila a fila
+
+    Cada fila se serializa al archivo temporal de openpyxl en cuanto se
+    agrega, así que la memoria no depende de la cantidad de filas; las
+    filas pueden venir directamente de un cursor (yield_per). Una hoja que
+    supera el límite de Excel continúa en 'Nombre (2)', 'Nombre (3)'...
+    con el mismo encabezado.
+
+    Uso:
+        with ExcelStreamWriter("empleados.xlsx") as libro:
+            libro.add_sheet("Empleados", columnas, filas, {'SUELDO': 'moneda'})
+    """
+
+    def __init__(self, path, max_rows=MAX_FILAS_HOJA):
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.workbook = Workbook(write_only=True)
+        self.sheets = []
+        self.cancelada = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.save()
+        return False
+
+    def add_sheet(self, nombre, columnas, filas, formatos=None, anchos=None, progress_callback=None):
+        """
+        Agregar una hoja (o varias si no cabe en una)
+
+        Args:
+            nombre: Nombre de la hoja (se recorta a 31 caracteres)
+            columnas: Encabezados
+            filas: Iterable de secuencias en el orden de columnas
+            formatos: {columna o índice: clave de FORMATOS_EXCEL o formato propio}
+            anchos: {columna o índice: ancho}
+            progress_callback: f(filas_escritas); devolver False detiene la hoja
+
+        Returns:
+            int: Filas de datos escritas
+        """
+        columnas = list(columnas)
+        formatos = self._by_index(columnas, formatos)
+        anchos = self._by_index(columnas, anchos)
+        por_hoja = self.max_rows - 1
+
+        # Una celda con estilo por columna formateada, reutilizada en cada fila
+        ws = self._new_sheet(nombre, columnas, formatos, anchos)
+        celdas = {i: self._styled_cell(ws, formato) for i, formato in formatos.items()}
+
+        escritas = en_hoja = 0
+        for fila in filas:
+            if en_hoja == por_hoja:
+                ws = self._new_sheet(nombre, columnas, formatos, anchos)
+                celdas = {i: self._styled_cell(ws, formato) for i, formato in formatos.items()}
+                en_hoja = 0
+            if celdas:
+                fila = list(fila)
+                for i, celda in celdas.items():
+                    if fila[i] is not None:
+                        celda.value = fila[i]
+                        fila[i] = celda
+            ws.append(fila)
+            escritas += 1
+            en_hoja += 1
+            if progress_callback and escritas % INTERVALO_PROGRESO == 0:
+                if progress_callback(escritas) is False:
+                    self.cancelada = True
+                    break
+
+        if progress_callback and not self.cancelada:
+            progress_callback(escritas)
+        return escritas
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workbook.save(self.path)
+        logger.info(f"Excel generado: {self.path} ({len(self.sheets)} hojas)")
+        return str(self.path)
+
+    @staticmethod
+    def _by_index(columnas, valores):
+        resultado = {}
+        for clave, valor in (valores or {}).items():
+            indice = clave if isinstance(clave, int) else columnas.index(clave)
+            resultado[indice] = valor
+        return resultado
+
+    def _sheet_title(self, nombre):
+        titulo = nombre[:31]
+        numero = 1
+        while titulo in self.sheets:
+            numero += 1
+            sufijo = f" ({numero})"
+            titulo = nombre[:31 - len(sufijo)] + sufijo
+        return titulo
+
+    def _new_sheet(self, nombre, columnas, formatos, anchos):
+        ws = self.workbook.create_sheet(self._sheet_title(nombre))
+        self.sheets.append(ws.title)
+        ws.freeze_panes = 'A2'
+
+        for i, columna in enumerate(columnas):
+            ancho = anchos.get(i) or max(len(str(columna)) + 2, ANCHOS_FORMATO.get(formatos.get(i), 10))
+            ws.column_dimensions[get_column_letter(i + 1)].width = ancho
+
+        encabezado = []
+        for columna in columnas:
+            celda = WriteOnlyCell(ws, value=columna)
+            celda.font = Font(bold=True)
+            encabezado.append(celda)
+        ws.append(encabezado)
+        return ws
+
+    @staticmethod
+    def _styled_cell(ws, formato):
+        celda = WriteOnlyCell(ws)
+        celda.number_format = FORMATOS_EXCEL.get(formato, formato)
+        return celda
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FileReader - Sistema SGN
+Lectura por bloques de archivos CSV/Excel grandes con memoria acotada
+"""
+
+import sys
+from pathlib import Path
+from datetime import datetime, date
+import logging
+import queue
+import threading
+
+import pandas as pd
+
+# Agregar path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ('.csv', '.xlsx', '.xls')
+
+# Bloques de bytes para contar líneas de un CSV sin interpretarlo
+BLOQUE_CONTEO = 1024 * 1024
+
+
+class ChunkedFileReader:
+    """
+    Lector de CSV/Excel que entrega DataFrames de chunk_size filas
+
+    El CSV se lee con pandas (chunksize) y el XLSX fila a fila con openpyxl
+    en modo read_only, así que la memoria depende del tamaño del bloque y
+    no del archivo. El índice de cada bloque es la fila de datos dentro del
+    archivo (0 = primera fila bajo el encabezado), de modo que 'índice + 2'
+    sigue siendo el número de fila que ve el usuario en Excel.
+
+    Args:
+        path: Archivo .csv, .xlsx o .xls
+        chunk_size: Filas por bloque (Config.IMPORT_CHUNK_SIZE por defecto)
+        dtype: Tipos por columna, p. ej. {'CEDULA': str} para conservar ceros
+        encoding: Codificación del CSV
+        sheet_name: Hoja de Excel (la activa si no se indica)
+    """
+
+    def __init__(self, path, chunk_size=None, dtype=None, encoding='utf-8', sheet_name=None):
+        self.path = Path(path)
+        self.chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+        self.dtype = dict(dtype or {})
+        self.encoding = encoding
+        self.sheet_name = sheet_name
+        self.extension = self.path.suffix.lower()
+        if self.extension not in FORMATOS:
+            raise ValueError("Formato de archivo no soportado")
+        self.size = self.path.stat().st_size
+        self._columns = None
+
+    # Información del archivo sin leerlo completo
+
+    def columns(self):
+        """Nombres de columna del encabezado"""
+        if self._columns is None:
+            self._columns = list(self.preview(0).columns)
+        return self._columns
+
+    def preview(self, rows=5):
+        """Primeras filas del archivo, con los mismos tipos que los bloques"""
+        if self.extension == '.csv':
+            return pd.read_csv(self.path, nrows=rows, dtype=self.dtype, encoding=self.encoding)
+        if self.extension == '.xls':
+            return pd.read_excel(self.path, nrows=rows, dtype=self.dtype, sheet_name=self.sheet_name or 0)
+
+        workbook, sheet = self._open_sheet()
+        try:
+            filas = sheet.iter_rows(values_only=True)
+            header = self._header(next(filas, ()))
+            datos = []
+            for numero, valores in enumerate(filas):
+                if len(datos) >= rows:
+                    break
+                if any(v is not None for v in valores):
+                    datos.append((numero, valores))
+            return self._frame(header, datos)
+        finally:
+            workbook.close()
+
+    def count_rows(self):
+        """
+        Cantidad de filas de datos
+
+        En CSV se cuentan saltos de línea por bloques de bytes (un campo
+        entre comillas con saltos de línea cuenta de más); en XLSX se usa la
+        dimensión declarada por la hoja cuando existe.
+        """
+        if self.extension == '.csv':
+            lineas = 0
+            ultimo = b'\n'
+            with open(self.path, 'rb') as fh:
+                while True:
+                    bloque = fh.read(BLOQUE_CONTEO)
+                    if not bloque:
+                        break
+                    lineas += bloque.count(b'\n')
+                    ultimo = bloque[-1:]
+            if ultimo != b'\n':
+                lineas += 1
+            return max(lineas - 1, 0)
+
+        if self.extension == '.xls':
+            return len(pd.read_excel(self.path, usecols=[0], sheet_name=self.sheet_name or 0))
+
+        workbook, sheet = self._open_sheet()
+        try:
+            if sheet.max_row:
+                return max(sheet.max_row - 1, 0)
+            return sum(1 for _ in sheet.iter_rows(min_row=2, max_col=1, values_only=True))
+        finally:
+            workbook.close()
+
+    # Lectura por bloques
+
+    def __iter__(self):
+        return self.chunks()
+
+    def chunks(self, progress_callback=None, prefetch=0):
+        """
+        Iterar los bloques del archivo
+
+        Args:
+            progress_callback: callback(bytes_leidos, bytes_totales, filas_leidas)
+                después de cada bloque
+            prefetch: Bloques que un hilo lector prepara por adelantado; con
+                1 o 2 la lectura del siguiente bloque se superpone con la
+                validación y escritura del actual sin perder el límite de memoria
+        """
+        if prefetch:
+            return self._prefetched(progress_callback, prefetch)
+        return self._chunks(progress_callback)
+
+    def _chunks(self, progress_callback=None):
+        if self.extension == '.csv':
+            source = self._csv_chunks()
+        elif self.extension == '.xlsx':
+            source = self._xlsx_chunks()
+        else:
+            source = self._xls_chunks()
+
+        filas = 0
+        for chunk, bytes_leidos in source:
+            filas += len(chunk)
+            if progress_callback:
+                progress_callback(bytes_leidos, self.size, filas)
+            yield chunk
+
+    def _prefetched(self, progress_callback, prefetch):
+        """Producir los bloques en un hilo y consumirlos desde una cola acotada"""
+        cola = queue.Queue(maxsize=prefetch)
+        fin = object()
+        detener = threading.Event()
+
+        def producir():
+            try:
+                for chunk in self._chunks(progress_callback):
+                    while not detener.is_set():
+                        try:
+                            cola.put(chunk, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if detener.is_set():
+                        return
+                cola.put(fin)
+            except Exception as e:
+                cola.put(e)
+
+        hilo = threading.Thread(target=producir, name="file-reader", daemon=True)
+        hilo.start()
+        try:
+            while True:
+                item = cola.get()
+                if item is fin:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # El consumidor puede abandonar la iteración antes del final
+            detener.set()
+            while hilo.is_alive():
+                try:
+                    cola.get_nowait()
+                except queue.Empty:
+                    hilo.join(0.1)
+
+    def _csv_chunks(self):
+        with open(self.path, 'rb') as fh:
+            reader = pd.read_csv(fh, chunksize=self.chunk_size, dtype=self.dtype, encoding=self.encoding)
+            for chunk in reader:
+                yield chunk, min(fh.tell(), self.size)
+
+    def _xlsx_chunks(self):
+        workbook, sheet = self._open_sheet()
+        try:
+            total = sheet.max_row or 0
+            filas = sheet.iter_rows(values_only=True)
+            header = self._header(next(filas, ()))
+            self._columns = header
+            datos = []
+            for numero, valores in enumerate(filas):
+                # Filas totalmente vacías no son datos; se conserva la numeración
+                if any(v is not None for v in valores):
+                    datos.append((numero, valores))
+                if len(datos) >= self.chunk_size:
+                    yield self._frame(header, datos), self._estimate_bytes(numero + 2, total)
+                    datos = []
+            if datos:
+                yield self._frame(header, datos), self.size
+        finally:
+            workbook.close()
+
+    def _xls_chunks(self):
+        # El formato .xls binario no se puede leer por filas: se carga y se
+        # entrega por bloques para que el resto del proceso sea el mismo
+        df = pd.read_excel(self.path, dtype=self.dtype, sheet_name=self.sheet_name or 0)
+        for inicio in range(0, len(df), self.chunk_size):
+            fin = min(inicio + self.chunk_size, len(df))
+            yield df.iloc[inicio:fin], self._estimate_bytes(fin + 1, len(df) + 1)
+
+    # Utilidades de XLSX
+
+    def _open_sheet(self):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        sheet = workbook[self.sheet_name] if self.sheet_name else workbook.active
+        return workbook, sheet
+
+    @staticmethod
+    def _header(valores):
+        header = [str(v).strip() if v is not None else '' for v in valores]
+        while header and not header[-1]:
+            header.pop()
+        return [nombre or f"Unnamed: {i}" for i, nombre in enumerate(header)]
+
+    def _frame(self, header, datos):
+        ancho = len(header)
+        df = pd.DataFrame(
+            [tuple(valores[:ancho]) + (None,) * (ancho - len(valores)) for _, valores in datos],
+            columns=header,
+            index=pd.Index([numero for numero, _ in datos]),
+        )
+        for columna, tipo in self.dtype.items():
+            if columna in df.columns and tipo is str:
+                df[columna] = df[columna].map(_as_text, na_action='ignore')
+        return df.infer_objects()
+
+    def _estimate_bytes(self, fila, total):
+        """El XLSX está comprimido: los bytes se estiman por la fracción de filas leídas"""
+        if not total:
+            return 0
+        return min(int(self.size * fila / total), self.size)
+
+
+def _as_text(valor):
+    """Texto de una celda como lo escribiría el usuario (1712345678.0 -> '1712345678')"""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, datetime) and valor.time() == datetime.min.time():
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
@@ -1,67 +1,171 @@
 """Validaciones para datos ecuatorianos"""
 
 import re
+import unicodedata
 from datetime import datetime, date
 from decimal import Decimal
 from typing import Union
 
+import numpy as np
+
+# Códigos de error de las validaciones por columna (0 = válido)
+VALIDO = 0
+ERROR_VACIO = 1
+ERROR_LONGITUD = 2
+ERROR_NO_NUMERICO = 3
+ERROR_PROVINCIA = 4
+ERROR_TERCER_DIGITO = 5
+ERROR_VERIFICADOR = 6
+ERROR_ESTABLECIMIENTO = 7
+ERROR_FORMATO = 8
+
+MENSAJES_VALIDACION = {
+    ERROR_VACIO: "Valor vacío",
+    ERROR_LONGITUD: "Longitud incorrecta",
+    ERROR_NO_NUMERICO: "Contiene caracteres no numéricos",
+    ERROR_PROVINCIA: "Código de provincia inválido",
+    ERROR_TERCER_DIGITO: "Tercer dígito inválido",
+    ERROR_VERIFICADOR: "Dígito verificador incorrecto",
+    ERROR_ESTABLECIMIENTO: "Establecimiento debe ser 001",
+    ERROR_FORMATO: "Formato inválido",
+}
+
+PATRON_EMAIL = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+_EMAIL = re.compile(PATRON_EMAIL)
+
+_COEFICIENTES_CEDULA = np.array([2, 1, 2, 1, 2, 1, 2, 1, 2], dtype=np.int32)
+
+def _como_texto(valores) -> np.ndarray:
+    """Arreglo de texto a partir de una lista, Serie o arreglo (None/NaN -> '')"""
+    if isinstance(valores, np.ndarray) and valores.dtype.kind == 'U':
+        return valores
+    if hasattr(valores, 'to_numpy'):
+        valores = valores.to_numpy(dtype=object)
+    texto = [v if type(v) is str else ('' if v is None or v != v else str(v)) for v in valores]
+    return np.array(texto, dtype=str) if texto else np.array([], dtype='U1')
+
+def _matriz_digitos(texto: np.ndarray, ancho: int) -> np.ndarray:
+    """Matriz (n, ancho) con el valor de cada carácter menos '0'"""
+    codigos = np.frombuffer(np.ascontiguousarray(texto, dtype=f'U{ancho}').tobytes(), dtype=np.uint32)
+    return codigos.reshape(-1, ancho).astype(np.int32) - ord('0')
+
+def _codigos_cedula_digitos(digitos: np.ndarray) -> np.ndarray:
+    """Reglas de cédula sobre una matriz de dígitos ASCII ya verificada (n, >=10)"""
+    codigos = np.full(len(digitos), VALIDO, dtype=np.int8)
+
+    productos = digitos[:, :9] * _COEFICIENTES_CEDULA
+    productos -= 9 * (productos >= 10)
+    verificador = (10 - productos.sum(axis=1) % 10) % 10
+    codigos[verificador != digitos[:, 9]] = ERROR_VERIFICADOR
+
+    # Se asignan de menor a mayor prioridad: queda el primer error de la lista
+    codigos[digitos[:, 2] > 5] = ERROR_TERCER_DIGITO
+    provincia = digitos[:, 0] * 10 + digitos[:, 1]
+    codigos[(provincia < 1) | (provincia > 24)] = ERROR_PROVINCIA
+    return codigos
+
+def _codigos_numericos(valores, longitud: int):
+    """Vacío, longitud y dígitos ASCII; devuelve (códigos, máscara de candidatos, matriz)"""
+    texto = _como_texto(valores)
+    codigos = np.full(len(texto), ERROR_LONGITUD, dtype=np.int8)
+    if not len(texto):
+        return codigos, np.zeros(0, dtype=bool), np.zeros((0, longitud), dtype=np.int32)
+
+    largos = np.char.str_len(texto)
+    codigos[largos == 0] = ERROR_VACIO
+    con_largo = largos == longitud
+
+    digitos = _matriz_digitos(texto[con_largo], longitud)
+    numericos = ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+    codigos[np.flatnonzero(con_largo)[~numericos]] = ERROR_NO_NUMERICO
+
+    candidatos = con_largo.copy()
+    candidatos[con_largo] = numericos
+    codigos[candidatos] = VALIDO
+    return codigos, candidatos, digitos[numericos]
+
+def codigos_cedula(cedulas) -> np.ndarray:
+    """
+    Validar una columna de cédulas; devuelve el código de error de cada una
+
+    Las reglas (provincia 01-24, tercer dígito menor a 6 y dígito verificador
+    módulo 10) se calculan sobre una matriz de dígitos, sin recorrer las
+    cédulas una por una. 0 es válida; ver MENSAJES_VALIDACION.
+    """
+    codigos, candidatos, digitos = _codigos_numericos(cedulas, 10)
+    if len(digitos):
+        codigos[candidatos] = _codigos_cedula_digitos(digitos)
+    return codigos
+
+def validar_cedulas(cedulas) -> np.ndarray:
+    """Máscara booleana de cédulas válidas, alineada con la entrada"""
+    return codigos_cedula(cedulas) == VALIDO
+
+def codigos_ruc(rucs) -> np.ndarray:
+    """Validar una columna de RUC de persona natural (cédula válida + 001)"""
+    codigos, candidatos, digitos = _codigos_numericos(rucs, 13)
+    if len(digitos):
+        resultado = _codigos_cedula_digitos(digitos)
+        establecimiento = digitos[:, 10] * 100 + digitos[:, 11] * 10 + digitos[:, 12]
+        resultado[(resultado == VALIDO) & (establecimiento != 1)] = ERROR_ESTABLECIMIENTO
+        codigos[candidatos] = resultado
+    return codigos
+
+def validar_rucs(rucs) -> np.ndarray:
+    """Máscara booleana de RUC válidos, alineada con la entrada"""
+    return codigos_ruc(rucs) == VALIDO
+
+def codigos_email(emails) -> np.ndarray:
+    """Validar una columna de emails con el patrón precompilado"""
+    texto = _como_texto(emails)
+    coincide = _EMAIL.fullmatch
+    codigos = np.fromiter(
+        (ERROR_VACIO if not e else (VALIDO if coincide(e) else ERROR_FORMATO) for e in texto),
+        dtype=np.int8, count=len(texto)
+    )
+    return codigos
+
+def validar_emails(emails) -> np.ndarray:
+    """Máscara booleana de emails con formato válido"""
+    return codigos_email(emails) == VALIDO
+
+def codigos_cuenta(cuentas, minimo: int = 6, maximo: int = 20) -> np.ndarray:
+    """Validar una columna de números de cuenta bancaria (solo dígitos, de minimo a maximo)"""
+    texto = _como_texto(cuentas)
+    codigos = np.full(len(texto), VALIDO, dtype=np.int8)
+    if not len(texto):
+        return codigos
+
+    largos = np.char.str_len(texto)
+    en_rango = (largos >= minimo) & (largos <= maximo)
+    codigos[~en_rango] = ERROR_LONGITUD
+    codigos[largos == 0] = ERROR_VACIO
+
+    # Posiciones más allá del largo de cada cuenta son relleno
+    digitos = _matriz_digitos(texto[en_rango], maximo)
+    relleno = np.arange(maximo) >= largos[en_rango][:, None]
+    numericos = (((digitos >= 0) & (digitos <= 9)) | relleno).all(axis=1)
+    codigos[np.flatnonzero(en_rango)[~numericos]] = ERROR_NO_NUMERICO
+    return codigos
+
 def validar_cedula(cedula: str) -> bool:
     """Validar cédula ecuatoriana"""
-    if not cedula or len(cedula) != 10:
-        return False
-
-    if not cedula.isdigit():
-        return False
-
-    # Validar provincia (primeros 2 dígitos)
-    provincia = int(cedula[:2])
-    if provincia < 1 or provincia > 24:
-        return False
-
-    # Validar tercer dígito
-    tercer_digito = int(cedula[2])
-    if tercer_digito > 5:
+    if not cedula:
         return False
-
-    # Algoritmo de validación
-    coeficientes = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-    total = 0
-
-    for i in range(9):
-        valor = int(cedula[i]) * coeficientes[i]
-        if valor >= 10:
-            valor = valor - 9
-        total += valor
-
-    digito_verificador = total % 10
-    if digito_verificador != 0:
-        digito_verificador = 10 - digito_verificador
-
-    return digito_verificador == int(cedula[9])
+    return bool(codigos_cedula([cedula])[0] == VALIDO)
 
 def validar_ruc(ruc: str) -> bool:
     """Validar RUC ecuatoriano"""
-    if not ruc or len(ruc) != 13:
-        return False
-
-    if not ruc.isdigit():
+    if not ruc:
         return False
-
-    # Los primeros 10 dígitos deben ser una cédula válida
-    cedula = ruc[:10]
-    if not validar_cedula(cedula):
-        return False
-
-    # Los últimos 3 dígitos deben ser 001
-    return ruc[10:] == "001"
+    return bool(codigos_ruc([ruc])[0] == VALIDO)
 
 def validar_email(email: str) -> bool:
     """Validar formato de email"""
     if not email:
         return False
 
-    patron = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(patron, email) is not None
+    return _EMAIL.fullmatch(email) is not None
 
 def validar_telefono(telefono: str) -> bool:
     """Validar formato de teléfono ecuatoriano"""
@@ -178,6 +282,18 @@ def normalizar_texto(texto: str) -> str:
 
     return texto_normalizado
 
+def normalizar_busqueda(texto: str) -> str:
+    """Normalizar texto para búsquedas: mayúsculas, espacios simples y sin tildes"""
+    texto_normalizado = normalizar_texto(texto)
+    if texto_normalizado.isascii():
+        return texto_normalizado
+
+    # Separar las tildes (y la virgulilla de la Ñ) y descartarlas
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', texto_normalizado)
+        if not unicodedata.combining(c)
+    )
+
 def normalizar_cedula(cedula: str) -> str:
     """Normalizar cédula removiendo caracteres especiales"""
     if not cedula: